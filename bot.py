@@ -25,6 +25,15 @@ from utils.alconna_compat import install_satori_file_segment_guard  # noqa: E402
 
 install_satori_file_segment_guard()
 
+from utils.http import http_client  # noqa: E402
+
+driver.on_startup(http_client.start)
+driver.on_shutdown(http_client.close)
+
+from utils.audio import log_transcode_metrics  # noqa: E402
+
+driver.on_shutdown(log_transcode_metrics)
+
 nonebot.load_plugins("plugins")
 
 nonebot.load_plugin("nonebot_plugin_manosaba_memes")
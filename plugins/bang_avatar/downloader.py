@@ -8,6 +8,8 @@ import aiohttp
 import aiofiles
 from nonebot import logger
 
+from utils.http import http_client
+
 
 class AsyncDownloader:
     def __init__(self, cache_dir: Path, data_dir: Path, max_concurrent_tasks: int = 32):
@@ -41,7 +43,8 @@ class AsyncDownloader:
             folder_name: Target folder name
             file_name: Target file name
             max_retries: Maximum number of retry attempts (default: 3)
-            retry_delay: Delay between retries in seconds (default: 1.0)
+            retry_delay: Initial delay between retries in seconds, doubled on
+                each further attempt (default: 1.0)
         """
         file_path: Path = self.data_dir / folder_name / file_name
 
@@ -49,48 +52,40 @@ class AsyncDownloader:
             file_path.parent.mkdir(parents=True, exist_ok=True)
 
         async with self.semaphore:
-            last_error = None
-            for attempt in range(max_retries + 1):
-                try:
-                    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(60)) as session:
-                        async with session.get(url, headers=self.headers) as response:
-                            if response.status != 200:
-                                logger.error(
-                                    f"Downloader: Failed to download {url}, status code: {response.status}"
-                                )
-                                return
-
-                            data: bytes = await response.read()
+            try:
+                async with http_client.request(
+                    "GET",
+                    url,
+                    headers=self.headers,
+                    timeout=60,
+                    retries=max_retries,
+                    backoff=retry_delay,
+                ) as response:
+                    if response.status != 200:
+                        logger.error(
+                            f"Downloader: Failed to download {url}, status code: {response.status}"
+                        )
+                        return
 
-                            if len(data) == 14559 or len(data) == 14084:
-                                logger.warning(f"Downloader: Bestdori image missing {url}")
-                                async with aiofiles.open(
-                                    self.cache_dir / "bad_url.txt", "a"
-                                ) as bad_file:
-                                    await bad_file.write(url + "\n")
-                            else:
-                                async with aiofiles.open(file_path, "wb") as file:
-                                    await file.write(data)
+                    data: bytes = await response.read()
 
-                                logger.success(
-                                    f"Downloader: Successfully downloaded {url} ({os.path.getsize(file_path)})"
-                                )
-                                return
-                except (aiohttp.ClientError, asyncio.TimeoutError, IOError) as e:
-                    last_error = e
-                    if attempt < max_retries:
-                        logger.warning(
-                            f"Downloader: 下载失败 (尝试 {attempt + 1}/{max_retries}) - URL: {url} - 错误: {str(e)}"
-                        )
-                        await asyncio.sleep(retry_delay)
-                    continue
-                except Exception as e:
-                    logger.error("Downloader: 未知错误 - URL: {} - 错误类型: {} - 详情: {}", url, type(e).__name__, e)
-                    return
+                if len(data) == 14559 or len(data) == 14084:
+                    logger.warning(f"Downloader: Bestdori image missing {url}")
+                    async with aiofiles.open(
+                        self.cache_dir / "bad_url.txt", "a"
+                    ) as bad_file:
+                        await bad_file.write(url + "\n")
+                else:
+                    async with aiofiles.open(file_path, "wb") as file:
+                        await file.write(data)
 
-            if last_error:
-                error_type = type(last_error).__name__
-                logger.error("Downloader: 下载失败 (超过最大重试次数 {}) - URL: {} - 最后错误: {}: {}", max_retries, url, error_type, str(last_error))
+                    logger.success(
+                        f"Downloader: Successfully downloaded {url} ({os.path.getsize(file_path)})"
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError, IOError) as e:
+                logger.error("Downloader: 下载失败 (超过最大重试次数 {}) - URL: {} - 最后错误: {}: {}", max_retries, url, type(e).__name__, str(e))
+            except Exception as e:
+                logger.error("Downloader: 未知错误 - URL: {} - 错误类型: {} - 详情: {}", url, type(e).__name__, e)
 
     async def download_cards(
         self, urls: List[str], folder_name: str, file_names: List[str]
@@ -3,6 +3,8 @@ from pathlib import Path
 from PIL import Image
 from nonebot import logger
 
+from utils.assets import AssetManifest
+
 from .utils import resize_img
 from .utils import svg_to_png
 from .models import Band
@@ -84,11 +86,15 @@ async def initialize(src_path: Path, cache_path: Path):
         "star.png": (107, 107),
         "star_trained.png": (107, 107),
     }
+    assets = AssetManifest(src_path, cache_path / "asset_manifest.json")
     missing = {
         name
         for name, size in expected.items()
-        if not _valid_png(src_path / name, size)
+        if not assets.is_valid(
+            src_path / name, lambda path, size=size: _valid_png(path, size)
+        )
     }
+    assets.save()
     logger.info(
         "BanGAvatar: 开机资源自检 "
         f"cached={len(expected) - len(missing)}/{len(expected)} "
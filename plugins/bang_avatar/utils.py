@@ -3,9 +3,9 @@ from io import BytesIO
 from PIL import Image
 from PIL import ImageDraw
 from PIL import ImageFilter
-from aiohttp import ClientSession
 from nonebot.adapters.satori import MessageSegment
 
+from utils.http import http_client
 from utils.images import image_segment
 from utils.image_tasks import run_image_task
 
@@ -104,11 +104,8 @@ async def get_group_member_head(
     if not avatar_url:
         avatar_url = f"https://q.qlogo.cn/qqapp/{app_id}/{user_id}/{mode}"
 
-    async with ClientSession() as cs:
-        async with await cs.get(avatar_url) as response:
-            response.raise_for_status()
-            img_bytes = await response.read()
-            return await run_image_task(_decode_image, img_bytes)
+    img_bytes = await http_client.get_bytes(avatar_url)
+    return await run_image_task(_decode_image, img_bytes)
 
 
 def image_to_message(image: Image.Image) -> MessageSegment:
@@ -9,6 +9,7 @@ from nonebot import on_command
 from nonebot.log import logger
 from nonebot.params import CommandArg
 from nonebot.exception import MatcherException
+from nonebot.permission import SUPERUSER
 from nonebot.adapters.satori import Message
 from nonebot.adapters.satori import MessageEvent
 
@@ -41,6 +42,7 @@ from .handlers import handle_split_decision  # noqa: E402
 from .handlers import handle_initial_blackjack  # noqa: E402
 from .help_render import help_page  # noqa: E402
 from .messages import Messages  # noqa: E402
+from .game_service import BlackjackGameService  # noqa: E402
 from .stats_render import stats_page  # noqa: E402
 from .stats_render import stats_card_data  # noqa: E402
 from .stats_service import get_blackjack_stats  # noqa: E402
@@ -81,6 +83,12 @@ game_stats = on_command(
     priority=10,
     block=True,
 )
+stats_backfill = on_command(
+    "rebuild-bkstats",
+    priority=10,
+    block=True,
+    permission=SUPERUSER,
+)
 
 
 @get_driver().on_startup
@@ -289,3 +297,20 @@ async def handle_stats(event: MessageEvent):
             + gens[event.message.id].element,
             referrer=gens[event.message.id].event.referrer,
         )
+
+
+@stats_backfill.handle()
+async def handle_stats_backfill(event: MessageEvent):
+    """Rebuild the stats rollups for the open season and every stored window"""
+    gens[event.message.id] = PG(event)
+    season_bounds = get_current_season_bounds()
+    if season_bounds is None:
+        count = BlackjackGameService.backfill_all_rollups()
+    else:
+        count = BlackjackGameService.backfill_all_rollups(
+            start_time=season_bounds[0], end_time=season_bounds[1]
+        )
+    await stats_backfill.finish(
+        f"已重建 {count} 条黑香澄统计汇总。" + gens[event.message.id].element,
+        referrer=gens[event.message.id].event.referrer,
+    )
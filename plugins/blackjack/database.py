@@ -6,7 +6,11 @@ require("nonebot_plugin_localstore")
 
 import nonebot_plugin_localstore as store  # noqa: E402
 
+from utils.migrations import migrations  # noqa: E402
+from utils.migrations import index_signature  # noqa: E402
+
 from .models import Base  # noqa: E402
+from .models import BlackjackGame  # noqa: E402
 
 # Database path
 database_path = store.get_data_file("blackjack", "games.db")
@@ -21,10 +25,23 @@ def init_database():
 
     # Initialize database
     engine = create_engine(f"sqlite:///{database_path.resolve()}")
-    Base.metadata.create_all(engine)
+    with migrations(engine, "blackjack") as registry:
+        Base.metadata.create_all(engine)
+        registry.run(
+            "blackjack.game_indexes",
+            migrate_game_indexes,
+            engine,
+            content=index_signature(BlackjackGame),
+        )
     session = sessionmaker(bind=engine)()
 
 
+def migrate_game_indexes(engine):
+    """Create indexes declared after the games table first shipped"""
+    for index in BlackjackGame.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+
 def get_session():
     """Get the database session"""
     global session
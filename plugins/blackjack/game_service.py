@@ -6,10 +6,20 @@ import time
 from typing import List
 from typing import Optional
 
+from sqlalchemy import case
+from sqlalchemy import func
+
 from .models import GameResult
 from .models import BlackjackGame
+from .models import BlackjackStatsRollup
 from .database import get_session
 
+# Unbounded stats use the window [0, LIFETIME_END) so lifetime and season
+# totals share one rollup table.
+LIFETIME_END = 2**62
+
+WINNING_RESULTS = (GameResult.WIN.value, GameResult.BLACKJACK.value)
+
 
 class BlackjackGameService:
     """Service class for handling blackjack game database operations"""
@@ -47,10 +57,157 @@ class BlackjackGameService:
         )
 
         session.add(game)
+        BlackjackGameService._apply_to_rollups(session, game)
         session.commit()
 
         return game
 
+    @staticmethod
+    def _window(start_time: int | None, end_time: int | None) -> tuple[int, int]:
+        return (
+            0 if start_time is None else start_time,
+            LIFETIME_END if end_time is None else end_time,
+        )
+
+    @staticmethod
+    def _apply_to_rollups(session, game: BlackjackGame) -> None:
+        """Add one new game to every rollup window that covers its timestamp.
+
+        Runs inside the caller's transaction; windows that do not exist yet
+        are backfilled on their first read instead.
+        """
+        rollups = (
+            session.query(BlackjackStatsRollup)
+            .filter(
+                BlackjackStatsRollup.user_id == game.user_id,
+                BlackjackStatsRollup.start_time <= game.timestamp,
+                BlackjackStatsRollup.end_time > game.timestamp,
+            )
+            .all()
+        )
+        for rollup in rollups:
+            rollup.total_games += 1
+            rollup.total_wagered += game.bet_amount
+            if game.result in WINNING_RESULTS:
+                rollup.wins += 1
+            if game.result == GameResult.PUSH.value:
+                rollup.pushes += 1
+            if game.result == GameResult.BLACKJACK.value:
+                rollup.blackjacks += 1
+            if game.winnings > 0:
+                rollup.total_won += game.winnings
+                rollup.biggest_win = max(rollup.biggest_win, game.winnings)
+            elif game.winnings < 0:
+                rollup.total_lost += -game.winnings
+                rollup.biggest_loss = max(rollup.biggest_loss, -game.winnings)
+
+    @staticmethod
+    def backfill_rollup(
+        user_id: str, *, start_time: int | None = None, end_time: int | None = None
+    ) -> Optional[BlackjackStatsRollup]:
+        """
+        Recompute and store one rollup window from the raw game rows
+
+        Args:
+            user_id: Player's user ID
+            start_time: Inclusive Unix timestamp lower bound.
+            end_time: Exclusive Unix timestamp upper bound.
+
+        Returns:
+            The rollup row, or None (nothing stored) when the window is empty
+        """
+        session = get_session()
+        start, end = BlackjackGameService._window(start_time, end_time)
+        won = case((BlackjackGame.winnings > 0, BlackjackGame.winnings), else_=0)
+        lost = case((BlackjackGame.winnings < 0, -BlackjackGame.winnings), else_=0)
+
+        def count_where(condition):
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+        totals = (
+            session.query(
+                func.count(BlackjackGame.id),
+                count_where(BlackjackGame.result.in_(WINNING_RESULTS)),
+                count_where(BlackjackGame.result == GameResult.PUSH.value),
+                count_where(BlackjackGame.result == GameResult.BLACKJACK.value),
+                func.coalesce(func.sum(BlackjackGame.bet_amount), 0),
+                func.coalesce(func.sum(won), 0),
+                func.coalesce(func.sum(lost), 0),
+                func.coalesce(func.max(won), 0),
+                func.coalesce(func.max(lost), 0),
+            )
+            .filter(
+                BlackjackGame.user_id == user_id,
+                BlackjackGame.timestamp >= start,
+                BlackjackGame.timestamp < end,
+            )
+            .one()
+        )
+        rollup = BlackjackGameService._get_rollup(session, user_id, start, end)
+        if not totals[0]:
+            if rollup is not None:
+                session.delete(rollup)
+                session.commit()
+            return None
+        if rollup is None:
+            rollup = BlackjackStatsRollup(
+                user_id=user_id, start_time=start, end_time=end
+            )
+            session.add(rollup)
+        (
+            rollup.total_games,
+            rollup.wins,
+            rollup.pushes,
+            rollup.blackjacks,
+            rollup.total_wagered,
+            rollup.total_won,
+            rollup.total_lost,
+            rollup.biggest_win,
+            rollup.biggest_loss,
+        ) = (int(value) for value in totals)
+        session.commit()
+        return rollup
+
+    @staticmethod
+    def backfill_all_rollups(
+        *, start_time: int | None = None, end_time: int | None = None
+    ) -> int:
+        """
+        Rebuild the given window for every player, plus every stored window
+
+        Returns:
+            Number of rollup windows recomputed
+        """
+        session = get_session()
+        windows = {
+            (row.user_id, row.start_time, row.end_time)
+            for row in session.query(BlackjackStatsRollup).all()
+        }
+        start, end = BlackjackGameService._window(start_time, end_time)
+        windows.update(
+            (user_id, start, end)
+            for (user_id,) in session.query(BlackjackGame.user_id).distinct()
+        )
+        for user_id, window_start, window_end in windows:
+            BlackjackGameService.backfill_rollup(
+                user_id, start_time=window_start, end_time=window_end
+            )
+        return len(windows)
+
+    @staticmethod
+    def _get_rollup(
+        session, user_id: str, start: int, end: int
+    ) -> Optional[BlackjackStatsRollup]:
+        return (
+            session.query(BlackjackStatsRollup)
+            .filter(
+                BlackjackStatsRollup.user_id == user_id,
+                BlackjackStatsRollup.start_time == start,
+                BlackjackStatsRollup.end_time == end,
+            )
+            .first()
+        )
+
     @staticmethod
     def get_user_games(
         user_id: str,
@@ -95,22 +252,27 @@ class BlackjackGameService:
         """
         Get comprehensive statistics for a user
 
+        Reads a single ``BlackjackStatsRollup`` row, backfilling it from the
+        game records the first time a window is requested.
+
         Args:
             user_id: Player's user ID
+            start_time: Inclusive Unix timestamp lower bound.
+            end_time: Exclusive Unix timestamp upper bound.
 
         Returns:
             Dictionary with complete statistics
         """
         session = get_session()
+        start, end = BlackjackGameService._window(start_time, end_time)
 
-        query = session.query(BlackjackGame).filter(BlackjackGame.user_id == user_id)
-        if start_time is not None:
-            query = query.filter(BlackjackGame.timestamp >= start_time)
-        if end_time is not None:
-            query = query.filter(BlackjackGame.timestamp < end_time)
-        games = query.all()
+        rollup = BlackjackGameService._get_rollup(session, user_id, start, end)
+        if rollup is None:
+            rollup = BlackjackGameService.backfill_rollup(
+                user_id, start_time=start_time, end_time=end_time
+            )
 
-        if not games:
+        if rollup is None:
             return {
                 "total_games": 0,
                 "wins": 0,
@@ -129,56 +291,25 @@ class BlackjackGameService:
                 "biggest_loss": 0,
             }
 
-        # Basic counts
-        total_games = len(games)
-        wins = len(
-            [
-                g
-                for g in games
-                if g.result in [GameResult.WIN.value, GameResult.BLACKJACK.value]
-            ]
-        )
-        pushes = len([g for g in games if g.result == GameResult.PUSH.value])
+        total_games = rollup.total_games
+        wins = rollup.wins
+        pushes = rollup.pushes
         losses = total_games - wins - pushes
-        blackjacks = len(
-            [g for g in games if g.result == GameResult.BLACKJACK.value]
-        )
-
-        # Win rate
-        win_rate = wins / total_games if total_games > 0 else 0.0
-
-        # Financial stats
-        total_wagered = sum(game.bet_amount for game in games)
-        total_won = sum(game.winnings for game in games if game.winnings > 0)
-        total_lost = abs(sum(game.winnings for game in games if game.winnings < 0))
-        net_profit = total_won - total_lost
-
-        # Averages
-        avg_bet = total_wagered / total_games if total_games > 0 else 0.0
-        avg_win = total_won / wins if wins > 0 else 0.0
-        avg_loss = total_lost / losses if losses > 0 else 0.0
-
-        # Extremes
-        win_amounts = [game.winnings for game in games if game.winnings > 0]
-        loss_amounts = [abs(game.winnings) for game in games if game.winnings < 0]
-
-        biggest_win = max(win_amounts) if win_amounts else 0
-        biggest_loss = max(loss_amounts) if loss_amounts else 0
 
         return {
             "total_games": total_games,
             "wins": wins,
             "losses": losses,
             "pushes": pushes,
-            "blackjacks": blackjacks,
-            "win_rate": win_rate,
-            "total_wagered": total_wagered,
-            "total_won": total_won,
-            "total_lost": total_lost,
-            "net_profit": net_profit,
-            "avg_bet": avg_bet,
-            "avg_win": avg_win,
-            "avg_loss": avg_loss,
-            "biggest_win": biggest_win,
-            "biggest_loss": biggest_loss,
+            "blackjacks": rollup.blackjacks,
+            "win_rate": wins / total_games if total_games > 0 else 0.0,
+            "total_wagered": rollup.total_wagered,
+            "total_won": rollup.total_won,
+            "total_lost": rollup.total_lost,
+            "net_profit": rollup.total_won - rollup.total_lost,
+            "avg_bet": rollup.total_wagered / total_games if total_games > 0 else 0.0,
+            "avg_win": rollup.total_won / wins if wins > 0 else 0.0,
+            "avg_loss": rollup.total_lost / losses if losses > 0 else 0.0,
+            "biggest_win": rollup.biggest_win,
+            "biggest_loss": rollup.biggest_loss,
         }
@@ -2,9 +2,11 @@ import random
 from enum import StrEnum
 from typing import List
 
+from sqlalchemy import Index
 from sqlalchemy import Column
 from sqlalchemy import String
 from sqlalchemy import Integer
+from sqlalchemy import UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 
 # Database base class
@@ -125,5 +127,37 @@ class BlackjackGame(Base):
     is_split = Column(Integer, default=0)  # 是否分牌 (0/1)
     timestamp = Column(Integer, nullable=False)  # Unix timestamp
 
+    __table_args__ = (Index("ix_blackjack_games_user_time", "user_id", "timestamp"),)
+
     def __repr__(self):
         return f"<BlackjackGame(user_id={self.user_id}, bet={self.bet_amount}, result={self.result}, winnings={self.winnings})>"
+
+
+class BlackjackStatsRollup(Base):
+    """Running totals of one player's games inside ``[start_time, end_time)``.
+
+    Created the first time a window (lifetime or one season's bounds) is
+    queried, then kept current by ``BlackjackGameService.record_game``.
+    """
+
+    __tablename__ = "blackjack_stats_rollups"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, nullable=False, index=True)
+    start_time = Column(Integer, nullable=False)
+    end_time = Column(Integer, nullable=False)
+    total_games = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)  # WIN + BLACKJACK
+    pushes = Column(Integer, nullable=False, default=0)
+    blackjacks = Column(Integer, nullable=False, default=0)
+    total_wagered = Column(Integer, nullable=False, default=0)
+    total_won = Column(Integer, nullable=False, default=0)
+    total_lost = Column(Integer, nullable=False, default=0)
+    biggest_win = Column(Integer, nullable=False, default=0)
+    biggest_loss = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "start_time", "end_time", name="uq_blackjack_rollup_window"
+        ),
+    )
@@ -29,6 +29,7 @@ from utils.avatar import get_avatar  # noqa: E402
 from utils.images import image_segment_async  # noqa: E402
 from utils.theming import kit_for_user  # noqa: E402
 from utils.identity import identity_for  # noqa: E402
+from utils.matching import NameIndex  # noqa: E402
 from utils.image_tasks import run_image_task  # noqa: E402
 from utils.waiter_rules import same_channel  # noqa: E402
 from utils.waiter_rules import is_force_stop_message  # noqa: E402
@@ -39,8 +40,8 @@ from utils.passive_generator import generators as gens  # noqa: E402
 
 from .. import monetary  # noqa: E402
 from .card import Card  # noqa: E402
-from .draw import image_to_message  # noqa: E402
 from .draw import random_crop_image  # noqa: E402
+from .draw import encoded_to_message  # noqa: E402
 from .store import GamersStore  # noqa: E402
 from .config import Config  # noqa: E402
 from .render import LevelGain  # noqa: E402
@@ -69,20 +70,16 @@ cut_name_to_amount = {
 }
 
 
-def _prepare_game_images(image_path: Path, image_cut_setting: dict):
-    """Decode, crop and encode the two in-round images in one worker."""
+def _crop_round_image(source: Image.Image, image_cut_setting: dict):
+    """Crop and encode the in-round puzzle from an already decoded card."""
 
-    with Image.open(image_path) as source:
-        source.load()
-        full_image = image_to_message(source)
-        cropped_image = random_crop_image(
-            source,
-            image_cut_setting["cut_width"],
-            image_cut_setting["cut_length"],
-            image_cut_setting["is_black"],
-            image_cut_setting["cut_counts"],
-        )
-    return full_image, cropped_image
+    return random_crop_image(
+        source,
+        image_cut_setting["cut_width"],
+        image_cut_setting["cut_length"],
+        image_cut_setting["is_black"],
+        image_cut_setting["cut_counts"],
+    )
 
 
 data_path = localstore.get_data_dir("cck")
@@ -109,6 +106,7 @@ character_data: Dict[str, List[str]] = json.loads(
 
 for k, v in character_data.items():
     character_data[k] = [str(i).lower() for i in v]
+character_index = NameIndex(character_data)
 
 if plugin_config.enable_cck:
 
@@ -120,7 +118,7 @@ if plugin_config.enable_cck:
     # 运行 _get_data 后会阻塞，不清楚为什么，所以暂时注释掉，有空重启 Kasumi 就能更新
 
 
-#: Per-server value pick order, matching ``Card._get_res_info``.
+#: Per-server value pick order, matching ``Card._res_info``.
 _SERVER_PICK_ORDER = (0, 3, 2, 1, 4)
 
 
@@ -266,7 +264,18 @@ async def handle_cck(event: MessageEvent, arg: Message = CommandArg()):
 
     gamers_store.add(event.channel.id)
 
-    character_id, card_id, image_path = await card_manager.random_card_image()
+    try:
+        round_card = await card_manager.take_round_card()
+    except (LookupError, OSError):
+        gamers_store.remove(event.channel.id)
+        logger.opt(exception=True).warning("cck round card unavailable")
+        await start_cck.finish(
+            "卡面加载失败了，请稍后再试" + current_pg.element,
+            referrer=current_pg.event.referrer,
+        )
+    character_id = round_card.entry.character_id
+    card_id = round_card.entry.card_id
+    image_path = round_card.entry.path
 
     character_name = character_data[character_id][0]
 
@@ -293,9 +302,11 @@ async def handle_cck(event: MessageEvent, arg: Message = CommandArg()):
             **kwargs,
         )
 
-    full_image, image = await run_image_task(
-        _prepare_game_images,
-        image_path,
+    # The reveal sends the cached PNG as is; only the puzzle is encoded.
+    full_image = encoded_to_message(round_card.encoded)
+    image = await run_image_task(
+        _crop_round_image,
+        round_card.image,
         image_cut_setting,
     )
 
@@ -351,11 +362,9 @@ async def handle_cck(event: MessageEvent, arg: Message = CommandArg()):
             )
             break
 
-        found_characters = [
-            key for key, values in character_data.items() if msg.lower() in values
-        ]
+        guessed_character = character_index.exact_match(msg)
 
-        if not found_characters:
+        if guessed_character is None:
             continue
 
         if user_id not in player_counts.keys():
@@ -368,7 +377,7 @@ async def handle_cck(event: MessageEvent, arg: Message = CommandArg()):
             )
             continue
 
-        if found_characters[0] != character_id:
+        if guessed_character != character_id:
             player_counts[user_id] += 1
             continue
 
@@ -1,17 +1,82 @@
-import asyncio
-import os
 import random
-from pathlib import Path
+import asyncio
+from io import BytesIO
 from typing import Tuple
+from pathlib import Path
+from collections import deque
+from collections import defaultdict
+from dataclasses import dataclass
 
-import aiohttp
-from aiohttp import ClientTimeout
 from PIL import Image
 from PIL import UnidentifiedImageError
 from nonebot import logger
 
+from utils.http import http_client
+from utils.assets import AssetScan
+from utils.assets import AssetManifest
+from utils.image_tasks import run_image_task
+
 from .downloader import AsyncDownloader
 
+#: ``type -> (normal, trained)`` art a card has; ``None`` means "only if the
+#: card has a training stat".
+_RES_VARIANTS = {
+    "initial": (True, False),
+    "permanent": (True, None),
+    "event": (True, None),
+    "limited": (True, None),
+    "campaign": (True, None),
+    "others": (None, True),
+    "dreamfes": (True, True),
+    "birthday": (False, True),
+    "kirafes": (False, True),
+    "special": (True, True),
+}
+
+
+#: 猜卡面只从该稀有度及以上的卡牌中出题。
+ROUND_MIN_RARITY = 3
+#: 预先解码、等待下一局使用的卡面数；一张原尺寸卡面约 4 MB。
+ROUND_POOL_SIZE = 2
+
+
+@dataclass(frozen=True)
+class CardEntry:
+    """磁盘上一张已缓存的卡面。"""
+
+    character_id: str
+    card_id: str
+    rarity: int
+    path: Path
+
+
+@dataclass(frozen=True)
+class RoundCard:
+    """一局猜卡面所需的卡面：解码后的图像和原始 PNG 字节。
+
+    揭晓时直接发送原始字节，不必重新编码整张卡面。
+    """
+
+    entry: CardEntry
+    image: Image.Image
+    encoded: bytes
+
+
+def _decode_round_card(entry: CardEntry) -> RoundCard:
+    encoded = entry.path.read_bytes()
+    with Image.open(BytesIO(encoded)) as opened:
+        image = opened.convert("RGB")
+    return RoundCard(entry, image, encoded)
+
+
+def _verify_png(path: Path) -> bool:
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except (OSError, UnidentifiedImageError):
+        return False
+    return True
+
 
 class Card:
     """
@@ -21,6 +86,12 @@ class Card:
     def __init__(self, proxy: str = None):
         self.initialized = False
         self._proxy = proxy
+        #: 磁盘上已有的卡面，按稀有度（每张卡一组特训前/后卡面）和角色索引。
+        self.cards_by_rarity: dict[int, tuple[tuple[CardEntry, ...], ...]] = {}
+        self.cards_by_character: dict[str, tuple[CardEntry, ...]] = {}
+        self._round_cards: tuple[tuple[CardEntry, ...], ...] = ()
+        self._ready: deque[RoundCard] = deque()
+        self._refill_task: asyncio.Task | None = None
 
     async def initialize(self, base_path: Path, cache_path: Path):
         logger.info("Card: 正在初始化")
@@ -28,6 +99,7 @@ class Card:
         self.base_path = base_path / "cards"
 
         self.downloader = AsyncDownloader(cache_path, self.base_path)
+        self.assets = AssetManifest(self.base_path, cache_path / "card_assets.json")
 
         await self._get_data()
 
@@ -36,9 +108,10 @@ class Card:
 
     async def _get_data(self):
         summary_url = "https://bestdori.com/api/cards/all.5.json"
-        async with aiohttp.ClientSession(timeout=ClientTimeout(30)) as session:
-            async with session.get(summary_url, proxy=self._proxy) as response:
-                self.__summary_data__: dict = await response.json()
+        async with http_client.request(
+            "GET", summary_url, proxy=self._proxy, timeout=30
+        ) as response:
+            self.__summary_data__: dict = await response.json()
         logger.success("Card: 成功获取卡牌简略数据")
 
         self.__processed_data__ = {
@@ -56,60 +129,50 @@ class Card:
         bad_res = await self._get_bad_res()
 
         for i, v in self.__summary_data__.items():
-            res_data, server = await self._get_res_info(i)
+            res_data, server = self._res_info(i)
             server_dict[v["resourceSetName"]] = server
             if res_data["normal"]:
                 res.append(f'{v["resourceSetName"]}_card_normal.png')
             if res_data["trained"]:
                 res.append(f'{v["resourceSetName"]}_card_after_training.png')
 
-        valid_cards, invalid_cards = await asyncio.to_thread(
-            self._valid_card_names, self.base_path
-        )
-        _miss_cards = list(set(res).difference(valid_cards))
+        scan = await asyncio.to_thread(self._scan_cards)
         logger.info(
             "Card: 开机资源自检 "
-            f"cached={len(valid_cards)}/{len(res)} invalid={len(invalid_cards)}"
+            f"cached={len(scan.valid)}/{len(res)} invalid={len(scan.invalid)} "
+            f"verified={self.assets.verified}"
         )
 
-        miss_cards = []
-
-        for v in _miss_cards:
-            if v not in bad_res:
-                miss_cards.append(v)
+        bad_res = set(bad_res)
+        miss_cards = [
+            name for name in dict.fromkeys(scan.missing(res)) if name not in bad_res
+        ]
 
         if len(miss_cards) > 0:
             logger.warning(f"Card: 卡面资源未下载: {miss_cards}")
             logger.info("Card: 开始尝试下载卡面资源")
             await self.downloader.download_cards(miss_cards, server_dict)
+            scan = await asyncio.to_thread(self._scan_cards)
         else:
             logger.info("Card: 卡面资源加载成功")
 
-    @staticmethod
-    def _valid_card_names(file_dir: Path) -> tuple[set[str], list[Path]]:
+        self._build_index(scan.valid)
+        self._schedule_refill()
+
+    def _scan_cards(self) -> AssetScan:
         """Return valid cached card PNG names and any corrupt files.
 
         The old startup check only compared filenames, so an interrupted
         download could leave a zero-byte/HTML file that was never repaired.
         Pillow's lightweight ``verify`` catches those files; the normal
         missing-resource path then downloads them again on this same boot.
+        The asset manifest limits ``verify`` to files added or changed since
+        the last boot.
         """
 
-        names: set[str] = set()
-        invalid: list[Path] = []
-        for root, _, files in os.walk(file_dir):
-            for filename in files:
-                if not filename.lower().endswith(".png"):
-                    continue
-                path = Path(root) / filename
-                try:
-                    with Image.open(path) as image:
-                        image.verify()
-                except (OSError, UnidentifiedImageError):
-                    invalid.append(path)
-                else:
-                    names.add(filename)
-        return names, invalid
+        scan = self.assets.scan(".png", _verify_png)
+        self.assets.save()
+        return scan
 
     async def _get_bad_res(self) -> tuple:
         res_lst = []
@@ -122,79 +185,88 @@ class Card:
                     res_lst.append(f"res{res_id}_card_normal.png")
         return res_lst
 
-    async def _get_res_info(self, card_id: int) -> Tuple[dict, str]:
-        card_id = str(card_id)
-        type = self.__summary_data__[card_id]["type"]
+    def _res_info(self, card_id: int | str) -> Tuple[dict, str]:
+        card = self.__summary_data__[str(card_id)]
         server = "jp"
         for i in [0, 3, 2, 1, 4]:
-            if self.__summary_data__[card_id]["prefix"][i]:
+            if card["prefix"][i]:
                 server = ["jp", "en", "tw", "cn", "kr"][i]
                 break
 
-        result_map = {
-            "initial": ({"normal": True, "trained": False}, server),
-            "permanent": (
-                {
-                    "normal": True,
-                    "trained": (
-                        True
-                        if self.__summary_data__[card_id]["stat"].get("training")
-                        else False
-                    ),
-                },
-                server,
-            ),
-            "event": (
-                {
-                    "normal": True,
-                    "trained": (
-                        True
-                        if self.__summary_data__[card_id]["stat"].get("training")
-                        else False
-                    ),
-                },
-                server,
-            ),
-            "limited": (
-                {
-                    "normal": True,
-                    "trained": (
-                        True
-                        if self.__summary_data__[card_id]["stat"].get("training")
-                        else False
-                    ),
-                },
-                server,
-            ),
-            "campaign": (
-                {
-                    "normal": True,
-                    "trained": (
-                        True
-                        if self.__summary_data__[card_id]["stat"].get("training")
-                        else False
-                    ),
-                },
-                server,
-            ),
-            "others": (
-                {
-                    "normal": (
-                        True
-                        if self.__summary_data__[card_id]["stat"].get("training")
-                        else False
-                    ),
-                    "trained": True,
-                },
-                server,
-            ),
-            "dreamfes": ({"normal": True, "trained": True}, server),
-            "birthday": ({"normal": False, "trained": True}, server),
-            "kirafes": ({"normal": False, "trained": True}, server),
-            "special": ({"normal": True, "trained": True}, server),
+        normal, trained = _RES_VARIANTS[card["type"]]
+        has_training = bool(card["stat"].get("training"))
+        return (
+            {
+                "normal": has_training if normal is None else normal,
+                "trained": has_training if trained is None else trained,
+            },
+            server,
+        )
+
+    def _build_index(self, valid_names: set[str]) -> None:
+        """按稀有度和角色索引磁盘上已有的卡面。"""
+
+        by_rarity: dict[int, list[tuple[CardEntry, ...]]] = defaultdict(list)
+        by_character: dict[str, list[CardEntry]] = defaultdict(list)
+        for card_id, card_data in self.__processed_data__.items():
+            res_data, _ = self._res_info(card_id)
+            character_id = str(card_data["characterId"])
+            rarity = int(card_data.get("rarity", 0))
+            folder = self.base_path / f"res{character_id.zfill(3)}"
+            resource_set = card_data["resourceSetName"]
+            variants = tuple(
+                CardEntry(character_id, card_id, rarity, folder / name)
+                for name, has_variant in (
+                    (f"{resource_set}_card_normal.png", res_data["normal"]),
+                    (f"{resource_set}_card_after_training.png", res_data["trained"]),
+                )
+                if has_variant and name in valid_names
+            )
+            if variants:
+                by_rarity[rarity].append(variants)
+                by_character[character_id].extend(variants)
+
+        self.cards_by_rarity = {
+            rarity: tuple(cards) for rarity, cards in sorted(by_rarity.items())
+        }
+        self.cards_by_character = {
+            character_id: tuple(entries)
+            for character_id, entries in by_character.items()
         }
+        self._round_cards = tuple(
+            variants
+            for rarity, cards in self.cards_by_rarity.items()
+            if rarity >= ROUND_MIN_RARITY
+            for variants in cards
+        )
+        self._ready.clear()
+        logger.info(f"Card: 可用于猜卡面的卡牌 {len(self._round_cards)} 张")
+
+    def random_card_entry(self) -> CardEntry:
+        """随机选择一张 3★ 及以上、已缓存的卡面。
 
-        return result_map[type]
+        先等概率选卡，再在该卡已缓存的特训前/后卡面中等概率选一张。
+        """
+
+        while self._round_cards:
+            entry = random.choice(random.choice(self._round_cards))
+            if entry.path.exists():
+                return entry
+            logger.warning(f"Card: 未找到卡面图片 {entry.path}")
+            self._discard_round_entry(entry)
+        raise LookupError("Card: 没有可用的卡面")
+
+    def _discard_round_entry(self, entry: CardEntry) -> None:
+        """把无法使用的卡面移出猜卡面的卡池。"""
+
+        self._round_cards = tuple(
+            remaining
+            for remaining in (
+                tuple(other for other in variants if other != entry)
+                for variants in self._round_cards
+            )
+            if remaining
+        )
 
     async def random_card_image(self) -> Tuple[str, str, Path]:
         """随机获取一张卡面图片
@@ -202,45 +274,35 @@ class Card:
         Returns:
             Tuple[str, str, Path]: 包含角色ID，卡片ID，和卡片图像路径的元组。
         """
-        filtered_data = {
-            key: value
-            for key, value in self.__processed_data__.items()
-            if value.get("rarity", 0) >= 3
-        }
-        card_id: str = random.choice(list(filtered_data.keys()))
-        card_data = self.__processed_data__[card_id]
-
-        character_id = str(card_data["characterId"])
-
-        res_data, _ = await self._get_res_info(card_id)
-
-        if res_data["normal"] and not res_data["trained"]:
-            card_path = (
-                self.base_path
-                / f"res{character_id.zfill(3)}"
-                / f"{card_data['resourceSetName']}_card_normal.png"
-            )
-        elif res_data["trained"] and not res_data["normal"]:
-            card_path = (
-                self.base_path
-                / f"res{character_id.zfill(3)}"
-                / f"{card_data['resourceSetName']}_card_after_training.png"
-            )
-        else:
-            # 随机选择一个
-            card_path = random.choice(
-                [
-                    self.base_path
-                    / f"res{character_id.zfill(3)}"
-                    / f"{card_data['resourceSetName']}_card_normal.png",
-                    self.base_path
-                    / f"res{character_id.zfill(3)}"
-                    / f"{card_data['resourceSetName']}_card_after_training.png",
-                ]
-            )
-
-        if not card_path.exists():
-            logger.warning(f"Card: 未找到卡面图片 {card_path}")
-            return await self.random_card_image()
 
-        return character_id, card_id, card_path
+        entry = self.random_card_entry()
+        return entry.character_id, entry.card_id, entry.path
+
+    async def take_round_card(self) -> RoundCard:
+        """取出一张预先解码好的卡面，并在后台补充下一张。"""
+
+        card = self._ready.popleft() if self._ready else None
+        if card is None:
+            card = await run_image_task(_decode_round_card, self.random_card_entry())
+        self._schedule_refill()
+        return card
+
+    def _schedule_refill(self) -> None:
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        while len(self._ready) < ROUND_POOL_SIZE and self._round_cards:
+            try:
+                entry = self.random_card_entry()
+            except LookupError as exc:
+                logger.warning(f"Card: 预解码卡面失败: {exc}")
+                return
+            try:
+                card = await run_image_task(_decode_round_card, entry)
+            except (OSError, UnidentifiedImageError) as exc:
+                # 坏掉的卡面移出卡池后继续补充，不让一张卡拖垮整个预解码。
+                logger.warning(f"Card: 预解码卡面 {entry.path} 失败，已跳过: {exc}")
+                self._discard_round_entry(entry)
+                continue
+            self._ready.append(card)
@@ -4,10 +4,11 @@ from typing import Dict
 from typing import List
 from pathlib import Path
 
-import aiohttp
 import aiofiles
 from nonebot import logger
 
+from utils.http import http_client
+
 
 class AsyncDownloader:
     def __init__(self, cache_dir: Path, data_dir: Path, max_concurrent_tasks: int = 32):
@@ -41,29 +42,30 @@ class AsyncDownloader:
 
         async with self.semaphore:
             try:
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(60)) as session:
-                    async with session.get(url, headers=self.headers) as response:
-                        if response.status != 200:
-                            logger.error(
-                                f"Downloader: Failed to download {url}, status code: {response.status}"
-                            )
-                            return
+                async with http_client.request(
+                    "GET", url, headers=self.headers, timeout=60
+                ) as response:
+                    if response.status != 200:
+                        logger.error(
+                            f"Downloader: Failed to download {url}, status code: {response.status}"
+                        )
+                        return
 
-                        data: bytes = await response.read()
+                    data: bytes = await response.read()
 
-                        if len(data) == 14559 or len(data) == 14084:
-                            logger.warning(f"Downloader: Bestdori image missing {url}")
-                            async with aiofiles.open(
-                                self.cache_dir / "bad_url.txt", "a"
-                            ) as bad_file:
-                                await bad_file.write(url + "\n")
-                        else:
-                            async with aiofiles.open(file_path, "wb") as file:
-                                await file.write(data)
+                if len(data) == 14559 or len(data) == 14084:
+                    logger.warning(f"Downloader: Bestdori image missing {url}")
+                    async with aiofiles.open(
+                        self.cache_dir / "bad_url.txt", "a"
+                    ) as bad_file:
+                        await bad_file.write(url + "\n")
+                else:
+                    async with aiofiles.open(file_path, "wb") as file:
+                        await file.write(data)
 
-                            logger.success(
-                                f"Downloader: Successfully downloaded {url} ({os.path.getsize(file_path)})"
-                            )
+                    logger.success(
+                        f"Downloader: Successfully downloaded {url} ({os.path.getsize(file_path)})"
+                    )
             except Exception as e:
                 logger.error("Downloader: {}", e)
 
@@ -20,6 +20,19 @@ def image_to_message(image: Image.Image) -> MessageSegment:
     return image_segment(image)
 
 
+def encoded_to_message(data: bytes) -> MessageSegment:
+    """
+    将已编码的 PNG 字节直接转换为 MessageSegment 对象，不重新编码
+
+    参数:
+        data (bytes): PNG 文件内容
+
+    返回:
+        MessageSegment: 返回 MessageSegment 对象
+    """
+    return MessageSegment.image(raw=data, mime="image/png")
+
+
 def random_crop_image(
     image: Image.Image,
     cut_width: int,
@@ -71,7 +71,7 @@ message_listener = on_message(priority=99, block=False)
 @message_listener.handle()
 async def auto_assign_task(event: MessageEvent):
     user_id = event.get_user_id()
-    daily_task_service.ensure_daily_task(user_id)
+    daily_task_service.ensure_assigned(user_id)
 
 
 # ========== Public functions for game plugins ==========
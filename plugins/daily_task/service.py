@@ -5,21 +5,46 @@ import time
 import random
 from typing import Optional
 from pathlib import Path
-from datetime import datetime
+from dataclasses import dataclass
 
 from nonebot.log import logger
 
-from utils.clock import bot_now
+from utils.clock import bot_today
+from utils.clock import next_bot_midnight
 
 from .. import monetary
 from .models import DailyTask
 from .database import get_session
 
 
+@dataclass
+class _TaskState:
+    """What ``check_progress`` needs to know about one user's task today."""
+
+    task_id: str
+    event_type: str
+    completed: bool
+
+
 class DailyTaskService:
+    """Daily task assignment and progress.
+
+    Game plugins call ``check_progress`` after every round, so today's task
+    state is kept in memory: ``_states`` maps a user to their task (``None``
+    once we know they have none yet) and ``_interested`` maps an event type
+    to the users whose incomplete task listens for it. A round that cannot
+    complete anything is answered from those dicts; the database is read once
+    per user per day and written only on assignment and completion. Both
+    dicts are dropped at the product-timezone midnight.
+    """
+
     def __init__(self):
         self._session = None
         self._task_configs = None
+        self._day = ""
+        self._rollover_at = 0
+        self._states: dict[str, Optional[_TaskState]] = {}
+        self._interested: dict[str, set[str]] = {}
 
     @property
     def session(self):
@@ -39,13 +64,64 @@ class DailyTaskService:
     def get_task_config_list(self):
         return list(self.task_configs.values())
 
+    def _today(self) -> str:
+        """Today's date key, dropping yesterday's cached state at midnight."""
+        now = time.time()
+        if now >= self._rollover_at:
+            self._day = bot_today().strftime("%Y-%m-%d")
+            self._rollover_at = next_bot_midnight(now)
+            self._states.clear()
+            self._interested.clear()
+        return self._day
+
+    def _remember(
+        self, user_id: str, task: Optional[DailyTask]
+    ) -> Optional[_TaskState]:
+        previous = self._states.get(user_id)
+        if previous is not None:
+            self._interested.get(previous.event_type, set()).discard(user_id)
+        if task is None:
+            self._states[user_id] = None
+            return None
+        cfg = self.task_configs.get(task.task_id)
+        state = _TaskState(
+            task_id=task.task_id,
+            event_type=cfg["type"] if cfg else "",
+            completed=bool(task.is_completed),
+        )
+        self._states[user_id] = state
+        if cfg and not state.completed:
+            self._interested.setdefault(state.event_type, set()).add(user_id)
+        return state
+
+    def _state(self, user_id: str) -> Optional[_TaskState]:
+        today = self._today()
+        if user_id not in self._states:
+            task = (
+                self.session.query(DailyTask)
+                .filter_by(user_id=user_id, date=today)
+                .first()
+            )
+            return self._remember(user_id, task)
+        return self._states[user_id]
+
+    def ensure_assigned(self, user_id: str) -> None:
+        """``ensure_daily_task`` for callers that don't need the row.
+
+        The per-message listener uses this, so after the first message of the
+        day it costs a dict lookup.
+        """
+        if self._state(user_id) is None:
+            self.ensure_daily_task(user_id)
+
     def ensure_daily_task(self, user_id: str) -> Optional[DailyTask]:
         """Ensure the user has a daily task for today. If not, assign one."""
-        today = bot_now().strftime("%Y-%m-%d")
+        today = self._today()
         task = (
             self.session.query(DailyTask).filter_by(user_id=user_id, date=today).first()
         )
         if task:
+            self._remember(user_id, task)
             return task
 
         # Randomly assign a task
@@ -58,11 +134,12 @@ class DailyTaskService:
         task = DailyTask(user_id=user_id, date=today, task_id=cfg["id"])
         self.session.add(task)
         self.session.commit()
+        self._remember(user_id, task)
         return task
 
     def get_today_task(self, user_id: str) -> Optional[DailyTask]:
         """Get the user's task for today."""
-        today = bot_now().strftime("%Y-%m-%d")
+        today = self._today()
         return (
             self.session.query(DailyTask).filter_by(user_id=user_id, date=today).first()
         )
@@ -80,25 +157,29 @@ class DailyTaskService:
 
         Returns the notification message if the task was completed, None otherwise.
         """
-        task = self.get_today_task(user_id)
-        if not task or task.is_completed:
+        state = self._state(user_id)
+        if user_id not in self._interested.get(event_type, ()):
             return None
 
-        cfg = self.task_configs.get(task.task_id)
-        if not cfg:
-            return None
-
-        # Match event type and conditions
+        cfg = self.task_configs[state.task_id]
+        # Match conditions
         if not self._match(cfg, event_type, data or {}):
             return None
 
-        # Mark complete
-        task.is_completed = True
-        task.completed_at = int(time.time())
+        # Mark complete; the guard keeps a stale cache from paying twice
+        completed = (
+            self.session.query(DailyTask)
+            .filter_by(user_id=user_id, date=self._day, is_completed=False)
+            .update({"is_completed": True, "completed_at": int(time.time())})
+        )
         self.session.commit()
+        state.completed = True
+        self._interested[event_type].discard(user_id)
+        if not completed:
+            return None
 
         # Award stickers
-        monetary.add_star_stickers(user_id, cfg["reward"], f"daily_task_{task.task_id}")
+        monetary.add_star_stickers(user_id, cfg["reward"], f"daily_task_{state.task_id}")
 
         return f"每日任务【{cfg['name']}】完成！\n获得 {cfg['reward']} 张星星贴纸！"
 
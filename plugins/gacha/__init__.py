@@ -1,6 +1,5 @@
 """Seasonal gacha commands."""
 
-import json
 from typing import Iterable
 from typing import Sequence
 from pathlib import Path
@@ -51,10 +50,6 @@ class _BestdoriConfig(BaseModel):
     bestdori_proxy: str | None = None
 
 
-#: Repo root; ``metadata.art`` paths in ``items.json`` are relative to it.
-_PROJECT_ROOT = Path(__file__).resolve().parents[2]
-
-
 @get_driver().on_startup
 async def init():
     init_database()
@@ -271,6 +266,7 @@ def _item_maps(
     """
 
     from ..inventory.service import get_item
+    from ..inventory.service import get_item_art
 
     names: dict[str, str] = {}
     art: dict[str, Path] = {}
@@ -279,17 +275,7 @@ def _item_maps(
         if item is None:
             continue
         names[item_id] = item.name
-        try:
-            metadata = json.loads(item.metadata_json or "{}")
-        except ValueError:
-            metadata = {}
-        art_value = metadata.get("art")
-        if not art_value:
-            continue
-        path = Path(art_value)
-        if not path.is_absolute():
-            path = _PROJECT_ROOT / path
-        if path.exists():
+        if path := get_item_art(item_id):
             art[item_id] = path
     return names, art
 
@@ -10,6 +10,8 @@ require("nonebot_plugin_localstore")
 
 import nonebot_plugin_localstore as store  # noqa: E402
 
+from utils.migrations import migrations  # noqa: E402
+
 from .models import Base  # noqa: E402
 
 database_path = store.get_data_file("gacha", "gacha.db")
@@ -21,13 +23,14 @@ def init_database():
     global session
 
     engine = create_engine(f"sqlite:///{database_path.resolve()}")
-    Base.metadata.create_all(engine)
-    migrate_gacha_schema(engine)
+    with migrations(engine, "gacha") as registry:
+        Base.metadata.create_all(engine)
+        registry.run("gacha.schema", migrate_gacha_schema, engine)
     session = sessionmaker(bind=engine)()
 
 
 def migrate_gacha_schema(engine) -> None:
-    """Add columns introduced after the first local gacha database shipped."""
+    """Add columns and indexes introduced after the first gacha database shipped."""
 
     columns = {column["name"] for column in inspect(engine).get_columns("gacha_pulls")}
     if "payment_item_id" not in columns:
@@ -39,6 +42,13 @@ def migrate_gacha_schema(engine) -> None:
                     "DEFAULT 'star_sticker' NOT NULL"
                 )
             )
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_gacha_pulls_user_created "
+                "ON gacha_pulls(user_id, created_at, id)"
+            )
+        )
 
 
 def get_session():
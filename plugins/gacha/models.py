@@ -1,5 +1,6 @@
 """Seasonal gacha persistence models."""
 
+from sqlalchemy import Index
 from sqlalchemy import Column
 from sqlalchemy import String
 from sqlalchemy import Integer
@@ -19,6 +20,10 @@ class GachaState(Base):
 
 class GachaPull(Base):
     __tablename__ = "gacha_pulls"
+    # History pages seek on (user_id, created_at, id) newest first.
+    __table_args__ = (
+        Index("ix_gacha_pulls_user_created", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String, nullable=False, index=True)
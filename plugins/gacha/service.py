@@ -1,14 +1,26 @@
-"""Seasonal gacha business logic."""
+"""Seasonal gacha business logic.
+
+A banner compiles itself when it is built: one exact integer alias table per
+rarity, so choosing the entry is a single ``randint`` and two lookups however
+large the Bestdori pool grows, and the cumulative rarity thresholds for every
+pity count. ``get_current_banner`` keeps the compiled banner until the season
+config or the standing-art cache changes.
+"""
 
 import time
 import uuid
 import random
 from typing import Any
+from dataclasses import field
 from dataclasses import dataclass
 
+from sqlalchemy import tuple_
+
 from .models import GachaPull
 from .models import GachaState
 from .database import get_session
+from ..inventory.unit_of_work import on_commit
+from ..inventory.unit_of_work import commit_or_defer
 
 DEFAULT_PAGE_SIZE = 10
 
@@ -28,6 +40,56 @@ class GachaEntry:
     bestdori_variant: str | None = None
 
 
+@dataclass(frozen=True)
+class _AliasTable:
+    """Walker/Vose alias table over integer weights, exact to the last unit.
+
+    Every column holds ``total`` units: ``threshold`` of them belong to the
+    column's own entry, the rest to its ``alias``. One ``randint`` over all
+    ``len(entries) * total`` units therefore picks entry ``i`` with
+    probability ``weight_i / total`` — the same odds as the linear weighted
+    scan, without the scan.
+    """
+
+    entries: tuple[GachaEntry, ...]
+    total: int
+    threshold: tuple[int, ...]
+    alias: tuple[int, ...]
+
+    @classmethod
+    def build(cls, entries: list[GachaEntry]) -> "_AliasTable":
+        total = sum(entry.weight for entry in entries)
+        # Column ``i`` starts with ``weight_i * n`` units of its own entry.
+        # Every fill moves units out of an overfull column, and each column
+        # keeps at least the units it started with or was left, so no
+        # threshold reaches 0: unit 1 always lands on ``entries[0]``.
+        units = [entry.weight * len(entries) for entry in entries]
+        threshold = [total] * len(entries)
+        alias = list(range(len(entries)))
+        small = [index for index, value in enumerate(units) if value < total]
+        large = [index for index, value in enumerate(units) if value >= total]
+        while small and large:
+            short = small.pop()
+            donor = large.pop()
+            threshold[short] = units[short]
+            alias[short] = donor
+            units[donor] -= total - units[short]
+            (small if units[donor] < total else large).append(donor)
+        return cls(
+            entries=tuple(entries),
+            total=total,
+            threshold=tuple(threshold),
+            alias=tuple(alias),
+        )
+
+    def sample(self) -> GachaEntry:
+        roll = random.randint(1, len(self.entries) * self.total) - 1
+        column, offset = divmod(roll, self.total)
+        if offset < self.threshold[column]:
+            return self.entries[column]
+        return self.entries[self.alias[column]]
+
+
 @dataclass(frozen=True)
 class GachaBanner:
     season_key: str
@@ -40,6 +102,33 @@ class GachaBanner:
     soft_pity_start: int
     hard_pity: int
     entries: tuple[GachaEntry, ...]
+    _pools: dict[int, _AliasTable] = field(init=False, repr=False, compare=False)
+    _rarity_steps: tuple[tuple[tuple[int, float], ...], ...] = field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        grouped: dict[int, list[GachaEntry]] = {}
+        for entry in self.entries:
+            if entry.weight > 0:
+                grouped.setdefault(entry.rarity, []).append(entry)
+        object.__setattr__(
+            self,
+            "_pools",
+            {rarity: _AliasTable.build(rows) for rarity, rows in grouped.items()},
+        )
+        # The ★6 rate stops changing once the next pull reaches hard pity, so
+        # pity counts past ``hard_pity - 1`` reuse the last row.
+        steps = []
+        for pity_count in range(max(1, self.hard_pity)):
+            rates = current_rates(self, pity_count)
+            cumulative = 0.0
+            row = []
+            for rarity in sorted(rates.keys(), reverse=True):
+                cumulative += rates[rarity]
+                row.append((rarity, cumulative))
+            steps.append(tuple(row))
+        object.__setattr__(self, "_rarity_steps", tuple(steps))
 
 
 @dataclass(frozen=True)
@@ -83,13 +172,44 @@ class HistoryPage:
     total: int
 
 
+_banner_cache: tuple[Any, Any, tuple, GachaBanner | None] | None = None
+
+
 def get_current_banner() -> GachaBanner | None:
+    """Return the open season's banner, compiled once per season.
+
+    The compiled banner is reused until the season row or its config hash
+    changes, the inventory database is re-initialised, or the standing-art
+    cache gains or loses cards.
+    """
+
+    global _banner_cache
+    from .standing_art import standing_art_cache
+    from ..inventory.database import get_session as get_inventory_session
     from ..inventory.season_service import get_current_season
 
     season = get_current_season()
     if season is None:
         return None
-    return _banner_from_season(season)
+    source = get_inventory_session()
+    key = (
+        season.id,
+        season.season_key,
+        season.name,
+        season.config_hash,
+        None if standing_art_cache is None else standing_art_cache.generation,
+    )
+    cached = _banner_cache
+    if (
+        cached is not None
+        and cached[0] is source
+        and cached[1] is standing_art_cache
+        and cached[2] == key
+    ):
+        return cached[3]
+    banner = _banner_from_season(season)
+    _banner_cache = (source, standing_art_cache, key, banner)
+    return banner
 
 
 def get_state(user_id: str) -> GachaState:
@@ -103,7 +223,7 @@ def get_state(user_id: str) -> GachaState:
             updated_at=int(time.time()),
         )
         session.add(state)
-        session.commit()
+        commit_or_defer(session)
     return state
 
 
@@ -118,8 +238,7 @@ def pull(user_id: str, count: int = 1) -> list[GachaResult]:
 
     total_cost = banner.single_cost if count == 1 else banner.ten_cost
     from ..inventory.models import STAR_STICKER_ITEM_ID
-    from ..inventory.service import cost_item
-    from ..inventory.service import grant_item
+    from ..inventory.service import batch as inventory_batch
     from ..inventory.service import get_quantity
 
     if get_quantity(user_id, STAR_STICKER_ITEM_ID) < total_cost:
@@ -131,33 +250,24 @@ def pull(user_id: str, count: int = 1) -> list[GachaResult]:
     ]
     batch_key = uuid.uuid4().hex
     results = []
+    # Each draw commits its cost, grants, pity and history row as one unit.
+    # A draw that fails rolls back with its own cost and the error
+    # propagates, so a partial ten-pull only pays for the draws recorded
+    # before it. The pity state is read once and reused across the units.
+    state = get_state(user_id)
     for index, cost in enumerate(pull_costs):
-        try:
-            cost_item(
-                user_id,
-                STAR_STICKER_ITEM_ID,
-                cost,
-                f"gacha:{banner.banner_key}:{count}:{batch_key}:{index}",
-            )
-        except ValueError:
-            raise ValueError(f"星星贴纸不足，需要 {total_cost} 张") from None
-
-        try:
-            results.append(_pull_once(user_id, banner, cost, index))
-        except Exception:
-            # Inventory and gacha history are separate databases. Compensate
-            # the currently failed draw so a partial ten-pull only pays for
-            # draws whose result was successfully recorded.
-            grant_item(
-                user_id,
-                STAR_STICKER_ITEM_ID,
-                cost,
-                "gacha_failed_pull_refund",
-                source_type="gacha_refund",
-                source_id=banner.banner_key,
-                idempotency_key=f"gacha_refund:{batch_key}:{index}",
-            )
-            raise
+        with inventory_batch(user_id) as inventory:
+            try:
+                inventory.cost(
+                    STAR_STICKER_ITEM_ID,
+                    cost,
+                    f"gacha:{banner.banner_key}:{count}:{batch_key}:{index}",
+                )
+            except ValueError:
+                raise ValueError(f"星星贴纸不足，需要 {total_cost} 张") from None
+
+            results.append(_pull_once(user_id, banner, cost, index, state=state))
+            commit_or_defer(get_session())
     return results
 
 
@@ -171,8 +281,8 @@ def pull_with_currency(
     """Perform one normal banner pull paid with a non-sticker currency.
 
     The draw uses the same banner, rates, pity state, rewards, and history as
-    ``pull``. Only the inventory debit differs. A failed draw is compensated
-    with an idempotent refund so the shop can safely expose paid bonus pulls.
+    ``pull``. Only the inventory debit differs. A failed draw rolls back with
+    its payment, so the shop can safely expose paid bonus pulls.
     """
 
     if payment_amount <= 0:
@@ -185,23 +295,23 @@ def pull_with_currency(
         raise ValueError("当前没有开放的限定卡池")
     _validate_banner_rewards(banner)
 
-    from ..inventory.service import cost_item
-    from ..inventory.service import grant_item
+    from ..inventory.service import batch as inventory_batch
 
-    try:
-        cost_item(
-            user_id,
-            payment_item_id,
-            payment_amount,
-            "gacha_alternate_payment",
-            source_type="gacha",
-            source_id=banner.banner_key,
-            idempotency_key=f"{idempotency_key}:payment",
-        )
-    except ValueError:
-        raise ValueError("盆栽不足") from None
+    # The payment and the draw share one batch: a failed draw rolls the
+    # payment back with it.
+    with inventory_batch(user_id) as inventory:
+        try:
+            inventory.cost(
+                payment_item_id,
+                payment_amount,
+                "gacha_alternate_payment",
+                source_type="gacha",
+                source_id=banner.banner_key,
+                idempotency_key=f"{idempotency_key}:payment",
+            )
+        except ValueError:
+            raise ValueError("盆栽不足") from None
 
-    try:
         return _pull_once(
             user_id,
             banner,
@@ -209,35 +319,104 @@ def pull_with_currency(
             0,
             payment_item_id=payment_item_id,
         )
-    except Exception:
-        grant_item(
-            user_id,
-            payment_item_id,
-            payment_amount,
-            "gacha_failed_pull_refund",
-            source_type="gacha_refund",
-            source_id=banner.banner_key,
-            idempotency_key=f"{idempotency_key}:refund",
-        )
-        raise
 
 
 def get_history(user_id: str, page: int, page_size: int = DEFAULT_PAGE_SIZE) -> HistoryPage:
+    """Return one page of ``user_id``'s pulls, newest first.
+
+    Pages seek on ``(created_at, id)`` from the last row of the page before
+    instead of skipping rows with OFFSET. Those cursors and the pull count
+    behind the page header are cached per user until the next pull.
+    """
+
     page = max(1, page)
     session = get_session()
-    query = session.query(GachaPull).filter(GachaPull.user_id == user_id)
-    total = query.count()
+    cache = _history_cache(user_id)
+    if cache.total is None:
+        cache.total = (
+            session.query(GachaPull).filter(GachaPull.user_id == user_id).count()
+        )
+    total = cache.total
     total_pages = max(1, (total + page_size - 1) // page_size)
     page = min(page, total_pages)
+    query = session.query(GachaPull).filter(GachaPull.user_id == user_id)
+    cursor = _page_cursor(cache, user_id, page, page_size)
+    if cursor is not None:
+        query = query.filter(tuple_(GachaPull.created_at, GachaPull.id) < cursor)
     rows = (
         query.order_by(GachaPull.created_at.desc(), GachaPull.id.desc())
-        .offset((page - 1) * page_size)
         .limit(page_size)
         .all()
     )
+    if len(rows) == page_size:
+        cache.cursors[(page_size, page + 1)] = (rows[-1].created_at, rows[-1].id)
     return HistoryPage(rows=rows, page=page, total_pages=total_pages, total=total)
 
 
+@dataclass
+class _HistoryCache:
+    total: int | None = None
+    #: ``(page_size, page)`` -> key of the last row on the page before.
+    cursors: dict[tuple[int, int], tuple[int, int]] = field(default_factory=dict)
+
+
+_history: dict[str, _HistoryCache] = {}
+_history_source = None
+
+
+def _history_cache(user_id: str) -> _HistoryCache:
+    """The user's history cache; all of them reset with the gacha session."""
+
+    global _history_source
+    session = get_session()
+    if session is not _history_source:
+        _history.clear()
+        _history_source = session
+    return _history.setdefault(user_id, _HistoryCache())
+
+
+def _page_cursor(
+    cache: _HistoryCache, user_id: str, page: int, page_size: int
+) -> tuple[int, int] | None:
+    if page == 1:
+        return None
+    if (page_size, page) in cache.cursors:
+        return cache.cursors[(page_size, page)]
+    # Jumping ahead: seek from the closest page already visited and walk the
+    # rest on the (user_id, created_at, id) index alone.
+    known = max(
+        (seen for size, seen in cache.cursors if size == page_size and seen < page),
+        default=1,
+    )
+    query = get_session().query(GachaPull.created_at, GachaPull.id)
+    query = query.filter(GachaPull.user_id == user_id)
+    if known > 1:
+        start = cache.cursors[(page_size, known)]
+        query = query.filter(tuple_(GachaPull.created_at, GachaPull.id) < start)
+    row = (
+        query.order_by(GachaPull.created_at.desc(), GachaPull.id.desc())
+        .offset((page - known) * page_size - 1)
+        .limit(1)
+        .first()
+    )
+    if row is None:
+        return None
+    cache.cursors[(page_size, page)] = (row.created_at, row.id)
+    return cache.cursors[(page_size, page)]
+
+
+def _history_recorded(user_id: str) -> None:
+    """Count a new pull row once it commits; page cursors shift, so they go."""
+
+    def bump() -> None:
+        cache = _history_cache(user_id)
+        if cache.total is not None:
+            cache.total += 1
+        cache.cursors.clear()
+
+    on_commit(bump)
+
+
 def current_rates(banner: GachaBanner, pity_count: int) -> dict[int, float]:
     rates = dict(banner.base_rates)
     rarity6 = _rarity6_rate(banner, pity_count)
@@ -260,9 +439,19 @@ def _pull_once(
     batch_index: int,
     *,
     payment_item_id: str = "star_sticker",
+    state: GachaState | None = None,
 ) -> GachaResult:
+    """Draw once and record it.
+
+    A caller drawing a batch passes the ``state`` it loaded and commits the
+    gacha session itself once the batch is done; without one the state is
+    loaded here and the draw is committed (or deferred) on its own.
+    """
+
     session = get_session()
-    state = get_state(user_id)
+    standalone = state is None
+    if state is None:
+        state = get_state(user_id)
     pity_before = state.pity_count
     rarity = _roll_rarity(banner, pity_before)
     entry = _choose_entry(banner, rarity)
@@ -336,7 +525,9 @@ def _pull_once(
         created_at=int(time.time()),
     )
     session.add(pull_row)
-    session.commit()
+    if standalone:
+        commit_or_defer(session)
+    _history_recorded(user_id)
     return GachaResult(
         item_id=entry.item_id,
         character_id=entry.character_id,
@@ -351,14 +542,12 @@ def _pull_once(
 
 
 def _roll_rarity(banner: GachaBanner, pity_count: int) -> int:
-    rates = current_rates(banner, pity_count)
+    steps = banner._rarity_steps[min(pity_count, len(banner._rarity_steps) - 1)]
     roll = random.random()
-    cumulative = 0.0
-    for rarity in sorted(rates.keys(), reverse=True):
-        cumulative += rates[rarity]
+    for rarity, cumulative in steps:
         if roll <= cumulative:
             return rarity
-    return min(rates.keys())
+    return min(rarity for rarity, _ in steps)
 
 
 def _rarity6_rate(banner: GachaBanner, pity_count: int) -> float:
@@ -374,19 +563,12 @@ def _rarity6_rate(banner: GachaBanner, pity_count: int) -> float:
 
 
 def _choose_entry(banner: GachaBanner, rarity: int) -> GachaEntry:
-    entries = [entry for entry in banner.entries if entry.rarity == rarity]
-    if not entries:
+    table = banner._pools.get(rarity)
+    if table is None:
+        if any(entry.rarity == rarity for entry in banner.entries):
+            raise ValueError(f"卡池稀有度 {rarity} 权重无效")
         raise ValueError(f"卡池缺少稀有度 {rarity} 的奖励")
-    total_weight = sum(max(0, entry.weight) for entry in entries)
-    if total_weight <= 0:
-        raise ValueError(f"卡池稀有度 {rarity} 权重无效")
-    roll = random.randint(1, total_weight)
-    current = 0
-    for entry in entries:
-        current += max(0, entry.weight)
-        if roll <= current:
-            return entry
-    return entries[-1]
+    return table.sample()
 
 
 def _validate_banner_rewards(banner: GachaBanner) -> None:
@@ -456,6 +638,18 @@ def _banner_from_season(season) -> GachaBanner | None:
     config = metadata.get("gacha_banner")
     if not config:
         return None
+    return banner_from_config(season.season_key, season.name, config)
+
+
+def banner_from_config(
+    season_key: str, season_name: str, config: dict[str, Any]
+) -> GachaBanner:
+    """Build a banner from a season's ``gacha_banner`` config block.
+
+    Cached Bestdori cards join the normal pool when the standing-art cache is
+    configured; without it (offline tools) only the configured entries do.
+    """
+
     rates = {int(row["rarity"]): float(row["rate"]) for row in config["rates"]}
     entries = list(_entry_from_config(row) for row in config["entries"])
     pool_config = config.get("bestdori_standing_art_pool")
@@ -472,8 +666,8 @@ def _banner_from_season(season) -> GachaBanner | None:
         ]
         entries.extend(dynamic_entries)
     return GachaBanner(
-        season_key=season.season_key,
-        season_name=season.name,
+        season_key=season_key,
+        season_name=season_name,
         banner_key=config["banner_key"],
         name=config["name"],
         single_cost=int(config.get("single_cost", 120)),
@@ -533,6 +727,9 @@ def _register_bestdori_standing_art(card) -> None:
     from ..inventory.database import get_session
     from ..inventory.models import CosmeticItem
     from ..inventory.models import Item
+    from ..inventory.catalog import add_to_catalog
+    from ..inventory.catalog import invalidate_catalog
+    from ..inventory.unit_of_work import on_rollback
     from .standing_art import standing_art_cache
 
     if standing_art_cache is None:
@@ -568,7 +765,11 @@ def _register_bestdori_standing_art(card) -> None:
         session.add(cosmetic)
     cosmetic.cosmetic_type = "standing_art"
     cosmetic.rarity = card.rarity
-    session.commit()
+    commit_or_defer(session)
+    # Only this card changed; the rest of the snapshot is reused as is.
+    add_to_catalog(item)
+    # A rolled-back pull must not leave the card in the catalog snapshot.
+    on_rollback(invalidate_catalog)
 
 
 def _register_bestdori_entry(entry: GachaEntry) -> None:
@@ -0,0 +1,164 @@
+"""Offline Monte Carlo simulation of a gacha banner.
+
+``compile_banner`` turns the rarity thresholds a :class:`GachaBanner` compiles
+for itself (``current_rates`` per pity count, summed in ``_roll_rarity``'s
+order) into NumPy arrays, so a simulated draw resolves exactly like a live
+one. ``simulate`` then runs many independent players side by side: every step
+draws one pull for all of them at once and advances their pity vectors.
+
+Used by ``scripts/simulate_gacha.py`` to review a season's banner config
+before it ships.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .service import GachaBanner
+
+DEFAULT_PLAYERS = 100_000
+DEFAULT_BATCH_SIZE = 50_000
+PERCENTILES = (50, 75, 90, 99)
+
+
+@dataclass(frozen=True)
+class CompiledBanner:
+    rarities: np.ndarray
+    #: ``thresholds[pity, j]`` is the cumulative rate up to ``rarities[j]``.
+    thresholds: np.ndarray
+    #: What ``_roll_rarity`` returns when a roll clears every threshold.
+    fallback_rarities: np.ndarray
+    featured_weight: int
+    rarity6_weight: int
+    single_cost: int
+    ten_cost: int
+
+
+@dataclass(frozen=True)
+class SimulationReport:
+    players: int
+    pulls_per_player: int
+    starting_pity: int
+    #: Share of all simulated pulls that landed on each rarity.
+    rates: dict[int, float]
+    #: Players who drew a featured ★6 within ``pulls_per_player`` pulls.
+    featured_share: float
+    featured_mean: float
+    #: Pulls needed for the first featured ★6, among players who got one.
+    featured_percentiles: dict[int, int]
+    #: Sticker cost of those pulls bought one at a time / in ten-pulls.
+    single_cost_percentiles: dict[int, int]
+    ten_cost_percentiles: dict[int, int]
+
+
+def compile_banner(banner: GachaBanner) -> CompiledBanner:
+    steps = banner._rarity_steps
+    # ``current_rates`` adds zero-rate 2★/1★ keys once soft pity eats into
+    # them, so rows differ in which rarities (and which fallback) they have.
+    # Absent rarities get a threshold no roll can reach.
+    rarities = sorted({rarity for row in steps for rarity, _ in row}, reverse=True)
+    thresholds = np.full((len(steps), len(rarities)), -np.inf)
+    for pity_count, row in enumerate(steps):
+        for rarity, cumulative in row:
+            thresholds[pity_count, rarities.index(rarity)] = cumulative
+    rarity6 = [entry for entry in banner.entries if entry.rarity == 6]
+    return CompiledBanner(
+        rarities=np.array(rarities, dtype=np.int64),
+        thresholds=thresholds,
+        fallback_rarities=np.array(
+            [min(rarity for rarity, _ in row) for row in steps], dtype=np.int64
+        ),
+        featured_weight=sum(
+            max(0, entry.weight) for entry in rarity6 if entry.featured
+        ),
+        rarity6_weight=sum(max(0, entry.weight) for entry in rarity6),
+        single_cost=banner.single_cost,
+        ten_cost=banner.ten_cost,
+    )
+
+
+def roll_rarities(
+    compiled: CompiledBanner, pity: np.ndarray, rolls: np.ndarray
+) -> np.ndarray:
+    """Vectorized ``_roll_rarity``: one ``random.random()`` value per pity."""
+
+    index = np.minimum(pity, len(compiled.thresholds) - 1)
+    hits = rolls[:, None] <= compiled.thresholds[index]
+    return np.where(
+        hits.any(axis=1),
+        compiled.rarities[hits.argmax(axis=1)],
+        compiled.fallback_rarities[index],
+    )
+
+
+def simulate(
+    banner: GachaBanner,
+    *,
+    players: int = DEFAULT_PLAYERS,
+    pulls: int | None = None,
+    starting_pity: int = 0,
+    seed: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> SimulationReport:
+    """Simulate ``players`` players each pulling ``pulls`` times.
+
+    ``pulls`` defaults to four hard-pity cycles. Players are simulated in
+    batches of ``batch_size`` to bound memory.
+    """
+
+    if players <= 0:
+        raise ValueError("players must be positive")
+    if starting_pity < 0:
+        raise ValueError("starting_pity must not be negative")
+    compiled = compile_banner(banner)
+    pulls = max(1, banner.hard_pity) * 4 if pulls is None else pulls
+    if pulls <= 0:
+        raise ValueError("pulls must be positive")
+    rng = np.random.default_rng(seed)
+
+    rarity_counts = np.zeros(compiled.rarities.max() + 1, dtype=np.int64)
+    first_featured = []
+    for offset in range(0, players, batch_size):
+        size = min(batch_size, players - offset)
+        pity = np.full(size, starting_pity, dtype=np.int64)
+        # 0 = no featured ★6 yet; otherwise the 1-based pull that drew it.
+        featured_at = np.zeros(size, dtype=np.int64)
+        for pull_number in range(1, pulls + 1):
+            rarity = roll_rarities(compiled, pity, rng.random(size))
+            rarity_counts += np.bincount(rarity, minlength=len(rarity_counts))
+            six = rarity == 6
+            if compiled.rarity6_weight > 0:
+                # The alias table picks a ★6 entry with probability
+                # weight / total weight; only whether it is featured matters.
+                featured = six & (
+                    rng.integers(1, compiled.rarity6_weight + 1, size)
+                    <= compiled.featured_weight
+                )
+                featured_at[featured & (featured_at == 0)] = pull_number
+            pity = np.where(six, 0, pity + 1)
+        first_featured.append(featured_at)
+
+    featured_at = np.concatenate(first_featured)
+    reached = featured_at[featured_at > 0]
+    total_pulls = players * pulls
+    return SimulationReport(
+        players=players,
+        pulls_per_player=pulls,
+        starting_pity=starting_pity,
+        rates={
+            int(rarity): int(rarity_counts[rarity]) / total_pulls
+            for rarity in sorted(compiled.rarities.tolist(), reverse=True)
+        },
+        featured_share=len(reached) / players,
+        featured_mean=float(reached.mean()) if len(reached) else 0.0,
+        featured_percentiles=_percentiles(reached),
+        single_cost_percentiles=_percentiles(reached * compiled.single_cost),
+        ten_cost_percentiles=_percentiles(-(-reached // 10) * compiled.ten_cost),
+    )
+
+
+def _percentiles(values: np.ndarray) -> dict[int, int]:
+    if not len(values):
+        return {}
+    points = np.percentile(values, PERCENTILES, method="higher")
+    return {percentile: int(point) for percentile, point in zip(PERCENTILES, points)}
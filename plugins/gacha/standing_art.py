@@ -25,6 +25,9 @@ import aiofiles
 import aiohttp
 from nonebot import logger
 
+from utils.http import http_client
+from utils.assets import AssetManifest
+
 
 SUMMARY_URL = "https://bestdori.com/api/cards/all.5.json"
 ART_URL = (
@@ -39,6 +42,7 @@ HEADERS = {
     ),
     "Referer": "https://bestdori.com/",
 }
+REQUEST_TIMEOUT = 90
 
 # Prefer Simplified Chinese for player-facing card titles; fall back to the
 # same server order CCK uses when a localized title is unavailable.
@@ -82,9 +86,29 @@ class StandingArtCache:
         self.data_dir = data_dir
         self.art_dir = data_dir / "standing"
         self.manifest_path = data_dir / "standing-art-manifest.json"
+        self.assets = AssetManifest(self.art_dir, data_dir / "standing-art-assets.json")
         self.proxy = proxy
-        self.cards: tuple[StandingArtCard, ...] = ()
+        #: Bumped whenever the manifest or the set of cached files changes
+        #: (once per download batch, not per file); the gacha banner
+        #: recompiles its pool when it moves.
+        self.generation = 0
+        self._cards: tuple[StandingArtCard, ...] = ()
+        self._pools: dict[tuple[int, int], tuple[StandingArtCard, ...]] = {}
         self._refresh_task: asyncio.Task[None] | None = None
+        self._save_task: asyncio.Task[None] | None = None
+
+    @property
+    def cards(self) -> tuple[StandingArtCard, ...]:
+        return self._cards
+
+    @cards.setter
+    def cards(self, cards: tuple[StandingArtCard, ...]) -> None:
+        self._cards = cards
+        self._changed()
+
+    def _changed(self) -> None:
+        self.generation += 1
+        self._pools.clear()
 
     def load_cached_manifest(self) -> tuple[StandingArtCard, ...]:
         """Load a previous crawl's index without contacting Bestdori."""
@@ -130,25 +154,32 @@ class StandingArtCache:
 
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.art_dir.mkdir(parents=True, exist_ok=True)
-        timeout = aiohttp.ClientTimeout(total=90)
-        async with aiohttp.ClientSession(timeout=timeout, headers=HEADERS) as session:
-            summary = await self._fetch_json(session, SUMMARY_URL)
-            cards = _cards_from_summary(summary)
-            self.cards = cards
-            await self._write_manifest(cards)
-            await self._download_missing(session, cards)
+        summary = await self._fetch_json(SUMMARY_URL)
+        cards = _cards_from_summary(summary)
+        self.cards = cards
+        await self._write_manifest(cards)
+        await self._download_missing(cards)
 
     def pool_cards(
         self, *, min_rarity: int = 2, max_rarity: int = 4
     ) -> tuple[StandingArtCard, ...]:
-        """Return cached cards that are safe to show in a reveal tile."""
+        """Return cached cards that are safe to show in a reveal tile.
 
-        return tuple(
-            card
-            for card in self.cards
-            if min_rarity <= card.rarity <= max_rarity
-            and self._is_valid_png(self.art_path(card))
-        )
+        The file check runs once per generation and rarity range; a draw does
+        not reopen every PNG in the pool.
+        """
+
+        key = (min_rarity, max_rarity)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = tuple(
+                card
+                for card in self.cards
+                if min_rarity <= card.rarity <= max_rarity and self._has_art(card)
+            )
+            self._pools[key] = pool
+            self._save_assets_later()
+        return pool
 
     def art_path(self, card: StandingArtCard) -> Path:
         return self.art_dir / card.filename
@@ -156,22 +187,28 @@ class StandingArtCache:
     def cache_status(self) -> tuple[int, int]:
         """Return ``(expected, valid)`` for concise startup diagnostics."""
 
-        return len(self.cards), sum(
-            self._is_valid_png(self.art_path(card)) for card in self.cards
-        )
+        valid = sum(self._has_art(card) for card in self.cards)
+        self.assets.save()
+        return len(self.cards), valid
 
-    @staticmethod
-    def _is_valid_png(path: Path) -> bool:
-        """Reject truncated files and HTML error pages left by an interrupted run."""
+    def _save_assets_later(self) -> None:
+        """Persist verification results without blocking a draw on disk I/O."""
 
         try:
-            with path.open("rb") as file:
-                return file.read(8) == b"\x89PNG\r\n\x1a\n"
-        except OSError:
-            return False
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.assets.save()
+            return
+        if self._save_task is None or self._save_task.done():
+            self._save_task = loop.create_task(self.assets.save_async())
+
+    def _has_art(self, card: StandingArtCard) -> bool:
+        """Whether the card's PNG is cached; unchanged files are trusted."""
 
-    async def _fetch_json(self, session: aiohttp.ClientSession, url: str) -> dict:
-        async with session.get(url, proxy=self.proxy) as response:
+        return self.assets.is_valid(self.art_path(card), _is_valid_png)
+
+    async def _fetch_json(self, url: str) -> dict:
+        async with self._get(url) as response:
             response.raise_for_status()
             data = await response.json(content_type=None)
         if not isinstance(data, dict):
@@ -187,10 +224,14 @@ class StandingArtCache:
         async with aiofiles.open(self.manifest_path, "w", encoding="utf-8") as file:
             await file.write(payload)
 
-    async def _download_missing(
-        self, session: aiohttp.ClientSession, cards: tuple[StandingArtCard, ...]
-    ) -> None:
-        missing = [card for card in cards if not self._is_valid_png(self.art_path(card))]
+    def _get(self, url: str):
+        return http_client.request(
+            "GET", url, headers=HEADERS, proxy=self.proxy, timeout=REQUEST_TIMEOUT
+        )
+
+    async def _download_missing(self, cards: tuple[StandingArtCard, ...]) -> None:
+        missing = [card for card in cards if not self._has_art(card)]
+        await self.assets.save_async()
         if not missing:
             logger.success("gacha standing art: all transparent CGs are cached")
             return
@@ -208,7 +249,7 @@ class StandingArtCache:
                     variant=card.variant,
                 )
                 try:
-                    async with session.get(url, proxy=self.proxy) as response:
+                    async with self._get(url) as response:
                         if response.status != 200:
                             return
                         content = await response.read()
@@ -218,6 +259,7 @@ class StandingArtCache:
                         return
                     async with aiofiles.open(self.art_path(card), "wb") as file:
                         await file.write(content)
+                    self.assets.mark_verified(self.art_path(card))
                     downloaded += 1
                     if downloaded % 100 == 0:
                         logger.info(
@@ -229,16 +271,31 @@ class StandingArtCache:
 
         # Batching bounds memory and prevents thousands of queued coroutines
         # from delaying bot shutdown while preserving eight concurrent fetches.
+        # The pool is recompiled once per batch that cached anything.
         for offset in range(0, len(missing), 128):
+            before = downloaded
             await asyncio.gather(
                 *(download(card) for card in missing[offset : offset + 128])
             )
+            if downloaded > before:
+                self._changed()
+                await self.assets.save_async()
         logger.success(
             f"gacha standing art: cached {downloaded} new CGs; "
             f"{len(self.pool_cards())} are now available to draw"
         )
 
 
+def _is_valid_png(path: Path) -> bool:
+    """Reject truncated files and HTML error pages left by an interrupted run."""
+
+    try:
+        with path.open("rb") as file:
+            return file.read(8) == b"\x89PNG\r\n\x1a\n"
+    except OSError:
+        return False
+
+
 def _cards_from_summary(summary: dict[str, Any]) -> tuple[StandingArtCard, ...]:
     """Turn ``cards/all.5`` into normal/trained trim variants.
 
@@ -1,26 +1,16 @@
-import io
 import random
 from typing import List
 from typing import Optional
 from pathlib import Path
 
-from PIL import Image
 from nonebot import require
 from nonebot import get_driver
 from nonebot import on_command
 from nonebot import get_plugin_config
-from bestdori import songs
 from bestdori import settings
 from nonebot.log import logger
 from nonebot.params import Depends
 from nonebot.params import CommandArg
-from bestdori.charts import Chart
-
-# The alias is load-bearing: importing the local ``.render`` package below
-# binds a MODULE named ``render`` onto this package's namespace (this file's
-# globals), which would silently overwrite a plain ``render`` function and
-# crash the handler with "'module' object is not callable".
-from bestdori.render import render as render_chart
 from nonebot.adapters.satori import Message
 from nonebot.adapters.satori import MessageEvent
 from nonebot.adapters.satori import MessageSegment
@@ -29,8 +19,10 @@ from utils.error_handler import handle_error
 
 require("daily_task")
 require("nonebot_plugin_waiter")
+require("nonebot_plugin_localstore")
 require("nonebot_plugin_apscheduler")
 
+import nonebot_plugin_localstore as localstore  # noqa: E402
 from nonebot_plugin_waiter import waiter  # noqa: E402
 from nonebot_plugin_apscheduler import scheduler  # noqa: E402
 
@@ -50,20 +42,20 @@ from .store import BandStore  # noqa: E402
 from .store import SongStore  # noqa: E402
 from .store import GamersStore  # noqa: E402
 from .utils import diff_num  # noqa: E402
-from .utils import fuzzy_match  # noqa: E402
+from .utils import slice_strip  # noqa: E402
 from .utils import get_difficulty  # noqa: E402
-from .utils import get_jacket_image  # noqa: E402
 from .utils import read_csv_to_dict  # noqa: E402
-from .utils import render_to_slices  # noqa: E402
 from .utils import flatten_song_data  # noqa: E402
 from .utils import sort_by_difficulty  # noqa: E402
 from .utils import get_value_from_list  # noqa: E402
-from .utils import build_enriched_dictionary  # noqa: E402
+from .charts import ChartCache  # noqa: E402
+from .charts import popular_charts  # noqa: E402
 from .config import Config  # noqa: E402
 from .render import LevelGain  # noqa: E402
 from .render import TaskCompletion  # noqa: E402
 from .render import GuessChartRevealData  # noqa: E402
 from .render import reveal_page  # noqa: E402
+from .jackets import SongAssetCache  # noqa: E402
 from ..daily_task import check_progress  # noqa: E402
 from ..daily_task import get_today_task  # noqa: E402
 from ..monetary.level_service import LEVEL_UP_STICKERS  # noqa: E402
@@ -74,9 +66,11 @@ settings.proxy = plugin_config.bestdori_proxy
 nickname_song = read_csv_to_dict(Path(__file__).parent / "nickname_song.csv")
 
 
-song_store = SongStore()
+song_store = SongStore(nickname_song)
 band_store = BandStore()
 gamers_store = GamersStore()
+chart_cache = ChartCache(localstore.get_cache_dir("guess_chart"))
+song_assets = SongAssetCache(localstore.get_cache_dir("guess_chart"))
 
 _FORCE_STOP_COMMANDS = {"猜谱面", "猜谱", "cpm", "谱面挑战"}
 
@@ -128,29 +122,18 @@ def _level_gain(old_level: int, new_level: int) -> Optional[LevelGain]:
     )
 
 
-def _decode_jacket(jacket_image: bytes) -> Optional[Image.Image]:
-    """Decode the fetched jacket bytes; the card tolerates ``None``."""
-
-    try:
-        jacket = Image.open(io.BytesIO(jacket_image))
-        jacket.load()
-        return jacket
-    except Exception:
-        logger.opt(exception=True).warning("jacket image decode failed")
-        return None
-
-
 async def _send_reveal_card(
     data: GuessChartRevealData,
     kit,
     pg: PG,
     fallback_text: str,
-    jacket_image: bytes,
+    jacket_image: Optional[bytes],
 ) -> None:
     """Render and send the round-exit card as one message.
 
     On a render failure the round must still resolve, so this falls back to
-    the pre-card shape: the answer as text plus the raw jacket image.
+    the pre-card shape: the answer as text plus the raw jacket image, when
+    the song has one.
     """
 
     try:
@@ -162,10 +145,12 @@ async def _send_reveal_card(
         await game_start.send(
             fallback_text + pg.element, referrer=pg.event.referrer
         )
-        await game_start.send(
-            MessageSegment.image(raw=jacket_image, mime="image/png") + pg.element,
-            referrer=pg.event.referrer,
-        )
+        if jacket_image is not None:
+            await game_start.send(
+                MessageSegment.image(raw=jacket_image, mime="image/png")
+                + pg.element,
+                referrer=pg.event.referrer,
+            )
         return
     await game_start.send(
         await image_segment_async(image) + pg.element, referrer=pg.event.referrer
@@ -179,6 +164,9 @@ if plugin_config.enable_guess_chart:
     async def refresh_data():
         await song_store.update()
         await band_store.update()
+        chart_cache.schedule_prefetch(
+            popular_charts(flatten_song_data(song_store.get()))
+        )
 
 
 @game_start.handle()
@@ -188,7 +176,6 @@ async def handle_start(
     song_data: dict = Depends(song_store.get),
     band_data: dict = Depends(band_store.get),
     game_difficulty: str = Depends(get_difficulty),
-    song_raw_data: dict = Depends(song_store.get_raw),
 ):
     current_pg = PG(event)
     gens[event.message.id] = current_pg
@@ -277,19 +264,18 @@ async def handle_start(
     song_id = int(song["song_id"])
 
     try:
-        song_detail = songs.Song(song_id)
-
         chart_difficulty = song["difficulty"]
-        chart = await Chart.get_chart_async(song_id, chart_difficulty)
+        chart = await chart_cache.chart(song_id, chart_difficulty)
         chart_statistics = chart.count()
 
         if game_difficulty in ["easy", "normal"]:
-            img = await run_image_task(lambda: render_chart(chart))
+            img = await chart_cache.page(song_id, chart_difficulty)
         else:
-            img = await run_image_task(render_to_slices, chart, game_difficulty)
+            strip, rate = await chart_cache.strip(song_id, chart_difficulty)
+            img = await run_image_task(slice_strip, strip, rate, game_difficulty)
 
         diff: str = chart_difficulty
-        song_info = await song_detail.get_info_async()
+        song_info = await song_assets.detail(song_id)
         level = (
             song_info.get("difficulty", {})
             .get(diff_num[diff], {})
@@ -305,8 +291,9 @@ async def handle_start(
         band_id: int = song_info["bandId"]
         band_name = get_value_from_list(band_data[str(band_id)]["bandName"])
 
-        jacket_image = await get_jacket_image(int(song_id), song_info)
-        jacket_pil = await run_image_task(_decode_jacket, jacket_image)
+        jacket = await song_assets.jacket(song_id, song_info)
+        jacket_image = jacket.raw if jacket is not None else None
+        jacket_pil = jacket.thumbnail if jacket is not None else None
         main_bpm = int(chart_statistics.main_bpm)
     except Exception as e:
         gamers_store.remove(event.channel.id)
@@ -422,8 +409,7 @@ async def handle_start(
                 )
                 break
 
-            enriched_song = build_enriched_dictionary(nickname_song, song_raw_data)
-            guessed_chart_id = fuzzy_match(msg, enriched_song)
+            guessed_chart_id = song_store.index.match(msg)
 
         if guessed_chart_id == correct_chart_id:
             gamers_store.remove(event.channel.id)
@@ -0,0 +1,209 @@
+"""Local chart store and rendered-strip cache for guess_chart.
+
+Every round used to fetch its chart from Bestdori and paint the entire chart
+(lanes, notes, measure lines, BPM and time texts) only to crop three slices
+from it, or to fold it into columns. :class:`ChartCache` keeps both steps on
+disk instead:
+
+- ``charts/<song>-<difficulty>.json``: the chart Bestdori returned, fetched
+  once per (song, difficulty);
+- ``strips/<version>/<song>-<difficulty>.png``: the painted and resized strip
+  from :func:`non_slice_render`, with its scale ``rate`` in a text chunk.
+
+``<version>`` combines the installed ``bestdori-render`` version with
+:data:`STRIP_VERSION`, so a renderer upgrade starts a fresh directory; the
+prefetcher removes the old ones. A round then decodes a strip and either
+crops it (hard/expert) or folds it into the page layout (easy/normal), which
+is the same fold ``bestdori.render.render`` applies after painting.
+
+:meth:`ChartCache.prefetch` fills both stores in the background for the
+charts the easy and normal modes draw from, one chart at a time.
+"""
+
+import shutil
+import asyncio
+from io import BytesIO
+from typing import Iterable
+from pathlib import Path
+from importlib import metadata
+
+from PIL import Image
+from nonebot.log import logger
+from bestdori.charts import Chart
+from bestdori.render import _utils as render_utils
+from PIL.PngImagePlugin import PngInfo
+
+from utils.image_tasks import run_image_task
+
+from .utils import non_slice_render
+from .utils import write_cache_file
+
+#: Bump whenever ``non_slice_render`` paints differently.
+STRIP_VERSION = 1
+
+#: Play level the easy (28+) and normal (27+) modes draw their charts from.
+PREFETCH_MIN_PLAY_LEVEL = 27
+
+
+class ChartCache:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.chart_dir = root / "charts"
+        self.strip_dir = root / "strips" / f"{_renderer_version()}-{STRIP_VERSION}"
+        self._inflight: dict[object, asyncio.Task] = {}
+        self._prefetch_task: asyncio.Task | None = None
+
+    async def chart(self, song_id: int, difficulty: str) -> Chart:
+        """The chart, read from disk when it was fetched before."""
+
+        return await asyncio.shield(
+            self._single_flight(
+                ("chart", song_id, difficulty),
+                lambda: self._load_chart(song_id, difficulty),
+            )
+        )
+
+    async def strip(self, song_id: int, difficulty: str) -> tuple[Image.Image, float]:
+        """The painted strip and its scale, painted only on a cache miss.
+
+        Callers share the returned image and must not mutate it.
+        """
+
+        return await asyncio.shield(
+            self._single_flight(
+                ("strip", song_id, difficulty),
+                lambda: self._load_strip(song_id, difficulty),
+            )
+        )
+
+    async def page(self, song_id: int, difficulty: str) -> Image.Image:
+        """The whole chart in ``bestdori.render.render``'s column layout."""
+
+        strip, _ = await self.strip(song_id, difficulty)
+        return await run_image_task(render_utils.process_image, strip)
+
+    def schedule_prefetch(self, charts: Iterable[tuple[int, str]]) -> None:
+        """Start :meth:`prefetch` in the background unless one is running."""
+
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = asyncio.create_task(self.prefetch(list(charts)))
+
+    async def prefetch(self, charts: Iterable[tuple[int, str]]) -> int:
+        """Fetch and paint every listed chart not cached yet, in order.
+
+        Returns the number of strips painted. A chart that fails is logged
+        and skipped; the next round that draws it tries again.
+        """
+
+        await asyncio.to_thread(self._prune)
+        filled = 0
+        for song_id, difficulty in charts:
+            if self._strip_path(song_id, difficulty).exists():
+                continue
+            try:
+                await self.strip(song_id, difficulty)
+            except Exception:
+                logger.opt(exception=True).warning(
+                    f"guess_chart prefetch of {song_id} {difficulty} failed"
+                )
+                continue
+            filled += 1
+        if filled:
+            logger.info(f"guess_chart prefetched {filled} charts")
+        return filled
+
+    async def _load_chart(self, song_id: int, difficulty: str) -> Chart:
+        path = self._chart_path(song_id, difficulty)
+        try:
+            raw = await asyncio.to_thread(path.read_text, encoding="utf-8")
+            return Chart.from_json(raw)
+        except FileNotFoundError:
+            pass
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning(f"guess_chart cached chart {path.name} ignored: {exc}")
+        chart = await Chart.get_chart_async(song_id, difficulty)
+        await asyncio.to_thread(write_cache_file, path, chart.json().encode("utf-8"))
+        return chart
+
+    async def _load_strip(
+        self, song_id: int, difficulty: str
+    ) -> tuple[Image.Image, float]:
+        path = self._strip_path(song_id, difficulty)
+        try:
+            return await run_image_task(_read_strip, path)
+        except FileNotFoundError:
+            pass
+        except (KeyError, OSError, ValueError) as exc:
+            logger.warning(f"guess_chart cached strip {path.name} ignored: {exc}")
+        chart = await self.chart(song_id, difficulty)
+        return await run_image_task(_paint_strip, chart, path)
+
+    def _single_flight(self, key: object, factory) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.create_task(factory())
+            self._inflight[key] = task
+
+            def forget(done: asyncio.Task) -> None:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            task.add_done_callback(forget)
+        return task
+
+    def _prune(self) -> None:
+        """Remove strips painted by another renderer version."""
+
+        parent = self.strip_dir.parent
+        if not parent.is_dir():
+            return
+        for directory in parent.iterdir():
+            if directory.is_dir() and directory != self.strip_dir:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _chart_path(self, song_id: int, difficulty: str) -> Path:
+        return self.chart_dir / f"{song_id}-{difficulty}.json"
+
+    def _strip_path(self, song_id: int, difficulty: str) -> Path:
+        return self.strip_dir / f"{song_id}-{difficulty}.png"
+
+
+def popular_charts(flat_song_data: Iterable[dict]) -> list[tuple[int, str]]:
+    """(song, difficulty) pairs worth prefetching, hardest first.
+
+    Args:
+        flat_song_data: Rows from ``flatten_song_data``.
+    """
+
+    songs = [
+        song
+        for song in flat_song_data
+        if song["play_level"] >= PREFETCH_MIN_PLAY_LEVEL
+    ]
+    songs.sort(key=lambda song: song["play_level"], reverse=True)
+    return [(int(song["song_id"]), song["difficulty"]) for song in songs]
+
+
+def _renderer_version() -> str:
+    try:
+        return metadata.version("bestdori-render")
+    except metadata.PackageNotFoundError:
+        return "0"
+
+
+def _read_strip(path: Path) -> tuple[Image.Image, float]:
+    with Image.open(path) as opened:
+        rate = float(opened.info["rate"])
+        opened.load()
+        return opened.copy(), rate
+
+
+def _paint_strip(chart: Chart, path: Path) -> tuple[Image.Image, float]:
+    strip, rate = non_slice_render(chart)
+    info = PngInfo()
+    info.add_text("rate", repr(rate))
+    buffer = BytesIO()
+    strip.save(buffer, format="PNG", pnginfo=info)
+    write_cache_file(path, buffer.getvalue())
+    return strip, rate
+
@@ -0,0 +1,234 @@
+"""Disk-backed song detail and jacket cache for guess_chart reveals.
+
+Every round fetched the song's detail JSON from Bestdori, and every reveal
+downloaded the song's jacket PNG again. :class:`SongAssetCache` keeps both on
+disk:
+
+- ``details/<song>.json``: ``Song.get_info_async()``, fresh for
+  :data:`DETAIL_TTL_SECONDS` and served stale while a background fetch
+  replaces it;
+- ``jackets/<song>.png``: the jacket as downloaded, for the text fallback;
+- ``jackets/<song>.thumb.png``: the jacket cover-fitted to the reveal card's
+  jacket slot in device pixels, kept decoded in a small in-memory LRU.
+
+A jacket Bestdori does not have (no ``jacketImage``, an unknown server, a 4xx
+or undecodable bytes) is remembered for :data:`MISSING_TTL_SECONDS`, and the
+reveal renders without it. A song that has been played before therefore
+reveals without waiting on the network.
+"""
+
+import json
+import time
+import asyncio
+from io import BytesIO
+from typing import Any
+from pathlib import Path
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import aiohttp
+from PIL import Image
+from PIL import ImageOps
+from PIL import UnidentifiedImageError
+from bestdori import songs
+from nonebot.log import logger
+
+from utils.image_tasks import run_image_task
+
+from .utils import get_jacket_image
+from .utils import write_cache_file
+from .render.reveal import JACKET_SIZE
+
+DETAIL_TTL_SECONDS = 24 * 3600
+JACKET_TTL_SECONDS = 30 * 24 * 3600
+MISSING_TTL_SECONDS = 6 * 3600
+
+#: Jacket slot in device pixels: page roots render at pixel ratio 2.
+THUMBNAIL_SIZE = JACKET_SIZE * 2
+
+#: Decoded thumbnails kept in memory. Each is RGBA at up to
+#: :data:`THUMBNAIL_SIZE` square: 560 × 560 × 4 bytes, about 1.2 MiB.
+MEMORY_THUMBNAILS = 32
+
+
+@dataclass(frozen=True)
+class Jacket:
+    #: The PNG as downloaded from Bestdori.
+    raw: bytes
+    #: Decoded, cover-fitted to :data:`THUMBNAIL_SIZE`; shared, do not mutate.
+    thumbnail: Image.Image
+
+
+class SongAssetCache:
+    def __init__(self, root: Path) -> None:
+        self.detail_dir = root / "details"
+        self.jacket_dir = root / "jackets"
+        self._jackets: OrderedDict[int, Jacket] = OrderedDict()
+        self._missing: dict[int, float] = {}
+        self._inflight: dict[object, asyncio.Task] = {}
+
+    async def detail(self, song_id: int) -> dict[str, Any]:
+        """The song's Bestdori detail JSON, from disk when fetched before."""
+
+        path = self.detail_dir / f"{song_id}.json"
+        try:
+            info, age = await asyncio.to_thread(_read_detail, path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as exc:
+            logger.warning(f"guess_chart cached detail {path.name} ignored: {exc}")
+        else:
+            if age > DETAIL_TTL_SECONDS:
+                self._refresh(
+                    ("refresh", "detail", song_id),
+                    lambda: self._fetch_detail(song_id),
+                )
+            return info
+        return await asyncio.shield(
+            self._single_flight(
+                ("detail", song_id), lambda: self._fetch_detail(song_id)
+            )
+        )
+
+    async def jacket(self, song_id: int, song_info: dict[str, Any]) -> Jacket | None:
+        """The song's jacket, or ``None`` when it is missing or unreachable."""
+
+        jacket = self._jackets.get(song_id)
+        if jacket is not None:
+            self._jackets.move_to_end(song_id)
+            return jacket
+        if self._missing.get(song_id, 0.0) > time.monotonic():
+            return None
+        try:
+            return await asyncio.shield(
+                self._single_flight(
+                    ("jacket", song_id),
+                    lambda: self._load_jacket(song_id, song_info),
+                )
+            )
+        except (aiohttp.ClientError, OSError) as exc:
+            logger.warning(f"guess_chart jacket {song_id} unavailable: {exc}")
+            return None
+
+    async def _fetch_detail(self, song_id: int) -> dict[str, Any]:
+        info = await songs.Song(song_id).get_info_async()
+        data = json.dumps(info, ensure_ascii=False).encode("utf-8")
+        path = self.detail_dir / f"{song_id}.json"
+        await asyncio.to_thread(write_cache_file, path, data)
+        return info
+
+    async def _load_jacket(
+        self, song_id: int, song_info: dict[str, Any]
+    ) -> Jacket | None:
+        raw_path, thumbnail_path = self._jacket_paths(song_id)
+        try:
+            jacket, age = await run_image_task(_read_jacket, raw_path, thumbnail_path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as exc:
+            logger.warning(f"guess_chart cached jacket {raw_path.name} ignored: {exc}")
+        else:
+            if age > JACKET_TTL_SECONDS:
+                self._refresh(
+                    ("refresh", "jacket", song_id),
+                    lambda: self._fetch_jacket(song_id, song_info),
+                )
+            self._remember(song_id, jacket)
+            return jacket
+        return await self._fetch_jacket(song_id, song_info)
+
+    async def _fetch_jacket(
+        self, song_id: int, song_info: dict[str, Any]
+    ) -> Jacket | None:
+        raw_path, thumbnail_path = self._jacket_paths(song_id)
+        try:
+            raw = await get_jacket_image(song_id, song_info)
+            jacket = await run_image_task(
+                _store_jacket, raw, raw_path, thumbnail_path
+            )
+        except aiohttp.ClientResponseError as exc:
+            if not 400 <= exc.status < 500:
+                raise
+            jacket = None
+        except (UnidentifiedImageError, ValueError):
+            # No jacket name, no known server, or bytes PIL cannot decode.
+            jacket = None
+        if jacket is None:
+            logger.info(f"guess_chart jacket {song_id} missing on Bestdori")
+            self._missing[song_id] = time.monotonic() + MISSING_TTL_SECONDS
+            return None
+        self._missing.pop(song_id, None)
+        self._remember(song_id, jacket)
+        return jacket
+
+    def _remember(self, song_id: int, jacket: Jacket) -> None:
+        self._jackets[song_id] = jacket
+        self._jackets.move_to_end(song_id)
+        while len(self._jackets) > MEMORY_THUMBNAILS:
+            self._jackets.popitem(last=False)
+
+    def _refresh(self, key: object, factory) -> None:
+        """Run ``factory()`` in the background; a failure keeps the stale copy."""
+
+        if key in self._inflight:
+            return
+
+        async def refresh() -> None:
+            try:
+                await factory()
+            except Exception:
+                logger.opt(exception=True).debug(f"guess_chart refresh {key} failed")
+
+        self._single_flight(key, refresh)
+
+    def _single_flight(self, key: object, factory) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.create_task(factory())
+            self._inflight[key] = task
+
+            def forget(done: asyncio.Task) -> None:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            task.add_done_callback(forget)
+        return task
+
+    def _jacket_paths(self, song_id: int) -> tuple[Path, Path]:
+        return (
+            self.jacket_dir / f"{song_id}.png",
+            self.jacket_dir / f"{song_id}.thumb.png",
+        )
+
+
+def _age(path: Path) -> float:
+    return time.time() - path.stat().st_mtime
+
+
+def _read_detail(path: Path) -> tuple[dict[str, Any], float]:
+    info = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(info, dict):
+        raise ValueError("not a song detail object")
+    return info, _age(path)
+
+
+def _read_jacket(raw_path: Path, thumbnail_path: Path) -> tuple[Jacket, float]:
+    raw = raw_path.read_bytes()
+    with Image.open(thumbnail_path) as opened:
+        opened.load()
+        thumbnail = opened.copy()
+    return Jacket(raw, thumbnail), _age(raw_path)
+
+
+def _store_jacket(raw: bytes, raw_path: Path, thumbnail_path: Path) -> Jacket:
+    with Image.open(BytesIO(raw)) as opened:
+        source = opened.convert("RGBA")
+    size = min(THUMBNAIL_SIZE, source.width, source.height)
+    thumbnail = ImageOps.fit(source, (size, size), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    thumbnail.save(buffer, format="PNG")
+    # The thumbnail goes first: a raw PNG on disk implies its thumbnail.
+    write_cache_file(thumbnail_path, buffer.getvalue())
+    write_cache_file(raw_path, raw)
+    return Jacket(raw, thumbnail)
+
@@ -1,11 +1,15 @@
 from typing import Any
 from typing import Dict
 from typing import List
+from typing import Optional
 
 import bestdori.songs as songs
 from bestdori.bands import get_all_async as get_bands_all_async
 
+from utils.matching import NameIndex
+
 from .utils import filter_song_data
+from .utils import build_enriched_dictionary
 
 
 class DataStore:
@@ -20,11 +24,17 @@ class DataStore:
 
 
 class SongStore(DataStore):
-    def __init__(self) -> None:
+    def __init__(self, nicknames: Optional[Dict[str, List[str]]] = None) -> None:
         super().__init__()
+        self.nicknames = nicknames or {}
+        #: Song guesses matcher, recompiled with every update.
+        self.index = NameIndex(self.nicknames)
 
     async def update(self) -> None:
         self.set("songs", await songs.get_all_async())
+        self.index = NameIndex(
+            build_enriched_dictionary(self.nicknames, self.get_raw())
+        )
 
     def get(self) -> Dict[str, Dict[str, Any]]:
         return filter_song_data(self.data.get("songs", {}))
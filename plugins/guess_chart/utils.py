@@ -1,4 +1,5 @@
 import io
+import os
 import re
 import csv
 import random
@@ -6,17 +7,20 @@ from typing import Any
 from typing import Dict
 from typing import List
 from typing import Tuple
+from pathlib import Path
 
-import aiohttp
 from PIL import Image
 from PIL import ImageDraw
-from rapidfuzz import process
+from nonebot.log import logger
 from nonebot.params import CommandArg
 from bestdori.charts import Chart
 from bestdori.render import _utils as utils
 from bestdori.render import config as render_config
 from nonebot.adapters import Message
 
+from utils.http import http_client
+from utils.matching import NameIndex
+
 diff_num = {
     "easy": "0",
     "normal": "1",
@@ -106,43 +110,8 @@ def read_csv_to_dict(file_path: str):
 
 
 def fuzzy_match(query: str, dictionary: dict, threshold: int = 75):
-    query_lower = query.lower()
-
-    # 1. Exact match fast path (case-insensitive)
-    for key, value in dictionary.items():
-        if any(query_lower == nick.lower() for nick in value):
-            return key
-
-    if not is_valid_query(query):
-        return None
-
-    # 2. Flatten to single list, one global extract (case-insensitive)
-    flat = [(nick.lower(), kid) for kid, nicks in dictionary.items() for nick in nicks]
-    if not flat:
-        return None
-    results = process.extract(query_lower, [n for n, _ in flat], limit=5)
-
-    # 3. Dynamic threshold: lower for CJK queries where one-char typos are common
-    effective_threshold = threshold
-    if any("一" <= c <= "鿿" or "㐀" <= c <= "䶿" for c in query):
-        effective_threshold = max(threshold - 10, 60)
-
-    best_song = None
-    best_score = 0
-    for matched_str, score, _ in results:
-        if score < effective_threshold:
-            break
-        for nick, sid in flat:
-            if nick == matched_str:
-                if score > best_score:
-                    best_score = score
-                    best_song = sid
-                elif score == best_score and best_song is not None:
-                    if len(dictionary[sid]) > len(dictionary[best_song]):
-                        best_song = sid
-                break
-
-    return best_song
+    """一次性匹配；对局中请复用 `SongStore.index`，避免每条消息重新编译"""
+    return NameIndex(dictionary).match(query, threshold)
 
 
 def get_difficulty(args: Message = CommandArg()) -> str:
@@ -160,9 +129,17 @@ def get_difficulty(args: Message = CommandArg()) -> str:
         return "normal"
 
 
-def render_to_slices(chart: list, game_difficulty: str) -> Image.Image:
-    chart_img, rate = non_slice_render(chart)
+def slice_strip(
+    chart_img: Image.Image, rate: float, game_difficulty: str
+) -> Image.Image:
+    """
+    从 `non_slice_render` 的整条谱面中随机切出三段
 
+    参数:
+        chart_img: 整条谱面图
+        rate: 缩放后与原始谱面的高度比
+        game_difficulty: 游戏难度，决定每段展示的秒数
+    """
     height = chart_img.height
     # 每个切片展示 n s 的谱面
     slice_height = int(
@@ -355,13 +332,6 @@ def pil_image_to_bytes(image: Image.Image):
     return img_byte_arr
 
 
-def is_valid_query(query: str):
-    stripped = query.strip()
-    return (
-        bool(stripped) and len(stripped) >= 2 and any(char.isalnum() for char in query)
-    )
-
-
 def _get_song_server(song_info: Dict[str, Any]) -> str:
     if (published_at := song_info.get("publishedAt", None)) is None:
         raise ValueError("缺少歌曲发布时间")
@@ -396,9 +366,18 @@ async def get_jacket_image(song_id: int, song_info: Dict[str, Any]) -> bytes:
         index=index, jacket_image=jacket_names[0], server=_get_song_server(song_info)
     )
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(jacket_url) as resp:
-            return await resp.read()
+    return await http_client.get_bytes(jacket_url)
+
+
+def write_cache_file(path: Path, data: bytes) -> None:
+    """原子写入缓存文件；写入失败只记录警告，缓存下次再补"""
+    temporary = path.with_name(path.name + ".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+    except OSError as exc:
+        logger.warning(f"guess_chart cache {path.name} not saved: {exc}")
 
 
 def flatten_song_data(song_data: Dict[str, Dict[str, Any]]):
@@ -1,6 +1,7 @@
 """Inventory plugin commands, season commands, and exports."""
 
 import time
+from typing import Iterable
 from pathlib import Path
 
 from nonebot import require
@@ -25,6 +26,7 @@ from utils.theming import kit_for_user
 from utils.theming import theme_by_token
 from utils.identity import identity_for
 from utils.identity import identities_for
+from utils.identity import load_identities
 
 require("nonebot_plugin_apscheduler")
 
@@ -46,6 +48,7 @@ from .render import inventory_list_page  # noqa: E402
 from .render import profile_page  # noqa: E402
 from .render import season_info_page  # noqa: E402
 from .render import season_rank_page  # noqa: E402
+from .service import batch  # noqa: E402
 from .service import get_item  # noqa: E402
 from .service import get_item_art  # noqa: E402
 from .service import get_equipped  # noqa: E402
@@ -62,7 +65,6 @@ from .database import init_database  # noqa: E402
 from ..render.types import ImageSource  # noqa: E402
 from .season_render import season_trend_data  # noqa: E402
 from .season_render import render_season_trend  # noqa: E402
-from .season_service import settle_season  # noqa: E402
 from .season_service import list_snapshots  # noqa: E402
 from .season_service import get_latest_season  # noqa: E402
 from .season_service import get_next_season  # noqa: E402
@@ -72,6 +74,8 @@ from .season_service import get_active_ranking  # noqa: E402
 from .season_service import get_current_season  # noqa: E402
 from .season_service import settle_due_seasons  # noqa: E402
 from .season_service import settlement_preview  # noqa: E402
+from .season_service import settle_season_async  # noqa: E402
+from .season_service import settlement_progress  # noqa: E402
 from .season_service import activate_due_seasons  # noqa: E402
 from .season_service import get_due_seasons  # noqa: E402
 from .season_service import get_user_season_rank  # noqa: E402
@@ -117,7 +121,7 @@ async def process_season_lifecycle():
         active_season = get_current_season(now=opening_time)
         if active_season is not None:
             migrate_legacy_season_participation(season=active_season)
-        settled = settle_due_seasons()
+        settled = await settle_due_seasons()
         delivered = dispatch_pending_season_rewards()
         if opened or settled or delivered:
             logger.info(
@@ -591,7 +595,7 @@ async def handle_season(
                 referrer=passive_generator.event.referrer,
             )
         try:
-            count = settle_season(
+            count = await settle_season_async(
                 parts[1],
                 force=len(parts) == 3,
             )
@@ -757,9 +761,10 @@ async def handle_season_rank(matcher: Matcher, event: MessageEvent):
                 referrer=passive_generator.event.referrer,
             )
         rows = list_settled_rankings(season, limit=50)
+        names = _display_names(row.user_id for row in rows)
         lines = [f"{season.name} 最终排行榜"]
         lines.extend(
-            f"{row.rank}. {_display_name(row.user_id)}: {row.final_points} Pt"
+            f"{row.rank}. {names[row.user_id]}: {row.final_points} Pt"
             for row in rows
         )
         if len(lines) == 1:
@@ -805,31 +810,40 @@ def _assemble_season_rank(user_id: str, season) -> SeasonRankData:
 
     viewer_rank, viewer_points = get_user_season_rank(user_id, season)
     top_rows = get_active_ranking(limit=_LADDER_TOP, season=season)
+
+    window = []
+    start = 0
+    if top_rows and all(row.user_id != user_id for row in top_rows):
+        fetched = get_active_ranking(
+            limit=viewer_rank + _NEARBY_SPAN, season=season
+        )
+        # Clip the window's start below the rows the top section already
+        # shows: a rank-12 viewer must not see ranks 7-10 twice on one card
+        # (and with a short ladder the whole top used to repeat).
+        start = max(len(top_rows), viewer_rank - _NEARBY_SPAN - 1)
+        window = fetched[start : viewer_rank + _NEARBY_SPAN]
+
+    # One batched load names every visible row and the viewer.
+    names = _display_names(
+        [*(row.user_id for row in (*top_rows, *window)), user_id]
+    )
     rows = tuple(
         SeasonRankRow(
             rank=idx,
-            name=_display_name(row.user_id),
+            name=names[row.user_id],
             points=row.quantity,
             user_id=row.user_id,
         )
         for idx, row in enumerate(top_rows, start=1)
     )
-    viewer_name = _display_name(user_id)
+    viewer_name = names[user_id]
 
     nearby: tuple[SeasonRankRow, ...] = ()
     if rows and all(row.user_id != user_id for row in top_rows):
-        fetched = get_active_ranking(
-            limit=viewer_rank + _NEARBY_SPAN, season=season
-        )
-        # Clip the window's start below the rows the top section already
-        # shows: a rank-12 viewer must not see ranks 7-10 twice on one card
-        # (and with a short ladder the whole top used to repeat).
-        start = max(len(rows), viewer_rank - _NEARBY_SPAN - 1)
-        window = fetched[start : viewer_rank + _NEARBY_SPAN]
         built = [
             SeasonRankRow(
                 rank=start + offset + 1,
-                name=_display_name(row.user_id),
+                name=names[row.user_id],
                 points=row.quantity,
                 user_id=row.user_id,
             )
@@ -1036,6 +1050,13 @@ async def handle_profile(
     )
 
 
+_SETTLEMENT_PHASE_LABELS = {
+    "pending": "未开始",
+    "ranking": "写入排名",
+    "participation": "写入参与奖励",
+    "done": "已完成",
+}
+
 season_admin_cmd = on_command(
     "seasonadmin",
     aliases={"season-admin"},
@@ -1066,7 +1087,7 @@ async def handle_season_admin(
                 referrer=passive_generator.event.referrer,
             )
         try:
-            count = settle_season(
+            count = await settle_season_async(
                 parts[1],
                 force=len(parts) == 3,
             )
@@ -1111,8 +1132,35 @@ async def handle_season_admin(
             referrer=passive_generator.event.referrer,
         )
 
+    if len(parts) == 2 and parts[0] == "progress":
+        try:
+            progress = settlement_progress(parts[1])
+        except ValueError as exc:
+            await matcher.finish(
+                str(exc) + passive_generator.element,
+                referrer=passive_generator.event.referrer,
+            )
+        updated_at = (
+            format_ts(progress["updated_at"]) if progress["updated_at"] else "-"
+        )
+        await matcher.finish(
+            "\n".join(
+                [
+                    f"赛季：{progress['season_key']}",
+                    f"状态：{progress['status']}",
+                    f"阶段：{_SETTLEMENT_PHASE_LABELS[progress['phase']]}",
+                    f"已排名：{progress['ranked']}/{progress['total_rankings']}",
+                    f"已写入奖励：{progress['rewards']}",
+                    f"待投递邮件：{progress['pending_mails']}",
+                    f"最近进度：{updated_at}",
+                ]
+            )
+            + passive_generator.element,
+            referrer=passive_generator.event.referrer,
+        )
+
     await matcher.finish(
-        "用法：/season-admin preview <season_key> /season-admin settle <season_key> [--force] /season-admin retry-rewards"
+        "用法：/season-admin preview <season_key> /season-admin progress <season_key> /season-admin settle <season_key> [--force] /season-admin retry-rewards"
         + passive_generator.element,
         referrer=passive_generator.event.referrer,
     )
@@ -1201,26 +1249,23 @@ def _format_time(timestamp: int) -> str:
     return format_ts(timestamp)
 
 
-def _display_name(user_id: str) -> str:
-    """Display name for a ladder row.
+def _display_names(user_ids: Iterable[str]) -> dict[str, str]:
+    """Display names for ladder rows, with one nickname query for all of them.
 
     Falls back to the id tail rather than the raw id so rows stay readable
-    and consistent with the level ladder's fallback.
+    and consistent with the level ladder's fallback. The identities are
+    memoized briefly, so hydrating the same rows right after reuses the load.
     """
 
-    try:
-        from ..nickname import nickname
-
-        name = nickname.get(user_id)
-        if name:
-            return str(name)
-    except Exception:
-        pass
-    return f"玩家{user_id[-4:]}" if len(user_id) >= 4 else f"玩家{user_id}"
+    return {
+        user_id: identity.nickname
+        for user_id, identity in load_identities(user_ids).items()
+    }
 
 
 __all__ = [
     "ItemAmount",
+    "batch",
     "ProfileData",
     "assemble_profile",
     "display_item_amount",
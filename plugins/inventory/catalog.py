@@ -1,20 +1,53 @@
-"""Catalog synchronization for built-in inventory items."""
+"""Catalog synchronization for built-in inventory items.
+
+The catalog only changes here and when gacha registers a Bestdori card, so
+reads go through an immutable :class:`CatalogSnapshot` instead of the
+``items`` table. A snapshot is built from the session it belongs to, swapped
+in as a whole and never mutated; readers holding the old one keep a
+consistent view.
+"""
 
 import json
+from types import MappingProxyType
+from typing import Any
+from typing import Mapping
+from typing import Optional
 from pathlib import Path
+from dataclasses import dataclass
 
 from nonebot.log import logger
 import nonebot_plugin_localstore as store
 
 from .models import Item
+from .models import CatalogItem
 from .models import CosmeticItem
 from .models import CurrencyItem
 from .models import EquippedItem
+from .models import CatalogCosmetic
+from .models import CatalogCurrency
 from .models import ItemTransaction
 from .models import UserItem
 from .database import get_session
 
 CATALOG_PATH = Path(__file__).with_name("items.json")
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    items: Mapping[str, CatalogItem]
+    source: Any = None
+
+    def get(self, item_id: str) -> CatalogItem | None:
+        return self.items.get(item_id)
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self.items
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+_version = 0
 
 
 def load_catalog() -> list[dict]:
@@ -75,9 +108,105 @@ def sync_catalog() -> None:
 
     _purge_title_cosmetics()
     session.commit()
+    refresh_catalog()
     _invalidate_theme_cache()
 
 
+def current_catalog() -> CatalogSnapshot:
+    """Return the catalog snapshot, building it on first use.
+
+    A snapshot read from a different session than the current one (the
+    database was re-initialised) is rebuilt.
+    """
+
+    session = get_session()
+    snapshot = _snapshot
+    if snapshot is None or snapshot.source is not session:
+        snapshot = refresh_catalog()
+    return snapshot
+
+
+def refresh_catalog() -> CatalogSnapshot:
+    """Rebuild the snapshot from the database and swap it in."""
+
+    global _snapshot, _version
+    session = get_session()
+    rows = session.query(Item).all()
+    _version += 1
+    snapshot = CatalogSnapshot(
+        version=_version,
+        items=MappingProxyType({row.item_id: _freeze_item(row) for row in rows}),
+        source=session,
+    )
+    _snapshot = snapshot
+    return snapshot
+
+
+def add_to_catalog(row: Item) -> CatalogSnapshot:
+    """Swap in a snapshot with ``row`` added or replaced, keeping the rest."""
+
+    global _snapshot, _version
+    items = dict(current_catalog().items)
+    items[row.item_id] = _freeze_item(row)
+    _version += 1
+    snapshot = CatalogSnapshot(
+        version=_version,
+        items=MappingProxyType(items),
+        source=get_session(),
+    )
+    _snapshot = snapshot
+    return snapshot
+
+
+def invalidate_catalog() -> None:
+    """Drop the snapshot; the next read rebuilds it."""
+
+    global _snapshot
+    _snapshot = None
+
+
+def _freeze_item(row: Item) -> CatalogItem:
+    try:
+        metadata = json.loads(row.metadata_json or "{}")
+    except (TypeError, ValueError):
+        metadata = {}
+    if not isinstance(metadata, dict):
+        metadata = {}
+    art_path = None
+    if art := metadata.get("art"):
+        art_path = Path(art)
+        if not art_path.is_absolute():
+            art_path = _PROJECT_ROOT / art_path
+    currency = None
+    if row.currency is not None:
+        currency = CatalogCurrency(
+            currency_kind=row.currency.currency_kind,
+            unit_name=row.currency.unit_name or "",
+            rankable=bool(row.currency.rankable),
+            reset_policy=row.currency.reset_policy or "none",
+        )
+    cosmetic = None
+    if row.cosmetic is not None:
+        cosmetic = CatalogCosmetic(
+            cosmetic_type=row.cosmetic.cosmetic_type,
+            rarity=int(row.cosmetic.rarity or 1),
+        )
+    return CatalogItem(
+        item_id=row.item_id,
+        category=row.category,
+        name=row.name,
+        description=row.description or "",
+        stackable=bool(row.stackable),
+        visible=bool(row.visible),
+        sort_order=int(row.sort_order or 0),
+        metadata_json=row.metadata_json or "{}",
+        metadata=MappingProxyType(metadata),
+        art_path=art_path,
+        currency=currency,
+        cosmetic=cosmetic,
+    )
+
+
 def _purge_title_cosmetics() -> None:
     """Remove the retired title cosmetic type and every development record.
 
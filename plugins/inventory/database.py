@@ -8,6 +8,8 @@ require("nonebot_plugin_localstore")
 
 import nonebot_plugin_localstore as store  # noqa: E402
 
+from utils.migrations import migrations  # noqa: E402
+
 from .models import Base  # noqa: E402
 
 database_path = store.get_data_file("inventory", "inventory.db")
@@ -22,14 +24,21 @@ def init_database():
     engine = create_engine(f"sqlite:///{database_path.resolve()}")
     session = sessionmaker(bind=engine)()
 
+    from .catalog import CATALOG_PATH
     from .catalog import sync_catalog
     from .migration import migrate_inventory_schema
     from .migration import migrate_legacy_monetary_balances
     from .season_service import sync_seasons_config
 
-    Base.metadata.create_all(engine)
-    migrate_inventory_schema()
-    sync_catalog()
+    with migrations(engine, "inventory") as registry:
+        Base.metadata.create_all(engine)
+        registry.run("inventory.schema", migrate_inventory_schema)
+        registry.run(
+            "inventory.catalog", sync_catalog, content=CATALOG_PATH.read_bytes()
+        )
+    # The season sync also moves seasons through their lifecycle by the clock,
+    # and the legacy balance migration keeps its own marker and may defer
+    # itself until a season opens; both run on every boot.
     sync_seasons_config()
     migrate_legacy_monetary_balances()
 
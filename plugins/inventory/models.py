@@ -1,6 +1,11 @@
 """Inventory and season data models."""
 
+from types import MappingProxyType
+from typing import Any
+from typing import Mapping
 from typing import Optional
+from pathlib import Path
+from dataclasses import field
 from dataclasses import dataclass
 
 from sqlalchemy import Text
@@ -188,6 +193,27 @@ class SeasonReward(Base):
     )
 
 
+class SeasonSettlementProgress(Base):
+    """Checkpoint of a chunked settlement, committed with each chunk.
+
+    ``phase`` moves ``ranking`` → ``participation`` → ``done``. The cursor is
+    the last row written in the current phase: ``(points, user_id)`` in
+    ranking order, or just ``user_id`` for participation-only rewards.
+    """
+
+    __tablename__ = "season_settlement_progress"
+
+    season_id = Column(Integer, primary_key=True)
+    phase = Column(String, default="ranking", nullable=False)
+    cursor_points = Column(Integer, default=0, nullable=False)
+    cursor_user_id = Column(String, default="", nullable=False)
+    ranked = Column(Integer, default=0, nullable=False)
+    total_rankings = Column(Integer, default=0, nullable=False)
+    rewards = Column(Integer, default=0, nullable=False)
+    started_at = Column(Integer, nullable=False)
+    updated_at = Column(Integer, nullable=False)
+
+
 class SeasonParticipation(Base):
     __tablename__ = "season_participation"
 
@@ -239,3 +265,40 @@ class GrantResult:
     quantity_after: int
     skipped: bool = False
     message: str = ""
+
+
+@dataclass(frozen=True)
+class CatalogCurrency:
+    currency_kind: str
+    unit_name: str = ""
+    rankable: bool = False
+    reset_policy: str = "none"
+
+
+@dataclass(frozen=True)
+class CatalogCosmetic:
+    cosmetic_type: str
+    rarity: int = 1
+
+
+@dataclass(frozen=True)
+class CatalogItem:
+    """Read-only copy of an ``Item`` row with its currency/cosmetic rows.
+
+    Attribute names match the ORM model, so callers that only read an item
+    work with either. ``metadata`` is the parsed ``metadata_json`` and
+    ``art_path`` its ``art`` entry resolved against the project root.
+    """
+
+    item_id: str
+    category: str
+    name: str
+    description: str = ""
+    stackable: bool = True
+    visible: bool = True
+    sort_order: int = 0
+    metadata_json: str = "{}"
+    metadata: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    art_path: Optional[Path] = None
+    currency: Optional[CatalogCurrency] = None
+    cosmetic: Optional[CatalogCosmetic] = None
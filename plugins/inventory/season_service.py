@@ -2,18 +2,23 @@
 
 import json
 import time
+import asyncio
 import hashlib
 from typing import Any
+from typing import Iterator
 from typing import Optional
+from typing import Generator
 from pathlib import Path
 from datetime import datetime
 
+from sqlalchemy import or_
+from sqlalchemy import and_
+from sqlalchemy import insert
 from nonebot.log import logger
 
 from .models import SEASON_SCOPE_TYPE
 from .models import OFFSEASON_SCOPE_TYPE
 from .models import SEASON_POINT_ITEM_ID
-from .models import Item
 from .models import Season
 from .models import UserItem
 from .models import ItemAmount
@@ -21,11 +26,16 @@ from .models import SeasonReward
 from .models import SeasonRanking
 from .models import SeasonRankSnapshot
 from .models import SeasonParticipation
+from .models import SeasonSettlementProgress
+from .catalog import current_catalog
 from .database import get_session
+from .unit_of_work import commit_or_defer
 
 SEASONS_PATH = Path(__file__).with_name("seasons.json")
 DEFAULT_TIMEZONE = "UTC+8"
 DEFAULT_OFFSEASON_STARTING_POINTS = 100
+SETTLEMENT_CHUNK_SIZE = 500
+DISPATCH_CHUNK_SIZE = 200
 
 
 def load_seasons_config() -> dict[str, Any]:
@@ -80,7 +90,7 @@ def sync_seasons_config(now: int | None = None) -> list[Season]:
         seasons.append(row)
 
     _prune_scrapped_seasons(session, {entry["season_key"] for entry in config.get("seasons", [])})
-    session.commit()
+    commit_or_defer(session)
     refresh_season_statuses(now=now)
     return seasons
 
@@ -138,7 +148,7 @@ def refresh_season_statuses(now: int | None = None) -> None:
             season.status = status
             changed = True
     if changed:
-        session.commit()
+        commit_or_defer(session)
 
 
 def activate_due_seasons(now: int | None = None) -> int:
@@ -190,12 +200,14 @@ def get_current_season(now: int | None = None) -> Optional[Season]:
         session.query(Season)
         # A settled season is over even inside its time window: an early
         # (admin) settlement must close the Pt scope and the gacha banner
-        # immediately, not at the configured end date.
+        # immediately, not at the configured end date. The same holds from
+        # the moment settlement starts, so chunks see frozen rankings.
         .filter(
             Season.start_time <= now,
             Season.end_time > now,
             Season.opened_at > 0,
             Season.settled_at == 0,
+            Season.status != "settling",
         )
         .order_by(Season.start_time.desc())
         .first()
@@ -281,7 +293,9 @@ def get_offseason_scope_id(now: int | None = None) -> str:
         (
             season
             for season in previous_candidates
-            if season.end_time <= now or season.settled_at
+            if season.end_time <= now
+            or season.settled_at
+            or season.status == "settling"
         ),
         None,
     )
@@ -408,19 +422,26 @@ def capture_rank_snapshots(now: int | None = None) -> int:
     return created
 
 
-def settle_due_seasons(now: int | None = None) -> int:
+async def settle_due_seasons(now: int | None = None) -> int:
+    """Settle every season that is due, yielding to the loop between chunks."""
+
     now = int(time.time()) if now is None else now
     sync_seasons_config(now=now)
     session = get_session()
     seasons = (
         session.query(Season)
-        .filter(Season.end_time <= now, Season.settled_at == 0)
+        # An interrupted settlement resumes on the next run even when it was
+        # an early (forced) one whose end date is still in the future.
+        .filter(
+            or_(Season.end_time <= now, Season.status == "settling"),
+            Season.settled_at == 0,
+        )
         .order_by(Season.end_time.asc())
         .all()
     )
     settled = 0
     for season in seasons:
-        settle_season(season.season_key, now=now)
+        await settle_season_async(season.season_key, now=now)
         settled += 1
     return settled
 
@@ -430,104 +451,257 @@ def settle_season(
     now: int | None = None,
     *,
     force: bool = False,
+    chunk_size: int = SETTLEMENT_CHUNK_SIZE,
 ) -> int:
+    steps = _settle_steps(season_key, now, force=force, chunk_size=chunk_size)
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+async def settle_season_async(
+    season_key: str,
+    now: int | None = None,
+    *,
+    force: bool = False,
+    chunk_size: int = SETTLEMENT_CHUNK_SIZE,
+) -> int:
+    """``settle_season`` that lets other handlers run between chunks."""
+
+    steps = _settle_steps(season_key, now, force=force, chunk_size=chunk_size)
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+        await asyncio.sleep(0)
+
+
+def _settle_steps(
+    season_key: str, now: int | None, *, force: bool, chunk_size: int
+) -> Generator[None, None, int]:
+    """Settle chunk by chunk, then deliver the rewards; returns the ranked count."""
+
+    progress = None
+    for progress in iter_settlement(
+        season_key, now=now, force=force, chunk_size=chunk_size
+    ):
+        yield
+    dispatch_pending_season_rewards(season_id=progress.season_id)
+    return progress.ranked
+
+
+def iter_settlement(
+    season_key: str,
+    now: int | None = None,
+    *,
+    force: bool = False,
+    chunk_size: int = SETTLEMENT_CHUNK_SIZE,
+) -> Iterator[SeasonSettlementProgress]:
+    """Settle a season chunk by chunk, yielding the checkpoint after each.
+
+    Ranked wallets are read in pages of ``chunk_size`` by keyset on the
+    ranking order, and each page's ``SeasonRanking``/``SeasonReward`` rows
+    commit together with the checkpoint. A crash therefore loses at most the
+    chunk in flight; the next call (or the lifecycle job, which picks up
+    seasons left in ``settling``) continues from the checkpoint. The
+    ``force`` check only applies when a settlement starts, not on resume.
+
+    While a season is ``settling`` it is no longer the current season, so no
+    Pt can move between chunks and shift the ranking under the cursor.
+    """
+
     now = int(time.time()) if now is None else now
     season = get_season_by_key(season_key)
     if season is None:
         raise ValueError(f"unknown season: {season_key}")
     if season.settled_at:
         raise ValueError(f"{season.name} 已经结算")
-    if now < season.start_time:
-        raise ValueError(f"{season.name} 尚未开始，不能结算")
-    if now < season.end_time and not force:
-        raise ValueError("赛季尚未到结束时间；提前结算必须显式使用 --force")
 
     session = get_session()
+    progress = session.get(SeasonSettlementProgress, season.id)
+    if progress is None:
+        if now < season.start_time:
+            raise ValueError(f"{season.name} 尚未开始，不能结算")
+        if now < season.end_time and not force:
+            raise ValueError("赛季尚未到结束时间；提前结算必须显式使用 --force")
+        progress = SeasonSettlementProgress(
+            season_id=season.id,
+            total_rankings=_season_point_query(season.id).count(),
+            started_at=now,
+            updated_at=now,
+        )
+        session.add(progress)
+    else:
+        logger.info(
+            f"Resuming season settlement: {season.season_key}, "
+            f"phase={progress.phase}, ranked={progress.ranked}"
+        )
     if not season.opened_at:
         season.opened_at = season.start_time
     season.status = "settling"
     session.commit()
-    try:
-        ranking_rows = _season_point_query(season.id).all()
-        metadata = get_season_metadata(season)
-        reward_tiers = metadata.get("reward_tiers", [])
-        participation_tier = _participation_tier(metadata)
-        participated_user_ids = _participated_user_ids(season.id)
-        existing_rankings = {
-            row.user_id: row
-            for row in session.query(SeasonRanking)
-            .filter(SeasonRanking.season_id == season.id)
-            .all()
-        }
-        existing_rewards = {
-            row.user_id
-            for row in session.query(SeasonReward.user_id)
-            .filter(SeasonReward.season_id == season.id)
-            .all()
-        }
-        created_rewards = 0
-
-        for idx, row in enumerate(ranking_rows, start=1):
-            ranking = existing_rankings.get(row.user_id)
-            if ranking is None:
-                ranking = SeasonRanking(season_id=season.id, user_id=row.user_id)
-                session.add(ranking)
-            ranking.final_points = row.quantity
-            ranking.rank = idx
-
-            tier = _reward_tier_for_rank(reward_tiers, idx)
-            if row.user_id in participated_user_ids:
-                tier = _merge_reward_tiers(tier, participation_tier)
-            if tier:
-                reward_json = json.dumps(tier, ensure_ascii=False, sort_keys=True)
-                ranking.reward_summary_json = reward_json
-                if _ensure_reward_record(
-                    season,
-                    row.user_id,
-                    idx,
-                    row.quantity,
-                    tier,
-                    now,
-                    existing_rewards,
-                ):
-                    created_rewards += 1
-            else:
-                ranking.reward_summary_json = "{}"
 
-        ranked_user_ids = {row.user_id for row in ranking_rows}
-        if participation_tier:
-            for user_id in sorted(participated_user_ids - ranked_user_ids):
-                if _ensure_reward_record(
-                    season,
-                    user_id,
-                    0,
-                    0,
-                    participation_tier,
-                    now,
-                    existing_rewards,
-                ):
-                    created_rewards += 1
-
-        season.settled_at = now
-        season.status = "settled"
-        session.commit()
-    except Exception:
-        session.rollback()
-        failed_season = (
-            session.query(Season).filter(Season.season_key == season_key).first()
-        )
-        if failed_season is not None and not failed_season.settled_at:
-            failed_season.status = (
-                "open" if now < failed_season.end_time else "ended"
-            )
+    metadata = get_season_metadata(season)
+    reward_tiers = metadata.get("reward_tiers", [])
+    participation_tier = _participation_tier(metadata)
+    while progress.phase != "done":
+        try:
+            if progress.phase == "ranking":
+                _settle_ranking_chunk(
+                    season, progress, reward_tiers, participation_tier, now, chunk_size
+                )
+            else:
+                _settle_participation_chunk(
+                    season, progress, participation_tier, now, chunk_size
+                )
+            progress.updated_at = now
+            if progress.phase == "done":
+                season.settled_at = now
+                season.status = "settled"
             session.commit()
-        raise
+        except Exception:
+            # The season stays "settling" at the last committed checkpoint.
+            session.rollback()
+            raise
+        yield progress
 
     logger.info(
-        f"Season settled: {season.season_key}, rankings={len(ranking_rows)}, rewards={created_rewards}"
+        f"Season settled: {season.season_key}, rankings={progress.ranked}, "
+        f"rewards={progress.rewards}"
     )
-    dispatch_pending_season_rewards(season_id=season.id)
-    return len(ranking_rows)
+
+
+def _settle_ranking_chunk(
+    season: Season,
+    progress: SeasonSettlementProgress,
+    reward_tiers: list[dict[str, Any]],
+    participation_tier: dict[str, Any] | None,
+    now: int,
+    chunk_size: int,
+) -> None:
+    query = _season_point_query(season.id)
+    if progress.cursor_user_id:
+        query = query.filter(
+            or_(
+                UserItem.quantity < progress.cursor_points,
+                and_(
+                    UserItem.quantity == progress.cursor_points,
+                    UserItem.user_id > progress.cursor_user_id,
+                ),
+            )
+        )
+    rows = query.limit(chunk_size).all()
+
+    rankings = []
+    rewards = []
+    for rank, row in enumerate(rows, start=progress.ranked + 1):
+        # ``_season_point_query`` only returns participants, so every ranked
+        # player also earns the participation reward.
+        tier = _merge_reward_tiers(
+            _reward_tier_for_rank(reward_tiers, rank), participation_tier
+        )
+        rankings.append(
+            {
+                "season_id": season.id,
+                "user_id": row.user_id,
+                "final_points": row.quantity,
+                "rank": rank,
+                "reward_summary_json": (
+                    json.dumps(tier, ensure_ascii=False, sort_keys=True)
+                    if tier
+                    else "{}"
+                ),
+            }
+        )
+        if tier:
+            rewards.append(
+                _reward_row(season, row.user_id, rank, row.quantity, tier, now)
+            )
+    _insert_missing(SeasonRanking, season.id, rankings)
+    progress.rewards += _insert_missing(SeasonReward, season.id, rewards)
+
+    progress.ranked += len(rows)
+    if rows:
+        progress.cursor_points = rows[-1].quantity
+        progress.cursor_user_id = rows[-1].user_id
+    if len(rows) < chunk_size:
+        progress.phase = "participation" if participation_tier else "done"
+        progress.cursor_points = 0
+        progress.cursor_user_id = ""
+
+
+def _settle_participation_chunk(
+    season: Season,
+    progress: SeasonSettlementProgress,
+    participation_tier: dict[str, Any] | None,
+    now: int,
+    chunk_size: int,
+) -> None:
+    """Reward participants who never got a ranked wallet this season."""
+
+    user_ids = [
+        row[0]
+        for row in get_session()
+        .query(SeasonParticipation.user_id)
+        .outerjoin(
+            UserItem,
+            (UserItem.user_id == SeasonParticipation.user_id)
+            & (UserItem.item_id == SEASON_POINT_ITEM_ID)
+            & (UserItem.scope_type == SEASON_SCOPE_TYPE)
+            & (UserItem.scope_id == str(season.id)),
+        )
+        .filter(
+            SeasonParticipation.season_id == season.id,
+            SeasonParticipation.user_id > progress.cursor_user_id,
+            UserItem.id.is_(None),
+        )
+        .order_by(SeasonParticipation.user_id.asc())
+        .limit(chunk_size)
+        .all()
+    ]
+    if participation_tier:
+        progress.rewards += _insert_missing(
+            SeasonReward,
+            season.id,
+            [
+                _reward_row(season, user_id, 0, 0, participation_tier, now)
+                for user_id in user_ids
+            ],
+        )
+    if user_ids:
+        progress.cursor_user_id = user_ids[-1]
+    if len(user_ids) < chunk_size:
+        progress.phase = "done"
+        progress.cursor_user_id = ""
+
+
+def _insert_missing(model, season_id: int, rows: list[dict[str, Any]]) -> int:
+    """Bulk-insert ``rows`` except users that already have one; return count.
+
+    Chunks commit with their checkpoint, so existing rows only show up when a
+    settlement was interrupted outside that protocol; skipping them keeps the
+    per-season unique constraints from wedging the resume.
+    """
+
+    if not rows:
+        return 0
+    session = get_session()
+    existing = {
+        row[0]
+        for row in session.query(model.user_id)
+        .filter(
+            model.season_id == season_id,
+            model.user_id.in_([row["user_id"] for row in rows]),
+        )
+        .all()
+    }
+    missing = [row for row in rows if row["user_id"] not in existing]
+    if missing:
+        session.execute(insert(model), missing)
+    return len(missing)
 
 
 def grant_featured_character_reward(
@@ -642,32 +816,48 @@ def settlement_preview(season_key: str) -> dict[str, int | str]:
     }
 
 
-def _ensure_reward_record(
+def settlement_progress(season_key: str) -> dict[str, int | str]:
+    """Return how far a (possibly interrupted) settlement has got."""
+
+    season = get_season_by_key(season_key)
+    if season is None:
+        raise ValueError(f"unknown season: {season_key}")
+    session = get_session()
+    progress = session.get(SeasonSettlementProgress, season.id)
+    pending = (
+        session.query(SeasonReward)
+        .filter(SeasonReward.season_id == season.id, SeasonReward.mail_id == 0)
+        .count()
+    )
+    return {
+        "season_key": season.season_key,
+        "status": season.status,
+        "phase": progress.phase if progress else "pending",
+        "ranked": progress.ranked if progress else 0,
+        "total_rankings": progress.total_rankings if progress else 0,
+        "rewards": progress.rewards if progress else 0,
+        "pending_mails": pending,
+        "updated_at": progress.updated_at if progress else 0,
+    }
+
+
+def _reward_row(
     season: Season,
     user_id: str,
     rank: int,
     points: int,
     tier: dict[str, Any],
     now: int,
-    existing_user_ids: set[str],
-) -> bool:
-    session = get_session()
-    if user_id in existing_user_ids:
-        return False
-
-    reward_json = json.dumps(tier, ensure_ascii=False, sort_keys=True)
-    reward = SeasonReward(
-        season_id=season.id,
-        user_id=user_id,
-        tier_key=tier["tier_key"],
-        rank=rank,
-        points=points,
-        reward_json=reward_json,
-        created_at=now,
-    )
-    session.add(reward)
-    existing_user_ids.add(user_id)
-    return True
+) -> dict[str, Any]:
+    return {
+        "season_id": season.id,
+        "user_id": user_id,
+        "tier_key": tier["tier_key"],
+        "rank": rank,
+        "points": points,
+        "reward_json": json.dumps(tier, ensure_ascii=False, sort_keys=True),
+        "created_at": now,
+    }
 
 
 def dispatch_pending_season_rewards(season_id: int | None = None) -> int:
@@ -676,66 +866,98 @@ def dispatch_pending_season_rewards(season_id: int | None = None) -> int:
     The ranking/reward transaction commits before this dispatcher runs.
     Mailbox ``external_key`` makes a retry return the original mail if the
     process died after the mailbox commit but before ``mail_id`` was saved.
-    Failures stay as ``mail_id == 0`` and are retried by the lifecycle job.
+    Rewards go out ``DISPATCH_CHUNK_SIZE`` mails per mailbox commit; when a
+    chunk fails it is retried one mail at a time so a single bad reward
+    cannot hold back the rest. Failures stay as ``mail_id == 0`` and are
+    retried by the lifecycle job.
     """
 
-    session = get_session()
-    query = session.query(SeasonReward.id).filter(SeasonReward.mail_id == 0)
-    if season_id is not None:
-        query = query.filter(SeasonReward.season_id == season_id)
-    reward_ids = [row[0] for row in query.order_by(SeasonReward.id.asc()).all()]
-    delivered = 0
-
     from ..mailbox.service import MailService
 
-    for reward_id in reward_ids:
-        reward = (
-            session.query(SeasonReward)
-            .filter(SeasonReward.id == reward_id, SeasonReward.mail_id == 0)
-            .first()
+    session = get_session()
+    seasons: dict[int, Season | None] = {}
+    delivered = 0
+    last_id = 0
+    while True:
+        query = session.query(SeasonReward).filter(
+            SeasonReward.mail_id == 0, SeasonReward.id > last_id
         )
-        if reward is None:
-            continue
-        season = session.query(Season).filter(Season.id == reward.season_id).first()
-        if season is None:
-            logger.error(f"Season reward {reward.id} has no season")
-            continue
-        tier = json.loads(reward.reward_json or "{}")
-        attachments = [
-            ItemAmount(item_id=item["item_id"], quantity=int(item["quantity"]))
-            for item in tier.get("items", [])
-        ]
-        if reward.rank > 0:
-            content = (
-                f"{season.name} 已结束！你以 {reward.points} Pt 获得第 {reward.rank} 名。\n"
-                "奖励已经放在这封邮件里了，感谢参与本赛季。"
-            )
-        else:
-            content = (
-                f"{season.name} 已结束！你完成了本赛季参与。\n"
-                "奖励已经放在这封邮件里了，感谢参与本赛季。"
-            )
+        if season_id is not None:
+            query = query.filter(SeasonReward.season_id == season_id)
+        rewards = query.order_by(SeasonReward.id.asc()).limit(DISPATCH_CHUNK_SIZE).all()
+        if not rewards:
+            break
+        last_id = rewards[-1].id
+
+        outgoing = []
+        for reward in rewards:
+            if reward.season_id not in seasons:
+                seasons[reward.season_id] = (
+                    session.query(Season).filter(Season.id == reward.season_id).first()
+                )
+            season = seasons[reward.season_id]
+            if season is None:
+                logger.error(f"Season reward {reward.id} has no season")
+                continue
+            outgoing.append((reward, _reward_mail(season, reward)))
+
         try:
-            mail_id = MailService().send_mail(
-                recipient_id=reward.user_id,
-                title=f"{season.name} {tier.get('title', '赛季奖励')}",
-                content=content,
-                attachments=attachments,
-                expire_days=30,
-                sender_id="season",
-                external_key=f"season_reward:{season.id}:{reward.user_id}",
-            )
-            reward.mail_id = mail_id
-            session.commit()
-            delivered += 1
+            sent = [
+                (
+                    outgoing,
+                    MailService().send_personal_mails([mail for _, mail in outgoing]),
+                )
+            ]
         except Exception:
-            session.rollback()
-            logger.opt(exception=True).error(
-                f"Season reward delivery failed: reward_id={reward_id}"
+            logger.opt(exception=True).warning(
+                f"Season reward chunk delivery failed, retrying one by one: "
+                f"rewards={len(outgoing)}"
             )
+            sent = []
+            for entry in outgoing:
+                try:
+                    mail_ids = MailService().send_personal_mails([entry[1]])
+                    sent.append(([entry], mail_ids))
+                except Exception:
+                    logger.opt(exception=True).error(
+                        f"Season reward delivery failed: reward_id={entry[0].id}"
+                    )
+        for batch, mail_ids in sent:
+            for (reward, _), mail_id in zip(batch, mail_ids):
+                reward.mail_id = mail_id
+                delivered += 1
+        session.commit()
     return delivered
 
 
+def _reward_mail(season: Season, reward: SeasonReward):
+    from ..mailbox.models import OutgoingMail
+
+    tier = json.loads(reward.reward_json or "{}")
+    if reward.rank > 0:
+        content = (
+            f"{season.name} 已结束！你以 {reward.points} Pt 获得第 {reward.rank} 名。\n"
+            "奖励已经放在这封邮件里了，感谢参与本赛季。"
+        )
+    else:
+        content = (
+            f"{season.name} 已结束！你完成了本赛季参与。\n"
+            "奖励已经放在这封邮件里了，感谢参与本赛季。"
+        )
+    return OutgoingMail(
+        recipient_id=reward.user_id,
+        title=f"{season.name} {tier.get('title', '赛季奖励')}",
+        content=content,
+        attachments=tuple(
+            ItemAmount(item_id=item["item_id"], quantity=int(item["quantity"]))
+            for item in tier.get("items", [])
+        ),
+        expire_days=30,
+        sender_id="season",
+        external_key=f"season_reward:{season.id}:{reward.user_id}",
+    )
+
+
 def _season_point_query(season_id: int):
     return (
         get_session()
@@ -948,8 +1170,7 @@ def _validate_reward_tier(
 
 
 def _validate_reward_items(config: dict[str, Any]) -> None:
-    session = get_session()
-    known_item_ids = {row.item_id for row in session.query(Item.item_id).all()}
+    known_item_ids = current_catalog().items
     missing = []
     for season in config.get("seasons", []):
         for item_id in (
@@ -1,11 +1,12 @@
 """Inventory service APIs."""
 
 import re
-import json
 import time
 from typing import Iterable
+from typing import Iterator
 from typing import Optional
 from pathlib import Path
+from contextlib import contextmanager
 
 from nonebot.log import logger
 
@@ -19,12 +20,17 @@ from .models import Item
 from .models import UserItem
 from .models import ItemScope
 from .models import ItemAmount
+from .models import CatalogItem
 from .models import GrantResult
 from .models import UserProfile
-from .models import CosmeticItem
 from .models import EquippedItem
 from .models import ItemTransaction
+from .catalog import current_catalog
+from .catalog import refresh_catalog
 from .database import get_session
+from .unit_of_work import memoize
+from .unit_of_work import unit_of_work
+from .unit_of_work import commit_or_defer
 from .season_service import get_point_scope
 from .season_service import get_season_starting_points
 from .season_service import get_offseason_starting_points
@@ -35,7 +41,8 @@ PROFILE_DESCRIPTION_PATTERN = re.compile(
     r" .,!?~\-_/：:;'\"()\[\]，。！？、；\n]*$"
 )
 
-_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+# Ids the ``items`` table did not have, for the catalog snapshot version.
+_missing_items: tuple[int, set[str]] = (0, set())
 
 DUPLICATE_BONSAI_COMPENSATION = {
     "avatar_frame": {
@@ -60,8 +67,30 @@ DUPLICATE_BONSAI_COMPENSATION = {
 }
 
 
-def get_item(item_id: str) -> Item | None:
-    return get_session().query(Item).filter(Item.item_id == item_id).first()
+def get_item(item_id: str) -> CatalogItem | None:
+    """Look an item up in the catalog snapshot.
+
+    A miss falls back to the ``items`` table, so a row written outside
+    :func:`catalog.sync_catalog` is picked up by rebuilding the snapshot. An
+    id the table does not have either is remembered as missing until the
+    snapshot changes, so unknown ids cost one query per snapshot.
+    """
+
+    global _missing_items
+    snapshot = current_catalog()
+    item = snapshot.get(item_id)
+    if item is not None:
+        return item
+    version, missing = _missing_items
+    if version != snapshot.version:
+        missing = set()
+        _missing_items = (snapshot.version, missing)
+    if item_id in missing:
+        return None
+    if get_session().query(Item.item_id).filter(Item.item_id == item_id).first():
+        return refresh_catalog().get(item_id)
+    missing.add(item_id)
+    return None
 
 
 def get_item_art(item_id: str | None) -> Path | None:
@@ -70,19 +99,11 @@ def get_item_art(item_id: str | None) -> Path | None:
     if not item_id:
         return None
     item = get_item(item_id)
-    if item is None:
+    if item is None or item.art_path is None:
         return None
-    try:
-        metadata = json.loads(item.metadata_json or "{}")
-    except (TypeError, ValueError):
-        return None
-    value = metadata.get("art") if isinstance(metadata, dict) else None
-    if not value:
-        return None
-    path = Path(value)
-    if not path.is_absolute():
-        path = _PROJECT_ROOT / path
-    return path if path.exists() else None
+    # The art may arrive after the catalog sync (Bestdori cache), so the
+    # existence check stays per call.
+    return item.art_path if item.art_path.exists() else None
 
 
 def resolve_scope(item_id: str, scope: Optional[ItemScope | tuple[str, str]] = None):
@@ -93,7 +114,8 @@ def resolve_scope(item_id: str, scope: Optional[ItemScope | tuple[str, str]] = N
 
     item = get_item(item_id)
     if item and item.currency and item.currency.currency_kind == "seasonal":
-        scope_type, scope_id, _ = get_point_scope()
+        # One batch spans one season scope, resolved before its first write.
+        scope_type, scope_id, _ = memoize("point_scope", get_point_scope)
         return scope_type, scope_id
 
     return PERMANENT_SCOPE_TYPE, PERMANENT_SCOPE_ID
@@ -119,31 +141,31 @@ def grant_many(
     idempotency_key: str | None = None,
 ) -> list[GrantResult]:
     results = []
-    for item in items:
-        if isinstance(item, ItemAmount):
-            item_scope = (
-                (item.scope_type, item.scope_id)
-                if item.scope_type and item.scope_id
-                else scope
-            )
-            item_id = item.item_id
-            quantity = item.quantity
-        else:
-            item_id, quantity = item
-            item_scope = scope
-
-        results.append(
-            grant_item(
-                user_id,
-                item_id,
-                quantity,
-                reason,
-                scope=item_scope,
-                source_type=source_type,
-                source_id=source_id,
-                idempotency_key=idempotency_key,
+    with batch(user_id) as inventory:
+        for item in items:
+            if isinstance(item, ItemAmount):
+                item_scope = (
+                    (item.scope_type, item.scope_id)
+                    if item.scope_type and item.scope_id
+                    else scope
+                )
+                item_id = item.item_id
+                quantity = item.quantity
+            else:
+                item_id, quantity = item
+                item_scope = scope
+
+            results.append(
+                inventory.grant(
+                    item_id,
+                    quantity,
+                    reason,
+                    scope=item_scope,
+                    source_type=source_type,
+                    source_id=source_id,
+                    idempotency_key=idempotency_key,
+                )
             )
-        )
     return results
 
 
@@ -194,7 +216,7 @@ def grant_item(
             source_id,
             tx_key,
         )
-        session.commit()
+        commit_or_defer(session)
         message = (
             f"already_owned_compensated:{compensation}"
             if compensation > 0
@@ -222,7 +244,7 @@ def grant_item(
         source_id,
         tx_key,
     )
-    session.commit()
+    commit_or_defer(session)
     return GrantResult(item_id, quantity, granted, row.quantity)
 
 
@@ -268,7 +290,7 @@ def cost_item(
         source_id,
         tx_key,
     )
-    session.commit()
+    commit_or_defer(session)
     return row.quantity
 
 
@@ -338,7 +360,7 @@ def exchange_for_nonstackable(
         source_id,
         grant_tx_key,
     )
-    session.commit()
+    commit_or_defer(session)
     return GrantResult(item_id, 1, 1, target.quantity)
 
 
@@ -374,10 +396,54 @@ def set_quantity(
         row.quantity,
         reason,
     )
-    session.commit()
+    commit_or_defer(session)
     return row.quantity
 
 
+class InventoryBatch:
+    """Grant/cost/set calls for one user inside an open :func:`batch`.
+
+    Each method has exactly the semantics of the module-level function it
+    wraps (idempotency keys, duplicate compensation, season participation,
+    transaction rows); only the commit is deferred to the end of the batch.
+    """
+
+    def __init__(self, user_id: str) -> None:
+        self.user_id = user_id
+
+    def grant(self, item_id: str, quantity: int, reason: str, **kwargs) -> GrantResult:
+        return grant_item(self.user_id, item_id, quantity, reason, **kwargs)
+
+    def grant_many(
+        self, items: Iterable[ItemAmount | tuple[str, int]], reason: str, **kwargs
+    ) -> list[GrantResult]:
+        return grant_many(self.user_id, items, reason, **kwargs)
+
+    def cost(self, item_id: str, quantity: int, reason: str, **kwargs) -> int:
+        return cost_item(self.user_id, item_id, quantity, reason, **kwargs)
+
+    def set(self, item_id: str, quantity: int, reason: str, **kwargs) -> int:
+        return set_quantity(self.user_id, item_id, quantity, reason, **kwargs)
+
+    def quantity(self, item_id: str, **kwargs) -> int:
+        return get_quantity(self.user_id, item_id, **kwargs)
+
+
+@contextmanager
+def batch(user_id: str) -> Iterator[InventoryBatch]:
+    """Apply several inventory changes for ``user_id`` in one commit.
+
+    ``with batch(user_id) as b: b.cost(...); b.grant(...)`` flushes every
+    change, idempotency key and ``ItemTransaction`` row into a single
+    transaction and commits it when the block exits; an exception rolls the
+    whole block back. Module-level calls made inside the block (including the
+    monetary wrappers) join the same unit of work.
+    """
+
+    with unit_of_work():
+        yield InventoryBatch(user_id)
+
+
 def list_inventory(
     user_id: str, category: str | None = None, include_season: bool = True
 ) -> list[UserItem]:
@@ -396,10 +462,7 @@ def list_inventory(
 
 def equip_cosmetic(user_id: str, item_id: str) -> EquippedItem:
     session = get_session()
-    item = _require_item(item_id)
-    cosmetic = (
-        session.query(CosmeticItem).filter(CosmeticItem.item_id == item.item_id).first()
-    )
+    cosmetic = _require_item(item_id).cosmetic
     if cosmetic is None:
         raise ValueError("item is not cosmetic")
     if get_quantity(user_id, item_id) <= 0:
@@ -417,7 +480,7 @@ def equip_cosmetic(user_id: str, item_id: str) -> EquippedItem:
         session.add(equipped)
     equipped.item_id = item_id
     equipped.updated_at = int(time.time())
-    session.commit()
+    commit_or_defer(session)
     _invalidate_theme_cache(user_id, cosmetic.cosmetic_type)
     return equipped
 
@@ -433,7 +496,7 @@ def unequip_cosmetic(user_id: str, slot: str) -> bool:
     if equipped is None:
         return False
     session.delete(equipped)
-    session.commit()
+    commit_or_defer(session)
     _invalidate_theme_cache(user_id, slot)
     return True
 
@@ -463,6 +526,24 @@ def get_equipped(user_id: str) -> dict[str, str]:
     return {row.slot: row.item_id for row in rows}
 
 
+def get_equipped_many(user_ids: Iterable[str]) -> dict[str, dict[str, str]]:
+    """``get_equipped`` for several users in one query."""
+
+    user_ids = list(dict.fromkeys(user_ids))
+    equipped: dict[str, dict[str, str]] = {user_id: {} for user_id in user_ids}
+    if not user_ids:
+        return equipped
+    rows = (
+        get_session()
+        .query(EquippedItem)
+        .filter(EquippedItem.user_id.in_(user_ids))
+        .all()
+    )
+    for row in rows:
+        equipped[row.user_id][row.slot] = row.item_id
+    return equipped
+
+
 def set_profile_description(user_id: str, description: str) -> UserProfile:
     normalized = validate_profile_description(description)
     session = get_session()
@@ -472,7 +553,7 @@ def set_profile_description(user_id: str, description: str) -> UserProfile:
         session.add(profile)
     profile.profile_description = normalized
     profile.updated_at = int(time.time())
-    session.commit()
+    commit_or_defer(session)
     return profile
 
 
@@ -542,7 +623,7 @@ def _normalize_slot(slot: str) -> str:
     return aliases[slot]
 
 
-def _require_item(item_id: str) -> Item:
+def _require_item(item_id: str) -> CatalogItem:
     item = get_item(item_id)
     if item is None:
         raise ValueError(f"unknown item: {item_id}")
@@ -584,7 +665,7 @@ def _ensure_user_item(
     return row
 
 
-def _duplicate_compensation(item: Item) -> int:
+def _duplicate_compensation(item: CatalogItem) -> int:
     if item.cosmetic is None:
         return 0
     by_rarity = DUPLICATE_BONSAI_COMPENSATION.get(item.cosmetic.cosmetic_type, {})
@@ -650,7 +731,7 @@ def _ensure_point_wallet(user_id: str, scope_type: str, scope_id: str) -> UserIt
             amount = get_offseason_starting_points()
             seed_key = f"offseason_start:{scope_id}"
     else:
-        session.commit()
+        commit_or_defer(session)
         return row
 
     tx_key = _tx_key(
@@ -684,7 +765,7 @@ def _ensure_point_wallet(user_id: str, scope_type: str, scope_id: str) -> UserIt
                 source_id=scope_id,
                 idempotency_key=tx_key,
             )
-    session.commit()
+    commit_or_defer(session)
     return row
 
 
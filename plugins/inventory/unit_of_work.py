@@ -0,0 +1,118 @@
+"""Deferred commits for inventory batches.
+
+``service.batch`` opens a unit of work. While it is open, every commit that
+the grant/cost/set paths would normally issue (including the season sync and
+log writes they reach) goes through :func:`commit_or_defer` and becomes a
+flush. The sessions involved are committed together when the outermost batch
+closes, or all rolled back if it raises.
+
+Other databases join the same unit of work simply by routing their commits
+through :func:`commit_or_defer` — the monetary transaction log and the gacha
+history do. Sessions commit in the order they first deferred, which on every
+grant/cost path puts the inventory first: a crash in between can lose a log
+row but never leaves a recorded change without its item change.
+
+Batches never await, so the module-level state is only ever touched from the
+event-loop thread.
+"""
+
+from typing import Any
+from typing import Callable
+from typing import Iterator
+from contextlib import contextmanager
+
+_depth = 0
+_doomed = False
+_sessions: list[Any] = []
+_memo: dict[str, Any] = {}
+_on_rollback: list[Callable[[], None]] = []
+_on_commit: list[Callable[[], None]] = []
+
+
+def in_batch() -> bool:
+    return _depth > 0
+
+
+def commit_or_defer(session) -> None:
+    """Commit ``session`` now, or at the end of the open batch."""
+
+    if _depth == 0:
+        session.commit()
+        return
+    if not any(joined is session for joined in _sessions):
+        _sessions.append(session)
+    session.flush()
+
+
+def memoize(key: str, factory: Callable[[], Any]) -> Any:
+    """Compute ``factory()`` once per batch; outside a batch, every time."""
+
+    if _depth == 0:
+        return factory()
+    if key not in _memo:
+        _memo[key] = factory()
+    return _memo[key]
+
+
+def on_rollback(callback: Callable[[], None]) -> None:
+    """Run ``callback`` if the open batch rolls back; outside one, never."""
+
+    if _depth > 0:
+        _on_rollback.append(callback)
+
+
+def on_commit(callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the open batch commits; outside one, right away."""
+
+    if _depth == 0:
+        callback()
+        return
+    _on_commit.append(callback)
+
+
+def _finish(commit: bool) -> None:
+    global _doomed
+    sessions = list(_sessions)
+    callbacks = list(_on_commit if commit else _on_rollback)
+    _sessions.clear()
+    _memo.clear()
+    _on_rollback.clear()
+    _on_commit.clear()
+    _doomed = False
+    for joined in sessions:
+        if commit:
+            joined.commit()
+        else:
+            joined.rollback()
+    for callback in callbacks:
+        callback()
+
+
+@contextmanager
+def unit_of_work() -> Iterator[None]:
+    """Defer commits until the outermost ``unit_of_work`` exits cleanly.
+
+    Nested units flatten into the outer one. An exception escaping a nested
+    unit dooms the whole batch: its half-applied writes are already flushed
+    into the shared transaction, so the outer unit rolls back instead of
+    committing them even if the caller swallowed the error.
+    """
+
+    global _depth, _doomed
+    if _depth == 0:
+        _finish(commit=False)
+    _depth += 1
+    try:
+        yield
+    except BaseException:
+        _depth -= 1
+        _doomed = True
+        if _depth == 0:
+            _finish(commit=False)
+        raise
+    _depth -= 1
+    if _depth == 0:
+        if _doomed:
+            _finish(commit=False)
+            raise RuntimeError("inventory batch aborted by a nested failure")
+        _finish(commit=True)
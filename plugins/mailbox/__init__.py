@@ -46,6 +46,7 @@ from .render import claim_all_page  # noqa: E402
 from .service import MailService  # noqa: E402
 from .service import claim_all_mails  # noqa: E402
 from .database import init_database  # noqa: E402
+from .dispatcher import ScheduledMailDispatcher  # noqa: E402
 from ..inventory.models import ItemAmount  # noqa: E402
 from .scheduled_service import ScheduledMailService  # noqa: E402
 from ..inventory.service import grant_many  # noqa: E402
@@ -67,6 +68,7 @@ async def init():
 # 创建服务实例
 mail_service = MailService()
 scheduled_service = ScheduledMailService()
+scheduled_dispatcher = ScheduledMailDispatcher(scheduled_service)
 
 
 # 定时任务
@@ -83,17 +85,19 @@ async def cleanup_expired_mails():
 
 
 @get_driver().on_startup
-@scheduler.scheduled_job(id="process_scheduled_mails", trigger="interval", seconds=5)
-async def process_scheduled_mails():
-    """每5分钟检查并发送到期的定时邮件"""
+async def start_scheduled_mail_dispatcher():
+    """启动定时邮件调度器：先补发停机期间到期的邮件，再按预定时间精确唤醒"""
     try:
-        processed_count = scheduled_service.process_due_mails()
-        if processed_count > 0:
-            logger.info(f"已发送 {processed_count} 封定时邮件")
+        scheduled_dispatcher.start()
     except Exception as e:
         log_error(generate_error_code(), e, context="mailbox_scheduler")
 
 
+@get_driver().on_shutdown
+async def stop_scheduled_mail_dispatcher():
+    await scheduled_dispatcher.stop()
+
+
 # 邮箱命令
 mailbox_cmd = on_command("mail", aliases={"邮箱", "邮件"}, priority=10, block=True)
 
@@ -585,17 +589,16 @@ async def send_mail_now(
                     referrer=passive_generator.event.referrer,
                 )
 
-            for recipient_id in recipient_ids:
-                mail_id = mail_service.send_mail(
-                    recipient_id=recipient_id,
-                    title=title,
-                    content=content,
-                    star_kakeras=star_kakeras,
-                    star_stickers=star_stickers,
-                    attachments=attachments,
-                    expire_days=expire_days,
-                    sender_id=event.get_user_id(),
-                )
+            mail_id = mail_service.send_mails(
+                recipient_ids,
+                title=title,
+                content=content,
+                star_kakeras=star_kakeras,
+                star_stickers=star_stickers,
+                attachments=attachments,
+                expire_days=expire_days,
+                sender_id=event.get_user_id(),
+            )[-1]
             target_info = f"{len(recipient_ids)} 位用户"
 
         await schedule_mail_cmd.finish(
@@ -10,6 +10,8 @@ require("nonebot_plugin_localstore")
 
 import nonebot_plugin_localstore as store  # noqa: E402
 
+from utils.migrations import migrations  # noqa: E402
+
 from .models import Base  # noqa: E402
 
 # 数据库路径
@@ -26,9 +28,10 @@ def init_database():
     # 创建数据库引擎
     engine = create_engine(f"sqlite:///{database_path.resolve()}")
 
-    # 创建所有表
-    Base.metadata.create_all(engine)
-    migrate_mailbox_schema(engine)
+    # 创建所有表，补齐旧库的列和索引
+    with migrations(engine, "mailbox") as registry:
+        Base.metadata.create_all(engine)
+        registry.run("mailbox.schema", migrate_mailbox_schema, engine)
 
     # 创建会话
     session = sessionmaker(bind=engine)()
@@ -47,6 +50,10 @@ def migrate_mailbox_schema(engine) -> None:
     ``external_key`` is the exactly-once boundary used by cross-database
     outboxes such as season settlement rewards. SQLite permits multiple NULL
     values in a unique index, so ordinary mails remain unrestricted.
+
+    ``expires_at`` is backfilled from ``created_at + expire_days`` so the
+    expiry filters can use ``ix_mails_expires_at`` and
+    ``ix_mails_broadcast_expires``.
     """
 
     with engine.begin() as conn:
@@ -59,3 +66,34 @@ def migrate_mailbox_schema(engine) -> None:
             "CREATE UNIQUE INDEX IF NOT EXISTS uq_mails_external_key "
             "ON mails(external_key)"
         )
+        if "expires_at" not in columns:
+            conn.exec_driver_sql("ALTER TABLE mails ADD COLUMN expires_at INTEGER")
+        if {"created_at", "expire_days"} <= columns:
+            conn.exec_driver_sql(
+                "UPDATE mails SET expires_at = created_at + expire_days * 86400 "
+                "WHERE expires_at IS NULL"
+            )
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_mails_expires_at ON mails(expires_at)"
+        )
+        if "is_broadcast" in columns:
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_mails_broadcast_expires "
+                "ON mails(is_broadcast, expires_at)"
+            )
+        tables = {
+            row[0]
+            for row in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+        }
+        if "mail_recipients" in tables:
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_mail_recipients_user_mail "
+                "ON mail_recipients(user_id, mail_id)"
+            )
+        if "scheduled_mails" in tables:
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_scheduled_mails_pending "
+                "ON scheduled_mails(is_sent, scheduled_time)"
+            )
@@ -0,0 +1,137 @@
+"""
+定时邮件调度器 - 按最近的预定时间精确唤醒，而不是固定间隔轮询
+
+内存里维护一个以预定时间为键的最小堆，启动时从数据库重建，
+创建/修改/删除定时邮件时由 ``ScheduledMailService`` 通知更新。
+调度任务睡到堆顶的预定时间，只在真正有邮件到期时才查库发送。
+
+堆条目采用惰性删除：``_due`` 记录每封邮件当前有效的预定时间，
+与之不一致的堆条目（已改期或已删除）在弹出时直接丢弃。
+"""
+
+import time
+import heapq
+import asyncio
+from typing import Optional
+
+from nonebot.log import logger
+
+from utils.error_handler import log_error
+from utils.error_handler import generate_error_code
+
+from .scheduled_service import ScheduledMailService
+
+#: 单次睡眠上限。墙上时钟可能被校时调整，睡眠按事件循环的单调时钟计，
+#: 定期醒来重新计算可以把两者的偏差限制在这个范围内；醒来本身不查库。
+MAX_SLEEP_SECONDS = 300
+#: 发送失败的邮件在这么久之后重试
+RETRY_SECONDS = 60
+
+
+class ScheduledMailDispatcher:
+    """定时邮件调度器"""
+
+    def __init__(self, service: ScheduledMailService):
+        self.service = service
+        self._heap: list[tuple[int, int]] = []
+        self._due: dict[int, int] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def rebuild(self) -> None:
+        """从数据库重建待发送堆"""
+        self._due = dict(self.service.get_pending_schedule())
+        self._heap = [(due, mail_id) for mail_id, due in self._due.items()]
+        heapq.heapify(self._heap)
+        self._wake.set()
+
+    def schedule(self, mail_id: int, scheduled_time: int) -> None:
+        """登记（或改期）一封定时邮件"""
+        self._due[mail_id] = scheduled_time
+        heapq.heappush(self._heap, (scheduled_time, mail_id))
+        self._wake.set()
+
+    def cancel(self, mail_id: int) -> None:
+        """取消一封定时邮件"""
+        if self._due.pop(mail_id, None) is not None:
+            self._wake.set()
+
+    def next_due(self) -> Optional[int]:
+        """最近一封待发送邮件的预定时间，没有则为 None"""
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def dispatch_due(self, now: Optional[int] = None) -> int:
+        """发送所有已到期的邮件
+
+        Returns:
+            int: 发送成功的邮件数量
+        """
+        now = int(time.time()) if now is None else now
+        mail_ids = []
+        while (due := self.next_due()) is not None and due <= now:
+            _, mail_id = heapq.heappop(self._heap)
+            del self._due[mail_id]
+            mail_ids.append(mail_id)
+        if not mail_ids:
+            return 0
+
+        try:
+            processed = self.service.process_due_mails(mail_ids=mail_ids, now=now)
+        except Exception as e:
+            log_error(generate_error_code(), e, context="mailbox_scheduler")
+            processed = 0
+
+        # 发送失败的仍是未发送状态，稍后重试
+        for mail_id, scheduled_time in self.service.get_pending_schedule(mail_ids):
+            if mail_id not in self._due:
+                self.schedule(mail_id, max(scheduled_time, now + RETRY_SECONDS))
+        return processed
+
+    def start(self) -> None:
+        """重建堆并启动调度任务"""
+        self.service.dispatcher = self
+        self.rebuild()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止调度任务"""
+        if self.service.dispatcher is self:
+            self.service.dispatcher = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            due = self.next_due()
+            delay = MAX_SLEEP_SECONDS if due is None else due - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(
+                        self._wake.wait(), timeout=min(delay, MAX_SLEEP_SECONDS)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                processed = self.dispatch_due()
+            except Exception as e:
+                # 数据库暂时不可用：稍后从数据库重建，弹出的邮件不会丢
+                log_error(generate_error_code(), e, context="mailbox_scheduler")
+                await asyncio.sleep(RETRY_SECONDS)
+                try:
+                    self.rebuild()
+                except Exception as e:
+                    log_error(generate_error_code(), e, context="mailbox_scheduler")
+                continue
+            if processed > 0:
+                logger.info(f"已发送 {processed} 封定时邮件")
@@ -10,19 +10,24 @@ from dataclasses import dataclass
 from pydantic import Field
 from pydantic import BaseModel
 from sqlalchemy import Text
+from sqlalchemy import Index
 from sqlalchemy import String
 from sqlalchemy import Boolean
 from sqlalchemy import Integer
 from sqlalchemy import ForeignKey
+from sqlalchemy import event
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.ext.declarative import declarative_base
 
+from ..inventory.models import ItemAmount
 from ..inventory.models import GrantResult
 
 Base = declarative_base()
 
+SECONDS_PER_DAY = 24 * 60 * 60
+
 
 class Mail(Base):
     __tablename__ = "mails"
@@ -36,6 +41,9 @@ class Mail(Base):
     created_at: Mapped[int] = mapped_column(
         nullable=False, default=lambda: int(time.time())
     )
+    # Derived from created_at + expire_days (see _stamp_expiry) so the expiry
+    # filters are plain indexed range scans.
+    expires_at: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     sender_id: Mapped[str] = mapped_column(String, nullable=False)
     is_broadcast: Mapped[bool] = mapped_column(default=False)
     external_key: Mapped[Optional[str]] = mapped_column(
@@ -49,6 +57,20 @@ class Mail(Base):
         back_populates="mail", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_mails_expires_at", "expires_at"),
+        Index("ix_mails_broadcast_expires", "is_broadcast", "expires_at"),
+    )
+
+
+@event.listens_for(Mail, "before_insert")
+@event.listens_for(Mail, "before_update")
+def _stamp_expiry(mapper, connection, mail: Mail) -> None:
+    if mail.created_at is None:
+        mail.created_at = int(time.time())
+    expire_days = 7 if mail.expire_days is None else mail.expire_days
+    mail.expires_at = mail.created_at + expire_days * SECONDS_PER_DAY
+
 
 class MailAttachment(Base):
     __tablename__ = "mail_attachments"
@@ -78,6 +100,25 @@ class MailRecipient(Base):
 
     mail: Mapped["Mail"] = relationship(back_populates="recipients")
 
+    __table_args__ = (
+        Index("ix_mail_recipients_user_mail", "user_id", "mail_id"),
+    )
+
+
+class BroadcastWatermark(Base):
+    """Per-user broadcast watermark
+
+    Every live broadcast with ``id <= last_mail_id`` already has a
+    ``MailRecipient`` row for this user, so unread broadcasts only need the
+    ``id > last_mail_id`` range. Broadcast recipient rows are materialized on
+    read/claim, never on inbox open.
+    """
+
+    __tablename__ = "broadcast_watermarks"
+
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    last_mail_id: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
 
 class ScheduledMail(Base):
     """定时邮件表模型"""
@@ -110,6 +151,10 @@ class ScheduledMail(Base):
         back_populates="scheduled_mail", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_scheduled_mails_pending", "is_sent", "scheduled_time"),
+    )
+
     def __repr__(self):
         return f"<ScheduledMail(id={self.id}, name={self.name}, scheduled_time={self.scheduled_time})>"
 
@@ -153,6 +198,25 @@ class ServiceMail(BaseModel):
     read_at: Optional[datetime.datetime]
 
 
+@dataclass(frozen=True)
+class OutgoingMail:
+    """``MailService.send_personal_mails`` 中的一封个人邮件
+
+    参数与 ``MailService.send_mail`` 一一对应，区别只是可以和其他内容不同的
+    邮件一起提交。
+    """
+
+    recipient_id: str
+    title: str
+    content: str
+    attachments: tuple[ItemAmount, ...] = ()
+    star_kakeras: int = 0
+    star_stickers: int = 0
+    expire_days: int = 7
+    sender_id: str = "system"
+    external_key: str | None = None
+
+
 @dataclass(frozen=True)
 class ClaimedMail:
     """一封在批量领取中被领取的邮件及其发放结果
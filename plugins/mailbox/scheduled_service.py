@@ -24,6 +24,8 @@ class ScheduledMailService:
 
     def __init__(self):
         self.mail_service = MailService()
+        # ScheduledMailDispatcher 启动后挂在这里，增删改定时邮件时通知它
+        self.dispatcher = None
 
     def create_scheduled_mail(
         self,
@@ -108,6 +110,7 @@ class ScheduledMailService:
         logger.info(
             f"已创建定时邮件: {name} (预定时间: {format_ts(scheduled_time, '%Y-%m-%d %H:%M:%S')})"
         )
+        self._notify(scheduled_mail.id, scheduled_time)
         return scheduled_mail.id
 
     def get_scheduled_mails(self, include_sent: bool = False) -> List[ScheduledMail]:
@@ -204,6 +207,7 @@ class ScheduledMailService:
 
         session.commit()
         logger.info(f"已更新定时邮件: {name}")
+        self._notify(scheduled_mail.id, scheduled_mail.scheduled_time)
         return True
 
     def delete_scheduled_mail(self, name: str) -> bool:
@@ -227,9 +231,11 @@ class ScheduledMailService:
         if scheduled_mail.is_sent:
             logger.warning(f"定时邮件 '{name}' 已发送，但仍可删除记录")
 
+        mail_id = scheduled_mail.id
         session.delete(scheduled_mail)
         session.commit()
         logger.info(f"已删除定时邮件: {name}")
+        self._notify(mail_id, None)
         return True
 
     def add_attachment(self, name: str, attachment: ItemAmount) -> bool:
@@ -252,27 +258,32 @@ class ScheduledMailService:
         session.commit()
         return True
 
-    def process_due_mails(self) -> int:
+    def process_due_mails(
+        self, mail_ids: Optional[list[int]] = None, now: Optional[int] = None
+    ) -> int:
         """
         处理到期的定时邮件
 
+        Args:
+            mail_ids: 只处理这些定时邮件（调度器传入），为空时处理全部到期邮件
+            now: 当前时间戳，默认取系统时间
+
         Returns:
             int: 处理的邮件数量
         """
         session = get_session()
-        current_time = int(time.time())
+        current_time = int(time.time()) if now is None else now
 
-        # 查找到期且未发送的邮件
-        due_mails = (
-            session.query(ScheduledMail)
-            .filter(
-                and_(
-                    ScheduledMail.scheduled_time <= current_time,
-                    ScheduledMail.is_sent == False,  # noqa: E712
-                )
+        # 查找到期且未发送的邮件（走 (is_sent, scheduled_time) 索引）
+        query = session.query(ScheduledMail).filter(
+            and_(
+                ScheduledMail.is_sent == False,  # noqa: E712
+                ScheduledMail.scheduled_time <= current_time,
             )
-            .all()
         )
+        if mail_ids is not None:
+            query = query.filter(ScheduledMail.id.in_(mail_ids))
+        due_mails = query.order_by(ScheduledMail.scheduled_time.asc()).all()
 
         # 发送前先把所有字段快照成普通值：send_mail/send_broadcast_mail
         # 会 commit 并 close 同一个共享 session，这些 ORM 实例随之过期又
@@ -321,21 +332,19 @@ class ScheduledMailService:
                         external_key=f"scheduled:{mail_id}:broadcast",
                     )
                 else:
-                    # 发送给指定用户
-                    recipient_ids = [uid.strip() for uid in recipients.split(",")]
-                    for recipient_id in recipient_ids:
-                        if recipient_id:  # 确保不是空字符串
-                            self.mail_service.send_mail(
-                                recipient_id=recipient_id,
-                                title=title,
-                                content=content,
-                                attachments=attachments,
-                                expire_days=expire_days,
-                                sender_id=sender_id,
-                                external_key=(
-                                    f"scheduled:{mail_id}:recipient:{recipient_id}"
-                                ),
-                            )
+                    # 发送给指定用户：一次提交，幂等键与逐封发送时相同
+                    recipient_ids = [
+                        uid.strip() for uid in recipients.split(",") if uid.strip()
+                    ]
+                    self.mail_service.send_mails(
+                        recipient_ids,
+                        title=title,
+                        content=content,
+                        attachments=attachments,
+                        expire_days=expire_days,
+                        sender_id=sender_id,
+                        external_key_prefix=f"scheduled:{mail_id}:recipient:",
+                    )
 
                 # 标记为已发送。按主键重新取行，而不是 merge 快照前的
                 # 实例：发送关闭过 session，旧实例已脱管；若邮件在发送
@@ -359,6 +368,39 @@ class ScheduledMailService:
 
         return processed_count
 
+    def get_pending_schedule(
+        self, mail_ids: Optional[list[int]] = None
+    ) -> list[tuple[int, int]]:
+        """
+        获取未发送定时邮件的 (ID, 预定时间)，供调度器建堆
+
+        Args:
+            mail_ids: 只查这些定时邮件，为空时查全部
+
+        Returns:
+            list[tuple[int, int]]: 按预定时间升序排列
+        """
+        session = get_session()
+        query = session.query(ScheduledMail.id, ScheduledMail.scheduled_time).filter(
+            ScheduledMail.is_sent == False  # noqa: E712
+        )
+        if mail_ids is not None:
+            query = query.filter(ScheduledMail.id.in_(mail_ids))
+        return [
+            (mail_id, scheduled_time)
+            for mail_id, scheduled_time in query.order_by(
+                ScheduledMail.scheduled_time.asc()
+            ).all()
+        ]
+
+    def _notify(self, mail_id: int, scheduled_time: Optional[int]) -> None:
+        if self.dispatcher is None:
+            return
+        if scheduled_time is None:
+            self.dispatcher.cancel(mail_id)
+        else:
+            self.dispatcher.schedule(mail_id, scheduled_time)
+
     def get_pending_count(self) -> int:
         """
         获取待发送定时邮件数量
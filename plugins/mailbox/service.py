@@ -9,6 +9,7 @@ from typing import List
 from typing import Optional
 
 from sqlalchemy import and_
+from sqlalchemy import func
 from nonebot.log import logger
 from sqlalchemy.exc import IntegrityError
 
@@ -19,11 +20,14 @@ from .models import ClaimTotal
 from .models import ClaimedMail
 from .models import ServiceMail
 from .models import ClaimOutcome
+from .models import OutgoingMail
 from .models import MailRecipient
 from .models import MailAttachment
+from .models import BroadcastWatermark
 from .models import ServiceMailAttachment
 from .database import get_session
 from ..inventory.models import ItemAmount
+from ..inventory.service import batch
 from ..inventory.service import grant_many
 
 
@@ -114,6 +118,160 @@ class MailService:
         finally:
             session.close()
 
+    def send_mails(
+        self,
+        recipient_ids: list[str],
+        title: str,
+        content: str,
+        star_kakeras: int = 0,
+        star_stickers: int = 0,
+        attachments: Optional[list[ItemAmount]] = None,
+        expire_days: int = 7,
+        sender_id: str = "system",
+        external_key_prefix: str | None = None,
+    ) -> list[int]:
+        """
+        把同一封邮件分别发送给多个用户，一次提交
+
+        每位接收者仍然得到独立的邮件（与逐个调用 ``send_mail`` 相同），
+        但已存在性检查合并为一次查询，写入合并为一次提交。
+
+        Args:
+            recipient_ids: 接收者用户ID列表，重复的只发一次
+            title: 邮件标题
+            content: 邮件内容
+            star_kakeras: Pt奖励
+            star_stickers: 星星贴纸奖励
+            expire_days: 过期天数
+            sender_id: 发送者用户ID
+            external_key_prefix: 幂等键前缀，每位接收者的键为前缀加用户ID
+
+        Returns:
+            list[int]: 与去重后的接收者一一对应的邮件ID
+        """
+        recipient_ids = list(dict.fromkeys(recipient_ids))
+        return self.send_personal_mails(
+            [
+                OutgoingMail(
+                    recipient_id=recipient_id,
+                    title=title,
+                    content=content,
+                    attachments=tuple(attachments or ()),
+                    star_kakeras=star_kakeras,
+                    star_stickers=star_stickers,
+                    expire_days=expire_days,
+                    sender_id=sender_id,
+                    external_key=(
+                        f"{external_key_prefix}{recipient_id}"
+                        if external_key_prefix
+                        else None
+                    ),
+                )
+                for recipient_id in recipient_ids
+            ]
+        )
+
+    def send_personal_mails(self, mails: list[OutgoingMail]) -> list[int]:
+        """
+        一次提交发送多封内容各不相同的个人邮件
+
+        逐封的结果与分别调用 ``send_mail`` 相同：带 ``external_key`` 且已经
+        发过的邮件直接返回原邮件ID。已存在性检查合并为一次查询，写入合并为
+        一次提交；并发写入撞上唯一键时整批回滚，再逐封走 ``send_mail``。
+
+        Args:
+            mails: 要发送的邮件
+
+        Returns:
+            list[int]: 与 ``mails`` 一一对应的邮件ID
+        """
+        if not mails:
+            return []
+        session = get_session()
+
+        try:
+            keys = [mail.external_key for mail in mails if mail.external_key]
+            existing = {}
+            if keys:
+                existing = dict(
+                    session.query(Mail.external_key, Mail.id)
+                    .filter(Mail.external_key.in_(keys))
+                    .all()
+                )
+
+            created = {}
+            first_index = {}
+            for index, outgoing in enumerate(mails):
+                key = outgoing.external_key
+                if key in existing or key in first_index:
+                    continue
+                normalized = _normalize_attachments(
+                    outgoing.star_kakeras,
+                    outgoing.star_stickers,
+                    list(outgoing.attachments),
+                )
+                mail = Mail(
+                    title=outgoing.title,
+                    content=outgoing.content,
+                    star_kakeras=outgoing.star_kakeras,
+                    star_stickers=outgoing.star_stickers,
+                    expire_days=outgoing.expire_days,
+                    sender_id=outgoing.sender_id,
+                    is_broadcast=False,
+                    external_key=outgoing.external_key or None,
+                    attachments=[
+                        MailAttachment(
+                            item_id=attachment.item_id,
+                            quantity=attachment.quantity,
+                            scope_type=attachment.scope_type or "",
+                            scope_id=attachment.scope_id or "",
+                        )
+                        for attachment in normalized
+                    ],
+                    recipients=[MailRecipient(user_id=outgoing.recipient_id)],
+                )
+                session.add(mail)
+                created[index] = mail
+                if key:
+                    # 同一批里重复的幂等键只发一次
+                    first_index[key] = index
+            session.commit()
+
+            mail_ids = []
+            for index, outgoing in enumerate(mails):
+                key = outgoing.external_key
+                if index in created:
+                    mail_ids.append(created[index].id)
+                elif key in existing:
+                    mail_ids.append(existing[key])
+                else:
+                    mail_ids.append(created[first_index[key]].id)
+            logger.info(f"邮件已批量发送给 {len(created)} 位用户")
+            return mail_ids
+
+        except IntegrityError:
+            session.rollback()
+            return [
+                self.send_mail(
+                    recipient_id=outgoing.recipient_id,
+                    title=outgoing.title,
+                    content=outgoing.content,
+                    star_kakeras=outgoing.star_kakeras,
+                    star_stickers=outgoing.star_stickers,
+                    attachments=list(outgoing.attachments),
+                    expire_days=outgoing.expire_days,
+                    sender_id=outgoing.sender_id,
+                    external_key=outgoing.external_key,
+                )
+                for outgoing in mails
+            ]
+        except Exception as e:
+            session.rollback()
+            logger.error("批量发送邮件时发生错误: {}", e)
+            raise
+        finally:
+            session.close()
+
     def send_broadcast_mail(
         self,
         title: str,
@@ -127,7 +285,7 @@ class MailService:
     ) -> int:
         """
         发送广播邮件给所有用户
-        注意: 这里不预先创建所有用户的记录，而是在用户查看邮箱时动态创建
+        注意: 这里不预先创建所有用户的记录，而是在用户读取/领取时才创建
 
         Args:
             title: 邮件标题
@@ -195,6 +353,9 @@ class MailService:
         """
         获取用户的所有邮件（包括广播邮件）
 
+        只读：未读的广播邮件由一次按 ``expires_at`` 的索引范围查询算出，
+        不会为每个打开邮箱的用户写入接收记录。
+
         Args:
             user_id: 用户ID
 
@@ -206,63 +367,29 @@ class MailService:
         try:
             current_time = int(time.time())
 
-            # 获取广播邮件（用户可能还没有接收记录）
-            broadcast_mails = (
-                session.query(Mail)
-                .filter(
-                    and_(
-                        Mail.is_broadcast,
-                        Mail.created_at + (Mail.expire_days * 24 * 60 * 60)
-                        > current_time,  # 未过期
-                    )
-                )
-                .all()
-            )
-
-            # 为广播邮件创建用户记录（如果不存在）
-            for broadcast_mail in broadcast_mails:
-                existing = (
-                    session.query(MailRecipient)
-                    .filter(
-                        and_(
-                            MailRecipient.mail_id == broadcast_mail.id,
-                            MailRecipient.user_id == user_id,
-                        )
-                    )
-                    .first()
-                )
-
-                if not existing:
-                    # 为用户创建广播邮件接收记录
-                    recipient = MailRecipient(
-                        mail_id=broadcast_mail.id,
-                        user_id=user_id,
-                    )
-                    session.add(recipient)
-
-            session.commit()
-
-            # 查询用户的所有邮件接收记录
+            # 用户已有接收记录的邮件（私信，以及已读的广播）
             recipients = (
                 session.query(MailRecipient)
                 .join(Mail, MailRecipient.mail_id == Mail.id)
                 .filter(
                     and_(
                         MailRecipient.user_id == user_id,
-                        Mail.created_at + (Mail.expire_days * 24 * 60 * 60)
-                        > current_time,  # 未过期
+                        Mail.expires_at > current_time,  # 未过期
                     )
                 )
                 .order_by(Mail.created_at.desc())
                 .all()
             )
-
-            # 转换为字典格式 - 使用关系访问邮件内容
-            mail_list = []
-            for recipient in recipients:
-                mail = recipient.mail  # 使用关系访问邮件内容
-                expire_time = mail.created_at + (mail.expire_days * 24 * 60 * 60)
-                mail_list.append(_to_service_mail(mail, recipient, expire_time))
+            mail_list = [
+                _to_service_mail(recipient.mail, recipient)
+                for recipient in recipients
+            ]
+
+            # 水位线之后、尚无接收记录的广播即为未读广播
+            mail_list.extend(
+                _to_service_mail(mail, None)
+                for mail in _unread_broadcasts(session, user_id, current_time)
+            )
 
             mail_list.sort(key=lambda x: x.created_at, reverse=True)
 
@@ -299,27 +426,46 @@ class MailService:
                     and_(
                         Mail.id == mail_id,
                         MailRecipient.user_id == user_id,
-                        Mail.created_at + (Mail.expire_days * 24 * 60 * 60)
-                        > current_time,  # 未过期
+                        Mail.expires_at > current_time,  # 未过期
                     )
                 )
                 .first()
             )
 
-            if not recipient:
-                return None
-
-            mail = recipient.mail  # 使用关系访问邮件内容
+            if recipient is None:
+                # 未读广播在读取（即领取）时才落地接收记录
+                mail = (
+                    session.query(Mail)
+                    .filter(
+                        and_(
+                            Mail.id == mail_id,
+                            Mail.is_broadcast,
+                            Mail.expires_at > current_time,
+                        )
+                    )
+                    .first()
+                )
+                if mail is None:
+                    return None
+                recipient = MailRecipient(
+                    mail_id=mail.id,
+                    user_id=user_id,
+                    is_read=True,
+                    read_at=current_time,
+                )
+                session.add(recipient)
+                session.flush()
+                _advance_watermark(session, user_id, current_time)
+                session.commit()
 
             # 标记为已读
-            if not recipient.is_read:
+            elif not recipient.is_read:
                 recipient.is_read = True
                 recipient.read_at = current_time
                 session.commit()
 
             # 返回邮件详情
-            expire_time = mail.created_at + (mail.expire_days * 24 * 60 * 60)
-            return _to_service_mail(mail, recipient, expire_time)
+            return _to_service_mail(recipient.mail, recipient)
 
         except Exception as e:
             session.rollback()
@@ -342,11 +488,7 @@ class MailService:
 
             # 查找过期的邮件
             expired_mails = (
-                session.query(Mail)
-                .filter(
-                    Mail.created_at + (Mail.expire_days * 24 * 60 * 60) <= current_time
-                )
-                .all()
+                session.query(Mail).filter(Mail.expires_at <= current_time).all()
             )
 
             expired_count = len(expired_mails)
@@ -355,6 +497,17 @@ class MailService:
                 # 删除过期邮件（级联删除接收记录）
                 for mail in expired_mails:
                     session.delete(mail)
+                session.flush()
+
+                # SQLite 会复用被删除的最大 ID；水位线不能越过现存最大 ID，
+                # 否则新广播会落在水位线之下而被漏掉
+                max_mail_id = session.query(func.max(Mail.id)).scalar() or 0
+                session.query(BroadcastWatermark).filter(
+                    BroadcastWatermark.last_mail_id > max_mail_id
+                ).update(
+                    {BroadcastWatermark.last_mail_id: max_mail_id},
+                    synchronize_session=False,
+                )
 
                 session.commit()
                 logger.info(f"已清理 {expired_count} 封过期邮件")
@@ -392,35 +545,40 @@ def claim_all_mails(mail_service: "MailService", user_id: str) -> ClaimOutcome:
     owned_totals: dict[str, int] = {}
     remaining_notices = 0
 
-    for position, mail in enumerate(mails, 1):
-        if mail.is_read:
-            continue
-        if not mail.attachments:
-            remaining_notices += 1
-            continue
-
-        results = grant_many(
-            user_id,
-            [
-                ItemAmount(
-                    attachment.item_id,
-                    attachment.quantity,
-                    attachment.scope_type or None,
-                    attachment.scope_id or None,
-                )
-                for attachment in mail.attachments
-            ],
-            reason=f"mail_reward_{mail.id}",
-            source_type="mail",
-            source_id=str(mail.id),
-            idempotency_key=f"mail:{mail.id}",
-        )
-        mail_service.read_mail(user_id, mail.id)
-        claimed.append(
-            ClaimedMail(mail=mail, results=tuple(results), ordinal=position)
-        )
+    # Every attachment of every mail is granted in one inventory commit; the
+    # mails are only marked read after it lands. A crash in between leaves
+    # them unread, and re-claiming is a no-op thanks to the ``mail:<id>`` keys.
+    with batch(user_id):
+        for position, mail in enumerate(mails, 1):
+            if mail.is_read:
+                continue
+            if not mail.attachments:
+                remaining_notices += 1
+                continue
+
+            results = grant_many(
+                user_id,
+                [
+                    ItemAmount(
+                        attachment.item_id,
+                        attachment.quantity,
+                        attachment.scope_type or None,
+                        attachment.scope_id or None,
+                    )
+                    for attachment in mail.attachments
+                ],
+                reason=f"mail_reward_{mail.id}",
+                source_type="mail",
+                source_id=str(mail.id),
+                idempotency_key=f"mail:{mail.id}",
+            )
+            claimed.append(
+                ClaimedMail(mail=mail, results=tuple(results), ordinal=position)
+            )
 
-        for result in results:
+    for claimed_mail in claimed:
+        mail_service.read_mail(user_id, claimed_mail.mail.id)
+        for result in claimed_mail.results:
             if result.granted > 0:
                 granted_totals[result.item_id] = (
                     granted_totals.get(result.item_id, 0) + result.granted
@@ -506,9 +664,61 @@ def _normalize_attachments(
     return list(merged.values())
 
 
-def _to_service_mail(
-    mail: Mail, recipient: MailRecipient, expire_time: int
-) -> ServiceMail:
+def _broadcast_watermark(session, user_id: str) -> int:
+    row = session.get(BroadcastWatermark, user_id)
+    return row.last_mail_id if row is not None else 0
+
+
+def _unread_broadcasts_query(session, user_id: str, current_time: int):
+    return (
+        session.query(Mail)
+        .outerjoin(
+            MailRecipient,
+            and_(MailRecipient.mail_id == Mail.id, MailRecipient.user_id == user_id),
+        )
+        .filter(
+            and_(
+                Mail.is_broadcast,
+                Mail.expires_at > current_time,
+                Mail.id > _broadcast_watermark(session, user_id),
+                MailRecipient.id.is_(None),
+            )
+        )
+    )
+
+
+def _unread_broadcasts(session, user_id: str, current_time: int) -> list[Mail]:
+    return (
+        _unread_broadcasts_query(session, user_id, current_time)
+        .order_by(Mail.created_at.desc())
+        .all()
+    )
+
+
+def _advance_watermark(session, user_id: str, current_time: int) -> None:
+    """Move the user's watermark up to just below their oldest unread broadcast."""
+
+    row = session.get(BroadcastWatermark, user_id)
+    if row is None:
+        row = BroadcastWatermark(user_id=user_id, last_mail_id=0)
+        session.add(row)
+    first_unread = (
+        _unread_broadcasts_query(session, user_id, current_time)
+        .with_entities(func.min(Mail.id))
+        .scalar()
+    )
+    if first_unread is not None:
+        row.last_mail_id = max(row.last_mail_id, first_unread - 1)
+        return
+    newest = (
+        session.query(func.max(Mail.id))
+        .filter(and_(Mail.is_broadcast, Mail.expires_at > current_time))
+        .scalar()
+    )
+    row.last_mail_id = max(row.last_mail_id, newest or 0)
+
+
+def _to_service_mail(mail: Mail, recipient: MailRecipient | None) -> ServiceMail:
     # Collapse duplicate rows per (item, scope), keeping the FIRST row. Mails
     # created before _normalize_attachments merged duplicates carry two
     # identical rows, and the grant idempotency key (per item + scope) means
@@ -552,10 +762,10 @@ def _to_service_mail(
         attachments=attachments,
         sender_id=mail.sender_id,
         created_at=to_bot_time(mail.created_at),
-        expire_time=to_bot_time(expire_time),
+        expire_time=to_bot_time(mail.expires_at),
         is_broadcast=mail.is_broadcast,
-        is_read=recipient.is_read,
+        is_read=recipient.is_read if recipient is not None else False,
         read_at=to_bot_time(recipient.read_at)
-        if recipient.read_at
+        if recipient is not None and recipient.read_at
         else None,
     )
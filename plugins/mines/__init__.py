@@ -7,6 +7,7 @@ from nonebot import on_command
 from nonebot.log import logger
 from nonebot.params import CommandArg
 from nonebot.exception import MatcherException
+from nonebot.permission import SUPERUSER
 from nonebot.adapters.satori import Message
 from nonebot.adapters.satori import MessageEvent
 from nonebot.adapters.satori import MessageSegment
@@ -43,6 +44,7 @@ from .messages import Messages  # noqa: E402
 from ..daily_task import check_progress  # noqa: E402
 from ..daily_task import get_today_task  # noqa: E402
 from .stats_service import get_mines_stats  # noqa: E402
+from .stats_service import backfill_all_rollups  # noqa: E402
 from ..monetary.level_service import LEVEL_UP_STICKERS  # noqa: E402
 
 game_manager = GameManager()
@@ -151,6 +153,12 @@ game_stats = on_command(
     priority=10,
     block=True,
 )
+stats_backfill = on_command(
+    "rebuild-minesstats",
+    priority=10,
+    block=True,
+    permission=SUPERUSER,
+)
 
 
 def _format_status(session) -> str:
@@ -512,3 +520,20 @@ async def handle_stats(event: MessageEvent):
             + gens[event.message.id].element,
             referrer=gens[event.message.id].event.referrer,
         )
+
+
+@stats_backfill.handle()
+async def handle_stats_backfill(event: MessageEvent):
+    """重建统计汇总表（当前赛季窗口 + 已有的全部窗口）"""
+    gens[event.message.id] = PG(event)
+    season_bounds = get_current_season_bounds()
+    if season_bounds is None:
+        count = backfill_all_rollups()
+    else:
+        count = backfill_all_rollups(
+            start_time=season_bounds[0], end_time=season_bounds[1]
+        )
+    await stats_backfill.finish(
+        f"已重建 {count} 条探险统计汇总。" + gens[event.message.id].element,
+        referrer=gens[event.message.id].event.referrer,
+    )
@@ -6,7 +6,11 @@ require("nonebot_plugin_localstore")
 
 import nonebot_plugin_localstore as store  # noqa: E402
 
+from utils.migrations import migrations  # noqa: E402
+from utils.migrations import index_signature  # noqa: E402
+
 from .models import Base  # noqa: E402
+from .models import MinesGame  # noqa: E402
 
 database_path = store.get_data_file("mines", "games.db")
 
@@ -17,10 +21,23 @@ def init_database():
     """初始化数据库连接并创建表"""
     global session
     engine = create_engine(f"sqlite:///{database_path.resolve()}")
-    Base.metadata.create_all(engine)
+    with migrations(engine, "mines") as registry:
+        Base.metadata.create_all(engine)
+        registry.run(
+            "mines.game_indexes",
+            migrate_game_indexes,
+            engine,
+            content=index_signature(MinesGame),
+        )
     session = sessionmaker(bind=engine)()
 
 
+def migrate_game_indexes(engine):
+    """为建表早于索引声明的旧库补建索引"""
+    for index in MinesGame.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+
 def get_session():
     """获取数据库会话"""
     global session
@@ -2,9 +2,11 @@ import random
 from enum import Enum
 from enum import StrEnum
 
+from sqlalchemy import Index
 from sqlalchemy import Column
 from sqlalchemy import String
 from sqlalchemy import Integer
+from sqlalchemy import UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 
 from .utils import get_random_arisa
@@ -104,3 +106,35 @@ class MinesGame(Base):
     result = Column(String, nullable=False)
     winnings = Column(Integer, nullable=False)
     timestamp = Column(Integer, nullable=False)
+
+    __table_args__ = (Index("ix_mines_games_user_time", "user_id", "timestamp"),)
+
+
+class MinesStatsRollup(Base):
+    """Running totals of one player's games inside ``[start_time, end_time)``.
+
+    A row is created the first time a window is queried (lifetime or one
+    season's bounds) and afterwards kept current by ``end_game``, so the stats
+    card reads a single row instead of every game the player ever finished.
+    """
+
+    __tablename__ = "mines_stats_rollups"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, nullable=False, index=True)
+    start_time = Column(Integer, nullable=False)
+    end_time = Column(Integer, nullable=False)
+    total_games = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    losses = Column(Integer, nullable=False, default=0)
+    total_wagered = Column(Integer, nullable=False, default=0)
+    total_won = Column(Integer, nullable=False, default=0)
+    total_lost = Column(Integer, nullable=False, default=0)
+    biggest_win = Column(Integer, nullable=False, default=0)
+    biggest_loss = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "start_time", "end_time", name="uq_mines_rollup_window"
+        ),
+    )
@@ -11,6 +11,7 @@ from .models import Field
 from .models import MinesGame
 from .models import GameResult
 from .database import get_session
+from .stats_service import apply_game_to_rollups
 
 
 @dataclass
@@ -97,17 +98,17 @@ class GameManager:
             winnings = -session.bet_amount
 
         db_session = get_session()
-        db_session.add(
-            MinesGame(
-                user_id=user_id,
-                bet_amount=session.bet_amount,
-                mines=session.mines,
-                revealed_count=session.revealed_count,
-                result=result.value,
-                winnings=winnings,
-                timestamp=int(time.time()),
-            )
+        game = MinesGame(
+            user_id=user_id,
+            bet_amount=session.bet_amount,
+            mines=session.mines,
+            revealed_count=session.revealed_count,
+            result=result.value,
+            winnings=winnings,
+            timestamp=int(time.time()),
         )
+        db_session.add(game)
+        apply_game_to_rollups(db_session, game)
         db_session.commit()
 
         self.remove_session(user_id)
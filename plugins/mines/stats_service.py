@@ -3,11 +3,19 @@ Mines game statistics service for analyzing player game data.
 """
 
 from typing import List
+from typing import Optional
 from dataclasses import dataclass
 
+from sqlalchemy import case
+from sqlalchemy import func
+
 from .models import MinesGame
+from .models import MinesStatsRollup
 from .database import get_session
 
+# 不限时间的统计窗口用 [0, LIFETIME_END) 表示，便于与赛季窗口共用一张汇总表
+LIFETIME_END = 2**62
+
 
 @dataclass
 class MinesGameRecord:
@@ -73,89 +81,223 @@ def _convert_db_games_to_records(
     return game_records
 
 
+def _window(start_time: int | None, end_time: int | None) -> tuple[int, int]:
+    return (
+        0 if start_time is None else start_time,
+        LIFETIME_END if end_time is None else end_time,
+    )
+
+
+def _aggregate_games(db_session, user_id: str, start: int, end: int) -> tuple:
+    """在数据库内一次性聚合窗口内的对局，只返回一行"""
+    won = case((MinesGame.winnings > 0, MinesGame.winnings), else_=0)
+    lost = case((MinesGame.winnings < 0, -MinesGame.winnings), else_=0)
+    return (
+        db_session.query(
+            func.count(MinesGame.id),
+            func.coalesce(func.sum(case((MinesGame.winnings > 0, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((MinesGame.winnings < 0, 1), else_=0)), 0),
+            func.coalesce(func.sum(MinesGame.bet_amount), 0),
+            func.coalesce(func.sum(won), 0),
+            func.coalesce(func.sum(lost), 0),
+            func.coalesce(func.max(won), 0),
+            func.coalesce(func.max(lost), 0),
+        )
+        .filter(
+            MinesGame.user_id == user_id,
+            MinesGame.timestamp >= start,
+            MinesGame.timestamp < end,
+        )
+        .one()
+    )
+
+
+def _fill_rollup(rollup: MinesStatsRollup, totals: tuple) -> None:
+    (
+        rollup.total_games,
+        rollup.wins,
+        rollup.losses,
+        rollup.total_wagered,
+        rollup.total_won,
+        rollup.total_lost,
+        rollup.biggest_win,
+        rollup.biggest_loss,
+    ) = (int(value) for value in totals)
+
+
+def backfill_rollup(
+    user_id: str, *, start_time: int | None = None, end_time: int | None = None
+) -> Optional[MinesStatsRollup]:
+    """
+    从对局记录重新计算并保存某个统计窗口的汇总行
+
+    Args:
+        user_id: 用户ID
+        start_time: 窗口起点（含），None 表示不限
+        end_time: 窗口终点（不含），None 表示不限
+
+    Returns:
+        汇总行；窗口内没有对局时不落库并返回 None
+    """
+    db_session = get_session()
+    start, end = _window(start_time, end_time)
+    totals = _aggregate_games(db_session, user_id, start, end)
+    rollup = (
+        db_session.query(MinesStatsRollup)
+        .filter(
+            MinesStatsRollup.user_id == user_id,
+            MinesStatsRollup.start_time == start,
+            MinesStatsRollup.end_time == end,
+        )
+        .first()
+    )
+    if not totals[0]:
+        if rollup is not None:
+            db_session.delete(rollup)
+            db_session.commit()
+        return None
+    if rollup is None:
+        rollup = MinesStatsRollup(user_id=user_id, start_time=start, end_time=end)
+        db_session.add(rollup)
+    _fill_rollup(rollup, totals)
+    db_session.commit()
+    return rollup
+
+
+def backfill_all_rollups(
+    *, start_time: int | None = None, end_time: int | None = None
+) -> int:
+    """
+    为所有玩过的用户重建指定窗口的汇总行，并重算已存在的其它窗口
+
+    Returns:
+        重建的汇总行数量
+    """
+    db_session = get_session()
+    windows = {
+        (row.user_id, row.start_time, row.end_time)
+        for row in db_session.query(MinesStatsRollup).all()
+    }
+    start, end = _window(start_time, end_time)
+    windows.update(
+        (user_id, start, end)
+        for (user_id,) in db_session.query(MinesGame.user_id).distinct()
+    )
+    for user_id, window_start, window_end in windows:
+        backfill_rollup(user_id, start_time=window_start, end_time=window_end)
+    return len(windows)
+
+
+def apply_game_to_rollups(db_session, game: MinesGame) -> None:
+    """
+    把一局新对局累加到该用户所有覆盖其时间戳的汇总行上
+
+    与对局记录在同一个事务里提交；尚未建立的窗口会在首次查询时回填。
+    """
+    rollups = (
+        db_session.query(MinesStatsRollup)
+        .filter(
+            MinesStatsRollup.user_id == game.user_id,
+            MinesStatsRollup.start_time <= game.timestamp,
+            MinesStatsRollup.end_time > game.timestamp,
+        )
+        .all()
+    )
+    for rollup in rollups:
+        rollup.total_games += 1
+        rollup.total_wagered += game.bet_amount
+        if game.winnings > 0:
+            rollup.wins += 1
+            rollup.total_won += game.winnings
+            rollup.biggest_win = max(rollup.biggest_win, game.winnings)
+        elif game.winnings < 0:
+            rollup.losses += 1
+            rollup.total_lost += -game.winnings
+            rollup.biggest_loss = max(rollup.biggest_loss, -game.winnings)
+
+
 def get_mines_stats(
     user_id: str, *, start_time: int | None = None, end_time: int | None = None
 ) -> MinesStats:
     """
     获取用户的mines游戏统计数据
 
+    汇总数字来自 ``MinesStatsRollup`` 的单行记录，首次查询某个窗口时回填。
+
     Args:
         user_id: 用户ID
+        start_time: 窗口起点（含）
+        end_time: 窗口终点（不含）
 
     Returns:
         完整的mines统计数据
     """
     db_session = get_session()
+    start, end = _window(start_time, end_time)
 
-    try:
-        games_query = db_session.query(MinesGame).filter(MinesGame.user_id == user_id)
-        if start_time is not None:
-            games_query = games_query.filter(MinesGame.timestamp >= start_time)
-        if end_time is not None:
-            games_query = games_query.filter(MinesGame.timestamp < end_time)
-        games = games_query.all()
-
-        if not games:
-            return MinesStats(
-                user_id=user_id,
-                total_games=0,
-                wins=0,
-                losses=0,
-                win_rate=0.0,
-                total_wagered=0,
-                total_won=0,
-                total_lost=0,
-                net_profit=0,
-                avg_bet=0.0,
-                avg_win=0.0,
-                avg_loss=0.0,
-                biggest_win=0,
-                biggest_loss=0,
-                recent_games=[],
-            )
-
-        total_games = len(games)
-        total_wagered = sum(game.bet_amount for game in games)
-        total_won = sum(game.winnings for game in games if game.winnings > 0)
-        total_lost = abs(sum(game.winnings for game in games if game.winnings < 0))
-        net_profit = total_won - total_lost
-        wins = len([g for g in games if g.winnings > 0])
-        losses = len([g for g in games if g.winnings < 0])
-        win_rate = wins / total_games if total_games > 0 else 0.0
-
-        avg_bet = total_wagered / total_games if total_games else 0.0
-        win_amounts = [g.winnings for g in games if g.winnings > 0]
-        loss_amounts = [abs(g.winnings) for g in games if g.winnings < 0]
-        biggest_win = max(win_amounts) if win_amounts else 0
-        biggest_loss = max(loss_amounts) if loss_amounts else 0
-        avg_win = sum(win_amounts) / len(win_amounts) if win_amounts else 0.0
-        avg_loss = sum(loss_amounts) / len(loss_amounts) if loss_amounts else 0.0
-
-        # 获取最近30次游戏记录（按时间倒序）
-        recent_query = db_session.query(MinesGame).filter(MinesGame.user_id == user_id)
-        if start_time is not None:
-            recent_query = recent_query.filter(MinesGame.timestamp >= start_time)
-        if end_time is not None:
-            recent_query = recent_query.filter(MinesGame.timestamp < end_time)
-        recent_db_games = recent_query.order_by(MinesGame.timestamp.desc()).limit(30).all()
-        recent_games = _convert_db_games_to_records(recent_db_games)
+    rollup = (
+        db_session.query(MinesStatsRollup)
+        .filter(
+            MinesStatsRollup.user_id == user_id,
+            MinesStatsRollup.start_time == start,
+            MinesStatsRollup.end_time == end,
+        )
+        .first()
+    )
+    if rollup is None:
+        rollup = backfill_rollup(user_id, start_time=start_time, end_time=end_time)
 
+    if rollup is None:
         return MinesStats(
             user_id=user_id,
-            total_games=total_games,
-            wins=wins,
-            losses=losses,
-            win_rate=win_rate,
-            total_wagered=total_wagered,
-            total_won=total_won,
-            total_lost=total_lost,
-            net_profit=net_profit,
-            avg_bet=avg_bet,
-            avg_win=avg_win,
-            avg_loss=avg_loss,
-            biggest_win=biggest_win,
-            biggest_loss=biggest_loss,
-            recent_games=recent_games,
+            total_games=0,
+            wins=0,
+            losses=0,
+            win_rate=0.0,
+            total_wagered=0,
+            total_won=0,
+            total_lost=0,
+            net_profit=0,
+            avg_bet=0.0,
+            avg_win=0.0,
+            avg_loss=0.0,
+            biggest_win=0,
+            biggest_loss=0,
+            recent_games=[],
         )
-    finally:
-        db_session.close()
+
+    total_games = rollup.total_games
+    wins = rollup.wins
+    losses = rollup.losses
+
+    # 获取最近30次游戏记录（按时间倒序，走 (user_id, timestamp) 索引）
+    recent_db_games = (
+        db_session.query(MinesGame)
+        .filter(
+            MinesGame.user_id == user_id,
+            MinesGame.timestamp >= start,
+            MinesGame.timestamp < end,
+        )
+        .order_by(MinesGame.timestamp.desc())
+        .limit(30)
+        .all()
+    )
+    recent_games = _convert_db_games_to_records(recent_db_games)
+
+    return MinesStats(
+        user_id=user_id,
+        total_games=total_games,
+        wins=wins,
+        losses=losses,
+        win_rate=wins / total_games if total_games > 0 else 0.0,
+        total_wagered=rollup.total_wagered,
+        total_won=rollup.total_won,
+        total_lost=rollup.total_lost,
+        net_profit=rollup.total_won - rollup.total_lost,
+        avg_bet=rollup.total_wagered / total_games if total_games else 0.0,
+        avg_win=rollup.total_won / wins if wins else 0.0,
+        avg_loss=rollup.total_lost / losses if losses else 0.0,
+        biggest_win=rollup.biggest_win,
+        biggest_loss=rollup.biggest_loss,
+        recent_games=recent_games,
+    )
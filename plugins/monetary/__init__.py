@@ -1,35 +1,54 @@
+import asyncio
+
+from nonebot import require
 from nonebot import get_driver
+from nonebot.log import logger
+
+from utils.error_handler import log_error
+from utils.error_handler import generate_error_code
+
+require("nonebot_plugin_apscheduler")
+
+from nonebot_plugin_apscheduler import scheduler  # noqa: E402
 
-from .models import UserRank
-from .models import UserStats
-from .database import init_database
-from .user_service import get_user
-from .user_service import get_level
-from .user_service import set_level
-from .user_service import add_balance as add
-from .user_service import get_balance as get
-from .user_service import set_balance as set
-from .user_service import cost_balance as cost
-from .user_service import daily_checkin as daily
-from .user_service import get_all_users
-from .user_service import decrease_level
-from .user_service import increase_level
-from .user_service import transfer_balance as transfer
-from .user_service import is_using_offseason_points
-from .level_service import add_xp
-from .level_service import admin_set_xp
-from .level_service import level_for_xp
-from .level_service import xp_per_level
-from .level_service import xp_to_next_level
-from .level_service import total_xp_for_level
-from .ranking_service import get_top_users
-from .ranking_service import get_user_rank
-from .ranking_service import get_user_stats
-from .transaction_service import get_user_transactions
-from .star_sticker_service import add_star_stickers
-from .star_sticker_service import get_star_stickers
-from .star_sticker_service import admin_add_stickers
-from .star_sticker_service import cost_star_stickers
+from .models import UserRank  # noqa: E402
+from .models import UserStats  # noqa: E402
+from .models import TransactionPage  # noqa: E402
+from .database import init_database  # noqa: E402
+from .user_service import get_user  # noqa: E402
+from .user_service import get_level  # noqa: E402
+from .user_service import set_level  # noqa: E402
+from .user_service import get_levels  # noqa: E402
+from .user_service import add_balance as add  # noqa: E402
+from .user_service import get_balance as get  # noqa: E402
+from .user_service import set_balance as set  # noqa: E402
+from .user_service import cost_balance as cost  # noqa: E402
+from .user_service import daily_checkin as daily  # noqa: E402
+from .user_service import get_all_users  # noqa: E402
+from .user_service import decrease_level  # noqa: E402
+from .user_service import increase_level  # noqa: E402
+from .user_service import transfer_balance as transfer  # noqa: E402
+from .user_service import is_using_offseason_points  # noqa: E402
+from .level_service import add_xp  # noqa: E402
+from .level_service import admin_set_xp  # noqa: E402
+from .level_service import level_for_xp  # noqa: E402
+from .level_service import xp_per_level  # noqa: E402
+from .level_service import xp_to_next_level  # noqa: E402
+from .level_service import total_xp_for_level  # noqa: E402
+from .archive_service import ARCHIVE_BATCH_SIZE  # noqa: E402
+from .archive_service import archive_transactions  # noqa: E402
+from .archive_service import iter_archived_transactions  # noqa: E402
+from .ranking_service import get_top_users  # noqa: E402
+from .ranking_service import get_user_rank  # noqa: E402
+from .ranking_service import get_user_stats  # noqa: E402
+from .transaction_service import get_user_transactions  # noqa: E402
+from .transaction_service import get_user_transactions_page  # noqa: E402
+from .star_sticker_service import add_star_stickers  # noqa: E402
+from .star_sticker_service import get_star_stickers  # noqa: E402
+from .star_sticker_service import admin_add_stickers  # noqa: E402
+from .star_sticker_service import cost_star_stickers  # noqa: E402
+
+ARCHIVE_BATCHES_PER_RUN = 200
 
 
 @get_driver().on_startup
@@ -37,6 +56,28 @@ async def init():
     init_database()
 
 
+@scheduler.scheduled_job(id="monetary_archive", trigger="cron", hour=4, minute=0)
+async def archive_old_transactions():
+    """Move transactions past the retention window into the monthly archives
+
+    One batch at a time, yielding to the event loop in between, and at most
+    ``ARCHIVE_BATCHES_PER_RUN`` batches a night; a large backlog finishes over
+    the following nights.
+    """
+    archived = 0
+    try:
+        for _ in range(ARCHIVE_BATCHES_PER_RUN):
+            moved = archive_transactions(max_batches=1)
+            archived += moved
+            if moved < ARCHIVE_BATCH_SIZE:
+                break
+            await asyncio.sleep(0)
+    except Exception as e:
+        log_error(generate_error_code(), e, context="monetary_archive")
+    if archived > 0:
+        logger.info(f"Archived {archived} monetary transactions")
+
+
 __all__ = [
     "get",
     "add",
@@ -51,6 +92,7 @@ __all__ = [
     "get_user_rank",
     "get_user_stats",
     "get_level",
+    "get_levels",
     "set_level",
     "increase_level",
     "decrease_level",
@@ -58,6 +100,10 @@ __all__ = [
     "UserRank",
     "UserStats",
     "get_user_transactions",
+    "get_user_transactions_page",
+    "TransactionPage",
+    "archive_transactions",
+    "iter_archived_transactions",
     "add_xp",
     "xp_per_level",
     "total_xp_for_level",
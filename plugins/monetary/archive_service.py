@@ -0,0 +1,196 @@
+"""Archival of the monetary transaction log.
+
+Every ``add``/``cost``/``set``/``transfer`` appends to ``transactions``, so the
+hot table only keeps the last ``TRANSACTION_RETENTION_DAYS`` days. Older rows
+move into gzip-compressed JSON-lines files partitioned by calendar month in the
+product timezone. Each archived batch writes one file per month it touches,
+``transactions-YYYY-MM.<first id>.jsonl.gz``, through a temporary file and
+``os.replace``, so a crash never leaves a half-written archive behind.
+
+Rows are archived before they are deleted from the database, so a crash
+between the two steps can only leave duplicates in the archive;
+:func:`iter_archived_transactions` skips repeated ids, and skips the truncated
+tail of a file written by an interrupted append. The files are plain gzip JSON
+lines and ``scripts/query_transaction_archive.py`` reads them without starting
+the bot.
+"""
+
+import os
+import gzip
+import json
+import time
+import zlib
+from typing import Iterator
+from typing import Optional
+from pathlib import Path
+from collections import defaultdict
+
+from nonebot import require
+from nonebot.log import logger
+
+from utils.clock import format_ts
+
+require("nonebot_plugin_localstore")
+
+import nonebot_plugin_localstore as store  # noqa: E402
+
+from .models import Transaction  # noqa: E402
+from .database import get_transaction_session  # noqa: E402
+
+TRANSACTION_RETENTION_DAYS = 180
+ARCHIVE_BATCH_SIZE = 5000
+ARCHIVE_FILE_PATTERN = "transactions-*.jsonl.gz"
+ARCHIVE_FIELDS = ("id", "user_id", "category", "amount", "time", "description")
+
+
+def default_archive_dir() -> Path:
+    return store.get_data_dir("monetary") / "transaction_archive"
+
+
+def archive_partition(timestamp: int) -> str:
+    """Partition key (``YYYY-MM`` in the product timezone) for a timestamp"""
+    return format_ts(timestamp, "%Y-%m")
+
+
+def _batch_path(archive_dir: Path, partition: str, first_id: int) -> Path:
+    # Zero-padded so name order is id order within a month.
+    return archive_dir / f"transactions-{partition}.{first_id:012d}.jsonl.gz"
+
+
+def _file_partition(path: Path) -> str:
+    return path.name[len("transactions-") :][:7]
+
+
+def _write_batch(path: Path, lines: list[str]) -> None:
+    temporary = path.with_name(path.name + ".tmp")
+    with gzip.open(temporary, "wt", encoding="utf-8") as f:
+        f.writelines(lines)
+    os.replace(temporary, path)
+
+
+def _read_archive_file(path: Path) -> Iterator[dict]:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping a damaged line in {path.name}")
+    except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+        logger.warning(f"Skipping the truncated tail of {path.name}: {e}")
+
+
+def archive_transactions(
+    older_than_days: int = TRANSACTION_RETENTION_DAYS,
+    *,
+    now: Optional[int] = None,
+    archive_dir: Optional[Path] = None,
+    max_batches: Optional[int] = None,
+) -> int:
+    """
+    Move transactions older than ``older_than_days`` into the monthly archives
+
+    Works in batches of ``ARCHIVE_BATCH_SIZE`` rows; each batch is written to
+    its partitions and then deleted in one commit.
+
+    Args:
+        older_than_days: Rows with ``time`` before now minus this many days move
+        now: Override the current Unix timestamp (tests)
+        archive_dir: Override the archive directory (tests)
+        max_batches: Stop after this many batches; ``None`` archives everything
+
+    Returns:
+        Number of rows archived
+    """
+    if older_than_days < 0:
+        raise ValueError("older_than_days must not be negative")
+
+    now = int(time.time()) if now is None else now
+    archive_dir = default_archive_dir() if archive_dir is None else archive_dir
+    cutoff = now - older_than_days * 86400
+    session = get_transaction_session()
+    archived = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        rows = (
+            session.query(Transaction)
+            .filter(Transaction.time < cutoff)
+            .order_by(Transaction.id.asc())
+            .limit(ARCHIVE_BATCH_SIZE)
+            .all()
+        )
+        if not rows:
+            break
+
+        partitions: dict[str, list[str]] = defaultdict(list)
+        for row in rows:
+            record = {field: getattr(row, field) for field in ARCHIVE_FIELDS}
+            partitions[archive_partition(row.time)].append(
+                json.dumps(record, ensure_ascii=False) + "\n"
+            )
+
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        for partition, lines in partitions.items():
+            _write_batch(_batch_path(archive_dir, partition, rows[0].id), lines)
+
+        session.query(Transaction).filter(
+            Transaction.id.in_([row.id for row in rows])
+        ).delete(synchronize_session=False)
+        session.commit()
+        archived += len(rows)
+        batches += 1
+
+    return archived
+
+
+def iter_archived_transactions(
+    *,
+    user_id: Optional[str] = None,
+    description: Optional[str] = None,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    archive_dir: Optional[Path] = None,
+) -> Iterator[dict]:
+    """
+    Iterate archived transactions in partition order, oldest month first
+
+    Only partitions overlapping ``[start_time, end_time)`` are opened.
+
+    Args:
+        user_id: Optional user filter
+        description: Optional description filter
+        start_time: Inclusive Unix timestamp lower bound
+        end_time: Exclusive Unix timestamp upper bound
+        archive_dir: Override the archive directory (tests)
+
+    Yields:
+        Transaction records as dicts with the ``ARCHIVE_FIELDS`` keys
+    """
+    archive_dir = default_archive_dir() if archive_dir is None else archive_dir
+    if not archive_dir.exists():
+        return
+
+    first = archive_partition(start_time) if start_time is not None else None
+    last = archive_partition(end_time - 1) if end_time is not None else None
+    seen: set[int] = set()
+
+    for path in sorted(archive_dir.glob(ARCHIVE_FILE_PATTERN)):
+        partition = _file_partition(path)
+        if (first is not None and partition < first) or (
+            last is not None and partition > last
+        ):
+            continue
+        for record in _read_archive_file(path):
+            if record["id"] in seen:
+                continue
+            seen.add(record["id"])
+            if user_id is not None and record["user_id"] != user_id:
+                continue
+            if description is not None and record["description"] != description:
+                continue
+            if start_time is not None and record["time"] < start_time:
+                continue
+            if end_time is not None and record["time"] >= end_time:
+                continue
+            yield record
@@ -6,7 +6,11 @@ require("nonebot_plugin_localstore")
 
 import nonebot_plugin_localstore as store  # noqa: E402
 
+from utils.migrations import migrations  # noqa: E402
+from utils.migrations import index_signature  # noqa: E402
+
 from .models import Base  # noqa: E402
+from .models import Transaction  # noqa: E402
 from .models import TransactionBase  # noqa: E402
 from .migration import migrate_data  # noqa: E402
 from .migration import migrate_schema  # noqa: E402
@@ -26,23 +30,39 @@ def init_database():
     """Initialize database connections and create tables"""
     global session, transaction_session
 
-    # Run migrations first (before creating tables with SQLAlchemy)
-    migrate_add_level_column()
-    migrate_fix_balance_column()
-    migrate_schema()  # v2 schema migration (adds columns, creates new tables)
-
-    # Initialize main database
     engine = create_engine(f"sqlite:///{database_path.resolve()}")
-    Base.metadata.create_all(engine)
-    session = sessionmaker(bind=engine)()
-
-    # Initialize transaction database
     transaction_engine = create_engine(f"sqlite:///{transaction_path.resolve()}")
-    TransactionBase.metadata.create_all(transaction_engine)
-    transaction_session = sessionmaker(bind=transaction_engine)()
 
-    # Run data migration after tables are guaranteed to exist
-    migrate_data()
+    with migrations(engine, "monetary") as registry:
+        # Run migrations first (before creating tables with SQLAlchemy)
+        registry.run("monetary.v1.level_column", migrate_add_level_column)
+        registry.run("monetary.v1.integer_balance", migrate_fix_balance_column)
+        # v2 schema migration (adds columns, creates new tables)
+        registry.run("monetary.v2.schema", migrate_schema)
+
+        # Initialize main database
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+
+        # Initialize transaction database
+        TransactionBase.metadata.create_all(transaction_engine)
+        with migrations(transaction_engine, "monetary transactions") as tx_registry:
+            tx_registry.run(
+                "monetary.transaction_indexes",
+                migrate_transaction_indexes,
+                transaction_engine,
+                content=index_signature(Transaction),
+            )
+        transaction_session = sessionmaker(bind=transaction_engine)()
+
+        # Run data migration after tables are guaranteed to exist
+        registry.run("monetary.v2.data", migrate_data)
+
+
+def migrate_transaction_indexes(engine):
+    """Create transaction-log indexes on databases created before they existed"""
+    for index in Transaction.__table__.indexes:
+        index.create(engine, checkfirst=True)
 
 
 def get_session():
@@ -3,8 +3,10 @@ Database models and data structures for the monetary plugin.
 """
 
 from enum import StrEnum
+from typing import Optional
 from dataclasses import dataclass
 
+from sqlalchemy import Index
 from sqlalchemy import Column
 from sqlalchemy import String
 from sqlalchemy import Integer
@@ -50,6 +52,16 @@ class Transaction(TransactionBase):
     time = Column(Integer)  # Unix timestamp
     description = Column(String)
 
+    __table_args__ = (
+        # History pages: newest first per user, keyset on (time, id)
+        Index("ix_transactions_user_time", "user_id", "time", "id"),
+        Index(
+            "ix_transactions_user_description_time", "user_id", "description", "time"
+        ),
+        # Archival scans everything older than a cutoff
+        Index("ix_transactions_time", "time"),
+    )
+
 
 class StickerTransaction(TransactionBase):
     """Sticker transaction log table"""
@@ -84,3 +96,11 @@ class UserStats:
     rank: int
     xp_gap: int
     last_daily_time: int
+
+
+@dataclass
+class TransactionPage:
+    """One keyset-paginated page of a user's transaction history"""
+
+    transactions: list[Transaction]  # Newest first
+    next_cursor: Optional[tuple[int, int]]  # (time, id) of the last row, or None
@@ -1,8 +1,12 @@
 import time
+from typing import Optional
 
+from sqlalchemy import or_
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
 
 from .models import Transaction
+from .models import TransactionPage
 from .models import TransactionCategory
 from .database import get_transaction_session
 
@@ -25,7 +29,10 @@ class TransactionManager:
             time=int(time.time()),
         )
         self.session.add(transaction)
-        self.session.commit()
+        # Inside an inventory batch the log row commits with the batch.
+        from ..inventory.unit_of_work import commit_or_defer
+
+        commit_or_defer(self.session)
 
     def get_transactions_by_description(
         self, user_id: str, description: str, limit: int = None
@@ -35,7 +42,7 @@ class TransactionManager:
             self.session.query(Transaction)
             .filter(Transaction.user_id == user_id)
             .filter(Transaction.description == description)
-            .order_by(Transaction.time.desc())
+            .order_by(Transaction.time.desc(), Transaction.id.desc())
         )
 
         if limit:
@@ -83,10 +90,56 @@ def get_user_transactions(
         query = (
             session.query(Transaction)
             .filter(Transaction.user_id == user_id)
-            .order_by(Transaction.time.desc())
+            .order_by(Transaction.time.desc(), Transaction.id.desc())
         )
 
         if limit:
             query = query.limit(limit)
 
         return query.all()
+
+
+def get_user_transactions_page(
+    user_id: str,
+    *,
+    description: Optional[str] = None,
+    before: Optional[tuple[int, int]] = None,
+    limit: int = 20,
+) -> TransactionPage:
+    """
+    Get one page of a user's transactions using keyset pagination
+
+    Pages are ordered by ``(time, id)`` descending and continue strictly after
+    ``before``, so deep pages cost the same as the first one instead of
+    scanning every skipped row like OFFSET would.
+
+    Args:
+        user_id: User ID to get transactions for
+        description: Optional description filter
+        before: ``next_cursor`` of the previous page; None for the first page
+        limit: Maximum number of rows in the page
+
+    Returns:
+        TransactionPage with the rows and the cursor for the next page
+    """
+    session = get_transaction_session()
+    query = session.query(Transaction).filter(Transaction.user_id == user_id)
+    if description:
+        query = query.filter(Transaction.description == description)
+    if before is not None:
+        cursor_time, cursor_id = before
+        query = query.filter(
+            or_(
+                Transaction.time < cursor_time,
+                and_(Transaction.time == cursor_time, Transaction.id < cursor_id),
+            )
+        )
+    rows = (
+        query.order_by(Transaction.time.desc(), Transaction.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    page = rows[:limit]
+    next_cursor = (page[-1].time, page[-1].id) if len(rows) > limit else None
+    return TransactionPage(transactions=page, next_cursor=next_cursor)
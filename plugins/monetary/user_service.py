@@ -1,5 +1,6 @@
 import time
 from typing import List
+from typing import Iterable
 
 from utils.clock import bot_date
 from utils.clock import bot_today
@@ -70,18 +71,21 @@ def add_balance(
     get_user(user_id)
     if amount < 0:
         return cost_balance(user_id, abs(amount), description)
-    if amount > 0:
-        result = _inventory().grant_item(
-            user_id,
-            "season_point",
-            amount,
-            description,
-            idempotency_key=idempotency_key,
+    # The wallet change and its log row commit together
+    with _inventory().batch(user_id) as inventory:
+        if amount > 0:
+            result = inventory.grant(
+                "season_point",
+                amount,
+                description,
+                idempotency_key=idempotency_key,
+            )
+            if result.skipped:
+                return
+
+        transaction_manager.add(
+            user_id, TransactionCategory.INCOME, amount, description
         )
-        if result.skipped:
-            return
-
-    transaction_manager.add(user_id, TransactionCategory.INCOME, amount, description)
 
 
 def cost_balance(user_id: str, amount: int, description: str):
@@ -91,10 +95,13 @@ def cost_balance(user_id: str, amount: int, description: str):
     get_user(user_id)
     if amount < 0:
         return add_balance(user_id, abs(amount), description)
-    if amount > 0:
-        _inventory().cost_item(user_id, "season_point", amount, description)
+    with _inventory().batch(user_id) as inventory:
+        if amount > 0:
+            inventory.cost("season_point", amount, description)
 
-    transaction_manager.add(user_id, TransactionCategory.EXPENSE, amount, description)
+        transaction_manager.add(
+            user_id, TransactionCategory.EXPENSE, amount, description
+        )
 
 
 def set_balance(user_id: str, amount: int, description: str):
@@ -102,9 +109,10 @@ def set_balance(user_id: str, amount: int, description: str):
     transaction_manager = get_transaction_manager()
 
     get_user(user_id)
-    _inventory().set_quantity(user_id, "season_point", amount, description)
+    with _inventory().batch(user_id) as inventory:
+        inventory.set("season_point", amount, description)
 
-    transaction_manager.add(user_id, TransactionCategory.SET, amount, description)
+        transaction_manager.add(user_id, TransactionCategory.SET, amount, description)
 
 
 def transfer_balance(from_user_id: str, to_user_id: str, amount: int, description: str):
@@ -126,6 +134,25 @@ def get_level(user_id: str) -> int:
     return user.level
 
 
+def get_levels(user_ids: Iterable[str]) -> dict[str, int]:
+    """Get several users' levels in one query, without creating user rows
+
+    Users without a record report level 1, the level ``get_user`` would
+    create them with.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+    rows = (
+        get_session()
+        .query(User.user_id, User.level)
+        .filter(User.user_id.in_(user_ids))
+        .all()
+    )
+    levels = {user_id: level or 1 for user_id, level in rows}
+    return {user_id: levels.get(user_id, 1) for user_id in user_ids}
+
+
 def set_level(user_id: str, level: int):
     """Set user's level to a specific value"""
     if level < 1:
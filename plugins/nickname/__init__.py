@@ -15,6 +15,7 @@ from .data_source import Nickname
 from .data_source import get
 from .data_source import get_id
 from .data_source import session
+from .data_source import get_many
 from .data_source import init_database
 from .data_source import purge_unsafe_nicknames
 
@@ -143,4 +144,4 @@ async def handle_get_nickname(event: MessageEvent):
     )
 
 
-__all__ = ["get", "get_id"]
+__all__ = ["get", "get_id", "get_many"]
@@ -1,3 +1,4 @@
+from typing import Iterable
 from typing import Optional
 
 from nonebot import require
@@ -49,11 +50,11 @@ def purge_unsafe_nicknames(
         init_database()
 
     active_policy = policy or SensitiveTextPolicy.default()
-    unsafe_user_ids = [
-        nickname.user_id
-        for nickname in session.query(Nickname).all()
-        if nickname.nickname is not None and active_policy.contains(nickname.nickname)
-    ]
+    unsafe_user_ids = list(
+        active_policy.scan(
+            session.query(Nickname.user_id, Nickname.nickname).yield_per(1000)
+        )
+    )
     if not unsafe_user_ids:
         return 0
 
@@ -81,6 +82,28 @@ def get(user_id: str) -> Optional[str]:
     return safe_display_text(nickname.nickname) or None
 
 
+def get_many(user_ids: Iterable[str]) -> dict[str, str]:
+    """一次查询获取多个用户的昵称
+
+    Args:
+        user_ids (Iterable[str]): 用户 ID 列表
+
+    Returns:
+        dict[str, str]: 用户 ID 到昵称的映射，没有设置昵称的用户不在其中
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+    if session is None:
+        init_database()
+    rows = session.query(Nickname).filter(Nickname.user_id.in_(user_ids)).all()
+    nicknames = {}
+    for row in rows:
+        if display := safe_display_text(row.nickname):
+            nicknames[row.user_id] = display
+    return nicknames
+
+
 def get_id(nickname: str) -> Optional[str]:
     """根据昵称获取用户 ID
 
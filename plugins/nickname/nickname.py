@@ -1,2 +1,3 @@
 from .data_source import get as get
 from .data_source import get_id as get_id
+from .data_source import get_many as get_many
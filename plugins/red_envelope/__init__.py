@@ -1,4 +1,5 @@
 import time
+from typing import Iterable
 from typing import Optional
 
 from nonebot import require
@@ -27,6 +28,7 @@ from utils.content_safety import safe_display_text  # noqa: E402
 from utils.images import image_segment_async  # noqa: E402
 from utils.theming import kit_for_user  # noqa: E402
 from utils.identity import identity_for  # noqa: E402
+from utils.identity import load_identities  # noqa: E402
 
 from .. import monetary  # noqa: E402
 from .render import ClaimRow  # noqa: E402
@@ -38,13 +40,13 @@ from .render import create_page  # noqa: E402
 from .render import completion_page  # noqa: E402
 from .service import EXPIRE_SECONDS  # noqa: E402
 from .service import EnvelopeCompletionInfo  # noqa: E402
-from .service import claim_envelope  # noqa: E402
 from .service import create_envelope  # noqa: E402
+from .service import claim_envelope_async  # noqa: E402
 from .service import get_active_envelopes  # noqa: E402
+from .service import credit_pending_claims  # noqa: E402
 from .service import expire_overdue_envelopes  # noqa: E402
 from .database import init_database  # noqa: E402
 from .messages import Messages  # noqa: E402
-from ..nickname import nickname  # noqa: E402
 
 
 @get_driver().on_startup
@@ -57,6 +59,9 @@ async def init():
 @scheduler.scheduled_job(id="red_envelope_expire", trigger="interval", minutes=5)
 async def handle_expire_job():
     try:
+        credited = credit_pending_claims()
+        if credited > 0:
+            logger.info(f"已补发 {credited} 笔未到账的红包")
         count = expire_overdue_envelopes()
         if count > 0:
             logger.info(f"已处理 {count} 个过期红包")
@@ -245,7 +250,7 @@ async def handle_claim(event: MessageEvent, arg: Message = CommandArg()):
         channel_index = int(text)
 
     try:
-        status, amount, completion_info = claim_envelope(
+        status, amount, completion_info = await claim_envelope_async(
             user_id, channel_id, channel_index
         )
         if status == "no_active":
@@ -310,8 +315,15 @@ async def _send_completion_card(
     面）。手气王只在这里出现——``EnvelopeCompletionInfo`` 只在最后一份被领取
     时构建，中途标手气王会与终局矛盾（一致性评审 #15）。
     """
-    creator_name = _display_name(info.creator_id)
-    lucky_king_name = _display_name(info.lucky_king_id)
+    names = _display_names(
+        (
+            info.creator_id,
+            info.lucky_king_id,
+            *(claim.user_id for claim in info.claims),
+        )
+    )
+    creator_name = names[info.creator_id]
+    lucky_king_name = names[info.lucky_king_id]
     data = EnvelopeCompletionData(
         channel_index=info.channel_index,
         title=safe_display_text(info.title, fallback="红包"),
@@ -323,7 +335,7 @@ async def _send_completion_card(
         lucky_king_amount=info.lucky_king_amount,
         claims=tuple(
             ClaimRow(
-                name=_display_name(claim.user_id),
+                name=names[claim.user_id],
                 amount=claim.amount,
                 is_lucky_king=claim.user_id == info.lucky_king_id,
             )
@@ -351,12 +363,15 @@ async def _send_completion_card(
     )
 
 
-def _display_name(user_id: str) -> str:
-    """昵称，缺省时退化为可区分的 玩家XXXX——结算榜每一行都要能对上人。"""
-    name = nickname.get(user_id)
-    if name:
-        return str(name)
-    return f"玩家{user_id[-4:]}" if len(user_id) >= 4 else f"玩家{user_id}"
+def _display_names(user_ids: Iterable[str]) -> dict[str, str]:
+    """昵称，缺省时退化为可区分的 玩家XXXX——结算榜每一行都要能对上人。
+
+    结算卡一次列出所有领取者，这里经身份批量加载器一次查完，而不是每行一查。
+    """
+    return {
+        user_id: identity.nickname
+        for user_id, identity in load_identities(user_ids).items()
+    }
 
 
 def _validity_state(remaining_seconds: int) -> tuple[str, bool]:
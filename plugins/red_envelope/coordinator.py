@@ -0,0 +1,89 @@
+"""In-memory claim coordination for active red envelopes.
+
+A coordinator holds everything the claim hot path needs for one envelope: the
+remaining double-average amounts (drawn once, up front), the set of users who
+already hold a claim, and reserved-but-uncredited claims waiting for a retry.
+Handing out an amount is then a set lookup and a ``popleft`` — no query.
+
+The amounts are drawn by ``service`` when it registers a coordinator.
+Coordinators never touch a database. ``service`` persists the claims they hand
+out in batches and tells them what happened (``restore`` on a failed
+reservation, ``uncredited`` bookkeeping on a failed credit). The database stays
+the source of truth: a coordinator is rebuilt from its rows after a restart,
+and anything only in memory is by construction not yet promised to anyone.
+"""
+
+import asyncio
+from typing import Optional
+from collections import deque
+from dataclasses import field
+from dataclasses import dataclass
+
+
+@dataclass(eq=False)
+class PendingClaim:
+    """One claim handed out by a coordinator, before or after it is persisted.
+
+    ``claim_id`` is 0 until the reservation commits. ``final`` marks the claim
+    that took the last amount; its credit builds the completion card.
+    """
+
+    user_id: str
+    amount: int
+    claimed_at: int
+    claim_id: int = 0
+    final: bool = False
+    future: Optional[asyncio.Future] = None
+    result: Optional[tuple] = None
+
+
+@dataclass(eq=False)
+class ClaimCoordinator:
+    envelope_id: int
+    channel_id: str
+    channel_index: int
+    created_at: int
+    expires_at: int
+    amounts: deque[int]
+    claimed: set[str] = field(default_factory=set)
+    uncredited: dict[str, PendingClaim] = field(default_factory=dict)
+    pending: list[PendingClaim] = field(default_factory=list)
+    flush_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.amounts)
+
+    @property
+    def settled(self) -> bool:
+        """Nothing left to hand out, persist, or retry."""
+        return not (self.amounts or self.pending or self.uncredited)
+
+    def take(self, user_id: str, now: int) -> PendingClaim | str:
+        """Hand ``user_id`` the next amount, or return a claim status.
+
+        A user whose earlier claim was reserved but never credited gets that
+        claim back for a retry instead of a second amount.
+        """
+
+        if retry := self.uncredited.get(user_id):
+            return retry
+        if user_id in self.claimed:
+            return "already"
+        if not self.amounts:
+            return "empty"
+        amount = self.amounts.popleft()
+        self.claimed.add(user_id)
+        return PendingClaim(
+            user_id=user_id,
+            amount=amount,
+            claimed_at=now,
+            final=not self.amounts,
+        )
+
+    def restore(self, claims: list[PendingClaim]) -> None:
+        """Put back amounts whose reservation failed to commit."""
+
+        for claim in reversed(claims):
+            self.amounts.appendleft(claim.amount)
+            self.claimed.discard(claim.user_id)
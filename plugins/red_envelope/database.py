@@ -6,6 +6,8 @@ require("nonebot_plugin_localstore")
 
 import nonebot_plugin_localstore as store  # noqa: E402
 
+from utils.migrations import migrations  # noqa: E402
+
 from .models import Base  # noqa: E402
 from .migration import migrate_red_envelope_schema  # noqa: E402
 
@@ -18,11 +20,11 @@ def init_database():
     """Initialize database connections and create tables"""
     global session
 
-    # Run migration before table creation
-    migrate_red_envelope_schema()
-
     engine = create_engine(f"sqlite:///{database_path.resolve()}")
-    Base.metadata.create_all(engine)
+    with migrations(engine, "red_envelope") as registry:
+        # Run migration before table creation
+        registry.run("red_envelope.schema", migrate_red_envelope_schema)
+        Base.metadata.create_all(engine)
     session = sessionmaker(bind=engine)()
 
 
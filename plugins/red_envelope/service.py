@@ -1,7 +1,9 @@
 import time
 import random
+import asyncio
 from typing import Tuple
 from typing import Optional
+from collections import deque
 from dataclasses import dataclass
 
 from nonebot.log import logger
@@ -10,6 +12,9 @@ from .. import monetary
 from .models import ClaimRecord
 from .models import RedEnvelope
 from .database import get_session
+from .coordinator import PendingClaim
+from .coordinator import ClaimCoordinator
+from ..inventory.unit_of_work import unit_of_work
 
 
 @dataclass
@@ -39,27 +44,42 @@ class EnvelopeCompletionInfo:
     claims: tuple[EnvelopeClaim, ...]
 
 
+ClaimResult = Tuple[str, Optional[int], Optional[EnvelopeCompletionInfo]]
+
 EXPIRE_SECONDS = 24 * 60 * 60
 MAX_ENVELOPE_COUNT = 10_000
+# How long a claim waits for others to share its commit (group commit window).
+CLAIM_FLUSH_SECONDS = 0.02
+# Upper bound on how long a claimer waits for its flush to report back.
+CLAIM_RESULT_TIMEOUT_SECONDS = 10
+
+_registry: dict[int, ClaimCoordinator] = {}
+_registry_source = None
+_loaded_channels: set[str] = set()
 
 
-def _generate_next_amount(remaining_amount: int, remaining_count: int) -> int:
+def _generate_amounts(remaining_amount: int, remaining_count: int) -> list[int]:
     """
-    WeChat-style double-average algorithm. O(1) per claim.
-    Each claim generates a random integer between 1 and
+    WeChat-style double-average algorithm, drawn for every remaining claim.
+
+    Each claim is a random integer between 1 and
     floor(2 * remaining_amount / remaining_count), except the last claim
     which takes the full remaining amount.
     """
     if remaining_count <= 0 or remaining_amount < remaining_count:
         raise ValueError("Invalid amount or count")
 
-    if remaining_count == 1:
-        return remaining_amount
-
-    max_amount = (2 * remaining_amount) // remaining_count
-    # Ensure each remaining claim gets at least 1
-    max_amount = min(max_amount, remaining_amount - remaining_count + 1)
-    return random.randint(1, max_amount)
+    amounts = []
+    while remaining_count > 1:
+        max_amount = (2 * remaining_amount) // remaining_count
+        # Ensure each remaining claim gets at least 1
+        max_amount = min(max_amount, remaining_amount - remaining_count + 1)
+        amount = random.randint(1, max_amount)
+        amounts.append(amount)
+        remaining_amount -= amount
+        remaining_count -= 1
+    amounts.append(remaining_amount)
+    return amounts
 
 
 def _get_next_channel_index(session, channel_id: str) -> int:
@@ -104,6 +124,7 @@ def create_envelope(
     try:
         session.add(envelope)
         session.commit()
+        _register(envelope, [])
         logger.info(
             f"红包已创建: channel_index={channel_index} creator={creator_id} channel={channel_id} amount={total_amount} count={total_count}"
         )
@@ -149,6 +170,13 @@ def get_active_envelope_by_index(
 
 def _expire_envelope(envelope: RedEnvelope) -> int:
     session = get_session()
+    coordinator = _coordinators().pop(envelope.id, None)
+    if coordinator is not None:
+        # Claims already handed out are promised; persist them before the
+        # refund reads the remaining amount.
+        if coordinator.flush_handle is not None:
+            coordinator.flush_handle.cancel()
+        _flush(coordinator)
     if envelope.is_expired:
         return 0
 
@@ -202,126 +230,389 @@ def _build_completion_info(
     )
 
 
-def _credit_claim(
-    envelope: RedEnvelope, claim: ClaimRecord, now: int
-) -> Optional[EnvelopeCompletionInfo]:
-    monetary.add(
-        claim.user_id,
-        claim.amount,
-        f"red_envelope_claim_{envelope.id}",
-        idempotency_key=f"red_envelope_claim:{envelope.id}:{claim.user_id}",
-    )
-    claim.credited_at = max(1, now)
-    get_session().commit()
-    logger.info(
-        f"红包领取成功: id={envelope.id} user={claim.user_id} amount={claim.amount}"
+def _coordinators() -> dict[int, ClaimCoordinator]:
+    """Coordinators of the current session's active envelopes, by envelope id.
+
+    Rebuilt whenever the session changes, the same way the inventory catalog
+    snapshot follows its session.
+    """
+    global _registry_source
+    session = get_session()
+    if session is not _registry_source:
+        _registry.clear()
+        _loaded_channels.clear()
+        _registry_source = session
+    return _registry
+
+
+def _register(envelope: RedEnvelope, claims: list[ClaimRecord]) -> ClaimCoordinator:
+    coordinator = ClaimCoordinator(
+        envelope_id=envelope.id,
+        channel_id=envelope.channel_id,
+        channel_index=envelope.channel_index,
+        created_at=envelope.created_at,
+        expires_at=envelope.expires_at,
+        amounts=deque(
+            _generate_amounts(envelope.remaining_amount, envelope.remaining_count)
+            if envelope.remaining_count > 0
+            else ()
+        ),
+        claimed={claim.user_id for claim in claims},
     )
-    return _build_completion_info(envelope, now)
+    last_claim_id = max((claim.id for claim in claims), default=0)
+    for claim in claims:
+        if claim.credited_at == 0:
+            coordinator.uncredited[claim.user_id] = PendingClaim(
+                user_id=claim.user_id,
+                amount=claim.amount,
+                claimed_at=claim.claimed_at,
+                claim_id=claim.id,
+                final=envelope.remaining_count == 0 and claim.id == last_claim_id,
+            )
+    _coordinators()[envelope.id] = coordinator
+    return coordinator
 
 
-def claim_envelope(
-    user_id: str, channel_id: str, channel_index: Optional[int] = None
-) -> Tuple[str, Optional[int], Optional[EnvelopeCompletionInfo]]:
-    session = get_session()
-    now = int(time.time())
+def _load_channel(channel_id: str, now: int) -> None:
+    """Register every claimable envelope of a channel, once per session."""
 
-    # A claim reservation is committed before crossing into the inventory
-    # database. Retry any reserved-but-uncredited claim first, including after
-    # the envelope became full or expired.
-    pending_query = (
-        session.query(ClaimRecord)
-        .join(RedEnvelope, RedEnvelope.id == ClaimRecord.envelope_id)
+    registry = _coordinators()
+    if channel_id in _loaded_channels:
+        return
+    session = get_session()
+    envelopes = [
+        envelope
+        for envelope in session.query(RedEnvelope)
         .filter(
-            ClaimRecord.user_id == user_id,
-            ClaimRecord.credited_at == 0,
             RedEnvelope.channel_id == channel_id,
+            RedEnvelope.is_expired == False,  # noqa: E712
+            RedEnvelope.expires_at > now,
         )
-    )
+        .all()
+        if envelope.id not in registry
+    ]
+    claims: dict[int, list[ClaimRecord]] = {envelope.id: [] for envelope in envelopes}
+    if envelopes:
+        for claim in session.query(ClaimRecord).filter(
+            ClaimRecord.envelope_id.in_(list(claims))
+        ):
+            claims[claim.envelope_id].append(claim)
+    for envelope in envelopes:
+        if envelope.remaining_count > 0 or any(
+            claim.credited_at == 0 for claim in claims[envelope.id]
+        ):
+            _register(envelope, claims[envelope.id])
+    _loaded_channels.add(channel_id)
+
+
+def _find_coordinator(
+    channel_id: str, channel_index: Optional[int], now: int
+) -> Optional[ClaimCoordinator]:
+    _load_channel(channel_id, now)
+    candidates = [
+        coordinator
+        for coordinator in _coordinators().values()
+        if coordinator.channel_id == channel_id
+    ]
     if channel_index is not None:
-        pending_query = pending_query.filter(
-            RedEnvelope.channel_index == channel_index
+        return next(
+            (c for c in candidates if c.channel_index == channel_index), None
         )
-    pending_claim = pending_query.order_by(ClaimRecord.id.desc()).first()
-    if pending_claim is not None:
-        envelope = pending_claim.envelope
+    active = [c for c in candidates if c.active and c.expires_at > now]
+    return max(active, key=lambda c: (c.created_at, c.channel_index), default=None)
+
+
+def _credit(envelope_id: int, claims: list[PendingClaim]) -> None:
+    """Credit ``claims`` in one inventory unit of work.
+
+    The idempotency key makes a repeat after a crash between the credit and
+    the ``credited_at`` commit a no-op.
+    """
+    with unit_of_work():
+        for claim in claims:
+            monetary.add(
+                claim.user_id,
+                claim.amount,
+                f"red_envelope_claim_{envelope_id}",
+                idempotency_key=f"red_envelope_claim:{envelope_id}:{claim.user_id}",
+            )
+
+
+def _credit_claims(envelope_id: int, claims: list[PendingClaim]) -> list[PendingClaim]:
+    """Credit ``claims`` together, or one at a time if the batch fails.
+
+    One user's failing credit dooms the shared unit of work; retrying claim by
+    claim keeps it from failing everyone else in the same flush.
+
+    Returns:
+        The claims that were credited
+    """
+    try:
+        _credit(envelope_id, claims)
+        return claims
+    except Exception as e:
+        if len(claims) == 1:
+            logger.error("红包到账时发生错误: {}", e)
+            return []
+        logger.warning("红包批量到账失败，逐个重试: {}", e)
+
+    credited = []
+    for claim in claims:
         try:
-            completion = _credit_claim(envelope, pending_claim, now)
-            return ("success", pending_claim.amount, completion)
+            _credit(envelope_id, [claim])
         except Exception as e:
-            session.rollback()
-            logger.error("补发红包到账时发生错误: {}", e)
-            return ("error", None, None)
+            logger.error("红包到账时发生错误: user={} {}", claim.user_id, e)
+            continue
+        credited.append(claim)
+    return credited
 
-    if channel_index is None:
-        envelope = (
-            session.query(RedEnvelope)
-            .filter(
-                RedEnvelope.channel_id == channel_id,
-                RedEnvelope.is_expired == False,  # noqa: E712
-                RedEnvelope.remaining_count > 0,
-                RedEnvelope.expires_at > now,
-            )
-            .order_by(RedEnvelope.created_at.desc())
-            .first()
-        )
-    else:
-        envelope = (
-            session.query(RedEnvelope)
-            .filter(
-                RedEnvelope.channel_index == channel_index,
-                RedEnvelope.channel_id == channel_id,
-            )
-            .first()
-        )
 
-    if not envelope:
-        return ("no_active" if channel_index is None else "not_found", None, None)
+def _rollback(session) -> None:
+    try:
+        session.rollback()
+    except Exception:
+        logger.opt(exception=True).error("红包数据库回滚失败")
+
 
-    if envelope.is_expired or envelope.expires_at <= now:
+def _flush(coordinator: ClaimCoordinator) -> None:
+    """Persist and credit every claim the coordinator has handed out so far.
+
+    Same protocol as a single claim, one commit per step for the whole batch:
+    the reservations (claim rows plus the envelope's remaining amount/count)
+    commit before anything crosses into the inventory database, the credits
+    share one unit of work (retried claim by claim if it fails), and
+    ``credited_at`` is stamped afterwards. A failed reservation puts the
+    amounts back; a failed credit leaves the claims reserved for the owner's
+    next claim or ``credit_pending_claims``.
+
+    Runs from ``call_later``, so nothing may escape: every claim in the batch
+    gets a result, ``("error", None, None)`` if the flush broke before
+    deciding it.
+    """
+    coordinator.flush_handle = None
+    batch = list({id(claim): claim for claim in coordinator.pending}.values())
+    coordinator.pending.clear()
+    if not batch:
+        return
+    results: dict[int, ClaimResult] = {}
+    try:
+        _flush_batch(coordinator, batch, results)
+    except Exception as e:
+        logger.opt(exception=True).error("红包批量处理时发生错误: {}", e)
+        for claim in batch:
+            if id(claim) not in results and claim.claim_id:
+                coordinator.uncredited[claim.user_id] = claim
+    finally:
+        try:
+            if coordinator.settled:
+                _coordinators().pop(coordinator.envelope_id, None)
+        finally:
+            for claim in batch:
+                claim.result = results.get(id(claim), ("error", None, None))
+                if claim.future is not None and not claim.future.done():
+                    claim.future.set_result(claim.result)
+
+
+def _flush_batch(
+    coordinator: ClaimCoordinator,
+    batch: list[PendingClaim],
+    results: dict[int, ClaimResult],
+) -> None:
+    session = get_session()
+    now = int(time.time())
+
+    fresh = [claim for claim in batch if claim.claim_id == 0]
+    if fresh:
+        try:
+            envelope = session.get(RedEnvelope, coordinator.envelope_id)
+            records = [
+                ClaimRecord(
+                    envelope_id=coordinator.envelope_id,
+                    user_id=claim.user_id,
+                    amount=claim.amount,
+                    claimed_at=claim.claimed_at,
+                    credited_at=0,
+                )
+                for claim in fresh
+            ]
+            envelope.remaining_amount -= sum(claim.amount for claim in fresh)
+            envelope.remaining_count -= len(fresh)
+            session.add_all(records)
+            session.commit()
+            for claim, record in zip(fresh, records):
+                claim.claim_id = record.id
+        except Exception as e:
+            _rollback(session)
+            logger.error("领取红包时发生错误: {}", e)
+            coordinator.restore(fresh)
+            for claim in fresh:
+                results[id(claim)] = ("error", None, None)
+
+    reserved = [claim for claim in batch if claim.claim_id]
+    if not reserved:
+        return
+    credited = _credit_claims(coordinator.envelope_id, reserved)
+    if credited:
+        try:
+            session.query(ClaimRecord).filter(
+                ClaimRecord.id.in_([claim.claim_id for claim in credited])
+            ).update(
+                {ClaimRecord.credited_at: max(1, now)}, synchronize_session="fetch"
+            )
+            session.commit()
+        except Exception as e:
+            _rollback(session)
+            logger.error("红包到账时发生错误: {}", e)
+            credited = []
+
+    credited_ids = {id(claim) for claim in credited}
+    for claim in reserved:
+        if id(claim) not in credited_ids:
+            coordinator.uncredited[claim.user_id] = claim
+            results[id(claim)] = ("error", None, None)
+    for claim in credited:
+        coordinator.uncredited.pop(claim.user_id, None)
+        logger.info(
+            f"红包领取成功: id={coordinator.envelope_id} "
+            f"user={claim.user_id} amount={claim.amount}"
+        )
+        completion = None
+        if claim.final:
+            try:
+                completion = _build_completion_info(
+                    session.get(RedEnvelope, coordinator.envelope_id), now
+                )
+            except Exception:
+                # The claim itself went through; only the completion card
+                # is lost.
+                logger.opt(exception=True).error("红包完成信息生成失败")
+        results[id(claim)] = ("success", claim.amount, completion)
+
+
+def _take(
+    user_id: str, channel_id: str, channel_index: Optional[int], now: int
+) -> tuple[Optional[ClaimCoordinator], PendingClaim | ClaimResult]:
+    coordinator = _find_coordinator(channel_id, channel_index, now)
+    if coordinator is None:
+        return None, _claim_without_coordinator(user_id, channel_id, channel_index)
+    if coordinator.expires_at <= now:
+        envelope = get_session().get(RedEnvelope, coordinator.envelope_id)
         _expire_envelope(envelope)
-        return ("expired", None, None)
+        return None, ("expired", None, None)
+    claim = coordinator.take(user_id, now)
+    if isinstance(claim, str):
+        return None, (claim, None, None)
+    if not any(pending is claim for pending in coordinator.pending):
+        coordinator.pending.append(claim)
+    return coordinator, claim
 
-    if envelope.remaining_count <= 0 or envelope.remaining_amount <= 0:
-        return ("empty", None, None)
 
-    already_claimed = (
-        session.query(ClaimRecord)
+def _claim_without_coordinator(
+    user_id: str, channel_id: str, channel_index: Optional[int]
+) -> ClaimResult:
+    """Status for a channel or index with nothing left to hand out."""
+
+    if channel_index is None:
+        return ("no_active", None, None)
+    envelope = (
+        get_session()
+        .query(RedEnvelope)
         .filter(
-            ClaimRecord.envelope_id == envelope.id,
-            ClaimRecord.user_id == user_id,
+            RedEnvelope.channel_index == channel_index,
+            RedEnvelope.channel_id == channel_id,
         )
         .first()
     )
-    if already_claimed:
-        return ("already", None, None)
+    if not envelope:
+        return ("not_found", None, None)
+    if envelope.is_expired or envelope.expires_at <= int(time.time()):
+        _expire_envelope(envelope)
+        return ("expired", None, None)
+    return ("empty", None, None)
 
-    # Generate amount on-the-fly using WeChat double-average algorithm
-    amount = _generate_next_amount(
-        envelope.remaining_amount, envelope.remaining_count
-    )
 
+def claim_envelope(
+    user_id: str, channel_id: str, channel_index: Optional[int] = None
+) -> ClaimResult:
+    """Claim and persist immediately; see ``claim_envelope_async``."""
+
+    coordinator, claim = _take(user_id, channel_id, channel_index, int(time.time()))
+    if coordinator is None:
+        return claim
+    _flush(coordinator)
+    return claim.result
+
+
+async def claim_envelope_async(
+    user_id: str, channel_id: str, channel_index: Optional[int] = None
+) -> ClaimResult:
+    """Claim through the envelope's coordinator with a group commit.
+
+    The amount is decided immediately in memory. The claim is persisted and
+    credited by a flush that runs ``CLAIM_FLUSH_SECONDS`` after the first
+    pending claim, together with every claim that arrived in between; the
+    caller only gets its result once that flush committed, so no one is told
+    "success" for a claim that a crash could lose.
+
+    A flush that never reports back within ``CLAIM_RESULT_TIMEOUT_SECONDS``
+    counts as an error.
+    """
+    coordinator, claim = _take(user_id, channel_id, channel_index, int(time.time()))
+    if coordinator is None:
+        return claim
+    loop = asyncio.get_running_loop()
+    if claim.future is None or claim.future.done():
+        claim.future = loop.create_future()
+    if coordinator.flush_handle is None:
+        coordinator.flush_handle = loop.call_later(
+            CLAIM_FLUSH_SECONDS, _flush, coordinator
+        )
     try:
-        envelope.remaining_amount -= amount
-        envelope.remaining_count -= 1
-
-        claim = ClaimRecord(
-            envelope_id=envelope.id,
-            user_id=user_id,
-            amount=amount,
-            claimed_at=now,
-            credited_at=0,
+        return await asyncio.wait_for(
+            asyncio.shield(claim.future), CLAIM_RESULT_TIMEOUT_SECONDS
         )
-        session.add(claim)
-        session.commit()
-
-        completion_info = _credit_claim(envelope, claim, now)
-        return ("success", amount, completion_info)
-    except Exception as e:
-        session.rollback()
-        logger.error("领取红包时发生错误: {}", e)
+    except TimeoutError:
+        logger.error(f"红包领取结果超时: id={coordinator.envelope_id} user={user_id}")
         return ("error", None, None)
 
 
+def credit_pending_claims() -> int:
+    """Credit every reserved-but-uncredited claim, e.g. after a crash."""
+
+    session = get_session()
+    claims = (
+        session.query(ClaimRecord)
+        .filter(ClaimRecord.credited_at == 0)
+        .order_by(ClaimRecord.id.asc())
+        .all()
+    )
+    registry = _coordinators()
+    credited = 0
+    for claim in claims:
+        coordinator = registry.get(claim.envelope_id)
+        if coordinator is not None and any(
+            pending.claim_id == claim.id for pending in coordinator.pending
+        ):
+            continue
+        try:
+            _credit(
+                claim.envelope_id,
+                [PendingClaim(claim.user_id, claim.amount, claim.claimed_at)],
+            )
+            claim.credited_at = max(1, int(time.time()))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error("补发红包到账时发生错误: {}", e)
+            continue
+        credited += 1
+        if coordinator is not None:
+            coordinator.uncredited.pop(claim.user_id, None)
+            if coordinator.settled:
+                registry.pop(claim.envelope_id, None)
+    return credited
+
+
 def expire_overdue_envelopes() -> int:
     session = get_session()
     now = int(time.time())
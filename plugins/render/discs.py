@@ -0,0 +1,141 @@
+"""Pre-scaled circular avatar crops.
+
+Identity strips, player cards and ladder rows draw the same avatar as a circle
+on every render, and each render used to cover-resize the 140px source and
+clip it to a circle again, often through a 3x supersampled layer. A disc is
+that finished crop: a square RGBA image, ``diameter`` device pixels wide,
+ready to composite.
+
+Discs are memoized per avatar *object* for as long as it is alive, so every
+render of one cached avatar shares them. ``utils.avatar`` builds the sizes in
+:data:`AVATAR_DIAMETERS` when an avatar is fetched, persists them next to the
+source PNG, and hands them over with :func:`seed_avatar_discs`; a size not in
+that list is built on first use.
+"""
+
+import weakref
+from pathlib import Path
+from threading import RLock
+from collections.abc import Mapping
+
+from PIL import Image
+from PIL import ImageDraw
+
+from .types import ImageSource
+
+#: Logical diameters the identity surfaces draw an avatar at: the generic
+#: ``avatar_or_initial`` sizes, Kasumi's discs, BanG Dream!'s ringed inner
+#: disc, and Endfield/Mewtype's padded face.
+AVATAR_DIAMETERS = (42, 44, 46, 52, 56)
+
+#: Render ratios discs are prepared for. Page roots render at
+#: ``RenderContext.pixel_ratio`` 2; direct component renders use 1.
+DISC_PIXEL_RATIOS = (1, 2)
+
+#: Ratio a composition-time caller picks a disc for (the page default).
+DISC_RENDER_RATIO = 2
+
+_SUPERSAMPLE = 3
+
+_discs: dict[int, tuple[weakref.ref, dict[int, Image.Image]]] = {}
+_lock = RLock()
+
+
+def disc_diameters() -> tuple[int, ...]:
+    """Device-pixel diameters prepared ahead of time, ascending."""
+
+    return tuple(
+        sorted(
+            {
+                diameter * ratio
+                for diameter in AVATAR_DIAMETERS
+                for ratio in DISC_PIXEL_RATIOS
+            }
+        )
+    )
+
+
+def circle_disc(image: Image.Image, diameter: int) -> Image.Image:
+    """Cover-fit an image into a circle ``diameter`` pixels wide.
+
+    The edge is drawn supersampled, then downscaled, so it stays smooth.
+
+    Args:
+        image: Source image.
+        diameter: Output width and height in pixels.
+
+    Returns:
+        New RGBA image with transparent corners.
+    """
+
+    diameter = max(1, diameter)
+    big = diameter * _SUPERSAMPLE
+    source = image.convert("RGBA")
+    ratio = max(big / source.width, big / source.height)
+    resized = source.resize(
+        (max(big, round(source.width * ratio)), max(big, round(source.height * ratio))),
+        Image.Resampling.LANCZOS,
+    )
+    left = (resized.width - big) // 2
+    top = (resized.height - big) // 2
+    art = resized.crop((left, top, left + big, top + big))
+    layer = Image.new("RGBA", (big, big), (0, 0, 0, 0))
+    mask = Image.new("L", (big, big), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, big - 1, big - 1), fill=255)
+    layer.paste(art, (0, 0), mask)
+    return layer.resize((diameter, diameter), Image.Resampling.LANCZOS)
+
+
+def avatar_disc(source: ImageSource, diameter: int) -> Image.Image:
+    """Return the circular crop of an avatar at a device-pixel diameter.
+
+    In-memory images are memoized per object; callers must not mutate the
+    result. Path sources are loaded and cropped on every call.
+
+    Args:
+        source: Avatar image or image path.
+        diameter: Output width and height in pixels.
+
+    Returns:
+        RGBA disc image.
+    """
+
+    if not isinstance(source, Image.Image):
+        with Image.open(Path(source)) as opened:
+            return circle_disc(opened, diameter)
+    discs = _discs_for(source)
+    disc = discs.get(diameter)
+    if disc is None:
+        disc = circle_disc(source, diameter)
+        discs[diameter] = disc
+    return disc
+
+
+def seed_avatar_discs(source: Image.Image, discs: Mapping[int, Image.Image]) -> None:
+    """Register discs prepared elsewhere (e.g. loaded from disk) for ``source``.
+
+    Args:
+        source: The avatar image renders will receive.
+        discs: Disc images keyed by device-pixel diameter.
+    """
+
+    _discs_for(source).update(discs)
+
+
+def _discs_for(source: Image.Image) -> dict[int, Image.Image]:
+    # PIL images are unhashable, so key by id and drop the entry when the
+    # image is collected (a reused id then finds a dead reference).
+    key = id(source)
+    with _lock:
+        entry = _discs.get(key)
+        if entry is None or entry[0]() is not source:
+            entry = (weakref.ref(source, lambda ref: _forget(key, ref)), {})
+            _discs[key] = entry
+        return entry[1]
+
+
+def _forget(key: int, ref: weakref.ref) -> None:
+    with _lock:
+        entry = _discs.get(key)
+        if entry is not None and entry[0] is ref:
+            del _discs[key]
@@ -15,6 +15,7 @@ from plugins.render.core import RenderContext
 from plugins.render.color import ColorLike
 from plugins.render.color import rgba
 from plugins.render.color import normalize_color
+from plugins.render.discs import avatar_disc
 from plugins.render.types import ImageFit
 from plugins.render.types import Overflow
 from plugins.render.types import TextAlign
@@ -500,8 +501,9 @@ class BanGDreamRingedAvatar:
     When ``source`` is ``None`` the inner disc is filled with a soft brand tint
     and carries the player's initial instead of leaving a hole. ``ring_width=0``
     disables the theme ring when an equipped cosmetic frame replaces it.
-    Rendering is supersampled so the circle edge stays clean after the
-    page-level downscale.
+    The ring and fallback are drawn supersampled so the circle edge stays
+    clean after the page-level downscale; an avatar is pasted as its
+    pre-scaled disc.
 
     Attributes:
         source: Optional avatar image.
@@ -546,11 +548,11 @@ class BanGDreamRingedAvatar:
         inner = max(1, big - 2 * (ring_width + ring_gap))
         inner_xy = (big - inner) // 2
 
+        disc = None
         if self.source is not None:
-            art = resize_cover(load_image(ctx, self.source), inner, inner)
-            mask = Image.new("L", (inner, inner), 0)
-            ImageDraw.Draw(mask).ellipse((0, 0, inner - 1, inner - 1), fill=255)
-            layer.paste(art, (inner_xy, inner_xy), mask)
+            # The avatar itself is pasted as a pre-scaled disc after the
+            # ring layer is downscaled; only the ring is drawn supersampled.
+            disc = avatar_disc(self.source, max(1, inner // supersample))
         else:
             draw.ellipse(
                 (inner_xy, inner_xy, inner_xy + inner - 1, inner_xy + inner - 1),
@@ -581,15 +583,15 @@ class BanGDreamRingedAvatar:
                 outline=normalize_color(self.ring_color),
                 width=ring_width,
             )
+        x = rect.x + max(0, (rect.width - side) // 2)
+        y = rect.y + max(0, (rect.height - side) // 2)
+        if disc is not None:
+            offset = (side - disc.width) // 2
+            alpha_composite_paste(canvas, disc, (x + offset, y + offset))
+            if ring_width == 0:
+                return
         resized = layer.resize((side, side), Image.Resampling.LANCZOS)
-        alpha_composite_paste(
-            canvas,
-            resized,
-            (
-                rect.x + max(0, (rect.width - side) // 2),
-                rect.y + max(0, (rect.height - side) // 2),
-            ),
-        )
+        alpha_composite_paste(canvas, resized, (x, y))
 
 
 @dataclass(frozen=True)
@@ -24,6 +24,7 @@ from plugins.render.color import Color
 from plugins.render.color import ColorLike
 from plugins.render.color import rgba
 from plugins.render.color import normalize_color
+from plugins.render.discs import avatar_disc
 from plugins.render.types import ImageSource
 from plugins.render.layout import Frame
 from plugins.render.sizing import SizeValue
@@ -33,7 +34,6 @@ from plugins.render.primitives import alpha_composite_paste
 
 from ..atoms import mix_color
 from ..atoms import load_image
-from ..atoms import resize_cover
 from ..atoms import draw_soft_shadow
 from ..atoms import vertical_gradient
 from ..atoms import draw_panel_surface
@@ -319,8 +319,9 @@ class KasumiAvatarDisc:
     """Circular avatar disc with an initial-glyph fallback.
 
     The ring around it belongs to the avatar frame (:func:`frame_overlay` or a
-    hand-drawn asset), so this component draws only the disc. Supersampled so
-    the circle edge survives the page downscale.
+    hand-drawn asset), so this component draws only the disc. An avatar is
+    pasted as its pre-scaled disc; the initial fallback is supersampled so the
+    circle edge survives the page downscale.
 
     Attributes:
         source: Optional avatar image.
@@ -343,40 +344,38 @@ class KasumiAvatarDisc:
         side = min(rect.width, rect.height)
         if side <= 0:
             return
+        position = (
+            rect.x + (rect.width - side) // 2,
+            rect.y + (rect.height - side) // 2,
+        )
+        if self.source is not None:
+            # Avatars arrive as images whose discs are memoized; a path goes
+            # through the render image cache like every other image source.
+            source = self.source
+            if not isinstance(source, Image.Image):
+                source = load_image(ctx, source)
+            alpha_composite_paste(canvas, avatar_disc(source, side), position)
+            return
+
         supersample = 3
         big = side * supersample
         layer = Image.new("RGBA", (big, big), (0, 0, 0, 0))
         draw = ImageDraw.Draw(layer)
-
-        if self.source is not None:
-            art = resize_cover(load_image(ctx, self.source), big, big)
-            mask = Image.new("L", (big, big), 0)
-            ImageDraw.Draw(mask).ellipse((0, 0, big - 1, big - 1), fill=255)
-            layer.paste(art, (0, 0), mask)
-        else:
-            draw.ellipse((0, 0, big - 1, big - 1), fill=normalize_color(self.fill))
-            glyph = (self.initial or "?")[:1]
-            font = load_font(max(8, round(big * 0.46)), CHINESE_FONT)
-            bbox = draw.textbbox((0, 0), glyph, font=font)
-            draw.text(
-                (
-                    (big - (bbox[2] - bbox[0])) // 2 - bbox[0],
-                    (big - (bbox[3] - bbox[1])) // 2 - bbox[1],
-                ),
-                glyph,
-                font=font,
-                fill=normalize_color(self.initial_color),
-            )
-
-        resized = layer.resize((side, side), Image.Resampling.LANCZOS)
-        alpha_composite_paste(
-            canvas,
-            resized,
+        draw.ellipse((0, 0, big - 1, big - 1), fill=normalize_color(self.fill))
+        glyph = (self.initial or "?")[:1]
+        font = load_font(max(8, round(big * 0.46)), CHINESE_FONT)
+        bbox = draw.textbbox((0, 0), glyph, font=font)
+        draw.text(
             (
-                rect.x + (rect.width - side) // 2,
-                rect.y + (rect.height - side) // 2,
+                (big - (bbox[2] - bbox[0])) // 2 - bbox[0],
+                (big - (bbox[3] - bbox[1])) // 2 - bbox[1],
             ),
+            glyph,
+            font=font,
+            fill=normalize_color(self.initial_color),
         )
+        resized = layer.resize((side, side), Image.Resampling.LANCZOS)
+        alpha_composite_paste(canvas, resized, position)
 
 
 def frame_overlay(avatar_size: int) -> Image.Image:
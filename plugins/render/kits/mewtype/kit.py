@@ -10,6 +10,8 @@ from plugins.render.core import Component
 from plugins.render.core import Background
 from plugins.render.color import ColorLike
 from plugins.render.color import rgba
+from plugins.render.discs import DISC_RENDER_RATIO
+from plugins.render.discs import avatar_disc
 from plugins.render.types import ImageFit
 from plugins.render.types import Overflow
 from plugins.render.types import TextAlign
@@ -602,12 +604,12 @@ class MewtypeKit(BaseKit):
                 align_y="center",
             )
         else:
+            # The face sits inside the disc's 5px padding.
             face = self.image(
-                source,
+                avatar_disc(source, (size - 10) * DISC_RENDER_RATIO),
                 width=Fill(),
                 height=Fill(),
                 fit="cover",
-                radius=max(1, size // 2 - 5),
             )
 
         disc: Component = MewtypePanel(
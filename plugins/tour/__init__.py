@@ -6,6 +6,7 @@ that state to NoneBot, the economy and the themed image surfaces.
 
 from __future__ import annotations
 
+from typing import Iterable
 from typing import Optional
 
 from nonebot import require
@@ -53,7 +54,7 @@ from .session import TourSession  # noqa: E402
 from .session import TourGameManager  # noqa: E402
 from .database import init_database  # noqa: E402
 from .messages import Messages  # noqa: E402
-from ..nickname import get as get_nickname  # noqa: E402
+from ..nickname import get_many as get_nicknames  # noqa: E402
 from ..daily_task import check_progress  # noqa: E402
 from ..daily_task import get_today_task  # noqa: E402
 from .render.state import TourRenderData  # noqa: E402
@@ -156,22 +157,34 @@ def _mask_user_id(user_id: str) -> str:
 
 
 def _leaderboard_rows(
-    difficulty: str,
+    difficulties: Iterable[str],
     season_bounds: tuple[int, int],
-) -> list[tuple[str, float]]:
-    records = get_leaderboard(
-        difficulty,
-        limit=10,
-        start_time=season_bounds[0],
-        end_time=season_bounds[1],
-    )
-    return [
-        (
-            get_nickname(record.user_id) or _mask_user_id(record.user_id),
-            record.elapsed_seconds,
+) -> dict[str, list[tuple[str, float]]]:
+    records_by_difficulty = {
+        difficulty: get_leaderboard(
+            difficulty,
+            limit=10,
+            start_time=season_bounds[0],
+            end_time=season_bounds[1],
         )
+        for difficulty in difficulties
+    }
+    # One nickname query for every board on the card.
+    nicknames = get_nicknames(
+        record.user_id
+        for records in records_by_difficulty.values()
         for record in records
-    ]
+    )
+    return {
+        difficulty: [
+            (
+                nicknames.get(record.user_id) or _mask_user_id(record.user_id),
+                record.elapsed_seconds,
+            )
+            for record in records
+        ]
+        for difficulty, records in records_by_difficulty.items()
+    }
 
 
 @leaderboard_cmd.handle()
@@ -185,10 +198,9 @@ async def handle_leaderboard(event: MessageEvent) -> None:
             referrer=pg.event.referrer,
         )
         return
-    rows_by_difficulty = {
-        difficulty: _leaderboard_rows(difficulty, season_bounds)
-        for difficulty in ("初级", "中级", "高级", "超级")
-    }
+    rows_by_difficulty = _leaderboard_rows(
+        ("初级", "中级", "高级", "超级"), season_bounds
+    )
     image = await render_image_segment(
         render_leaderboard,
         rows_by_difficulty,
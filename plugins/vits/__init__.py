@@ -8,6 +8,7 @@ from nonebot import require
 from nonebot import get_driver
 from nonebot import on_command
 from nonebot import get_plugin_config
+from nonebot.log import logger
 from nonebot.params import CommandArg
 from nonebot.adapters.satori import Message
 from nonebot.adapters.satori import MessageEvent
@@ -18,20 +19,25 @@ from utils.error_handler import handle_error
 from utils.error_handler import generate_error_code
 
 require("nonebot_plugin_waiter")
+require("nonebot_plugin_localstore")
 
+import nonebot_plugin_localstore as localstore  # noqa: E402
 from nonebot_plugin_waiter import waiter  # noqa: E402
 
-from utils import encode_with_ntsilk  # noqa: E402
+from utils.matching import NameIndex  # noqa: E402
 from utils.content_safety import ContentSafetyError  # noqa: E402
 from utils.content_safety import ensure_safe_text  # noqa: E402
 from utils.passive_generator import PassiveGenerator as PG  # noqa: E402
 
 from .. import monetary  # noqa: E402
+from .audio import AudioCache  # noqa: E402
 from .utils import speaker_dict  # noqa: E402
 from .utils import match_character  # noqa: E402
 from .utils import call_speaker_api  # noqa: E402
-from .utils import call_synthesize_api  # noqa: E402
 from .config import Config  # noqa: E402
+from .synthesis import Synthesizer  # noqa: E402
+from .synthesis import SynthesisBusy  # noqa: E402
+from .synthesis import SynthesisQueue  # noqa: E402
 
 plugin_config = get_plugin_config(Config)
 
@@ -39,6 +45,19 @@ speakers = None
 
 with open(Path(__file__).parent / "characters.json", "r", encoding="utf-8") as f:
     characters: Dict[str, List[str]] = json.load(f)
+character_index = NameIndex(characters)
+
+synthesizer = Synthesizer(
+    url=plugin_config.bert_vits_api_url + "/synthesize",
+    cache=AudioCache(
+        localstore.get_cache_dir("vits"), plugin_config.vits_cache_mb * 1024 * 1024
+    ),
+    queue=SynthesisQueue(
+        concurrency=plugin_config.vits_concurrency,
+        max_depth=plugin_config.vits_queue_depth,
+        per_user=plugin_config.vits_queue_per_user,
+    ),
+)
 
 
 vits = on_command("tts", priority=10, block=True)
@@ -56,6 +75,19 @@ async def get_available_speakers():
         log_error(generate_error_code(), e, context="vits_speaker_startup")
 
 
+@get_driver().on_shutdown
+async def log_synthesis_metrics():
+    metrics = synthesizer.queue.metrics
+    cache = synthesizer.cache
+    logger.info(
+        f"vits synthesis: submitted={metrics.submitted} joined={metrics.joined} "
+        f"rejected={metrics.rejected} completed={metrics.completed} "
+        f"failed={metrics.failed} max_depth={metrics.max_depth} "
+        f"avg_wait={metrics.wait_seconds / max(1, metrics.completed):.1f}s "
+        f"cache_hits={cache.hits} cache_misses={cache.misses}"
+    )
+
+
 @vits.handle()
 async def handle_vits(event: MessageEvent, arg: Message = CommandArg()):
     global speakers
@@ -90,7 +122,7 @@ async def handle_vits(event: MessageEvent, arg: Message = CommandArg()):
         if args[0] in speakers.values():
             character = args[0]
         else:
-            character = match_character(args[0], characters)
+            character = match_character(args[0], character_index)
 
         if character is None:
             text = args[0]
@@ -100,7 +132,7 @@ async def handle_vits(event: MessageEvent, arg: Message = CommandArg()):
             character = args[0]
             text = args[1]
         else:
-            character = match_character(args[0], characters)
+            character = match_character(args[0], character_index)
             text = args[1]
 
     # 使用 waiter 等待用户输入
@@ -135,7 +167,7 @@ async def handle_vits(event: MessageEvent, arg: Message = CommandArg()):
 
         input_text = resp.get_message().extract_plain_text()
 
-        character = match_character(input_text, characters)
+        character = match_character(input_text, character_index)
 
         if character is None and input_text in speakers.values():
             character = input_text
@@ -191,17 +223,23 @@ async def handle_vits(event: MessageEvent, arg: Message = CommandArg()):
     refund_key = f"vits_refund:{uuid.uuid4().hex}"
     monetary.cost(user_id, required_amount, "vits")
     try:
-        response = await call_synthesize_api(
-            text=text,
-            speaker_id=speaker_id,
-            url=plugin_config.bert_vits_api_url + "/synthesize",
-        )
-        encoded = await encode_with_ntsilk(response, "wav", "ntsilk")
+        encoded = await synthesizer.silk(user_id, text, speaker_id)
         await vits.send(
             MessageSegment.audio(raw=encoded, mime="audio/silk")
             + passive_generator.element,
             referrer=passive_generator.event.referrer,
         )
+    except SynthesisBusy:
+        monetary.add(
+            user_id,
+            required_amount,
+            "vits_error",
+            idempotency_key=refund_key,
+        )
+        await vits.finish(
+            "现在排队合成语音的人太多了，待会再来试试吧~" + passive_generator.element,
+            referrer=passive_generator.event.referrer,
+        )
     except Exception as e:
         monetary.add(
             user_id,
@@ -0,0 +1,154 @@
+"""Content-keyed disk cache of synthesized speech.
+
+Every ``/tts`` request went to the Bert-VITS server and through NTSilk again,
+even when a phrase had been synthesized with the same speaker minutes before
+in another group. :class:`AudioCache` stores each result under
+:func:`audio_key`, a hash of everything that determines the audio (text,
+speaker and synthesis parameters), with one file per encoded variant
+(``wav`` from the server, ``silk`` as sent, ...).
+
+The cache is bounded by total bytes. Reads bump a file's mtime, and a write
+that takes the total past the budget removes the least recently used files
+first. The size index is built from one directory walk on first use, so the
+budget holds across restarts.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any
+from pathlib import Path
+
+from nonebot.log import logger
+
+#: Bump when the server's model or the encoder changes output for the same
+#: request, so old audio stops matching.
+AUDIO_VERSION = 1
+
+
+def audio_key(text: str, speaker_id: int | str, **params: Any) -> str:
+    """Content key for one synthesis request."""
+
+    payload = json.dumps(
+        {
+            "version": AUDIO_VERSION,
+            "text": text,
+            "speaker_id": str(speaker_id),
+            "params": params,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        #: path -> (size, last use); ``None`` until the first walk.
+        self._index: dict[Path, tuple[int, float]] | None = None
+        self._total = 0
+
+    def get(self, key: str, variant: str, *, count: bool = True) -> bytes | None:
+        """The cached ``variant`` (a file suffix) of ``key``, if present.
+
+        ``count=False`` leaves :attr:`hits` and :attr:`misses` alone, for a
+        follow-up lookup within a request that was already counted.
+        Blocking; call it off the event loop.
+        """
+
+        path = self._path(key, variant)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            if count:
+                self.misses += 1
+            return None
+        if count:
+            self.hits += 1
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            index = self._load_index()
+            if path not in index:
+                self._total += len(data)
+            index[path] = (len(data), now)
+        return data
+
+    def put(self, key: str, variant: str, data: bytes) -> None:
+        """Store ``data`` and evict old entries past the budget; never raises.
+
+        Blocking; call it off the event loop.
+        """
+
+        path = self._path(key, variant)
+        temporary = path.with_name(path.name + ".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary.write_bytes(data)
+            os.replace(temporary, path)
+        except OSError as exc:
+            logger.warning(f"vits audio cache {path.name} not saved: {exc}")
+            return
+        with self._lock:
+            index = self._load_index()
+            previous = index.get(path)
+            if previous is not None:
+                self._total -= previous[0]
+            index[path] = (len(data), time.time())
+            self._total += len(data)
+            self._evict(index, keep=path)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            self._load_index()
+            return self._total
+
+    def _evict(self, index: dict[Path, tuple[int, float]], keep: Path) -> None:
+        if self._total <= self.max_bytes:
+            return
+        by_age = sorted(index.items(), key=lambda item: item[1][1])
+        for path, (size, _) in by_age:
+            if self._total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                logger.warning(f"vits audio cache {path.name} not evicted: {exc}")
+                continue
+            del index[path]
+            self._total -= size
+
+    def _load_index(self) -> dict[Path, tuple[int, float]]:
+        if self._index is None:
+            self._index = {}
+            self._total = 0
+            for directory, _, files in os.walk(self.root):
+                for filename in files:
+                    if filename.endswith(".tmp"):
+                        continue
+                    path = Path(directory) / filename
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    self._index[path] = (stat.st_size, stat.st_mtime)
+                    self._total += stat.st_size
+        return self._index
+
+    def _path(self, key: str, variant: str) -> Path:
+        return self.root / key[:2] / f"{key}.{variant}"
@@ -5,3 +5,7 @@ from pydantic import BaseModel
 
 class Config(BaseModel):
     bert_vits_api_url: Optional[str] = "http://127.0.0.1:4371"
+    vits_cache_mb: int = 256
+    vits_concurrency: int = 1
+    vits_queue_depth: int = 16
+    vits_queue_per_user: int = 2
@@ -0,0 +1,193 @@
+"""Bounded, per-user fair queue in front of the Bert-VITS server.
+
+``/tts`` called the synthesis server as soon as a request arrived, so a burst
+of requests ran at once on a box without a GPU. :class:`SynthesisQueue` runs
+at most ``concurrency`` jobs at a time and queues the rest:
+
+- the next job comes from the waiting user served least recently, so one
+  user's requests cannot starve everyone else;
+- a user may have at most ``per_user`` jobs waiting or running, and the queue
+  as a whole at most ``max_depth``; past either limit :meth:`submit` raises
+  :class:`SynthesisBusy` instead of queuing;
+- a job whose key is already queued or running joins that job instead of
+  running twice.
+
+:class:`QueueMetrics` counts what went through, including the deepest the
+queue got and the total time jobs spent waiting. :class:`Synthesizer` puts
+the queue behind the :class:`~plugins.vits.audio.AudioCache`, so only
+requests the cache cannot answer wait for a turn.
+"""
+
+import time
+import asyncio
+from typing import Callable
+from typing import Awaitable
+from collections import deque
+from dataclasses import field
+from dataclasses import dataclass
+
+from utils import encode_with_ntsilk
+
+from .audio import AudioCache
+from .audio import audio_key
+from .utils import call_synthesize_api
+
+
+class SynthesisBusy(RuntimeError):
+    """The queue, or the user's share of it, is full."""
+
+
+@dataclass
+class QueueMetrics:
+    submitted: int = 0
+    #: Submissions that joined an identical queued or running job.
+    joined: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+    #: Deepest the queue got, counting running jobs.
+    max_depth: int = 0
+    #: Seconds jobs spent queued before they started, summed.
+    wait_seconds: float = 0.0
+
+
+@dataclass
+class _Job:
+    key: str
+    user_id: str
+    run: Callable[[], Awaitable[bytes]]
+    future: asyncio.Future
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class SynthesisQueue:
+    def __init__(
+        self, *, concurrency: int = 1, max_depth: int = 16, per_user: int = 2
+    ) -> None:
+        self.concurrency = concurrency
+        self.max_depth = max_depth
+        self.per_user = per_user
+        self.metrics = QueueMetrics()
+        self._waiting: dict[str, deque[_Job]] = {}
+        self._jobs: dict[str, _Job] = {}
+        #: Turn number of each user's latest start.
+        self._last_turn: dict[str, int] = {}
+        self._turns = 0
+        self._tasks: set[asyncio.Task] = set()
+        self._running = 0
+
+    @property
+    def depth(self) -> int:
+        """Jobs waiting or running."""
+
+        return len(self._jobs)
+
+    async def submit(
+        self, user_id: str, key: str, run: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        """Run ``run()`` when its turn comes and return its result.
+
+        Raises:
+            SynthesisBusy: The queue or the user's share of it is full.
+        """
+
+        self.metrics.submitted += 1
+        job = self._jobs.get(key)
+        if job is not None:
+            self.metrics.joined += 1
+            return await asyncio.shield(job.future)
+
+        if (
+            len(self._jobs) >= self.max_depth
+            or self._user_depth(user_id) >= self.per_user
+        ):
+            self.metrics.rejected += 1
+            raise SynthesisBusy(f"synthesis queue full ({len(self._jobs)} jobs)")
+
+        job = _Job(key, user_id, run, asyncio.get_running_loop().create_future())
+        self._jobs[key] = job
+        self._waiting.setdefault(user_id, deque()).append(job)
+        self.metrics.max_depth = max(self.metrics.max_depth, len(self._jobs))
+        self._dispatch()
+        return await asyncio.shield(job.future)
+
+    def _user_depth(self, user_id: str) -> int:
+        return sum(1 for job in self._jobs.values() if job.user_id == user_id)
+
+    def _dispatch(self) -> None:
+        while self._running < self.concurrency and self._waiting:
+            # Users not served yet sort first, in the order they arrived.
+            user_id = min(
+                self._waiting, key=lambda user: self._last_turn.get(user, -1)
+            )
+            jobs = self._waiting[user_id]
+            job = jobs.popleft()
+            if not jobs:
+                del self._waiting[user_id]
+            self._turns += 1
+            self._last_turn[user_id] = self._turns
+            self._running += 1
+            self.metrics.wait_seconds += time.perf_counter() - job.queued_at
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: _Job) -> None:
+        try:
+            result = await job.run()
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as exc:
+            self.metrics.failed += 1
+            if not job.future.done():
+                job.future.set_exception(exc)
+        else:
+            self.metrics.completed += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._running -= 1
+            del self._jobs[job.key]
+            self._dispatch()
+
+
+class Synthesizer:
+    def __init__(
+        self,
+        url: str,
+        cache: AudioCache,
+        queue: SynthesisQueue,
+        encode: Callable[[bytes, str, str], Awaitable[bytes]] = encode_with_ntsilk,
+    ) -> None:
+        self.url = url
+        self.cache = cache
+        self.queue = queue
+        self.encode = encode
+
+    async def silk(self, user_id: str, text: str, speaker_id: int | str) -> bytes:
+        """Speech for ``text`` as SILK, synthesized only on a cache miss.
+
+        Raises:
+            SynthesisBusy: The request would have had to queue and cannot.
+        """
+
+        key = audio_key(text, speaker_id)
+        cached = await asyncio.to_thread(self.cache.get, key, "silk")
+        if cached is not None:
+            return cached
+        return await self.queue.submit(
+            user_id, key, lambda: self._synthesize(key, text, speaker_id)
+        )
+
+    async def _synthesize(self, key: str, text: str, speaker_id: int | str) -> bytes:
+        # The request was counted by its SILK lookup in silk().
+        wav = await asyncio.to_thread(self.cache.get, key, "wav", count=False)
+        if wav is None:
+            wav = await call_synthesize_api(
+                text=text, speaker_id=speaker_id, url=self.url
+            )
+            await asyncio.to_thread(self.cache.put, key, "wav", wav)
+        silk = await self.encode(wav, "wav", "ntsilk")
+        await asyncio.to_thread(self.cache.put, key, "silk", silk)
+        return silk
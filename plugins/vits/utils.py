@@ -1,8 +1,10 @@
 from typing import Dict
 from typing import List
+from typing import Union
 from typing import Optional
 
-import aiohttp
+from utils.http import http_client
+from utils.matching import NameIndex
 
 
 async def call_synthesize_api(
@@ -50,12 +52,11 @@ async def call_synthesize_api(
         "style_weight": style_weight,
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=input_data) as response:
-            if response.status == 200:
-                return await response.read()
-            else:
-                response.raise_for_status()
+    async with http_client.request("POST", url, json=input_data) as response:
+        if response.status == 200:
+            return await response.read()
+        else:
+            response.raise_for_status()
 
 
 async def call_speaker_api(
@@ -73,29 +74,30 @@ async def call_speaker_api(
         Dict[str, str]: 说话人列表，或者在请求失败时返回错误信息.
     """
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                response.raise_for_status()
+    async with http_client.request("GET", url) as response:
+        if response.status == 200:
+            return await response.json()
+        else:
+            response.raise_for_status()
 
 
-def match_character(string: str, characters: Dict[str, List[str]]) -> Optional[str]:
-    """匹配角色
+def match_character(
+    string: str, characters: Union[NameIndex, Dict[str, List[str]]]
+) -> Optional[str]:
+    """匹配角色（忽略大小写）
 
     Args:
         string (str): 要匹配的字符串.
-        characters (Dict[str, List[str]]): 角色名列表.
+        characters (Union[NameIndex, Dict[str, List[str]]]): 角色名列表，
+            或预先编译好的 `NameIndex`（每条消息都要匹配时传这个）.
 
     Returns:
         Optional[str]: 匹配到的角色名，或者匹配失败时返回 None.
     """
 
-    for name, aliases in characters.items():
-        if string in aliases:
-            return name
-    return None
+    if not isinstance(characters, NameIndex):
+        characters = NameIndex(characters)
+    return characters.exact_match(string)
 
 
 speaker_dict = {
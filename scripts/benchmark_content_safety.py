@@ -0,0 +1,96 @@
+"""Compare the Aho–Corasick text policy with per-term substring scans.
+
+Runs both matchers over the vendored lexicon and the same generated texts:
+short nicknames, profile-description-sized strings, and a bulk purge of many
+nicknames. The two must agree on every text; the script exits non-zero if
+they do not.
+
+Examples:
+    python scripts/benchmark_content_safety.py
+    python scripts/benchmark_content_safety.py --texts 50000 --length 200
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from utils.content_safety import SensitiveTextPolicy  # noqa: E402
+from utils.content_safety import normalize_text  # noqa: E402
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789今天一起玩邦邦吧户山香澄星之鼓动"
+
+
+def _naive_contains(terms: frozenset[str], text: str) -> bool:
+    normalized = normalize_text(text)
+    return bool(normalized) and any(term in normalized for term in terms)
+
+
+def _texts(rng: random.Random, count: int, length: int, terms: list[str]) -> list[str]:
+    texts = []
+    for index in range(count):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, length)))
+        if index % 50 == 0:
+            cut = rng.randint(0, len(text))
+            text = text[:cut] + rng.choice(terms) + text[cut:]
+        texts.append(text)
+    return texts
+
+
+def _time(label: str, func, texts: list[str]) -> tuple[float, list[bool]]:
+    start = time.perf_counter()
+    results = [func(text) for text in texts]
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<14}{elapsed * 1000:10.1f} ms  ({len(texts)} texts)")
+    return elapsed, results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="敏感词匹配性能对比")
+    parser.add_argument("--texts", type=int, default=20000, help="每组文本数量")
+    parser.add_argument("--length", type=int, default=120, help="长文本最大长度")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    build_start = time.perf_counter()
+    SensitiveTextPolicy.default.cache_clear()
+    policy = SensitiveTextPolicy.default()
+    build_ms = (time.perf_counter() - build_start) * 1000
+    print(f"lexicon: {len(policy.terms)} terms, load + compile {build_ms:.1f} ms")
+
+    rng = random.Random(args.seed)
+    terms = sorted(policy.terms)
+    groups = {
+        "nicknames": _texts(rng, args.texts, 12, terms),
+        "descriptions": _texts(rng, args.texts, args.length, terms),
+    }
+    mismatches = 0
+    for name, texts in groups.items():
+        print(f"{name}:")
+        naive, expected = _time(
+            "per-term", lambda text: _naive_contains(policy.terms, text), texts
+        )
+        automaton, actual = _time("aho-corasick", policy.contains, texts)
+        print(f"  speedup       {naive / automaton:10.1f}x")
+        mismatches += sum(a != b for a, b in zip(expected, actual))
+
+    entries = list(enumerate(groups["nicknames"]))
+    start = time.perf_counter()
+    flagged = list(policy.scan(entries))
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"bulk scan: {len(flagged)}/{len(entries)} flagged in {elapsed:.1f} ms")
+
+    if mismatches:
+        print(f"MISMATCH: {mismatches} texts disagree", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
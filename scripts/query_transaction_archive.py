@@ -0,0 +1,66 @@
+"""Query the archived monetary transaction log without starting the bot.
+
+The monetary plugin moves transactions past its retention window into
+``<data>/monetary/transaction_archive/transactions-YYYY-MM.*.jsonl.gz`` (see
+``plugins/monetary/archive_service.py``). This script filters those files with
+the plugin's own reader.
+
+Examples:
+    python scripts/query_transaction_archive.py DATA_DIR --user 12345
+    python scripts/query_transaction_archive.py DATA_DIR --since 2026-01-01 \
+        --until 2026-02-01 --description daily --limit 50
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+import nonebot
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# The plugin modules call ``require``, which needs an initialised (not
+# running) NoneBot.
+nonebot.init()
+
+from utils.clock import BOT_TZ  # noqa: E402
+from plugins.monetary.archive_service import iter_archived_transactions  # noqa: E402
+
+
+def _parse_date(value: str) -> int:
+    return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=BOT_TZ).timestamp())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="查询已归档的货币交易记录")
+    parser.add_argument("archive_dir", type=Path, help="transaction_archive 目录")
+    parser.add_argument("--user", help="只显示该用户的记录")
+    parser.add_argument("--description", help="只显示该描述的记录")
+    parser.add_argument("--since", help="起始日期（含），格式 YYYY-MM-DD，UTC+8")
+    parser.add_argument("--until", help="结束日期（不含），格式 YYYY-MM-DD，UTC+8")
+    parser.add_argument("--limit", type=int, default=0, help="最多输出多少条")
+    args = parser.parse_args()
+
+    records = iter_archived_transactions(
+        user_id=args.user,
+        description=args.description,
+        start_time=_parse_date(args.since) if args.since else None,
+        end_time=_parse_date(args.until) if args.until else None,
+        archive_dir=args.archive_dir,
+    )
+    for printed, record in enumerate(records, start=1):
+        when = datetime.fromtimestamp(record["time"], tz=BOT_TZ)
+        print(
+            f"{record['id']}\t{when:%Y-%m-%d %H:%M:%S}\t{record['user_id']}"
+            f"\t{record['category']}\t{record['amount']}\t{record['description']}"
+        )
+        if args.limit and printed >= args.limit:
+            break
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
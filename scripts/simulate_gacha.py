@@ -0,0 +1,97 @@
+"""Simulate a season's gacha banner without starting the bot.
+
+Builds each banner from ``plugins/inventory/seasons.json`` with the same code
+the bot uses, then runs ``plugins/gacha/simulator.py`` over it and prints the
+effective rarity rates, pulls until the first featured ★6, and what those
+pulls cost in stickers. Only the configured entries are used; cached Bestdori
+cards change which 2–4★ art drops, not the rates.
+
+Examples:
+    python scripts/simulate_gacha.py
+    python scripts/simulate_gacha.py --season 2026-s01 --players 1000000 --seed 7
+    python scripts/simulate_gacha.py --pity 60 --pulls 90
+"""
+
+import sys
+import json
+import types
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SEASONS_PATH = ROOT / "plugins" / "inventory" / "seasons.json"
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import nonebot  # noqa: E402
+
+
+def _load_gacha_modules():
+    # Import the service and simulator without running the plugin packages'
+    # ``__init__`` (command registration, startup hooks).
+    nonebot.init()
+    for name in ("plugins", "plugins.gacha"):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [str(ROOT.joinpath(*name.split(".")))]
+            sys.modules[name] = package
+    from plugins.gacha import service
+    from plugins.gacha import simulator
+
+    return service, simulator
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="模拟赛季限定卡池的抽卡结果")
+    parser.add_argument("--season", help="只模拟该赛季（season_key）")
+    parser.add_argument("--players", type=int, default=100_000, help="模拟玩家数")
+    parser.add_argument("--pulls", type=int, help="每名玩家抽卡次数，默认 4 个硬保底")
+    parser.add_argument("--pity", type=int, default=0, help="起始保底计数")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    args = parser.parse_args()
+
+    service, simulator = _load_gacha_modules()
+    with open(SEASONS_PATH, "r", encoding="utf-8") as f:
+        seasons = json.load(f).get("seasons", [])
+
+    found = False
+    for season in seasons:
+        config = season.get("gacha_banner")
+        if not config or (args.season and season["season_key"] != args.season):
+            continue
+        found = True
+        banner = service.banner_from_config(season["season_key"], season["name"], config)
+        report = simulator.simulate(
+            banner,
+            players=args.players,
+            pulls=args.pulls,
+            starting_pity=args.pity,
+            seed=args.seed,
+        )
+        print(f"{banner.season_key}\t{banner.name}")
+        print(
+            f"  {report.players} players x {report.pulls_per_player} pulls, "
+            f"starting pity {report.starting_pity}"
+        )
+        for rarity, rate in report.rates.items():
+            configured = banner.base_rates.get(rarity, 0.0)
+            print(f"  ★{rarity}\t{rate:.4%}\t(configured {configured:.2%})")
+        print(
+            f"  featured ★6: {report.featured_share:.2%} of players, "
+            f"mean {report.featured_mean:.1f} pulls"
+        )
+        for percentile, pulls in report.featured_percentiles.items():
+            print(
+                f"  p{percentile}\t{pulls} pulls\t"
+                f"{report.single_cost_percentiles[percentile]} stickers (single)\t"
+                f"{report.ten_cost_percentiles[percentile]} stickers (ten-pull)"
+            )
+    if not found:
+        print("no matching gacha banner", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
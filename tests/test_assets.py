@@ -0,0 +1,72 @@
+import os
+
+from utils.assets import AssetManifest
+
+
+def _counting_verifier(calls):
+    def verify(path):
+        calls.append(path.name)
+        return path.read_bytes().startswith(b"PNG")
+
+    return verify
+
+
+def test_unchanged_files_are_trusted_after_a_restart(tmp_path):
+    root = tmp_path / "cards"
+    root.mkdir()
+    (root / "a.png").write_bytes(b"PNG a")
+    (root / "b.png").write_bytes(b"<html>")
+    manifest_path = tmp_path / "assets.json"
+    calls = []
+
+    manifest = AssetManifest(root, manifest_path)
+    first = manifest.scan(".png", _counting_verifier(calls))
+    manifest.save()
+    assert first.valid == {"a.png"}
+    assert [path.name for path in first.invalid] == ["b.png"]
+    assert sorted(calls) == ["a.png", "b.png"]
+    calls.clear()
+
+    restarted = AssetManifest(root, manifest_path)
+    scan = restarted.scan(".png", _counting_verifier(calls))
+    assert calls == []
+    assert scan.valid == {"a.png"}
+    assert scan.missing(["a.png", "b.png", "c.png"]) == ["b.png", "c.png"]
+
+
+def test_changed_files_are_verified_again_unless_the_content_is_identical(tmp_path):
+    root = tmp_path / "cards"
+    root.mkdir()
+    path = root / "a.png"
+    path.write_bytes(b"PNG a")
+    manifest_path = tmp_path / "assets.json"
+    manifest = AssetManifest(root, manifest_path)
+    manifest.scan(".png", _counting_verifier([]))
+    manifest.save()
+
+    # Same bytes, new mtime (a re-download): trusted by hash.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    calls = []
+    manifest = AssetManifest(root, manifest_path)
+    assert manifest.is_valid(path, _counting_verifier(calls))
+    assert calls == []
+
+    # Different bytes: verified again.
+    path.write_bytes(b"<html> truncated")
+    assert not manifest.is_valid(path, _counting_verifier(calls))
+    assert calls == ["a.png"]
+
+
+def test_scan_forgets_deleted_files(tmp_path):
+    root = tmp_path / "cards"
+    (root / "res001").mkdir(parents=True)
+    path = root / "res001" / "a.png"
+    path.write_bytes(b"PNG a")
+    manifest = AssetManifest(root, tmp_path / "assets.json")
+    manifest.scan(".png", _counting_verifier([]))
+    assert set(manifest.records) == {"res001/a.png"}
+
+    path.unlink()
+    assert manifest.scan(".png", _counting_verifier([])).valid == set()
+    assert manifest.records == {}
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+
+class FakeProcess:
+    def __init__(self, stdout=b"", returncode=0, hang=False):
+        self.stdout = stdout
+        self.returncode = returncode
+        self.hang = hang
+        self.killed = False
+
+    async def communicate(self, input=None):
+        if self.hang and not self.killed:
+            await asyncio.sleep(3600)
+        return self.stdout, b""
+
+    def kill(self):
+        self.killed = True
+        self.returncode = -9
+
+
+@pytest.mark.asyncio
+async def test_transcode_decodes_once_and_pipes_pcm_to_every_encoder(monkeypatch):
+    from utils import audio
+
+    calls = []
+
+    async def create_process(*args, **kwargs):
+        calls.append(args)
+        assert kwargs["stdin"] == asyncio.subprocess.PIPE
+        if args[0] == audio.SILK_ENCODER:
+            # The SILK CLI writes to the named pipe given after ``-o``.
+            output = args[args.index("-o") + 1]
+            with open(output, "wb") as fifo:
+                fifo.write(b"#!SILK_V3")
+            return FakeProcess()
+        if "pipe:0" in args and args[args.index("-i") - 1] == "wav":
+            return FakeProcess(stdout=b"PCM")
+        return FakeProcess(stdout=b"MP3")
+
+    monkeypatch.setattr(audio.asyncio, "create_subprocess_exec", create_process)
+    monkeypatch.setattr(audio, "metrics", {})
+
+    result = await audio.transcode(b"RIFF", "wav", ["silk", "mp3", "pcm"])
+
+    assert result == {"silk": b"#!SILK_V3", "mp3": b"MP3", "pcm": b"PCM"}
+    assert [call[0] for call in calls].count(audio.FFMPEG) == 2
+    silk_call = next(call for call in calls if call[0] == audio.SILK_ENCODER)
+    assert "/dev/stdin" in silk_call
+    runs = {stage: stage_metrics.runs for stage, stage_metrics in audio.metrics.items()}
+    assert runs == {"decode": 1, "mp3": 1, "silk": 1}
+
+
+@pytest.mark.asyncio
+async def test_transcode_kills_stuck_encoders_and_reports_failures(monkeypatch):
+    from utils import audio
+
+    processes = []
+
+    async def create_process(*args, **kwargs):
+        processes.append(FakeProcess(hang=args[0] == audio.SILK_ENCODER))
+        if args[0] == audio.FFMPEG:
+            processes[-1].stdout = b"PCM"
+        return processes[-1]
+
+    monkeypatch.setattr(audio.asyncio, "create_subprocess_exec", create_process)
+    monkeypatch.setattr(audio, "metrics", {})
+    monkeypatch.setattr(audio, "TRANSCODE_TIMEOUT_SECONDS", 0.05)
+
+    with pytest.raises(RuntimeError, match="silk timed out"):
+        await audio.transcode(b"RIFF", "wav", ["silk"])
+    assert processes[-1].killed
+    assert audio.metrics["silk"].failures == 1
+
+    async def failing_process(*args, **kwargs):
+        return FakeProcess(returncode=1)
+
+    monkeypatch.setattr(audio.asyncio, "create_subprocess_exec", failing_process)
+    with pytest.raises(RuntimeError, match="exit code 1"):
+        await audio.transcode(b"RIFF", "wav", ["mp3"])
+    with pytest.raises(ValueError):
+        await audio.transcode(b"RIFF", "wav", ["ogg"])
+
+
+@pytest.mark.asyncio
+async def test_silk_goes_through_temporary_files_without_named_pipes(monkeypatch):
+    from utils import audio
+
+    calls = []
+
+    async def create_process(*args, **kwargs):
+        calls.append(args)
+        with open(args[args.index("-i") + 1], "rb") as source:
+            assert source.read() == b"PCM"
+        with open(args[args.index("-o") + 1], "wb") as output:
+            output.write(b"#!SILK_V3")
+        return FakeProcess()
+
+    monkeypatch.delattr(audio.os, "mkfifo", raising=False)
+    monkeypatch.setattr(audio.asyncio, "create_subprocess_exec", create_process)
+    monkeypatch.setattr(audio, "metrics", {})
+
+    assert await audio.pcm_to_silk(b"PCM") == b"#!SILK_V3"
+    assert "/dev/stdin" not in calls[0]
+    assert audio.metrics["silk"].runs == 1
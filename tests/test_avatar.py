@@ -1,5 +1,7 @@
 import io
+import os
 import sys
+import time
 import asyncio
 import unittest
 from pathlib import Path
@@ -10,6 +12,7 @@ from PIL import Image
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from utils import avatar
+from plugins.render.discs import avatar_disc
 
 
 def _png_bytes(color: tuple[int, int, int, int]) -> bytes:
@@ -22,10 +25,11 @@ PENGUIN = _png_bytes((10, 10, 10, 255))
 REAL = _png_bytes((200, 60, 60, 255))
 
 
-class AvatarFallbackTest(unittest.TestCase):
+class _AvatarCacheTest(unittest.TestCase):
     def setUp(self) -> None:
         avatar._memory.clear()
         avatar._negative.clear()
+        avatar._revalidate_after.clear()
         avatar._default_fingerprints = None
         self._tmp = Path(
             "/tmp/claude-avatar-test"
@@ -53,6 +57,8 @@ class AvatarFallbackTest(unittest.TestCase):
         with mock.patch.object(avatar, "_download", side_effect=fake_download):
             return asyncio.run(avatar.get_avatar(user_id))
 
+
+class AvatarFallbackTest(_AvatarCacheTest):
     def test_stock_penguin_counts_as_no_avatar(self) -> None:
         # q.qlogo.cn answers unknown uids with HTTP 200 + the stock penguin;
         # the initial badge beats a generic penguin, so it must become None.
@@ -85,5 +91,86 @@ class AvatarFallbackTest(unittest.TestCase):
             self.assertIsNone(asyncio.run(avatar.get_avatar("42")))
 
 
+class AvatarConcurrencyTest(_AvatarCacheTest):
+    def test_concurrent_callers_share_one_download_per_user(self) -> None:
+        calls: list[str] = []
+        active = 0
+        peak = 0
+
+        async def slow_download(app_id: str, uid: str):
+            nonlocal active, peak
+            calls.append(uid)
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return PENGUIN if uid == avatar._SENTINEL_UID else REAL
+
+        async def leaderboard():
+            return await asyncio.gather(
+                *(avatar.get_avatar(uid) for uid in ["1", "2", "3", "1", "2", "3"])
+            )
+
+        with mock.patch.object(avatar, "_download", side_effect=slow_download):
+            results = asyncio.run(leaderboard())
+
+        self.assertTrue(all(result is not None for result in results))
+        self.assertEqual(sorted(calls), [avatar._SENTINEL_UID, "1", "2", "3"])
+        self.assertGreater(peak, 1)
+
+    def test_stale_disk_avatar_is_served_then_refreshed(self) -> None:
+        stale_path = self._tmp / "42.png"
+        Image.new("RGBA", (8, 8), (1, 2, 3, 255)).save(stale_path)
+        old = time.time() - avatar._DISK_TTL_SECONDS - 60
+        os.utime(stale_path, (old, old))
+
+        async def fake_download(app_id: str, uid: str):
+            return PENGUIN if uid == avatar._SENTINEL_UID else REAL
+
+        async def fetch_then_settle():
+            first = await avatar.get_avatar("42")
+            await asyncio.gather(*avatar._inflight.values())
+            return first
+
+        with mock.patch.object(avatar, "_download", side_effect=fake_download):
+            first = asyncio.run(fetch_then_settle())
+
+        self.assertEqual(first.getpixel((0, 0)), (1, 2, 3, 255))
+        refreshed, _ = avatar._memory.get("42")
+        self.assertEqual(refreshed.getpixel((0, 0)), (200, 60, 60, 255))
+        self.assertGreater(stale_path.stat().st_mtime, old)
+
+    def test_fetch_persists_discs_that_a_restart_reuses(self) -> None:
+        self._run({avatar._SENTINEL_UID: PENGUIN, "42": REAL}, "42")
+        self.assertTrue((self._tmp / "42.discs.png").exists())
+
+        # A restart: memory is empty, the PNG and its discs are on disk.
+        avatar._memory.clear()
+        with mock.patch.object(avatar, "circle_disc", side_effect=AssertionError):
+            result = self._run({}, "42")
+
+        disc = avatar_disc(result, 104)
+        self.assertEqual(disc.size, (104, 104))
+        self.assertEqual(disc.getpixel((52, 52)), (200, 60, 60, 255))
+        self.assertEqual(disc.getpixel((0, 0))[3], 0)
+
+
+class AvatarLRUTest(unittest.TestCase):
+    def test_evicts_least_recently_used_by_decoded_bytes(self) -> None:
+        tile = Image.new("RGBA", (8, 8))
+        lru = avatar._AvatarLRU(max_bytes=3 * 8 * 8 * 4)
+        for uid in ["a", "b", "c"]:
+            lru.put(uid, tile, 0.0)
+        lru.get("a")
+        lru.put("d", tile, 0.0)
+
+        self.assertNotIn("b", lru)
+        self.assertEqual(len(lru), 3)
+        self.assertEqual(lru.bytes, 3 * 8 * 8 * 4)
+
+        lru.put("huge", Image.new("RGBA", (64, 64)), 0.0)
+        self.assertNotIn("huge", lru)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -6,6 +6,7 @@ file-cache invariants must remain stable without a live Bestdori request.
 """
 
 from pathlib import Path
+from contextlib import asynccontextmanager
 
 from plugins.gacha.standing_art import StandingArtCache
 from plugins.gacha.standing_art import _cards_from_summary
@@ -84,3 +85,43 @@ def test_boot_check_rejects_a_corrupt_cached_png(tmp_path: Path) -> None:
 
     assert cache.cache_status() == (4, 1)
     assert [card.variant for card in cache.pool_cards()] == ["after_training"]
+
+
+async def test_draws_save_the_asset_manifest_off_the_event_loop(tmp_path: Path) -> None:
+    cache = StandingArtCache(tmp_path)
+    cache.cards = _cards_from_summary(_summary())
+    cache.art_dir.mkdir()
+    (cache.art_dir / "42_normal.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+
+    assert len(cache.pool_cards()) == 1
+    assert not cache.assets.path.exists()
+
+    await cache._save_task
+    assert cache.assets.path.exists()
+
+
+async def test_a_download_batch_bumps_the_generation_once(tmp_path: Path) -> None:
+    cache = StandingArtCache(tmp_path)
+    cache.cards = _cards_from_summary(_summary())
+    cache.art_dir.mkdir()
+    fetched = []
+
+    class Response:
+        status = 200
+
+        async def read(self) -> bytes:
+            return b"\x89PNG\r\n\x1a\nart"
+
+    @asynccontextmanager
+    async def get(url: str):
+        fetched.append(url)
+        yield Response()
+
+    cache._get = get
+    generation = cache.generation
+
+    await cache._download_missing(cache.cards)
+
+    assert len(fetched) == 4
+    assert cache.generation == generation + 1
+    assert len(cache.pool_cards()) == 3
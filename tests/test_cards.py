@@ -378,7 +378,7 @@ class IdentityHelperTest(unittest.TestCase):
         # the attribute is bound on the package).
         with mock.patch.dict(sys.modules, {"plugins.nickname": None}):
             with mock.patch.object(
-                monetary, "get_level", side_effect=RuntimeError("db down")
+                monetary, "get_levels", side_effect=RuntimeError("db down")
             ):
                 identity = identity_module.identity_for("1234567890")
         self.assertTrue(identity.nickname)
@@ -4,6 +4,7 @@ import pytest
 
 from utils.content_safety import ContentSafetyError
 from utils.content_safety import SensitiveTextPolicy
+from utils.content_safety import normalize_text
 from utils.content_safety import ensure_safe_text
 from utils.content_safety import safe_display_text
 
@@ -59,3 +60,24 @@ def test_startup_nickname_cleanup_removes_only_policy_matches(sqlite_session) ->
     assert removed == 1
     assert nickname_data.get("unsafe") is None
     assert nickname_data.get("safe") == "Kasumi"
+
+
+def test_automaton_agrees_with_plain_substring_matching() -> None:
+    terms = ("he", "she", "his", "hers", "abcd", "bc", "违规词")
+    policy = SensitiveTextPolicy.from_terms(terms)
+    samples = ("ushers", "abce", "abd", "hi", "这是违规词吗", "违规", "", "A-B-C-D")
+
+    for sample in samples:
+        normalized = normalize_text(sample)
+        expected = bool(normalized) and any(term in normalized for term in terms)
+        assert policy.contains(sample) is expected, sample
+
+
+def test_scan_yields_keys_of_matching_texts_only() -> None:
+    policy = SensitiveTextPolicy.from_terms(("blocked",))
+
+    entries = [("a", "Kasumi"), ("b", "BLOCKED!"), ("c", None), ("d", "b-locked")]
+
+    unsafe = list(policy.scan(entries))
+
+    assert unsafe == ["b", "d"]
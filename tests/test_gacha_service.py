@@ -1,5 +1,6 @@
 import copy
 import unittest
+from dataclasses import replace
 from unittest.mock import patch
 
 from sqlalchemy import create_engine
@@ -105,6 +106,31 @@ class GachaServiceTest(unittest.TestCase):
         self.assertEqual(self.gacha_session.query(GachaPull).count(), 7)
         self.assertEqual(get_quantity("u1", STAR_STICKER_ITEM_ID), 360)
 
+    def test_ten_pull_failure_in_a_nested_unit_keeps_its_own_error(self) -> None:
+        from plugins.inventory.service import batch
+
+        grant_item("u1", STAR_STICKER_ITEM_ID, 1200, "test")
+        original_pull_once = gacha_service._pull_once
+        calls = 0
+
+        def fail_on_eighth(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            if calls == 8:
+                with batch("u1"):
+                    raise RuntimeError("simulated grant failure")
+            return original_pull_once(*args, **kwargs)
+
+        with patch("plugins.gacha.service.random.random", return_value=0.99):
+            with patch(
+                "plugins.gacha.service._pull_once", side_effect=fail_on_eighth
+            ):
+                with self.assertRaisesRegex(RuntimeError, "simulated grant failure"):
+                    pull("u1", 10)
+
+        self.assertEqual(self.gacha_session.query(GachaPull).count(), 7)
+        self.assertEqual(get_quantity("u1", STAR_STICKER_ITEM_ID), 360)
+
     def test_hard_pity_forces_rarity_6_and_resets_pity(self) -> None:
         grant_item("u1", STAR_STICKER_ITEM_ID, 120, "test")
         self.gacha_session.add(
@@ -223,6 +249,119 @@ class GachaServiceTest(unittest.TestCase):
         self.assertEqual(third_page.page, 3)
         self.assertEqual(len(third_page.rows), 1)
 
+    def test_history_pages_seek_in_newest_first_order(self) -> None:
+        grant_item("u1", STAR_STICKER_ITEM_ID, 2400, "test")
+        with patch("plugins.gacha.service.random.random", return_value=0.99):
+            pull("u1", 10)
+        with patch("plugins.gacha.service.time.time", return_value=4_000_000_000):
+            with patch("plugins.gacha.service.random.random", return_value=0.99):
+                pull("u1", 10)
+        expected = [
+            row.id
+            for row in self.gacha_session.query(GachaPull).order_by(
+                GachaPull.created_at.desc(), GachaPull.id.desc()
+            )
+        ]
+
+        # Jump straight to page 3, then walk back over the earlier pages.
+        pages = {page: get_history("u1", page, page_size=3) for page in (3, 1, 2, 4)}
+        pages.update({page: get_history("u1", page, page_size=3) for page in (5, 6, 7)})
+
+        self.assertEqual(
+            [row.id for page in range(1, 8) for row in pages[page].rows], expected
+        )
+        self.assertEqual(pages[7].total_pages, 7)
+
+    def test_history_total_follows_new_pulls_without_recounting(self) -> None:
+        grant_item("u1", STAR_STICKER_ITEM_ID, 1320, "test")
+        with patch("plugins.gacha.service.random.random", return_value=0.99):
+            pull("u1", 10)
+        self.assertEqual(get_history("u1", 2, page_size=5).total, 10)
+
+        with patch("plugins.gacha.service.random.random", return_value=0.99):
+            pull("u1", 1)
+        with patch.object(
+            self.gacha_session, "query", wraps=self.gacha_session.query
+        ) as query:
+            history = get_history("u1", 1, page_size=5)
+
+        self.assertEqual(history.total, 11)
+        self.assertEqual(history.total_pages, 3)
+        self.assertEqual(query.call_count, 1)
+
+    def test_history_total_ignores_a_pull_whose_commit_failed(self) -> None:
+        grant_item("u1", STAR_STICKER_ITEM_ID, 1320, "test")
+        with patch("plugins.gacha.service.random.random", return_value=0.99):
+            pull("u1", 10)
+        self.assertEqual(get_history("u1", 1, page_size=5).total, 10)
+
+        with (
+            patch("plugins.gacha.service.random.random", return_value=0.99),
+            patch.object(
+                self.gacha_session, "commit", side_effect=RuntimeError("disk full")
+            ),
+        ):
+            with self.assertRaises(RuntimeError):
+                pull("u1", 1)
+        self.gacha_session.rollback()
+
+        self.assertEqual(get_history("u1", 1, page_size=5).total, 10)
+
+    def test_alias_table_matches_the_weighted_odds_exactly(self) -> None:
+        weights = [3, 0, 5, 1, 7, -2, 2]
+        entries = tuple(
+            GachaEntry(
+                item_id=f"item_{index}",
+                character_id="placeholder",
+                name=f"item {index}",
+                rarity=4,
+                weight=weight,
+            )
+            for index, weight in enumerate(weights)
+        )
+        banner = replace(self._banner("banner-a", "season-a"), entries=entries)
+        table = banner._pools[4]
+        units = len(table.entries) * table.total
+
+        counts: dict[str, int] = {}
+        for roll in range(1, units + 1):
+            with patch("plugins.gacha.service.random.randint", return_value=roll):
+                entry = gacha_service._choose_entry(banner, 4)
+            counts[entry.item_id] = counts.get(entry.item_id, 0) + 1
+
+        # Every unit maps to one entry; each entry owns weight * n units.
+        self.assertEqual(
+            counts,
+            {
+                entry.item_id: entry.weight * len(table.entries)
+                for entry in entries
+                if entry.weight > 0
+            },
+        )
+        with patch("plugins.gacha.service.random.randint", return_value=1):
+            self.assertEqual(gacha_service._choose_entry(banner, 4).item_id, "item_0")
+        with self.assertRaisesRegex(ValueError, "缺少稀有度 6"):
+            gacha_service._choose_entry(banner, 6)
+
+    def test_ten_pull_reuses_the_compiled_banner_and_one_state_row(self) -> None:
+        grant_item("u1", STAR_STICKER_ITEM_ID, 1200, "test")
+        banner = gacha_service.get_current_banner()
+        self.assertIs(gacha_service.get_current_banner(), banner)
+
+        with patch("plugins.gacha.service.random.random", return_value=0.99):
+            with patch(
+                "plugins.gacha.service.get_state", wraps=gacha_service.get_state
+            ) as get_state_mock:
+                results = pull("u1", 10)
+
+        self.assertEqual(get_state_mock.call_count, 1)
+        self.assertEqual(
+            [(result.pity_before, result.pity_after) for result in results],
+            [(index, index + 1) for index in range(10)],
+        )
+        self.assertEqual(get_state("u1").total_pulls, 10)
+        self.assertEqual(self.gacha_session.query(GachaPull).count(), 10)
+
     def _banner(self, banner_key: str, season_key: str) -> GachaBanner:
         return GachaBanner(
             season_key=season_key,
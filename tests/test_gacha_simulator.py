@@ -0,0 +1,71 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from plugins.gacha import service as gacha_service
+from plugins.gacha.service import GachaEntry
+from plugins.gacha.service import GachaBanner
+from plugins.gacha.simulator import simulate
+from plugins.gacha.simulator import roll_rarities
+from plugins.gacha.simulator import compile_banner
+
+
+def _banner(*entries: GachaEntry) -> GachaBanner:
+    return GachaBanner(
+        season_key="sim",
+        season_name="sim",
+        banner_key="sim-limited",
+        name="sim",
+        single_cost=120,
+        ten_cost=1200,
+        base_rates={6: 0.01, 5: 0.09, 4: 0.30, 3: 0.60},
+        soft_pity_start=70,
+        hard_pity=90,
+        entries=entries
+        or (
+            GachaEntry("featured", "kasumi", "featured", 6, 1, featured=True),
+            GachaEntry("r3", "placeholder", "r3", 3, 1),
+        ),
+    )
+
+
+def test_vectorized_rolls_match_roll_rarity() -> None:
+    banner = _banner()
+    compiled = compile_banner(banner)
+    pities = np.repeat(np.arange(0, 95), 41)
+    rolls = np.tile(np.linspace(0.0, 1.0, 41), 95)
+
+    simulated = roll_rarities(compiled, pities, rolls)
+
+    expected = []
+    for pity, roll in zip(pities.tolist(), rolls.tolist()):
+        with patch("plugins.gacha.service.random.random", return_value=roll):
+            expected.append(gacha_service._roll_rarity(banner, pity))
+    assert simulated.tolist() == expected
+
+
+def test_simulation_respects_hard_pity_and_reports_costs() -> None:
+    report = simulate(_banner(), players=2_000, pulls=180, seed=7)
+
+    assert report.featured_share == 1.0
+    assert report.featured_percentiles[99] <= 90
+    assert report.single_cost_percentiles[50] == report.featured_percentiles[50] * 120
+    assert report.ten_cost_percentiles[50] % 1200 == 0
+    assert sum(report.rates.values()) == pytest.approx(1.0)
+    assert abs(report.rates[5] - 0.09) < 0.01
+
+
+def test_featured_share_follows_six_star_weights() -> None:
+    banner = _banner(
+        GachaEntry("featured", "kasumi", "featured", 6, 1, featured=True),
+        GachaEntry("standard", "arisa", "standard", 6, 3),
+        GachaEntry("r3", "placeholder", "r3", 3, 1),
+    )
+
+    report = simulate(banner, players=2_000, pulls=1, starting_pity=89, seed=3)
+
+    # Every player's first pull is a guaranteed ★6; a quarter are featured.
+    assert report.rates[6] == 1.0
+    assert abs(report.featured_share - 0.25) < 0.05
+    assert report.featured_percentiles == {50: 1, 75: 1, 90: 1, 99: 1}
@@ -342,19 +342,49 @@ def test_level_gain_helpers_translate_xp_levels():
         assert gain.stickers == 2 * LEVEL_UP_STICKERS
 
 
-def test_guess_chart_decode_jacket_tolerates_bad_bytes():
+async def test_guess_chart_song_assets_tolerate_bad_jackets_and_survive_a_restart(
+    tmp_path, monkeypatch
+):
     _load_plugin_dependencies("plugins.daily_task")
     import io
 
-    from plugins.guess_chart import _decode_jacket
+    from plugins.guess_chart import jackets
+    from plugins.guess_chart.jackets import THUMBNAIL_SIZE
+    from plugins.guess_chart.jackets import SongAssetCache
 
     buffer = io.BytesIO()
     _jacket().save(buffer, format="PNG")
-    decoded = _decode_jacket(buffer.getvalue())
-    assert decoded is not None
-    assert decoded.size == (640, 640)
+    bodies = {1: buffer.getvalue(), 2: b"not an image"}
+    fetched = []
 
-    assert _decode_jacket(b"not an image") is None
+    async def fake_jacket(song_id, _song_info):
+        fetched.append(("jacket", song_id))
+        return bodies[song_id]
+
+    class FakeSong:
+        def __init__(self, song_id):
+            self.song_id = song_id
+
+        async def get_info_async(self):
+            fetched.append(("detail", self.song_id))
+            return {"bandId": 1, "jacketImage": ["x"]}
+
+    monkeypatch.setattr(jackets, "get_jacket_image", fake_jacket)
+    monkeypatch.setattr(jackets.songs, "Song", FakeSong)
+
+    cache = SongAssetCache(tmp_path)
+    assert (await cache.detail(1))["bandId"] == 1
+    jacket = await cache.jacket(1, {})
+    assert jacket.raw == bodies[1]
+    assert jacket.thumbnail.size == (THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+    # Undecodable bytes read as a missing jacket, and are not asked for again.
+    assert await cache.jacket(2, {}) is None
+    assert await cache.jacket(2, {}) is None
+
+    restarted = SongAssetCache(tmp_path)
+    assert (await restarted.detail(1))["bandId"] == 1
+    assert (await restarted.jacket(1, {})).raw == bodies[1]
+    assert fetched == [("detail", 1), ("jacket", 1), ("jacket", 2)]
 
 
 def test_guess_chart_chart_renderer_survives_the_reveal_package_import():
@@ -364,26 +394,26 @@ def test_guess_chart_chart_renderer_survives_the_reveal_package_import():
     ``__init__.py``'s globals — so a plain ``from bestdori.render import
     render`` got overwritten and ``render(chart)`` crashed ``handle_start``
     with "'module' object is not callable". The handler must reach the chart
-    renderer through an alias the subpackage binding cannot clobber, while the
-    reveal package import coexists."""
+    renderer through a name the subpackage binding cannot clobber, while the
+    reveal package import coexists. Rounds now reach the renderer through the
+    chart cache, whose module is named so it cannot shadow the instance."""
 
     _load_plugin_dependencies("plugins.daily_task")
-    import bestdori.render
 
     guess_chart = importlib.import_module("plugins.guess_chart")
     reveal_package = importlib.import_module("plugins.guess_chart.render")
+    charts = importlib.import_module("plugins.guess_chart.charts")
 
-    # The subpackage inevitably owns the bare name; the handler's callable
-    # lives under the alias and stays the bestdori function.
+    # The subpackage inevitably owns the bare name; the handler's cache is
+    # bound under a name no subpackage uses.
     assert guess_chart.render is reveal_package
-    assert callable(guess_chart.render_chart)
-    assert guess_chart.render_chart is bestdori.render.render
+    assert isinstance(guess_chart.chart_cache, charts.ChartCache)
     assert callable(reveal_package.reveal_page)
 
-    # And the call site uses the alias — a bare ``render(chart)`` would hit
-    # the module object again.
+    # And no call site uses the bare name — ``render(chart)`` would hit the
+    # module object again.
     source = (ROOT / "plugins/guess_chart/__init__.py").read_text(encoding="utf-8")
-    assert "render_chart(chart)" in source
+    assert "chart_cache.page(" in source
     assert " render(chart)" not in source
 
 
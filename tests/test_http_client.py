@@ -0,0 +1,77 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils.http import HttpClient
+
+
+async def _serve(handler):
+    app = web.Application()
+    app.router.add_route("*", "/", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+async def test_get_retries_transient_statuses_with_backoff():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.method)
+        if len(calls) < 3:
+            return web.Response(status=503)
+        return web.Response(body=b"ok")
+
+    server = await _serve(handler)
+    client = HttpClient(backoff=0)
+    url = server.make_url("/")
+    try:
+        assert await client.get_bytes(str(url)) == b"ok"
+    finally:
+        await client.close()
+        await server.close()
+
+    assert calls == ["GET", "GET", "GET"]
+    metrics = client.metrics[f"{url.host}:{url.port}"]
+    assert metrics.requests == 3
+    assert metrics.retries == 2
+    assert metrics.statuses == {"5xx": 2, "2xx": 1}
+
+
+async def test_post_is_not_retried_unless_asked_and_reuses_the_session():
+    calls = []
+
+    async def handler(request):
+        calls.append(await request.json())
+        return web.Response(status=503)
+
+    server = await _serve(handler)
+    client = HttpClient(backoff=0)
+    url = str(server.make_url("/"))
+    try:
+        async with client.request("POST", url, json={"n": 1}) as response:
+            assert response.status == 503
+        session = client.session()
+        async with client.request("POST", url, json={"n": 2}, retries=1) as response:
+            assert response.status == 503
+        assert client.session() is session
+    finally:
+        await client.close()
+        await server.close()
+
+    assert calls == [{"n": 1}, {"n": 2}, {"n": 2}]
+
+
+def test_session_from_a_finished_loop_is_let_go():
+    client = HttpClient()
+
+    async def bind():
+        return client.session()
+
+    stale = asyncio.run(bind())
+    fresh = asyncio.run(bind())
+
+    assert fresh is not stale
+    assert stale.closed
+    asyncio.run(client.close())
@@ -63,7 +63,11 @@ def _stub_season_rank(
         "get_user_season_rank",
         lambda user_id, season=None: (viewer_rank, viewer_points),
     )
-    monkeypatch.setattr(inventory, "_display_name", lambda user_id: f"昵称{user_id}")
+    monkeypatch.setattr(
+        inventory,
+        "_display_names",
+        lambda user_ids: {user_id: f"昵称{user_id}" for user_id in user_ids},
+    )
     monkeypatch.setattr(inventory, "kit_for_user", lambda user_id: MinimalKit())
 
 
@@ -103,7 +107,11 @@ async def test_season_rank_offseason_stays_text(
             SimpleNamespace(rank=1, user_id="member-0", final_points=9000)
         ],
     )
-    monkeypatch.setattr(inventory, "_display_name", lambda user_id: f"昵称{user_id}")
+    monkeypatch.setattr(
+        inventory,
+        "_display_names",
+        lambda user_ids: {user_id: f"昵称{user_id}" for user_id in user_ids},
+    )
 
     matcher = RecordingMatcher()
     event = make_satori_event("/赛季排行")
@@ -138,6 +146,30 @@ def test_assemble_season_rank_slices_the_viewer_neighbourhood(
     assert any(row.name == "昵称user" for row in data.nearby)
 
 
+def test_assemble_season_rank_names_every_row_in_one_batch(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    display_names = inventory._display_names
+    rows = _ranking_rows(30)
+    _stub_season_rank(monkeypatch, rows=rows, viewer_rank=31, viewer_points=0)
+    monkeypatch.setattr(inventory, "_display_names", display_names)
+    loads = []
+
+    def load_identities(user_ids):
+        loads.append(list(user_ids))
+        return {
+            user_id: PlayerIdentity(nickname=f"昵称{user_id}") for user_id in loads[-1]
+        }
+
+    monkeypatch.setattr(inventory, "load_identities", load_identities)
+
+    data = inventory._assemble_season_rank("user", SimpleNamespace(id=7, name="S1"))
+
+    assert len(loads) == 1
+    assert set(loads[0]) == {row.user_id for row in (*data.rows, *data.nearby)}
+    assert data.nearby[-1].name == "昵称user"
+
+
 def test_assemble_season_rank_pins_a_viewer_without_a_pt_row(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
@@ -168,16 +168,20 @@ async def test_guess_chart_cleans_session_when_song_info_fetch_fails(
     class UpstreamFailure(RuntimeError):
         pass
 
-    class FakeSong:
-        async def get_info_async(self):
+    class FakeSongAssets:
+        async def detail(self, _song_id):
             raise UpstreamFailure("502 Bad Gateway")
 
     class FakeChart:
         def count(self):
             return object()
 
-    async def fake_chart(*_args, **_kwargs):
-        return FakeChart()
+    class FakeChartCache:
+        async def chart(self, *_args):
+            return FakeChart()
+
+        async def strip(self, *_args):
+            return Image.new("RGB", (1, 1)), 1.0
 
     async def fake_image_task(*_args, **_kwargs):
         return Image.new("RGB", (1, 1))
@@ -189,8 +193,8 @@ async def test_guess_chart_cleans_session_when_song_info_fetch_fails(
     monkeypatch.setattr(module, "gamers_store", store)
     monkeypatch.setattr(module, "flatten_song_data", lambda _data: [{"song_id": "1", "difficulty": "expert"}])
     monkeypatch.setattr(module, "sort_by_difficulty", lambda _data: {"expert": [1]})
-    monkeypatch.setattr(module.songs, "Song", lambda _song_id: FakeSong())
-    monkeypatch.setattr(module.Chart, "get_chart_async", fake_chart)
+    monkeypatch.setattr(module, "song_assets", FakeSongAssets())
+    monkeypatch.setattr(module, "chart_cache", FakeChartCache())
     monkeypatch.setattr(module, "run_image_task", fake_image_task)
     monkeypatch.setattr(module.game_start, "send", AsyncMock())
     monkeypatch.setattr(module.game_start, "finish", fake_finish)
@@ -204,7 +208,6 @@ async def test_guess_chart_cleans_session_when_song_info_fetch_fails(
             song_data={},
             band_data={},
             game_difficulty="hard",
-            song_raw_data={},
         )
 
     assert "game-channel" not in store.get()
@@ -6,6 +6,7 @@ from sqlalchemy.orm import sessionmaker
 from plugins.mailbox import database
 from plugins.mailbox.models import Base
 from plugins.mailbox.models import Mail
+from plugins.mailbox.models import OutgoingMail
 from plugins.mailbox.service import MailService
 from plugins.mailbox.database import migrate_mailbox_schema
 
@@ -34,6 +35,40 @@ def test_external_key_returns_the_existing_mail(monkeypatch):
     assert session.query(Mail).count() == 1
 
 
+def test_personal_mails_share_one_commit_and_keep_their_keys(monkeypatch):
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    monkeypatch.setattr(database, "session", session)
+
+    service = MailService()
+    existing = service.send_mail(
+        "u1", "赛季奖励", "第一次发送", external_key="season_reward:1:u1"
+    )
+    mail_ids = service.send_personal_mails(
+        [
+            OutgoingMail(
+                "u1", "赛季奖励", "重试不应新建", external_key="season_reward:1:u1"
+            ),
+            OutgoingMail("u2", "赛季奖励", "第 2 名", external_key="season_reward:1:u2"),
+            OutgoingMail(
+                "u2", "赛季奖励", "同批重复", external_key="season_reward:1:u2"
+            ),
+            OutgoingMail("u3", "通知", "没有幂等键"),
+        ]
+    )
+
+    assert mail_ids[0] == existing
+    assert mail_ids[1] == mail_ids[2] != existing
+    contents = dict(session.query(Mail.id, Mail.content).all())
+    assert [contents[mail_id] for mail_id in mail_ids] == [
+        "第一次发送",
+        "第 2 名",
+        "第 2 名",
+        "没有幂等键",
+    ]
+
+
 def test_schema_migration_adds_external_key_to_an_existing_mailbox():
     engine = create_engine("sqlite:///:memory:")
     with engine.begin() as connection:
@@ -58,3 +93,70 @@ def test_schema_migration_adds_external_key_to_an_existing_mailbox():
         }
     assert "external_key" in columns
     assert "uq_mails_external_key" in indexes
+
+
+def test_broadcasts_are_computed_on_read_and_materialized_on_claim(monkeypatch):
+    from plugins.mailbox.models import MailRecipient
+    from plugins.mailbox.models import BroadcastWatermark
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    monkeypatch.setattr(database, "session", session)
+
+    service = MailService()
+    first = service.send_broadcast_mail("公告一", "内容")
+    second = service.send_broadcast_mail("公告二", "内容")
+
+    for user_id in ("u1", "u2", "u3"):
+        assert {mail.id for mail in service.get_user_mails(user_id)} == {
+            first,
+            second,
+        }
+    assert session.query(MailRecipient).count() == 0
+
+    assert service.read_mail("u1", second).is_read is True
+    assert session.get(BroadcastWatermark, "u1").last_mail_id == first - 1
+    assert service.read_mail("u1", first).is_read is True
+    assert session.get(BroadcastWatermark, "u1").last_mail_id == second
+    assert [mail.is_read for mail in service.get_user_mails("u1")] == [True, True]
+    assert session.query(MailRecipient).count() == 2
+
+    session.query(Mail).filter(Mail.id == second).one().created_at = 1
+    session.commit()
+    assert service.cleanup_expired_mails() == 1
+    assert session.get(BroadcastWatermark, "u1").last_mail_id == first
+    third = service.send_broadcast_mail("公告三", "内容")
+    assert third in {mail.id for mail in service.get_user_mails("u1")}
+
+
+def test_scheduled_dispatcher_wakes_for_the_next_due_mail(monkeypatch):
+    from plugins.mailbox.models import MailRecipient
+    from plugins.mailbox.dispatcher import ScheduledMailDispatcher
+    from plugins.mailbox.scheduled_service import ScheduledMailService
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    monkeypatch.setattr(database, "session", session)
+
+    scheduled = ScheduledMailService()
+    dispatcher = ScheduledMailDispatcher(scheduled)
+    scheduled.dispatcher = dispatcher
+    scheduled.create_scheduled_mail("u1,u2,u1", "晚", "内容", 2_000, name="late")
+    scheduled.create_scheduled_mail("u3", "早", "内容", 1_000, name="early")
+    scheduled.create_scheduled_mail("u4", "取消", "内容", 500, name="gone")
+    scheduled.delete_scheduled_mail("gone")
+    assert dispatcher.next_due() == 1_000
+
+    scheduled.update_scheduled_mail("early", scheduled_time=3_000)
+    assert dispatcher.next_due() == 2_000
+    assert dispatcher.dispatch_due(now=1_999) == 0
+    assert dispatcher.dispatch_due(now=2_000) == 1
+    assert sorted(row.user_id for row in session.query(MailRecipient)) == ["u1", "u2"]
+
+    dispatcher.rebuild()
+    assert dispatcher.next_due() == 3_000
+    assert dispatcher.dispatch_due(now=3_000) == 1
+    assert dispatcher.next_due() is None
+    assert scheduled.get_pending_count() == 0
@@ -386,17 +386,20 @@ def test_scheduled_targeted_mail_retry_does_not_duplicate_earlier_recipients(
         scheduled_time=1,
         name="retry-targeted",
     )
-    real_send = scheduled.mail_service.send_mail
+    real_send = scheduled.mail_service.send_mails
     failed_once = False
 
-    def flaky_send(**kwargs):
+    def flaky_send(recipient_ids, **kwargs):
+        # The first attempt delivers "a" and then fails before "b", as a run
+        # interrupted midway would.
         nonlocal failed_once
-        if kwargs["recipient_id"] == "b" and not failed_once:
+        if not failed_once:
             failed_once = True
+            real_send(recipient_ids[:1], **kwargs)
             raise RuntimeError("mailbox unavailable")
-        return real_send(**kwargs)
+        return real_send(recipient_ids, **kwargs)
 
-    monkeypatch.setattr(scheduled.mail_service, "send_mail", flaky_send)
+    monkeypatch.setattr(scheduled.mail_service, "send_mails", flaky_send)
 
     assert scheduled.process_due_mails() == 0
     assert scheduled.process_due_mails() == 1
@@ -0,0 +1,35 @@
+from utils.matching import NameIndex
+from utils.matching import is_fuzzy_query
+
+
+def test_exact_hits_ignore_case_and_belong_to_the_first_owner():
+    index = NameIndex({"1": ["Yes! BanG_Dream!", "ybd"], "2": ["YBD", "Returns"]})
+
+    assert index.exact_match("yes! bang_dream!") == "1"
+    assert index.exact_match("ybd") == "1"
+    assert index.match("RETURNS") == "2"
+    assert index.match("r") is None
+    assert len(index) == 3
+
+
+def test_fuzzy_hits_map_back_by_index_and_prefer_better_known_keys():
+    index = NameIndex(
+        {
+            "1": ["star beat"],
+            "2": ["star beet", "ホシノコドウ", "星之鼓动"],
+            "3": ["回:Birth Again"],
+        }
+    )
+
+    # Equal scores: the key with more aliases wins.
+    assert index.match("star bet") == "2"
+    assert index.match("星之鼓") == "2"
+    assert index.match("birth again") == "3"
+    assert index.match("completely different") is None
+
+
+def test_fuzzy_queries_need_two_characters_and_one_alphanumeric():
+    assert is_fuzzy_query("star") is True
+    assert is_fuzzy_query(" 星 ") is False
+    assert is_fuzzy_query("!?") is False
+    assert is_fuzzy_query("星之") is True
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy import create_engine
+
+from utils.migrations import migrations
+
+
+def _engine(path: Path):
+    return create_engine(f"sqlite:///{path}")
+
+
+def test_completed_migrations_are_skipped_on_the_next_boot(tmp_path: Path) -> None:
+    calls = []
+
+    def add_column() -> None:
+        calls.append("add_column")
+
+    for _ in range(3):
+        with migrations(_engine(tmp_path / "data.db"), "test") as registry:
+            registry.run("test.add_column", add_column)
+
+    assert calls == ["add_column"]
+    with _engine(tmp_path / "data.db").connect() as connection:
+        ids = connection.execute(text("SELECT id FROM schema_migrations")).scalars()
+        assert list(ids) == ["test.add_column"]
+
+
+def test_changed_content_runs_the_migration_again(tmp_path: Path) -> None:
+    calls = []
+
+    def sync(version: str) -> None:
+        calls.append(version)
+
+    for version in ("v1", "v1", "v2"):
+        with migrations(_engine(tmp_path / "data.db"), "test") as registry:
+            registry.run("test.sync", sync, version, content=version)
+
+    assert calls == ["v1", "v2"]
+
+
+def test_reading_the_registry_does_not_create_the_database(tmp_path: Path) -> None:
+    path = tmp_path / "data.db"
+    seen = []
+
+    def check_existing_database() -> None:
+        seen.append(path.exists())
+
+    with migrations(_engine(path), "test") as registry:
+        registry.run("test.check", check_existing_database)
+
+    # The step still saw a fresh install; the record is written afterwards.
+    assert seen == [False]
+    assert path.exists()
+
+
+def test_steps_before_a_failure_stay_recorded(tmp_path: Path) -> None:
+    calls = []
+
+    def first() -> None:
+        calls.append("first")
+
+    def broken() -> None:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        with migrations(_engine(tmp_path / "data.db"), "test") as registry:
+            registry.run("test.first", first)
+            registry.run("test.broken", broken)
+    with migrations(_engine(tmp_path / "data.db"), "test") as registry:
+        ran = registry.run("test.first", first)
+
+    assert ran is False
+    assert calls == ["first"]
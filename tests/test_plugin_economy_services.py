@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import copy
+import gzip
+import json
 from unittest.mock import Mock
 
 import pytest
@@ -128,6 +130,51 @@ async def test_daily_task_completes_matching_config(sqlite_session, monkeypatch)
     assert service.get_today_task("u1").is_completed is True
 
 
+@pytest.mark.asyncio
+async def test_daily_task_state_is_cached_until_midnight(sqlite_session, monkeypatch):
+    import datetime
+
+    from plugins.daily_task import database
+    from plugins.daily_task.models import Base
+    from plugins.daily_task.service import DailyTaskService
+
+    session = sqlite_session(database, Base)
+    service = DailyTaskService()
+    service._task_configs = {
+        "mines": {
+            "id": "mines",
+            "name": "探险",
+            "description": "play",
+            "reward": 12,
+            "type": "game",
+            "conditions": [{"field": "plugin", "op": "==", "value": "mines"}],
+        }
+    }
+    monkeypatch.setattr("plugins.daily_task.service.random.choice", lambda rows: rows[0])
+    monkeypatch.setattr(
+        "plugins.daily_task.service.monetary.add_star_stickers", Mock()
+    )
+    service.ensure_daily_task("u1")
+
+    # Known users with a non-matching event never reach the database.
+    service._session = Mock()
+    service._session.query.side_effect = AssertionError("unexpected query")
+    assert await service.check_progress("u1", "message", {}) is None
+    service.ensure_assigned("u1")
+    service._session = session
+
+    assert await service.check_progress("u1", "game", {"plugin": "mines"})
+    assert await service.check_progress("u1", "game", {"plugin": "mines"}) is None
+
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    monkeypatch.setattr("plugins.daily_task.service.bot_today", lambda: tomorrow)
+    service._rollover_at = 0
+    assert await service.check_progress("u1", "game", {"plugin": "mines"}) is None
+    assert service._states == {"u1": None}
+    service.ensure_assigned("u1")
+    assert service.get_today_task("u1").date == tomorrow.strftime("%Y-%m-%d")
+
+
 def test_daily_task_any_condition_supports_tour_progress() -> None:
     from plugins.daily_task.service import DailyTaskService
 
@@ -178,8 +225,11 @@ def test_mailbox_send_read_cleanup_and_scheduled_processing(sqlite_session, monk
     sent = []
     monkeypatch.setattr(
         scheduled.mail_service,
-        "send_mail",
-        lambda **kwargs: sent.append(kwargs) or 99,
+        "send_mails",
+        lambda recipient_ids, **kwargs: sent.extend(
+            {"recipient_id": recipient_id, **kwargs} for recipient_id in recipient_ids
+        )
+        or [99] * len(recipient_ids),
     )
     scheduled.create_scheduled_mail(
         recipients="u1,u2",
@@ -260,6 +310,129 @@ def test_red_envelope_retries_an_uncredited_claim(sqlite_session, monkeypatch):
     assert service.claim_envelope("u1", "channel", 1)[0] == "already"
 
 
+async def test_red_envelope_claim_storm_shares_one_commit(
+    sqlite_session, monkeypatch
+):
+    import asyncio
+
+    from plugins.red_envelope import service
+    from plugins.red_envelope import database
+    from plugins.red_envelope.models import Base
+    from plugins.red_envelope.models import ClaimRecord
+
+    session = sqlite_session(database, Base)
+    added = []
+    monkeypatch.setattr(
+        service.monetary, "add", lambda *args, **kwargs: added.append(args[:2])
+    )
+    envelope = service.create_envelope("creator", "channel", "hello", 100, 4)
+    commits = 0
+    real_commit = session.commit
+
+    def counting_commit():
+        nonlocal commits
+        commits += 1
+        real_commit()
+
+    monkeypatch.setattr(session, "commit", counting_commit)
+    results = await asyncio.gather(
+        *(
+            service.claim_envelope_async(user_id, "channel")
+            for user_id in ("u1", "u2", "u1", "u3", "u4", "u5")
+        )
+    )
+
+    assert [status for status, _amount, _completion in results] == [
+        "success",
+        "success",
+        "already",
+        "success",
+        "success",
+        "no_active",
+    ]
+    # One commit reserves the whole batch, one stamps it credited.
+    assert commits == 2
+    assert sum(amount for _user, amount in added) == 100
+    completions = [completion for _status, _amount, completion in results]
+    assert [index for index, c in enumerate(completions) if c is not None] == [4]
+    assert (envelope.remaining_amount, envelope.remaining_count) == (0, 0)
+    uncredited = session.query(ClaimRecord).filter(ClaimRecord.credited_at == 0)
+    assert uncredited.count() == 0
+
+
+async def test_red_envelope_storm_isolates_a_failing_credit(sqlite_session, monkeypatch):
+    import asyncio
+
+    from plugins.red_envelope import service
+    from plugins.red_envelope import database
+    from plugins.red_envelope.models import Base
+    from plugins.red_envelope.models import ClaimRecord
+
+    session = sqlite_session(database, Base)
+    added = []
+
+    def add(user_id, amount, *args, **kwargs):
+        if user_id == "u2":
+            raise RuntimeError("inventory unavailable")
+        added.append(user_id)
+
+    def broken_completion(*args, **kwargs):
+        raise RuntimeError("completion unavailable")
+
+    monkeypatch.setattr(service.monetary, "add", add)
+    monkeypatch.setattr(service, "_build_completion_info", broken_completion)
+    service.create_envelope("creator", "channel", "hello", 100, 3)
+
+    results = await asyncio.gather(
+        *(
+            service.claim_envelope_async(user_id, "channel")
+            for user_id in ("u1", "u2", "u3")
+        )
+    )
+
+    assert [status for status, _amount, _completion in results] == [
+        "success",
+        "error",
+        "success",
+    ]
+    assert results[2][2] is None
+    # The batch attempt rolled back; the claim-by-claim retry credited these.
+    assert set(added) == {"u1", "u3"}
+    uncredited = session.query(ClaimRecord).filter(ClaimRecord.credited_at == 0)
+    assert [claim.user_id for claim in uncredited] == ["u2"]
+
+
+def test_red_envelope_uncredited_claims_are_swept_after_restart(
+    sqlite_session, monkeypatch
+):
+    from plugins.red_envelope import service
+    from plugins.red_envelope import database
+    from plugins.red_envelope.models import Base
+    from plugins.red_envelope.models import ClaimRecord
+
+    session = sqlite_session(database, Base)
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError("inventory unavailable")
+
+    monkeypatch.setattr(service.monetary, "add", unavailable)
+    service.create_envelope("creator", "channel", "hello", 10, 2)
+    assert service.claim_envelope("u1", "channel")[0] == "error"
+
+    # A restart forgets every coordinator; the reservation is still on disk.
+    service._registry.clear()
+    service._loaded_channels.clear()
+    added = []
+    monkeypatch.setattr(
+        service.monetary, "add", lambda *args, **kwargs: added.append(args[:2])
+    )
+
+    assert service.credit_pending_claims() == 1
+    assert added == [("u1", session.query(ClaimRecord).one().amount)]
+    assert service.claim_envelope("u1", "channel")[0] == "already"
+    assert service.claim_envelope("u2", "channel")[0] == "success"
+
+
 def test_red_envelope_migration_marks_historical_claims_as_credited(
     tmp_path, monkeypatch
 ):
@@ -350,3 +523,184 @@ def test_inventory_profile_equipment_and_season_status(sqlite_session, monkeypat
     season_service.activate_due_seasons(now=2_000_000_000)
     assert synced[0].season_key == "s1"
     assert season_service.get_current_season(now=2_000_000_000).name == "S1"
+
+
+def test_transaction_history_pages_by_keyset_and_archives_old_rows(economy_db, tmp_path):
+    from plugins import monetary
+    from plugins.monetary import archive_service
+    from plugins.monetary.models import Transaction
+    from plugins.monetary.models import TransactionCategory
+
+    transaction_session = economy_db[2]
+    transaction_session.add_all(
+        [
+            Transaction(
+                user_id="u1",
+                category=TransactionCategory.INCOME,
+                amount=index,
+                time=1_000 + index // 2,
+                description="daily" if index % 2 else "mines",
+            )
+            for index in range(7)
+        ]
+    )
+    transaction_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        page = monetary.get_user_transactions_page("u1", before=cursor, limit=3)
+        seen.extend(row.amount for row in page.transactions)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == [6, 5, 4, 3, 2, 1, 0]
+    daily = monetary.get_user_transactions_page("u1", description="daily", limit=10)
+    assert [row.amount for row in daily.transactions] == [5, 3, 1]
+    assert daily.next_cursor is None
+
+    archived = monetary.archive_transactions(
+        1, now=1_002 + 86400, archive_dir=tmp_path
+    )
+
+    assert archived == 4
+    assert [row.amount for row in transaction_session.query(Transaction)] == [4, 5, 6]
+    assert not list(tmp_path.glob("*.tmp"))
+
+    # An append interrupted mid-write leaves a truncated gzip member behind;
+    # the records before the damage are still readable.
+    legacy = gzip.compress(
+        b"".join(
+            json.dumps(
+                {
+                    "id": 100 + index,
+                    "user_id": "u1",
+                    "category": "income",
+                    "amount": 100 + index,
+                    "time": 1_000,
+                    "description": "daily",
+                }
+            ).encode()
+            + b"\n"
+            for index in range(3)
+        )
+    )
+    partition = archive_service.archive_partition(1_000)
+    (tmp_path / f"transactions-{partition}.jsonl.gz").write_bytes(legacy[:-8])
+
+    assert [
+        record["amount"]
+        for record in monetary.iter_archived_transactions(
+            user_id="u1", description="daily", archive_dir=tmp_path
+        )
+    ] == [1, 3, 100, 101, 102]
+
+
+def test_inventory_batch_commits_once_and_rolls_back_as_a_whole(economy_db):
+    from plugins import monetary
+    from plugins.inventory import service
+    from plugins.monetary.models import Transaction
+
+    monetary.add("u1", 50, "seed")
+    commits = []
+    inventory_session = economy_db[1]
+    original_commit = inventory_session.commit
+    inventory_session.commit = lambda: commits.append(1) or original_commit()
+
+    with service.batch("u1") as inventory:
+        inventory.cost("season_point", 20, "buy")
+        inventory.grant("star_sticker", 5, "buy")
+    assert len(commits) == 1
+
+    with pytest.raises(ValueError):
+        with service.batch("u1") as inventory:
+            monetary.cost("u1", 10, "partial")
+            inventory.cost("season_point", 10_000, "too much")
+    inventory_session.commit = original_commit
+
+    assert monetary.get("u1") == 30
+    assert service.get_quantity("u1", "star_sticker") == 5
+    descriptions = [row.description for row in economy_db[2].query(Transaction)]
+    assert "partial" not in descriptions
+
+
+def test_item_catalog_snapshot_serves_reads_and_picks_up_new_rows(economy_db):
+    from sqlalchemy import event
+
+    from plugins.inventory import models
+    from plugins.inventory import catalog
+    from plugins.inventory import service
+
+    inventory_session = economy_db[1]
+    snapshot = catalog.refresh_catalog()
+    statements = []
+    engine = inventory_session.get_bind()
+    record = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        item = service.get_item("season_point")
+        assert service.resolve_scope("season_point") == ("season", "1")
+        assert service.get_item_art("season_point") is None
+        assert statements == []
+        assert service.get_item("no_such_item") is None
+        assert service.get_item("no_such_item") is None
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert len(statements) == 1
+    assert item.currency.currency_kind == "seasonal"
+    with pytest.raises(TypeError):
+        snapshot.items["x"] = item
+
+    _seed_currency(inventory_session, models, "ticket", "券")
+    assert service.get_item("ticket").name == "券"
+    assert catalog.current_catalog().version > snapshot.version
+    assert "ticket" not in snapshot
+
+    # Adding one row reuses every other frozen item instead of reloading.
+    before = catalog.current_catalog()
+    row = models.Item(
+        item_id="standing_art_bestdori_1",
+        category="cosmetic",
+        name="立绘",
+        stackable=False,
+        visible=True,
+        sort_order=1,
+        metadata_json="{}",
+    )
+    inventory_session.add(row)
+    inventory_session.flush()
+    after = catalog.add_to_catalog(row)
+    assert catalog.current_catalog() is after
+    assert after.version > before.version
+    assert after.get("standing_art_bestdori_1").name == "立绘"
+    assert after.get("ticket") is before.get("ticket")
+    assert "standing_art_bestdori_1" not in before
+
+
+def test_identity_loader_batches_sources_without_creating_users(
+    economy_db, sqlite_session, monkeypatch
+):
+    from utils import identity
+    from plugins import monetary
+    from plugins.nickname import data_source as nickname_data
+    from plugins.monetary.models import User
+
+    nickname_session = sqlite_session(nickname_data, nickname_data.Base)
+    nickname_session.add(nickname_data.Nickname(user_id="u1", nickname="Kasumi"))
+    nickname_session.commit()
+    monetary.increase_level("u1", 4)
+    monkeypatch.setattr(identity, "_memo", {})
+
+    identities = identity.load_identities(["u1", "u20000", "u1"])
+
+    assert list(identities) == ["u1", "u20000"]
+    assert (identities["u1"].nickname, identities["u1"].level) == ("Kasumi", 5)
+    assert (identities["u20000"].nickname, identities["u20000"].level) == (
+        "玩家0000",
+        1,
+    )
+    assert economy_db[0].query(User).filter(User.user_id == "u20000").count() == 0
+
+    nickname_session.query(nickname_data.Nickname).delete()
+    nickname_session.commit()
+    assert identity.identity_for("u1").nickname == "Kasumi"
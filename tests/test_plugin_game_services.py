@@ -137,7 +137,6 @@ def test_guess_chart_helpers_and_cck_crop(monkeypatch):
     from plugins.cck.draw import random_crop_image
     from plugins.guess_chart.utils import fuzzy_match
     from plugins.guess_chart.utils import num_to_range
-    from plugins.guess_chart.utils import is_valid_query
     from plugins.guess_chart.utils import build_enriched_dictionary
 
     monkeypatch.setattr("plugins.cck.draw.random.randint", lambda low, high: low)
@@ -152,5 +151,168 @@ def test_guess_chart_helpers_and_cck_crop(monkeypatch):
     enriched = build_enriched_dictionary(dictionary, song_raw_data)
     assert "star beat" in enriched["1"]
     assert fuzzy_match("star beat", enriched) == "1"
-    assert is_valid_query("star") is True
     assert num_to_range(7) == (0, 100)
+
+
+async def test_guess_chart_cache_fetches_and_paints_each_chart_once(
+    tmp_path, monkeypatch
+):
+    from PIL import Image
+    from bestdori.charts import Chart
+
+    _load_plugin_dependencies("plugins.daily_task")
+
+    from plugins.guess_chart import charts as module
+    from plugins.guess_chart.charts import ChartCache
+    from plugins.guess_chart.charts import popular_charts
+
+    fetched = []
+    painted = []
+
+    async def fake_fetch(song_id, difficulty):
+        fetched.append((song_id, difficulty))
+        return Chart.from_python(
+            [
+                {"type": "BPM", "bpm": 120, "beat": 0},
+                {"type": "Single", "lane": 3, "beat": 1},
+            ]
+        )
+
+    def fake_paint(chart):
+        painted.append(chart.count().notes)
+        return Image.new("RGBA", (40, 300), (1, 2, 3, 255)), 0.25
+
+    monkeypatch.setattr(module.Chart, "get_chart_async", fake_fetch)
+    monkeypatch.setattr(module, "non_slice_render", fake_paint)
+
+    cache = ChartCache(tmp_path)
+    assert popular_charts(
+        [
+            {"song_id": "1", "difficulty": "expert", "play_level": 27},
+            {"song_id": "2", "difficulty": "hard", "play_level": 20},
+            {"song_id": "3", "difficulty": "special", "play_level": 29},
+        ]
+    ) == [(3, "special"), (1, "expert")]
+    assert await cache.prefetch([(3, "special"), (1, "expert")]) == 2
+    assert await cache.prefetch([(3, "special")]) == 0
+
+    # A restart reads both stores back without Bestdori or a repaint.
+    restarted = ChartCache(tmp_path)
+    strip, rate = await restarted.strip(3, "special")
+    assert (strip.size, rate) == ((40, 300), 0.25)
+    assert (await restarted.chart(1, "expert")).count().notes == 1
+    assert fetched == [(3, "special"), (1, "expert")]
+    assert painted == [1, 1]
+
+
+async def test_cck_round_cards_come_from_an_index_of_cached_files(
+    tmp_path, monkeypatch
+):
+    from PIL import Image
+
+    _load_plugin_dependencies("plugins.daily_task")
+
+    from plugins.cck.card import ROUND_POOL_SIZE
+    from plugins.cck.card import Card
+
+    def card(character_id, rarity, card_type, resource_set):
+        return {
+            "characterId": character_id,
+            "rarity": rarity,
+            "type": card_type,
+            "resourceSetName": resource_set,
+            "prefix": ["jp", None, None, None, None],
+            "stat": {"training": {}},
+        }
+
+    manager = Card()
+    manager.base_path = tmp_path / "cards"
+    manager.__summary_data__ = {
+        "1": card(1, 4, "permanent", "res001001"),
+        "2": card(1, 2, "permanent", "res001002"),
+        "3": card(2, 3, "birthday", "res002003"),
+        "4": card(2, 4, "permanent", "res002004"),
+    }
+    manager.__processed_data__ = manager.__summary_data__
+    cached = {
+        "res001/res001001_card_normal.png",
+        "res001/res001002_card_normal.png",
+        "res002/res002003_card_after_training.png",
+    }
+    for name in cached:
+        path = manager.base_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        Image.new("RGBA", (64, 48), (9, 8, 7, 255)).save(path)
+
+    manager._build_index({Path(name).name for name in cached})
+
+    assert sorted(manager.cards_by_rarity) == [2, 3, 4]
+    assert [entry.card_id for entry in manager.cards_by_character["2"]] == ["3"]
+    assert {
+        entry.path.name
+        for variants in manager._round_cards
+        for entry in variants
+    } == {"res001001_card_normal.png", "res002003_card_after_training.png"}
+
+    round_card = await manager.take_round_card()
+    assert round_card.entry.rarity >= 3
+    assert round_card.image.mode == "RGB"
+    assert round_card.image.size == (64, 48)
+    assert round_card.encoded == round_card.entry.path.read_bytes()
+
+    await manager._refill_task
+    assert len(manager._ready) == ROUND_POOL_SIZE
+
+    # An undecodable file is dropped from the pool; the refill keeps going.
+    broken = manager.base_path / "res002/res002003_card_after_training.png"
+    broken.write_bytes(b"not a png")
+    manager._ready.clear()
+    # The broken (3★) card sorts first in the pool, so it is tried first.
+    monkeypatch.setattr("plugins.cck.card.random.choice", lambda options: options[0])
+    await manager._refill()
+    assert len(manager._ready) == ROUND_POOL_SIZE
+    assert {card.entry.card_id for card in manager._ready} == {"1"}
+    assert [entry.card_id for (entry,) in manager._round_cards] == ["1"]
+
+
+async def test_cck_releases_the_channel_when_no_round_card_loads(
+    monkeypatch, make_satori_event
+):
+    import pytest
+    from nonebot.exception import FinishedException
+    from nonebot.adapters.satori import Message
+
+    _load_plugin_dependencies("plugins.daily_task")
+
+    import plugins.cck as cck
+
+    finished = []
+    channels = set()
+
+    class Matcher:
+        async def finish(self, message=None, **kwargs):
+            finished.append(str(message))
+            raise FinishedException()
+
+    class Store:
+        def get(self):
+            return list(channels)
+
+        def add(self, channel_id):
+            channels.add(channel_id)
+
+        def remove(self, channel_id):
+            channels.discard(channel_id)
+
+    async def no_card():
+        raise LookupError("Card: 没有可用的卡面")
+
+    monkeypatch.setattr(cck, "start_cck", Matcher())
+    monkeypatch.setattr(cck, "gamers_store", Store())
+    monkeypatch.setattr(cck.card_manager, "take_round_card", no_card)
+
+    with pytest.raises(FinishedException):
+        await cck.handle_cck(make_satori_event("/猜卡面"), Message(""))
+
+    assert channels == set()
+    assert "卡面加载失败" in finished[0]
@@ -147,36 +147,24 @@ async def test_vits_api_wrappers_use_expected_payload(monkeypatch):
         def raise_for_status(self):
             raise AssertionError("unexpected status error")
 
-    class Session:
+    class Client:
         def __init__(self):
             self.posts = []
             self.gets = []
 
-        async def __aenter__(self):
-            return self
-
-        async def __aexit__(self, exc_type, exc, tb):
-            return None
-
-        def post(self, url, json):
-            self.posts.append((url, json))
-            return Response()
-
-        def get(self, url):
-            self.gets.append(url)
+        def request(self, method, url, json=None):
+            if method == "POST":
+                self.posts.append((url, json))
+            else:
+                self.gets.append(url)
             return Response()
 
-    sessions = []
-
-    def session_factory():
-        session = Session()
-        sessions.append(session)
-        return session
-
-    monkeypatch.setattr(utils.aiohttp, "ClientSession", session_factory)
+    client = Client()
+    monkeypatch.setattr(utils, "http_client", client)
 
     assert await utils.call_synthesize_api("hello", speaker_id=7, url="http://api/synth") == b"wav"
-    assert sessions[0].posts[0][0] == "http://api/synth"
-    assert sessions[0].posts[0][1]["text"] == "hello"
-    assert sessions[0].posts[0][1]["speaker_id"] == 7
+    assert client.posts[0][0] == "http://api/synth"
+    assert client.posts[0][1]["text"] == "hello"
+    assert client.posts[0][1]["speaker_id"] == 7
     assert await utils.call_speaker_api("http://api/speakers") == {"band": "speaker"}
+    assert client.gets == ["http://api/speakers"]
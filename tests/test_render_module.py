@@ -23,6 +23,8 @@ from plugins.render import Constraints
 from plugins.render import LayoutError
 from plugins.render import RenderContext
 from plugins.render.kit import BaseKit
+from plugins.render.discs import avatar_disc
+from plugins.render.discs import seed_avatar_discs
 from plugins.render.primitives import load_font
 from plugins.render.primitives import alpha_composite_paste
 from plugins.render.image_cache import ImageCache
@@ -32,6 +34,7 @@ from plugins.render.kits.minimal import MinimalKit
 from plugins.render.kits.bangdream import CHINESE_FONT
 from plugins.render.kits.bangdream import DISPLAY_FONT
 from plugins.render.kits.bangdream import BanGDreamKit
+from plugins.render.kits.kasumi.components import KasumiAvatarDisc
 from plugins.render.kits.minimal.components import MinimalText
 from plugins.render.kits.minimal.components import MinimalImage
 from plugins.render.kits.minimal.components import MinimalPanel
@@ -605,6 +608,38 @@ class RenderLayoutTest(unittest.TestCase):
                     marker, content, f"{path} imports the shared visual layer"
                 )
 
+    def test_avatar_disc_is_a_circle_memoized_per_image(self) -> None:
+        avatar = Image.new("RGBA", (140, 100), (200, 60, 60, 255))
+
+        disc = avatar_disc(avatar, 52)
+
+        self.assertEqual(disc.size, (52, 52))
+        self.assertEqual(disc.getpixel((0, 0))[3], 0)
+        self.assertEqual(disc.getpixel((26, 26)), (200, 60, 60, 255))
+        self.assertIs(avatar_disc(avatar, 52), disc)
+        self.assertIsNot(avatar_disc(avatar.copy(), 52), disc)
+
+        seeded = Image.new("RGBA", (52, 52), (1, 2, 3, 255))
+        other = avatar.copy()
+        seed_avatar_discs(other, {52: seeded})
+        self.assertIs(avatar_disc(other, 52), seeded)
+
+
+    def test_kasumi_avatar_disc_loads_paths_through_the_render_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "avatar.png"
+            Image.new("RGBA", (140, 140), (200, 60, 60, 255)).save(path)
+            ctx = RenderContext()
+            disc = KasumiAvatarDisc(source=path, initial="K", size=52)
+            for _ in range(2):
+                canvas = Image.new("RGBA", (52, 52), (0, 0, 0, 0))
+                disc.render(ctx, canvas, Rect(0, 0, 52, 52))
+            path.unlink()
+            canvas = Image.new("RGBA", (52, 52), (0, 0, 0, 0))
+            disc.render(ctx, canvas, Rect(0, 0, 52, 52))
+
+        self.assertEqual(canvas.getpixel((26, 26)), (200, 60, 60, 255))
+
 
 class AsyncRenderTest(unittest.IsolatedAsyncioTestCase):
     async def test_page_render_async_returns_logical_size(self) -> None:
@@ -146,6 +146,22 @@ class RyuseidoServiceTest(unittest.TestCase):
         self.assertEqual(season_pull_status("u1").used, 0)
         self.assertEqual(gacha_database.session.query(GachaPull).count(), 0)
 
+    def test_failed_bonus_pull_inside_a_nested_unit_keeps_its_own_error(self) -> None:
+        from plugins.inventory.unit_of_work import unit_of_work
+
+        grant_item("u1", BONSAI_ITEM_ID, 400, "test")
+
+        def fail_in_nested_unit(*args, **kwargs):
+            with unit_of_work():
+                raise RuntimeError("simulated nested failure")
+
+        with patch("plugins.gacha.service._pull_once", side_effect=fail_in_nested_unit):
+            with self.assertRaisesRegex(RuntimeError, "simulated nested failure"):
+                buy_season_pull("u1")
+
+        self.assertEqual(get_quantity("u1", BONSAI_ITEM_ID), 400)
+        self.assertEqual(season_pull_status("u1").used, 0)
+
     @staticmethod
     def _season_config() -> dict:
         return {
@@ -363,3 +379,5 @@ def test_gacha_schema_migration_marks_legacy_pulls_as_sticker_paid() -> None:
         ).scalar_one()
     assert "payment_item_id" in columns
     assert self_row == "star_sticker"
+    indexes = {index["name"] for index in inspect(engine).get_indexes("gacha_pulls")}
+    assert "ix_gacha_pulls_user_created" in indexes
@@ -254,7 +254,10 @@ def test_zero_point_wallet_without_participation_is_not_ranked(
         scope=(SEASON_SCOPE_TYPE, str(season.id)),
     )
 
-    with patch("plugins.mailbox.service.MailService.send_mail", return_value=101):
+    with patch(
+        "plugins.mailbox.service.MailService.send_personal_mails",
+        side_effect=lambda mails: [101] * len(mails),
+    ):
         season_service.settle_season("s1", now=END)
 
     rankings = session.query(SeasonRanking).order_by(SeasonRanking.rank).all()
@@ -514,7 +517,11 @@ async def test_lifecycle_retries_deferred_legacy_migration(
         "get_current_season",
         lambda *, now=None: active_season,
     )
-    monkeypatch.setattr(inventory_plugin, "settle_due_seasons", lambda: 0)
+    async def settle_due_seasons():
+        calls.append("settle")
+        return 0
+
+    monkeypatch.setattr(inventory_plugin, "settle_due_seasons", settle_due_seasons)
     monkeypatch.setattr(
         inventory_plugin,
         "dispatch_pending_season_rewards",
@@ -539,7 +546,7 @@ async def test_lifecycle_retries_deferred_legacy_migration(
 
     await inventory_plugin.process_season_lifecycle()
 
-    assert calls == ["migration:due", "open", "participation:active"]
+    assert calls == ["migration:due", "open", "participation:active", "settle"]
 
 
 async def test_lifecycle_does_not_open_when_legacy_migration_fails(
@@ -580,7 +587,8 @@ def test_second_settlement_cannot_rewrite_final_ranking(lifecycle_db):
     session, _ = lifecycle_db
     season = _sync_and_grant(session)
     with patch(
-        "plugins.mailbox.service.MailService.send_mail", return_value=101
+        "plugins.mailbox.service.MailService.send_personal_mails",
+        side_effect=lambda mails: [101] * len(mails),
     ):
         season_service.settle_season("s1", now=END)
 
@@ -610,11 +618,56 @@ def test_second_settlement_cannot_rewrite_final_ranking(lifecycle_db):
     assert ranking.final_points == 125
 
 
+async def test_interrupted_settlement_resumes_from_its_checkpoint(lifecycle_db):
+    session, _ = lifecycle_db
+    season = _sync_and_grant(session, "u1", 100)
+    for user_id, quantity in (("u3", 50), ("u2", 50), ("u5", 10), ("u4", 10)):
+        _sync_and_grant(session, user_id, quantity)
+    season_service.mark_participated("lurker", season.id, now=START + 1)
+
+    chunks = season_service.iter_settlement("s1", now=END, chunk_size=2)
+    next(chunks)
+    chunks.close()
+
+    session.expire_all()
+    assert season.status == "settling"
+    assert season.settled_at == 0
+    progress = season_service.settlement_progress("s1")
+    assert progress["phase"] == "ranking"
+    assert (progress["ranked"], progress["total_rankings"]) == (2, 5)
+    assert session.query(SeasonRanking).count() == 2
+
+    with patch(
+        "plugins.mailbox.service.MailService.send_personal_mails",
+        side_effect=lambda mails: list(range(1, len(mails) + 1)),
+    ) as send:
+        assert await season_service.settle_due_seasons(now=END + 60) == 1
+
+    session.expire_all()
+    rankings = session.query(SeasonRanking).order_by(SeasonRanking.rank).all()
+    assert [(row.rank, row.user_id) for row in rankings] == [
+        (1, "u1"),
+        (2, "u2"),
+        (3, "u3"),
+        (4, "u4"),
+        (5, "u5"),
+    ]
+    rewards = {row.user_id: row for row in session.query(SeasonReward).all()}
+    assert rewards["lurker"].rank == 0
+    assert rewards["u1"].tier_key == "rank_1"
+    assert all(reward.mail_id for reward in rewards.values())
+    assert send.call_count == 1
+    assert len(send.call_args.args[0]) == 6
+    assert season.status == "settled"
+    assert season_service.settlement_progress("s1")["phase"] == "done"
+
+
 def test_settled_season_config_is_frozen(lifecycle_db):
     session, config = lifecycle_db
     season = _sync_and_grant(session)
     with patch(
-        "plugins.mailbox.service.MailService.send_mail", return_value=101
+        "plugins.mailbox.service.MailService.send_personal_mails",
+        side_effect=lambda mails: [101] * len(mails),
     ):
         season_service.settle_season("s1", now=END)
     original_start = season.start_time
@@ -651,7 +704,7 @@ def test_failed_mail_stays_pending_and_can_be_retried(lifecycle_db):
     session, _ = lifecycle_db
     season = _sync_and_grant(session)
     with patch(
-        "plugins.mailbox.service.MailService.send_mail",
+        "plugins.mailbox.service.MailService.send_personal_mails",
         side_effect=RuntimeError("mail db unavailable"),
     ):
         season_service.settle_season("s1", now=END)
@@ -668,15 +721,14 @@ def test_failed_mail_stays_pending_and_can_be_retried(lifecycle_db):
     assert reward.mail_id == 0
 
     with patch(
-        "plugins.mailbox.service.MailService.send_mail", return_value=321
+        "plugins.mailbox.service.MailService.send_personal_mails",
+        side_effect=lambda mails: [321] * len(mails),
     ) as send:
         assert season_service.dispatch_pending_season_rewards() == 1
     session.expire_all()
     assert send.call_count == 1
-    assert (
-        send.call_args.kwargs["external_key"]
-        == f"season_reward:{season.id}:u1"
-    )
+    [mail] = send.call_args.args[0]
+    assert mail.external_key == f"season_reward:{season.id}:u1"
     assert reward.mail_id == 321
 
 
@@ -744,14 +796,15 @@ def test_invalid_rules_are_rejected(lifecycle_db, mutate):
         season_service.sync_seasons_config()
 
 
-def test_normal_due_settlement_remains_idempotent(lifecycle_db):
+async def test_normal_due_settlement_remains_idempotent(lifecycle_db):
     session, _ = lifecycle_db
     season = _sync_and_grant(session)
     with patch(
-        "plugins.mailbox.service.MailService.send_mail", return_value=123
+        "plugins.mailbox.service.MailService.send_personal_mails",
+        side_effect=lambda mails: [123] * len(mails),
     ) as send:
-        assert season_service.settle_due_seasons(now=END) == 1
-        assert season_service.settle_due_seasons(now=END + 60) == 0
+        assert await season_service.settle_due_seasons(now=END) == 1
+        assert await season_service.settle_due_seasons(now=END + 60) == 0
     assert send.call_count == 1
     assert (
         session.query(SeasonReward)
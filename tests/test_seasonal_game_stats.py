@@ -37,3 +37,69 @@ def test_mines_stats_can_be_limited_to_a_season(sqlite_session):
     assert stats.losses == 1
     assert stats.total_wagered == 50
     assert [game.time for game in stats.recent_games] == [199, 100]
+
+
+def test_blackjack_rollup_tracks_new_games_after_first_read(sqlite_session, monkeypatch):
+    from plugins.blackjack import database
+    from plugins.blackjack.models import Base
+    from plugins.blackjack.models import GameResult
+    from plugins.blackjack.models import BlackjackStatsRollup
+    from plugins.blackjack.game_service import BlackjackGameService
+
+    session = sqlite_session(database, Base)
+    timestamps = iter((100, 150, 160, 250))
+    monkeypatch.setattr("plugins.blackjack.game_service.time.time", lambda: next(timestamps))
+    BlackjackGameService.record_game("u1", 10, GameResult.WIN, 10)
+
+    assert BlackjackGameService.get_user_stats("u1", start_time=100, end_time=200)[
+        "total_games"
+    ] == 1
+
+    BlackjackGameService.record_game("u1", 30, GameResult.BLACKJACK, 45)
+    BlackjackGameService.record_game("u1", 20, GameResult.BUST, -20)
+    BlackjackGameService.record_game("u1", 50, GameResult.WIN, 50)  # outside
+
+    stats = BlackjackGameService.get_user_stats("u1", start_time=100, end_time=200)
+    assert stats["total_games"] == 3
+    assert stats["wins"] == 2
+    assert stats["blackjacks"] == 1
+    assert stats["losses"] == 1
+    assert stats["total_wagered"] == 60
+    assert stats["biggest_win"] == 45
+    assert stats["biggest_loss"] == 20
+    assert session.query(BlackjackStatsRollup).count() == 1
+
+    assert BlackjackGameService.backfill_all_rollups(start_time=100, end_time=200) == 1
+    assert BlackjackGameService.get_user_stats("u1", start_time=100, end_time=200) == stats
+
+
+def test_mines_rollup_is_updated_by_end_game(sqlite_session, monkeypatch):
+    from plugins.mines import database
+    from plugins.mines.models import Base
+    from plugins.mines.models import GameResult
+    from plugins.mines.session import GameManager
+    from plugins.mines.stats_service import get_mines_stats
+
+    sqlite_session(database, Base)
+    monkeypatch.setattr("plugins.mines.session.monetary.add", lambda *args: None)
+    monkeypatch.setattr("plugins.mines.session.monetary.cost", lambda *args: None)
+    monkeypatch.setattr("plugins.mines.session.monetary.get", lambda user_id: 1000)
+    monkeypatch.setattr("plugins.mines.models.get_random_kasumi", lambda: None)
+    monkeypatch.setattr("plugins.mines.models.get_random_arisa", lambda: None)
+    assert get_mines_stats("u1").total_games == 0
+
+    manager = GameManager()
+    for payout in (0, 25):
+        manager.start_game("u1", 10)
+        manager.create_session("u1", "c1", 10, 3)
+        manager.end_game("u1", GameResult.CASHOUT if payout else GameResult.LOSE, payout)
+        get_mines_stats("u1")
+
+    stats = get_mines_stats("u1")
+    assert stats.total_games == 2
+    assert stats.wins == 1
+    assert stats.losses == 1
+    assert stats.total_won == 15
+    assert stats.total_lost == 10
+    assert stats.biggest_win == 15
+    assert sorted(game.amount for game in stats.recent_games) == [-10, 15]
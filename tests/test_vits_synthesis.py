@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils.http import http_client
+from plugins.vits.audio import AudioCache
+from plugins.vits.synthesis import Synthesizer
+from plugins.vits.synthesis import SynthesisBusy
+from plugins.vits.synthesis import SynthesisQueue
+
+
+async def _fake_encode(data, source_format, target_format):
+    return b"silk:" + data
+
+
+async def test_identical_requests_synthesize_once_and_survive_a_restart(tmp_path):
+    requests = []
+
+    async def synthesize(request):
+        payload = await request.json()
+        requests.append(payload["text"])
+        await asyncio.sleep(0.05)
+        return web.Response(body=f"wav:{payload['text']}".encode())
+
+    app = web.Application()
+    app.router.add_post("/synthesize", synthesize)
+    server = TestServer(app)
+    await server.start_server()
+    url = str(server.make_url("/synthesize"))
+    try:
+        synthesizer = Synthesizer(
+            url, AudioCache(tmp_path, 1 << 20), SynthesisQueue(), _fake_encode
+        )
+        first, second = await asyncio.gather(
+            synthesizer.silk("u1", "你好", 4), synthesizer.silk("u2", "你好", 4)
+        )
+        assert first == second == "silk:wav:你好".encode()
+        assert synthesizer.queue.metrics.joined == 1
+
+        restarted = Synthesizer(
+            url, AudioCache(tmp_path, 1 << 20), SynthesisQueue(), _fake_encode
+        )
+        assert await restarted.silk("u3", "你好", 4) == first
+        assert await restarted.silk("u3", "你好", 5) == "silk:wav:你好".encode()
+    finally:
+        await http_client.close()
+        await server.close()
+
+    # The other speaker is a different request.
+    assert requests == ["你好", "你好"]
+    assert synthesizer.cache.misses == 2
+    assert restarted.cache.hits == 1
+    assert restarted.cache.misses == 1
+
+
+async def test_queue_takes_turns_between_users_and_rejects_past_its_limits():
+    queue = SynthesisQueue(concurrency=1, max_depth=4, per_user=2)
+    gate = asyncio.Event()
+    order = []
+
+    def job(name):
+        async def run():
+            await gate.wait()
+            order.append(name)
+            return name.encode()
+
+        return run
+
+    tasks = [
+        asyncio.create_task(queue.submit(user, name, job(name)))
+        for user, name in [("a", "a1"), ("a", "a2"), ("b", "b1")]
+    ]
+    await asyncio.sleep(0)
+    assert queue.depth == 3
+    with pytest.raises(SynthesisBusy):
+        await queue.submit("a", "a3", job("a3"))
+
+    gate.set()
+    assert await asyncio.gather(*tasks) == [b"a1", b"a2", b"b1"]
+    assert order == ["a1", "b1", "a2"]
+    assert queue.metrics.rejected == 1
+    assert queue.metrics.completed == 3
+    assert queue.metrics.max_depth == 3
+    assert queue.depth == 0
+
+
+def test_audio_cache_evicts_least_recently_used_files(tmp_path):
+    cache = AudioCache(tmp_path, max_bytes=10)
+    cache.put("aa01", "silk", b"1234")
+    cache.put("bb02", "silk", b"5678")
+    assert cache.get("aa01", "silk") == b"1234"
+    cache.put("cc03", "silk", b"9012")
+
+    assert cache.get("bb02", "silk") is None
+    assert cache.get("aa01", "silk") == b"1234"
+    assert AudioCache(tmp_path, max_bytes=10).total_bytes == 8
@@ -0,0 +1,207 @@
+"""Persistent verification manifest for downloaded asset files.
+
+CCK's card directory, BanG Avatar's icon set and the gacha standing-art cache
+each checked every cached file at boot (a full ``Image.verify`` per CCK card),
+so restart time grew with Bestdori's card count. An :class:`AssetManifest`
+remembers, per file, the size, mtime and SHA-256 it saw and whether the file
+passed its verifier. At the next boot a file whose size and mtime are
+unchanged is answered from the manifest with one ``stat``; only new or changed
+files are verified again. A changed file whose content hash matches a verified
+record (a re-download of identical bytes) is trusted without re-verifying.
+
+The manifest is a JSON file next to the plugin's cache. It is only a cache of
+verification results: deleting it costs one full check on the next boot.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+from typing import Callable
+from typing import Iterable
+from pathlib import Path
+from dataclasses import dataclass
+
+from nonebot.log import logger
+
+MANIFEST_VERSION = 1
+
+
+@dataclass(frozen=True)
+class AssetRecord:
+    size: int
+    mtime_ns: int
+    sha256: str
+    verified: bool
+
+
+@dataclass(frozen=True)
+class AssetScan:
+    #: File names (not paths) that passed verification.
+    valid: set[str]
+    #: Files that exist but failed verification.
+    invalid: list[Path]
+
+    def missing(self, expected: Iterable[str]) -> list[str]:
+        """Expected file names that are not valid, in ``expected`` order."""
+
+        return [name for name in expected if name not in self.valid]
+
+
+class AssetManifest:
+    def __init__(self, root: Path, path: Path) -> None:
+        self.root = root
+        self.path = path
+        self.records = self._load()
+        #: Files run through a verifier since the manifest was loaded.
+        self.verified = 0
+        self._dirty = False
+
+    def is_valid(self, path: Path, verify: Callable[[Path], bool]) -> bool:
+        """Whether ``path`` exists and passes ``verify``, trusting unchanged files."""
+
+        key = self._key(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            if self.records.pop(key, None) is not None:
+                self._dirty = True
+            return False
+        record = self.records.get(key)
+        if (
+            record is not None
+            and record.size == stat.st_size
+            and record.mtime_ns == stat.st_mtime_ns
+        ):
+            return record.verified
+
+        try:
+            digest = _sha256(path)
+        except OSError:
+            return False
+        if record is not None and record.verified and record.sha256 == digest:
+            verified = True
+        else:
+            verified = verify(path)
+            self.verified += 1
+        self.records[key] = AssetRecord(
+            stat.st_size, stat.st_mtime_ns, digest, verified
+        )
+        self._dirty = True
+        return verified
+
+    def mark_verified(self, path: Path) -> None:
+        """Record a file the caller just wrote and validated itself."""
+
+        try:
+            stat = path.stat()
+            digest = _sha256(path)
+        except OSError:
+            return
+        self.records[self._key(path)] = AssetRecord(
+            stat.st_size, stat.st_mtime_ns, digest, True
+        )
+        self._dirty = True
+
+    def scan(self, suffix: str, verify: Callable[[Path], bool]) -> AssetScan:
+        """Check every ``suffix`` file under ``root`` in one walk.
+
+        Records of files that no longer exist are dropped.
+        """
+
+        valid: set[str] = set()
+        invalid: list[Path] = []
+        seen: set[str] = set()
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                if not filename.lower().endswith(suffix):
+                    continue
+                path = Path(directory) / filename
+                seen.add(self._key(path))
+                if self.is_valid(path, verify):
+                    valid.add(filename)
+                else:
+                    invalid.append(path)
+        for key in set(self.records) - seen:
+            del self.records[key]
+            self._dirty = True
+        return AssetScan(valid, invalid)
+
+    def save(self) -> None:
+        """Write the manifest if anything changed; never raises."""
+
+        if not self._dirty:
+            return
+        if self._write(self._payload()):
+            self._dirty = False
+
+    async def save_async(self) -> None:
+        """:meth:`save` with the file write moved off the event loop.
+
+        The payload is serialized on the loop, so records changing during the
+        write are neither torn nor lost: they leave the manifest dirty.
+        """
+
+        if not self._dirty:
+            return
+        payload = self._payload()
+        self._dirty = False
+        if not await asyncio.to_thread(self._write, payload):
+            self._dirty = True
+
+    def _payload(self) -> str:
+        return json.dumps(
+            {
+                "version": MANIFEST_VERSION,
+                "files": {
+                    key: [
+                        record.size,
+                        record.mtime_ns,
+                        record.sha256,
+                        record.verified,
+                    ]
+                    for key, record in sorted(self.records.items())
+                },
+            },
+            separators=(",", ":"),
+        )
+
+    def _write(self, payload: str) -> bool:
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary.write_text(payload, encoding="utf-8")
+            os.replace(temporary, self.path)
+        except OSError as exc:
+            logger.warning(f"asset manifest {self.path.name} not saved: {exc}")
+            return False
+        return True
+
+    def _key(self, path: Path) -> str:
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def _load(self) -> dict[str, AssetRecord]:
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            if raw.get("version") != MANIFEST_VERSION:
+                return {}
+            return {
+                key: AssetRecord(int(size), int(mtime_ns), str(digest), bool(ok))
+                for key, (size, mtime_ns, digest, ok) in raw["files"].items()
+            }
+        except FileNotFoundError:
+            return {}
+        except (AttributeError, KeyError, OSError, TypeError, ValueError) as exc:
+            logger.warning(f"asset manifest {self.path.name} ignored: {exc}")
+            return {}
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,226 @@
+"""Async audio transcoding through subprocess pipes.
+
+The old encoders wrote every clip to temp files, ran ``ffmpeg`` through a
+shell with blocking ``subprocess.run``, ran the SILK CLI the same way and read
+the result back from disk, all on the event loop. Here every stage is an
+asyncio subprocess fed from and read into memory:
+
+- :func:`decode_pcm` pipes the source into ``ffmpeg`` and reads mono 16-bit
+  PCM at :data:`SAMPLE_RATE` from its stdout;
+- :func:`pcm_to_mp3` pipes that PCM through ``ffmpeg`` again;
+- :func:`pcm_to_silk` pipes it into the SILK CLI, which reads ``/dev/stdin``
+  and writes into a named pipe, because its stdout carries its log (without
+  named pipes, on Windows, it goes through temporary files instead);
+- :func:`transcode` decodes once and runs every requested encoder on the
+  same PCM.
+
+Each stage runs under :data:`TRANSCODE_TIMEOUT_SECONDS`, is killed past it,
+and takes one of :data:`TRANSCODE_CONCURRENCY` slots. :data:`metrics` keeps
+runs, failures and seconds per stage.
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+from typing import Iterable
+from pathlib import Path
+from dataclasses import dataclass
+
+from nonebot.log import logger
+
+FFMPEG = "ffmpeg"
+SILK_ENCODER = "./cli"
+SAMPLE_RATE = 24000
+TRANSCODE_TIMEOUT_SECONDS = 30
+
+# Encoders are CPU-bound; a burst of voice replies should queue rather than
+# start one ffmpeg per request.
+TRANSCODE_CONCURRENCY = max(1, min(4, os.cpu_count() or 1))
+
+
+@dataclass
+class StageMetrics:
+    runs: int = 0
+    failures: int = 0
+    #: Wall time spent in the stage, excluding the wait for a slot.
+    seconds: float = 0.0
+
+
+metrics: dict[str, StageMetrics] = {}
+
+_slots: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+
+async def run_pipe(stage: str, args: list[str], data: bytes = b"") -> bytes:
+    """Run ``args`` with ``data`` on stdin and return what it wrote to stdout.
+
+    Raises:
+        RuntimeError: The process timed out or exited with a non-zero code.
+    """
+
+    async with _transcode_slots():
+        stage_metrics = metrics.setdefault(stage, StageMetrics())
+        stage_metrics.runs += 1
+        started = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                async with asyncio.timeout(TRANSCODE_TIMEOUT_SECONDS):
+                    stdout, stderr = await process.communicate(input=data)
+            except asyncio.CancelledError:
+                process.kill()
+                raise
+            except TimeoutError as error:
+                process.kill()
+                await process.communicate()
+                raise RuntimeError(
+                    f"{stage} timed out after {TRANSCODE_TIMEOUT_SECONDS}s"
+                ) from error
+            if process.returncode != 0:
+                detail = stderr.decode(errors="replace").strip()[-500:]
+                raise RuntimeError(
+                    f"{stage} failed with exit code {process.returncode}: {detail}"
+                )
+            return stdout
+        except Exception:
+            stage_metrics.failures += 1
+            raise
+        finally:
+            stage_metrics.seconds += time.perf_counter() - started
+
+
+async def decode_pcm(file: bytes, format: str = "wav") -> bytes:
+    """Decode ``file`` to mono signed 16-bit PCM at :data:`SAMPLE_RATE`."""
+
+    return await run_pipe(
+        "decode",
+        [
+            FFMPEG,
+            *("-hide_banner", "-loglevel", "error"),
+            *("-f", format, "-i", "pipe:0"),
+            *("-f", "s16le", "-acodec", "pcm_s16le"),
+            *("-ar", str(SAMPLE_RATE), "-ac", "1", "pipe:1"),
+        ],
+        file,
+    )
+
+
+async def pcm_to_mp3(pcm: bytes) -> bytes:
+    """Encode PCM from :func:`decode_pcm` as MP3."""
+
+    return await run_pipe(
+        "mp3",
+        [
+            FFMPEG,
+            *("-hide_banner", "-loglevel", "error"),
+            *("-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0"),
+            *("-f", "mp3", "-acodec", "libmp3lame", "pipe:1"),
+        ],
+        pcm,
+    )
+
+
+async def pcm_to_silk(pcm: bytes) -> bytes:
+    """Encode PCM from :func:`decode_pcm` as SILK.
+
+    Where ``os.mkfifo`` exists the PCM is piped in through ``/dev/stdin`` and
+    the result read back from a named pipe. Elsewhere (Windows) both go
+    through temporary files instead.
+    """
+
+    with tempfile.TemporaryDirectory(prefix="silk-") as directory:
+        output_path = os.path.join(directory, "output.silk")
+        if not hasattr(os, "mkfifo"):
+            return await _silk_through_files(directory, output_path, pcm)
+        os.mkfifo(output_path)
+        # Holding a write end open ourselves means the reader neither sees an
+        # early EOF before the encoder opens the pipe nor blocks forever when
+        # the encoder dies without opening it.
+        read_fd = os.open(output_path, os.O_RDONLY | os.O_NONBLOCK)
+        write_fd = os.open(output_path, os.O_WRONLY)
+        os.set_blocking(read_fd, True)
+        reader = asyncio.create_task(asyncio.to_thread(_drain, read_fd))
+        try:
+            await run_pipe("silk", _silk_args("/dev/stdin", output_path), pcm)
+        finally:
+            os.close(write_fd)
+            try:
+                silk = await reader
+            finally:
+                os.close(read_fd)
+    return silk
+
+
+async def _silk_through_files(directory: str, output_path: str, pcm: bytes) -> bytes:
+    input_path = Path(directory, "input.pcm")
+    await asyncio.to_thread(input_path.write_bytes, pcm)
+    await run_pipe("silk", _silk_args(str(input_path), output_path))
+    return await asyncio.to_thread(Path(output_path).read_bytes)
+
+
+def _silk_args(input_path: str, output_path: str) -> list[str]:
+    return [
+        SILK_ENCODER,
+        *("-i", input_path, "-o", output_path),
+        *("-s", str(SAMPLE_RATE)),
+    ]
+
+
+ENCODERS = {"mp3": pcm_to_mp3, "silk": pcm_to_silk}
+
+
+async def transcode(
+    file: bytes, format: str, targets: Iterable[str]
+) -> dict[str, bytes]:
+    """Encode ``file`` into each of ``targets``, decoding it only once.
+
+    ``targets`` are keys of :data:`ENCODERS`, or ``"pcm"`` for the decoded
+    PCM itself.
+    """
+
+    targets = list(dict.fromkeys(targets))
+    unknown = [
+        target for target in targets if target != "pcm" and target not in ENCODERS
+    ]
+    if unknown:
+        raise ValueError(f"unknown audio targets: {', '.join(unknown)}")
+
+    pcm = await decode_pcm(file, format)
+    encoders = [target for target in targets if target != "pcm"]
+    encoded = await asyncio.gather(*(ENCODERS[target](pcm) for target in encoders))
+    results = dict(zip(encoders, encoded))
+    if "pcm" in targets:
+        results["pcm"] = pcm
+    return results
+
+
+def log_transcode_metrics() -> None:
+    for stage, stage_metrics in sorted(metrics.items()):
+        average = stage_metrics.seconds / max(stage_metrics.runs, 1)
+        logger.info(
+            f"transcode {stage}: {stage_metrics.runs} runs, "
+            f"{stage_metrics.failures} failed, {average:.3f}s average"
+        )
+
+
+def _drain(fd: int) -> bytes:
+    chunks = []
+    while chunk := os.read(fd, 65536):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _transcode_slots() -> asyncio.Semaphore:
+    """Bound concurrent encoder processes; one semaphore per event loop."""
+
+    global _slots
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots[0] is not loop:
+        _slots = (loop, asyncio.Semaphore(TRANSCODE_CONCURRENCY))
+    return _slots[1]
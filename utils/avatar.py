@@ -5,10 +5,17 @@ fallback because the only avatar path in the codebase
 (``bang_avatar.utils.get_group_member_head``) downloads per call. This module
 makes real avatars affordable on per-move surfaces:
 
-- memory cache for the hot path (a mines game renders every dig),
-- disk cache under the localstore cache dir with a TTL,
+- memory cache for the hot path (a mines game renders every dig): an LRU
+  bounded by decoded bytes, not entry count,
+- disk cache under the localstore cache dir with a TTL; an expired avatar is
+  still served while a background refresh replaces it,
+- single-flight fetches: concurrent callers for one user share a download,
+  and downloads for different users run in parallel up to a small limit (a
+  cold 50-row leaderboard no longer fetches one avatar at a time),
 - a negative cache so an id that failed to resolve does not add an HTTP
   round-trip to every message for the next few minutes,
+- ready-to-composite circular discs at the sizes identity surfaces draw
+  (``plugins.render.discs``), built once per fetch and kept beside the PNG,
 - hard timeout, never raises: on any failure the caller gets ``None`` and the
   surfaces keep their initial-badge fallback.
 
@@ -20,12 +27,18 @@ import time
 import asyncio
 from io import BytesIO
 from pathlib import Path
+from collections import OrderedDict
 
-import aiohttp
 from PIL import Image
 from nonebot import get_driver
 from nonebot.log import logger
+from PIL.PngImagePlugin import PngInfo
 
+from plugins.render.discs import circle_disc
+from plugins.render.discs import disc_diameters
+from plugins.render.discs import seed_avatar_discs
+
+from .http import http_client
 from .image_tasks import run_image_task
 
 #: Where q.qlogo.cn serves QQ-bot app avatars; mode 5 is the 140px variant,
@@ -37,14 +50,88 @@ _URL_TEMPLATE = "https://q.qlogo.cn/qqapp/{app_id}/{user_id}/5"
 _SENTINEL_UID = "0"
 
 _FETCH_TIMEOUT_SECONDS = 3.0
+_FETCH_CONCURRENCY = 8
 _DISK_TTL_SECONDS = 24 * 60 * 60
 _NEGATIVE_TTL_SECONDS = 600.0
-_MAX_MEMORY_ENTRIES = 512
+_AVATAR_SIDE = 140
+#: Avatars kept decoded in memory, about 119 MiB with their discs.
+_MEMORY_AVATARS = 400
+#: Decoded RGBA bytes of one cached avatar: the source (about 77 KiB) plus
+#: its pre-scaled discs (about 228 KiB), which the LRU counts with it.
+_AVATAR_ENTRY_BYTES = 4 * (
+    _AVATAR_SIDE * _AVATAR_SIDE + sum(side * side for side in disc_diameters())
+)
+_MAX_MEMORY_BYTES = _MEMORY_AVATARS * _AVATAR_ENTRY_BYTES
+
+
+class _AvatarLRU:
+    """Decoded avatars in least-recently-used order, bounded by decoded size.
+
+    Each entry keeps the wall-clock time it was fetched so a stale avatar can
+    still be served while it is refreshed.
+    """
 
-_memory: dict[str, Image.Image] = {}
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: OrderedDict[str, tuple[Image.Image, float]] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str) -> tuple[Image.Image, float] | None:
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            self._entries.move_to_end(user_id)
+        return entry
+
+    def put(
+        self,
+        user_id: str,
+        image: Image.Image,
+        fetched_at: float,
+        *,
+        extra_bytes: int = 0,
+    ) -> None:
+        """Cache ``image``; ``extra_bytes`` counts data that lives with it."""
+
+        self.pop(user_id)
+        size = _image_bytes(image) + extra_bytes
+        if size > self.max_bytes:
+            return
+        self._entries[user_id] = (image, fetched_at)
+        self._sizes[user_id] = size
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            evicted, _ = self._entries.popitem(last=False)
+            self.bytes -= self._sizes.pop(evicted)
+
+    def pop(self, user_id: str) -> None:
+        if self._entries.pop(user_id, None) is not None:
+            self.bytes -= self._sizes.pop(user_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._sizes.clear()
+        self.bytes = 0
+
+
+def _image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+_memory = _AvatarLRU(_MAX_MEMORY_BYTES)
 _negative: dict[str, float] = {}
+#: Monotonic deadline before which a failed background refresh is not retried.
+_revalidate_after: dict[str, float] = {}
 _default_fingerprints: set[bytes] | None = None
-_lock = asyncio.Lock()
+#: One task per user id, refresh or fingerprint key currently in flight.
+_inflight: dict[object, asyncio.Task] = {}
+_slots: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
 
 
 def _cache_dir() -> Path:
@@ -66,11 +153,84 @@ def _load_rgba(source: Path | BytesIO) -> Image.Image:
         return opened.convert("RGBA")
 
 
-def _decode_and_store(payload: bytes, disk_path: Path) -> Image.Image:
+def _decode_and_store(
+    payload: bytes, disk_path: Path
+) -> tuple[Image.Image, dict[int, Image.Image]]:
     image = _load_rgba(BytesIO(payload))
     disk_path.parent.mkdir(parents=True, exist_ok=True)
     image.save(disk_path)
-    return image
+    discs = _build_discs(image, disk_path)
+    return image, discs
+
+
+def _load_from_disk(disk_path: Path) -> tuple[Image.Image, dict[int, Image.Image]]:
+    image = _load_rgba(disk_path)
+    try:
+        discs = _load_discs(_discs_path(disk_path))
+    except OSError:
+        discs = None
+    if discs is None:
+        discs = _build_discs(image, disk_path)
+    return image, discs
+
+
+def _discs_path(disk_path: Path) -> Path:
+    return disk_path.with_suffix(".discs.png")
+
+
+def _build_discs(image: Image.Image, disk_path: Path) -> dict[int, Image.Image]:
+    """Render the standard avatar discs and persist them as one strip PNG.
+
+    The strip lays the discs out left to right, smallest first; its
+    ``diameters`` text chunk records the layout, so a changed size list is
+    detected on load and the strip rebuilt.
+    """
+
+    diameters = disc_diameters()
+    discs = {diameter: circle_disc(image, diameter) for diameter in diameters}
+    strip = Image.new("RGBA", (sum(diameters), max(diameters)), (0, 0, 0, 0))
+    x = 0
+    for diameter in diameters:
+        strip.paste(discs[diameter], (x, 0))
+        x += diameter
+    info = PngInfo()
+    info.add_text("diameters", ",".join(map(str, diameters)))
+    try:
+        strip.save(_discs_path(disk_path), pnginfo=info)
+    except OSError:
+        pass
+    return discs
+
+
+def _load_discs(path: Path) -> dict[int, Image.Image] | None:
+    if not path.exists():
+        return None
+    diameters = disc_diameters()
+    with Image.open(path) as opened:
+        if opened.info.get("diameters") != ",".join(map(str, diameters)):
+            return None
+        strip = opened.convert("RGBA")
+    discs = {}
+    x = 0
+    for diameter in diameters:
+        discs[diameter] = strip.crop((x, 0, x + diameter, diameter))
+        x += diameter
+    return discs
+
+
+def _remember(
+    user_id: str,
+    image: Image.Image,
+    discs: dict[int, Image.Image],
+    fetched_at: float,
+) -> None:
+    seed_avatar_discs(image, discs)
+    _memory.put(
+        user_id,
+        image,
+        fetched_at,
+        extra_bytes=sum(_image_bytes(disc) for disc in discs.values()),
+    )
 
 
 async def get_avatar(user_id: str) -> Image.Image | None:
@@ -93,50 +253,119 @@ async def get_avatar(user_id: str) -> Image.Image | None:
 async def _get_avatar(user_id: str) -> Image.Image | None:
     cached = _memory.get(user_id)
     if cached is not None:
-        return cached
+        image, fetched_at = cached
+        if time.time() - fetched_at >= _DISK_TTL_SECONDS:
+            _revalidate(user_id)
+        return image
     if _negative.get(user_id, 0.0) > time.monotonic():
         return None
+    # Every concurrent caller for this user awaits the same load; shield it so
+    # one cancelled handler does not cancel the fetch for the others.
+    return await asyncio.shield(_single_flight(user_id, lambda: _load(user_id)))
+
 
+async def _load(user_id: str) -> Image.Image | None:
     disk_path = _cache_dir() / f"{user_id}.png"
-    if disk_path.exists() and time.time() - disk_path.stat().st_mtime < _DISK_TTL_SECONDS:
+    if disk_path.exists():
+        fetched_at = disk_path.stat().st_mtime
         try:
-            image = await run_image_task(_load_rgba, disk_path)
-            _remember(user_id, image)
-            return image
+            image, discs = await run_image_task(_load_from_disk, disk_path)
         except OSError:
             disk_path.unlink(missing_ok=True)
+        else:
+            _remember(user_id, image, discs, fetched_at)
+            if time.time() - fetched_at >= _DISK_TTL_SECONDS:
+                # Stale-while-revalidate: an old avatar beats waiting on
+                # q.qlogo.cn, and the refresh lands before the next render.
+                _revalidate(user_id)
+            return image
+    return await _fetch(user_id, disk_path)
+
 
+async def _fetch(
+    user_id: str, disk_path: Path, *, stale: bool = False
+) -> Image.Image | None:
     app_id = _app_id()
     if not app_id:
         _negative[user_id] = time.monotonic() + _NEGATIVE_TTL_SECONDS
         return None
 
-    async with _lock:
-        # Re-check after the lock: a concurrent handler may have fetched it.
-        cached = _memory.get(user_id)
-        if cached is not None:
-            return cached
+    async with _fetch_slots():
         payload = await _download(app_id, user_id)
-        if payload is None or await _is_default_penguin(app_id, payload):
-            # q.qlogo.cn answers unknown uids with 200 + the stock penguin
-            # rather than an error; the initial badge looks better than a
-            # generic penguin, so the stock image counts as "no avatar".
+    if payload is None:
+        if stale:
+            # Keep serving the cached avatar; try again after a while.
+            _revalidate_after[user_id] = time.monotonic() + _NEGATIVE_TTL_SECONDS
+        else:
             _negative[user_id] = time.monotonic() + _NEGATIVE_TTL_SECONDS
-            return None
-        image = await run_image_task(_decode_and_store, payload, disk_path)
-        _remember(user_id, image)
-        return image
+        return None
+    if await _is_default_penguin(app_id, payload):
+        # q.qlogo.cn answers unknown uids with 200 + the stock penguin rather
+        # than an error; the initial badge looks better than a generic
+        # penguin, so the stock image counts as "no avatar" — also when it
+        # replaces an avatar the user has since removed.
+        invalidate(user_id)
+        _negative[user_id] = time.monotonic() + _NEGATIVE_TTL_SECONDS
+        return None
+    image, discs = await run_image_task(_decode_and_store, payload, disk_path)
+    _remember(user_id, image, discs, time.time())
+    return image
+
+
+def _revalidate(user_id: str) -> None:
+    """Refresh a stale avatar in the background; callers keep the old one."""
+
+    key = ("refresh", user_id)
+    if key in _inflight or _revalidate_after.get(user_id, 0.0) > time.monotonic():
+        return
+
+    async def refresh() -> None:
+        try:
+            await _fetch(user_id, _cache_dir() / f"{user_id}.png", stale=True)
+        except Exception:
+            _revalidate_after[user_id] = time.monotonic() + _NEGATIVE_TTL_SECONDS
+            logger.opt(exception=True).debug(f"avatar refresh failed for {user_id!r}")
+
+    _single_flight(key, refresh)
+
+
+def _single_flight(key: object, factory) -> asyncio.Task:
+    """Return the in-flight task for ``key``, starting ``factory()`` if none."""
+
+    task = _inflight.get(key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.create_task(factory())
+        _inflight[key] = task
+
+        def forget(done: asyncio.Task) -> None:
+            if _inflight.get(key) is done:
+                del _inflight[key]
+
+        task.add_done_callback(forget)
+    return task
+
+
+def _fetch_slots() -> asyncio.Semaphore:
+    """Bound concurrent avatar downloads; one semaphore per event loop."""
+
+    global _slots
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots[0] is not loop:
+        _slots = (loop, asyncio.Semaphore(_FETCH_CONCURRENCY))
+    return _slots[1]
 
 
 async def _download(app_id: str, user_id: str) -> bytes | None:
-    timeout = aiohttp.ClientTimeout(total=_FETCH_TIMEOUT_SECONDS)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.get(
-            _URL_TEMPLATE.format(app_id=app_id, user_id=user_id)
-        ) as response:
-            if response.status != 200:
-                return None
-            payload = await response.read()
+    # No retries: the hard timeout is the whole budget on a message path.
+    async with http_client.request(
+        "GET",
+        _URL_TEMPLATE.format(app_id=app_id, user_id=user_id),
+        timeout=_FETCH_TIMEOUT_SECONDS,
+        retries=0,
+    ) as response:
+        if response.status != 200:
+            return None
+        payload = await response.read()
     return payload or None
 
 
@@ -151,27 +380,31 @@ async def _is_default_penguin(app_id: str, payload: bytes) -> bool:
 
     import hashlib
 
-    global _default_fingerprints
     if _default_fingerprints is None:
-        sentinel = await _download(app_id, _SENTINEL_UID)
-        _default_fingerprints = (
-            {hashlib.sha256(sentinel).digest()} if sentinel else set()
+        await asyncio.shield(
+            _single_flight(("fingerprint", app_id), lambda: _fingerprint(app_id))
         )
     return hashlib.sha256(payload).digest() in _default_fingerprints
 
 
-def _remember(user_id: str, image: Image.Image) -> None:
-    if len(_memory) >= _MAX_MEMORY_ENTRIES:
-        _memory.pop(next(iter(_memory)), None)
-    _memory[user_id] = image
+async def _fingerprint(app_id: str) -> None:
+    import hashlib
+
+    global _default_fingerprints
+    async with _fetch_slots():
+        sentinel = await _download(app_id, _SENTINEL_UID)
+    _default_fingerprints = {hashlib.sha256(sentinel).digest()} if sentinel else set()
 
 
 def invalidate(user_id: str) -> None:
     """Drop one user's cached avatar (memory, negative, and disk)."""
 
-    _memory.pop(user_id, None)
+    _memory.pop(user_id)
     _negative.pop(user_id, None)
+    _revalidate_after.pop(user_id, None)
+    disk_path = _cache_dir() / f"{user_id}.png"
     try:
-        (_cache_dir() / f"{user_id}.png").unlink(missing_ok=True)
+        disk_path.unlink(missing_ok=True)
+        _discs_path(disk_path).unlink(missing_ok=True)
     except OSError:
         pass
@@ -42,6 +42,8 @@ from plugins.render import Component
 from plugins.render import PlayerIdentity
 from plugins.render import PullRevealItem
 from plugins.render.color import ColorLike
+from plugins.render.discs import DISC_RENDER_RATIO
+from plugins.render.discs import avatar_disc
 from plugins.render.types import ImageSource
 
 #: Outer content column. Every card uses this so grids line up across plugins.
@@ -870,12 +872,13 @@ def avatar_or_initial(
     """
 
     if identity.avatar is not None:
+        # A pre-scaled disc at the page render ratio: no resize or circle
+        # clip is left for the kit to do per render.
         base: Component = kit.image(
-            identity.avatar,
+            avatar_disc(identity.avatar, size * DISC_RENDER_RATIO),
             width=Fixed(size),
             height=Fixed(size),
             fit="cover",
-            radius=size // 2,
         )
     else:
         initial = identity.nickname[:1] or "?"
@@ -15,6 +15,7 @@ Rules:
   need nothing from this module.
 """
 
+import time
 import datetime
 
 #: The product timezone. Seasons.json carries "UTC+8" as well; if the product
@@ -40,6 +41,19 @@ def bot_date(timestamp: float) -> datetime.date:
     return datetime.datetime.fromtimestamp(timestamp, tz=BOT_TZ).date()
 
 
+def next_bot_midnight(timestamp: float | None = None) -> int:
+    """Epoch of the first product-timezone midnight after ``timestamp``.
+
+    Caches keyed by :func:`bot_today` compare ``time.time()`` against this
+    instead of formatting the current date on every lookup.
+    """
+
+    now = to_bot_time(time.time() if timestamp is None else timestamp)
+    tomorrow = now.date() + datetime.timedelta(days=1)
+    midnight = datetime.datetime.combine(tomorrow, datetime.time(), tzinfo=BOT_TZ)
+    return int(midnight.timestamp())
+
+
 def to_bot_time(timestamp: float) -> datetime.datetime:
     """An epoch timestamp as an aware datetime in the product timezone."""
 
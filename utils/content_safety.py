@@ -7,15 +7,21 @@ this module prevents.
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from functools import lru_cache
-from pathlib import Path
 import unicodedata
-
+from typing import TypeVar
+from typing import Iterable
+from typing import Iterator
+from pathlib import Path
+from functools import lru_cache
+from collections import deque
+from dataclasses import field
+from dataclasses import dataclass
 
 _LEXICON_DIRECTORY = Path(__file__).with_name("resources") / "sensitive_lexicon"
 _LEXICON_FILES = ("politics.txt", "reactionary.txt")
 
+K = TypeVar("K")
+
 
 class ContentSafetyError(ValueError):
     """Raised when user-controlled text must not be sent or stored."""
@@ -40,11 +46,79 @@ def normalize_text(text: str) -> str:
     )
 
 
+class _TermAutomaton:
+    """Aho–Corasick automaton answering "does any term occur in this text?".
+
+    States are list indices: ``goto[state]`` maps a character to the next
+    state, ``fail[state]`` is the longest proper suffix that is also a trie
+    prefix, and ``terminal[state]`` is true when some term ends here or
+    anywhere down the fail chain.  One pass over the text therefore checks
+    every term at once, however large the lexicon is.
+    """
+
+    __slots__ = ("goto", "fail", "terminal")
+
+    def __init__(self, terms: Iterable[str]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        terminal = [False]
+        for term in terms:
+            state = 0
+            for character in term:
+                next_state = goto[state].get(character)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][character] = next_state
+                    goto.append({})
+                    terminal.append(False)
+                state = next_state
+            terminal[state] = True
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and character not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(character, 0)
+                terminal[next_state] = terminal[next_state] or terminal[
+                    fail[next_state]
+                ]
+
+        self.goto = goto
+        self.fail = fail
+        self.terminal = terminal
+
+    def search(self, text: str) -> bool:
+        goto = self.goto
+        fail = self.fail
+        terminal = self.terminal
+        state = 0
+        for character in text:
+            while state and character not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(character, 0)
+            if terminal[state]:
+                return True
+        return False
+
+
 @dataclass(frozen=True)
 class SensitiveTextPolicy:
-    """A small immutable lexicon with normalized substring matching."""
+    """An immutable lexicon with normalized substring matching.
+
+    The terms are compiled once into an Aho–Corasick automaton, so a check
+    costs one pass over the normalized text rather than one substring scan
+    per term.
+    """
 
     terms: frozenset[str]
+    _automaton: _TermAutomaton = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_automaton", _TermAutomaton(self.terms))
 
     @classmethod
     def from_terms(cls, terms: tuple[str, ...] | list[str]) -> "SensitiveTextPolicy":
@@ -67,7 +141,19 @@ class SensitiveTextPolicy:
 
     def contains(self, text: str) -> bool:
         normalized = normalize_text(text)
-        return bool(normalized) and any(term in normalized for term in self.terms)
+        return bool(normalized) and self._automaton.search(normalized)
+
+    def scan(self, entries: Iterable[tuple[K, str | None]]) -> Iterator[K]:
+        """Yield the key of every ``(key, text)`` entry whose text matches.
+
+        Meant for bulk remediation such as the startup nickname purge: the
+        entries can stream straight from a query, and ``None`` texts are
+        skipped.
+        """
+
+        for key, text in entries:
+            if text is not None and self.contains(text):
+                yield key
 
 
 def ensure_safe_text(
@@ -0,0 +1,183 @@
+"""Process-wide pooled HTTP client for outbound fetches.
+
+Avatar, card art, jacket and TTS requests used to open an
+``aiohttp.ClientSession`` per call, paying a fresh TCP+TLS handshake each
+time. :data:`http_client` keeps one session for the whole process instead:
+
+- one connector: a global and a per-host connection limit, keep-alive, and a
+  DNS cache,
+- uniform timeouts, overridable per request,
+- retries with exponential backoff for connection errors, timeouts, 429 and
+  5xx (GET/HEAD by default; other methods opt in with ``retries=``),
+- per-host request metrics.
+
+``bot.py`` opens and closes it with the driver. Outside the bot the session is
+created on first use, and re-created (letting go of the old one) if the event
+loop it was bound to has gone away, so tests and scripts need no setup.
+"""
+
+import time
+import asyncio
+from typing import Any
+from typing import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import field
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import aiohttp
+from nonebot.log import logger
+
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+DEFAULT_RETRIES = 2
+BACKOFF_SECONDS = 0.5
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 16
+DNS_CACHE_SECONDS = 300
+KEEPALIVE_SECONDS = 30
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD"})
+
+
+@dataclass
+class HostMetrics:
+    requests: int = 0
+    retries: int = 0
+    errors: int = 0
+    #: Responses by status class: ``2xx``, ``4xx``, ...
+    statuses: dict[str, int] = field(default_factory=dict)
+    #: Seconds until response headers, summed over requests.
+    seconds: float = 0.0
+
+    def record(self, status: int) -> None:
+        key = f"{status // 100}xx"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+
+class HttpClient:
+    def __init__(
+        self,
+        *,
+        limit: int = CONNECTION_LIMIT,
+        limit_per_host: int = CONNECTION_LIMIT_PER_HOST,
+        timeout: aiohttp.ClientTimeout = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = BACKOFF_SECONDS,
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.metrics: dict[str, HostMetrics] = {}
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._discard_session()
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=DNS_CACHE_SECONDS,
+                keepalive_timeout=KEEPALIVE_SECONDS,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout
+            )
+            self._loop = loop
+        return self._session
+
+    def _discard_session(self) -> None:
+        """Let go of a session bound to another event loop.
+
+        Its loop can't be awaited from here: if it still runs (in another
+        thread) the session is closed there, otherwise its connector is
+        detached so the session reads as closed and isn't reused.
+        """
+
+        session, self._session = self._session, None
+        if session is None or session.closed:
+            return
+        if self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), self._loop)
+        else:
+            session.detach()
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        timeout: float | aiohttp.ClientTimeout | None = None,
+        retries: int | None = None,
+        backoff: float | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Send a request and yield its response, retrying transient failures.
+
+        The last response is yielded whatever its status; the last exception
+        is raised once the retries are spent. ``kwargs`` go to
+        ``aiohttp.ClientSession.request`` (``headers``, ``json``, ``proxy``…).
+        """
+
+        method = method.upper()
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+        backoff = self.backoff if backoff is None else backoff
+        if isinstance(timeout, (int, float)):
+            timeout = aiohttp.ClientTimeout(total=timeout)
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        metrics = self.metrics.setdefault(urlsplit(url).netloc, HostMetrics())
+
+        for attempt in range(retries + 1):
+            if attempt:
+                metrics.retries += 1
+                await asyncio.sleep(backoff * 2 ** (attempt - 1))
+            metrics.requests += 1
+            started = time.perf_counter()
+            try:
+                response = await self.session().request(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                metrics.errors += 1
+                metrics.seconds += time.perf_counter() - started
+                if attempt == retries:
+                    raise
+                continue
+            metrics.seconds += time.perf_counter() - started
+            metrics.record(response.status)
+            if response.status in RETRY_STATUSES and attempt < retries:
+                response.release()
+                continue
+            try:
+                yield response
+            finally:
+                response.release()
+            return
+
+    async def get_bytes(self, url: str, **kwargs: Any) -> bytes:
+        """GET ``url`` and return the body; raises on a non-2xx status."""
+
+        async with self.request("GET", url, **kwargs) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def start(self) -> None:
+        self.session()
+
+    async def close(self) -> None:
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
+        for host, metrics in sorted(self.metrics.items()):
+            logger.info(
+                f"http {host}: requests={metrics.requests} retries={metrics.retries} "
+                f"errors={metrics.errors} statuses={metrics.statuses} "
+                f"avg={metrics.seconds / max(1, metrics.requests) * 1000:.0f}ms"
+            )
+
+
+http_client = HttpClient()
@@ -15,9 +15,16 @@ Avatars are deliberately not fetched here: the only existing avatar path
 (``plugins.bang_avatar.utils.get_group_member_head``) downloads per call with
 no cache, which is unacceptable on a surface that renders once per game move.
 Callers that already hold an avatar image pass it via ``avatar=``.
+
+Multi-player surfaces (ladders, result cards) go through
+:func:`load_identities`, which loads nicknames, levels and equipped frames for
+the whole set with one query per table. Loaded facts are memoized for a few
+seconds so the rows and viewer strip of one request share a single load.
 """
 
+import time
 import asyncio
+from collections.abc import Mapping
 from collections.abc import Iterable
 
 from nonebot.log import logger
@@ -25,6 +32,15 @@ from nonebot.log import logger
 from plugins.render import PlayerIdentity
 from plugins.render.types import ImageSource
 
+#: How long loaded facts are reused. Long enough that one request (a ladder
+#: plus its viewer row, a result card with several players) loads each player
+#: once; short enough that a nickname or frame change shows up on the next
+#: command.
+_MEMO_TTL_SECONDS = 3.0
+_MEMO_MAX_ENTRIES = 512
+
+_memo: dict[str, tuple[float, str | None, int | None, ImageSource | None]] = {}
+
 
 def identity_for(
     user_id: str,
@@ -41,16 +57,42 @@ def identity_for(
         Identity with the best data available.
     """
 
-    return PlayerIdentity(
-        nickname=_nickname(user_id),
-        level=_level(user_id),
-        avatar=avatar,
-        avatar_frame=_avatar_frame(user_id),
-    )
+    return load_identities((user_id,), {user_id: avatar})[user_id]
+
+
+def load_identities(
+    user_ids: Iterable[str],
+    avatars: Mapping[str, ImageSource | None] | None = None,
+) -> dict[str, PlayerIdentity]:
+    """Assemble several identities with one query per source table.
+
+    Nicknames, levels and equipped frames are each loaded for the whole set at
+    once. Never raises, never writes.
+
+    Args:
+        user_ids: Player ids; duplicates are collapsed.
+        avatars: Optional avatar images the caller already holds, by user id.
+
+    Returns:
+        Identities keyed by user id, in first-seen order.
+    """
+
+    ordered = tuple(dict.fromkeys(str(user_id) for user_id in user_ids))
+    facts = _load_facts(ordered)
+    avatars = avatars or {}
+    return {
+        user_id: PlayerIdentity(
+            nickname=_nickname(user_id, facts[user_id][0]),
+            level=facts[user_id][1],
+            avatar=avatars.get(user_id),
+            avatar_frame=facts[user_id][2],
+        )
+        for user_id in ordered
+    }
 
 
 async def identities_for(user_ids: Iterable[str]) -> dict[str, PlayerIdentity]:
-    """Fetch and assemble several identities concurrently for leaderboard rows."""
+    """Fetch avatars concurrently and assemble identities for leaderboard rows."""
 
     from utils.avatar import get_avatar
 
@@ -59,23 +101,53 @@ async def identities_for(user_ids: Iterable[str]) -> dict[str, PlayerIdentity]:
         *(get_avatar(user_id) for user_id in ordered),
         return_exceptions=True,
     )
-    return {
-        user_id: identity_for(
-            user_id,
-            avatar=None if isinstance(avatar, BaseException) else avatar,
-        )
-        for user_id, avatar in zip(ordered, avatars)
-    }
+    return load_identities(
+        ordered,
+        {
+            user_id: None if isinstance(avatar, BaseException) else avatar
+            for user_id, avatar in zip(ordered, avatars)
+        },
+    )
 
 
-def _nickname(user_id: str) -> str:
-    try:
-        from plugins.nickname import get
+def _load_facts(
+    user_ids: tuple[str, ...],
+) -> dict[str, tuple[str | None, int | None, ImageSource | None]]:
+    now = time.monotonic()
+    facts = {}
+    missing = []
+    for user_id in user_ids:
+        hit = _memo.get(user_id)
+        if hit is not None and hit[0] > now:
+            facts[user_id] = hit[1:]
+        else:
+            missing.append(user_id)
+    if not missing:
+        return facts
+
+    nicknames = _nicknames(missing)
+    levels = _levels(missing)
+    frames = _avatar_frames(missing)
+    # A source that failed degrades this answer but is not remembered.
+    cacheable = None not in (nicknames, levels, frames)
+    if cacheable and len(_memo) + len(missing) > _MEMO_MAX_ENTRIES:
+        for user_id in [key for key, hit in _memo.items() if hit[0] <= now]:
+            del _memo[user_id]
+        if len(_memo) + len(missing) > _MEMO_MAX_ENTRIES:
+            _memo.clear()
+    for user_id in missing:
+        fact = (
+            (nicknames or {}).get(user_id),
+            (levels or {}).get(user_id),
+            (frames or {}).get(user_id),
+        )
+        facts[user_id] = fact
+        if cacheable:
+            _memo[user_id] = (now + _MEMO_TTL_SECONDS, *fact)
+    return facts
 
-        nickname = get(user_id)
-    except Exception:
-        logger.opt(exception=True).warning("nickname unavailable for identity")
-        nickname = None
+
+def _nickname(user_id: str, nickname: str | None) -> str:
     if nickname:
         return str(nickname)
     # A recognizable stand-in beats an empty strip: the id tail is what group
@@ -83,24 +155,40 @@ def _nickname(user_id: str) -> str:
     return f"玩家{user_id[-4:]}" if len(user_id) >= 4 else f"玩家{user_id}"
 
 
-def _level(user_id: str) -> int | None:
+def _nicknames(user_ids: list[str]) -> dict[str, str] | None:
+    try:
+        from plugins.nickname import get_many
+
+        return get_many(user_ids)
+    except Exception:
+        logger.opt(exception=True).warning("nickname unavailable for identity")
+        return None
+
+
+def _levels(user_ids: list[str]) -> dict[str, int] | None:
     try:
         from plugins import monetary
 
-        return int(monetary.get_level(user_id))
+        return {
+            user_id: int(level)
+            for user_id, level in monetary.get_levels(user_ids).items()
+        }
     except Exception:
         logger.opt(exception=True).warning("level unavailable for identity")
         return None
 
 
-def _avatar_frame(user_id: str) -> ImageSource | None:
+def _avatar_frames(user_ids: list[str]) -> dict[str, ImageSource | None] | None:
     """Return equipped frame art without ever making identity rendering fail."""
 
     try:
-        from plugins.inventory.service import get_equipped
         from plugins.inventory.service import get_item_art
+        from plugins.inventory.service import get_equipped_many
 
-        return get_item_art(get_equipped(user_id).get("avatar_frame"))
+        return {
+            user_id: get_item_art(slots.get("avatar_frame"))
+            for user_id, slots in get_equipped_many(user_ids).items()
+        }
     except Exception:
         logger.opt(exception=True).warning("avatar frame unavailable for identity")
         return None
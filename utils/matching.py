@@ -0,0 +1,111 @@
+"""Alias lookup compiled once for chat-message matching.
+
+guess_chart matched every group message during a game against every song
+nickname: it scanned each nickname list for an exact hit, flattened and
+lowercased all nicknames again, ran ``process.extract`` over them, and then
+scanned the flat list once more to map each hit back to its song. cck and
+vits scanned their character alias lists the same way, one message at a time.
+
+A :class:`NameIndex` does that preparation once, when the aliases change:
+
+- a dict from lowercased alias to key for exact hits;
+- the unique lowercased aliases as rapidfuzz choices, with a parallel array of
+  their keys, so a fuzzy hit maps back by index;
+- each key's alias count, the tie-breaker between equal fuzzy scores.
+"""
+
+from typing import Mapping
+from typing import Iterable
+
+from rapidfuzz import fuzz
+from rapidfuzz import process
+
+#: Fuzzy score (0-100) a hit needs by default.
+DEFAULT_THRESHOLD = 75
+
+#: CJK queries get a lower bar: a one-character typo costs far more of a
+#: short CJK title's score than of a Latin one.
+CJK_THRESHOLD_DROP = 10
+CJK_MIN_THRESHOLD = 60
+
+#: Fuzzy candidates considered per query.
+FUZZY_LIMIT = 5
+
+
+class NameIndex:
+    def __init__(self, aliases: Mapping[str, Iterable[str]]) -> None:
+        """Compile ``aliases``, a mapping from key to that key's aliases.
+
+        An alias shared by several keys belongs to the first key listing it.
+        """
+
+        self.exact: dict[str, str] = {}
+        self.choices: list[str] = []
+        self.keys: list[str] = []
+        self.alias_counts: dict[str, int] = {}
+        for key, names in aliases.items():
+            names = list(names)
+            self.alias_counts[key] = len(names)
+            for name in names:
+                lowered = name.lower()
+                if lowered not in self.exact:
+                    self.exact[lowered] = key
+                    self.choices.append(lowered)
+                    self.keys.append(key)
+
+    def __len__(self) -> int:
+        return len(self.choices)
+
+    def exact_match(self, query: str) -> str | None:
+        """The key owning ``query`` as an alias, ignoring case."""
+
+        return self.exact.get(query.lower())
+
+    def match(self, query: str, threshold: int = DEFAULT_THRESHOLD) -> str | None:
+        """The key for ``query``: an exact alias first, then the best fuzzy hit.
+
+        Among fuzzy hits with the same score, the key with more aliases wins.
+        Queries shorter than two characters or without any letter or digit
+        only match exactly.
+        """
+
+        key = self.exact_match(query)
+        if key is not None or not self.choices or not is_fuzzy_query(query):
+            return key
+
+        if any(_is_cjk(char) for char in query):
+            threshold = max(threshold - CJK_THRESHOLD_DROP, CJK_MIN_THRESHOLD)
+        results = process.extract(
+            query.lower(),
+            self.choices,
+            scorer=fuzz.WRatio,
+            limit=FUZZY_LIMIT,
+            score_cutoff=threshold,
+        )
+
+        best_key = None
+        best_score = 0.0
+        for _, score, index in results:
+            candidate = self.keys[index]
+            if (
+                best_key is None
+                or score > best_score
+                or (
+                    score == best_score
+                    and self.alias_counts[candidate] > self.alias_counts[best_key]
+                )
+            ):
+                best_key = candidate
+                best_score = score
+        return best_key
+
+
+def is_fuzzy_query(query: str) -> bool:
+    """Whether ``query`` is worth fuzzy matching: two characters, one alphanumeric."""
+
+    stripped = query.strip()
+    return len(stripped) >= 2 and any(char.isalnum() for char in query)
+
+
+def _is_cjk(char: str) -> bool:
+    return "一" <= char <= "鿿" or "㐀" <= char <= "䶿"
@@ -0,0 +1,152 @@
+"""Record which boot migrations a database has already been through.
+
+Every plugin's ``init_database`` used to re-run all of its migrations on each
+start, and each one introspected tables or scanned rows just to find that
+there was nothing left to do. A :class:`MigrationRegistry` keeps a small
+``schema_migrations`` table in the database it migrates, with one row per
+migration id and the hash of what ran. At boot the table is read once; a step
+whose id and hash match is skipped with a dict lookup.
+
+The hash covers the source of the module defining the step plus any
+``content`` the caller passes (a bundled JSON file, the index list of a
+model). Editing the migration or its input makes it run again, so migrations
+must stay idempotent, as they always have been.
+
+Records are written when the ``migrations`` block exits, after the plugin has
+created its tables: several migrations decide what to do from whether the
+database file exists yet, and reading the registry never creates it.
+"""
+
+import time
+import hashlib
+import inspect
+from typing import Any
+from typing import Callable
+from typing import Iterator
+from pathlib import Path
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from nonebot.log import logger
+from sqlalchemy.exc import OperationalError
+
+_module_hashes: dict[str, str] = {}
+
+
+class MigrationRegistry:
+    def __init__(self, engine, name: str) -> None:
+        self.engine = engine
+        self.name = name
+        self.applied = self._load()
+        self.records: list[dict[str, Any]] = []
+        self.skipped = 0
+
+    def run(
+        self,
+        migration_id: str,
+        step: Callable[..., Any],
+        *args: Any,
+        content: bytes | str = b"",
+    ) -> bool:
+        """Run ``step(*args)`` unless this exact migration already ran.
+
+        Returns whether the step ran.
+        """
+
+        content_hash = _content_hash(step, content)
+        if self.applied.get(migration_id) == content_hash:
+            self.skipped += 1
+            return False
+        started = time.perf_counter()
+        step(*args)
+        self.applied[migration_id] = content_hash
+        self.records.append(
+            {
+                "id": migration_id,
+                "content_hash": content_hash,
+                "applied_at": int(time.time()),
+                "duration_ms": int((time.perf_counter() - started) * 1000),
+            }
+        )
+        return True
+
+    def _load(self) -> dict[str, str]:
+        database = self.engine.url.database
+        if database and database != ":memory:" and not Path(database).exists():
+            return {}
+        try:
+            with self.engine.connect() as connection:
+                rows = connection.execute(
+                    text("SELECT id, content_hash FROM schema_migrations")
+                ).fetchall()
+        except OperationalError:
+            return {}
+        return {row[0]: row[1] for row in rows}
+
+    def save(self) -> None:
+        if not self.records:
+            return
+        with self.engine.begin() as connection:
+            connection.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                    "id VARCHAR PRIMARY KEY, "
+                    "content_hash VARCHAR NOT NULL, "
+                    "applied_at INTEGER NOT NULL, "
+                    "duration_ms INTEGER NOT NULL)"
+                )
+            )
+            connection.execute(
+                text(
+                    "INSERT OR REPLACE INTO schema_migrations "
+                    "(id, content_hash, applied_at, duration_ms) "
+                    "VALUES (:id, :content_hash, :applied_at, :duration_ms)"
+                ),
+                self.records,
+            )
+
+
+@contextmanager
+def migrations(engine, name: str) -> Iterator[MigrationRegistry]:
+    """Run boot migrations for one database and log how long they took.
+
+    Steps that completed are recorded even if a later one raises.
+    """
+
+    started = time.perf_counter()
+    registry = MigrationRegistry(engine, name)
+    try:
+        yield registry
+    finally:
+        registry.save()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"{name} migrations: ran {len(registry.records)}, "
+            f"skipped {registry.skipped} in {elapsed_ms:.1f} ms"
+        )
+
+
+def index_signature(model) -> str:
+    """``content`` for a step that creates the indexes ``model`` declares."""
+
+    return ";".join(
+        sorted(
+            f"{index.name}({','.join(column.name for column in index.columns)})"
+            for index in model.__table__.indexes
+        )
+    )
+
+
+def _content_hash(step: Callable[..., Any], content: bytes | str) -> str:
+    module = inspect.getmodule(step)
+    module_name = module.__name__ if module is not None else ""
+    if module_name not in _module_hashes:
+        try:
+            source = inspect.getsource(module).encode("utf-8")
+        except (OSError, TypeError):
+            source = step.__code__.co_code
+        _module_hashes[module_name] = hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256(_module_hashes[module_name].encode("ascii"))
+    digest.update(step.__qualname__.encode("utf-8"))
+    digest.update(content.encode("utf-8") if isinstance(content, str) else content)
+    return digest.hexdigest()